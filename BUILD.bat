@@ -42,6 +42,17 @@ pyinstaller --onefile --windowed --name=DNAAnalysisTool ^
     --hidden-import=real_ancestry_data ^
     --hidden-import=calibrated_ancestry_engine ^
     --hidden-import=comprehensive_analysis ^
+    --hidden-import=analysis_scheduler ^
+    --hidden-import=results_cache ^
+    --hidden-import=polygenic_risk_engine ^
+    --hidden-import=star_allele_caller ^
+    --hidden-import=haplogroup_tree ^
+    --hidden-import=carrier_panel ^
+    --hidden-import=introgression_scanner ^
+    --hidden-import=ancient_affinity ^
+    --hidden-import=score_rules ^
+    --hidden-import=blood_groups ^
+    --hidden-import=ancestry_marker_weights ^
     --hidden-import=ancestry_markers_real ^
     --hidden-import=ancestry_markers_expanded ^
     --hidden-import=ancestry_markers_merged ^
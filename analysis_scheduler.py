@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Analysis Scheduler
+Runs the ComprehensiveDNAAnalysisEngine modules as a dependency graph.
+
+Each module is declared with the engine method that computes it and the
+modules whose results it receives as keyword arguments (see ANALYSIS_MODULES
+in comprehensive_analysis.py). Modules whose inputs are ready run
+concurrently on a thread or process pool. A module that raises or runs past
+its timeout is recorded as failed and gets an empty result; modules that
+depend on it receive None for that input, so one bad module never stops the
+rest of the run.
+
+Before a module is submitted the engine's per-kit memo is consulted
+(cached_result / store_result), so a module computed once for a kit is not
+recomputed, whichever backend ran it.
+
+An optional on_event(event, run) callback is told when each module starts
+and finishes ('started' / 'finished', with the ModuleRun holding the result),
+so callers can show progress and use sections as soon as they are ready. A
+cancel Event is checked between modules; once set, no further module is
+started and run() raises AnalysisCancelled.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+BACKENDS = ('serial', 'thread', 'process')
+
+# How often a pooled run checks its cancel Event while modules are running
+CANCEL_POLL_SECONDS = 0.1
+
+# Module run states
+PENDING = 'pending'
+RUNNING = 'running'
+OK = 'ok'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+CANCELLED = 'cancelled'
+
+# Progress events
+STARTED = 'started'
+FINISHED = 'finished'
+
+
+class AnalysisCancelled(Exception):
+    """Raised when an analysis (or a file parse) is cancelled by the caller"""
+
+
+@dataclass
+class ModuleRun:
+    """Outcome of one analysis module"""
+    name: str
+    status: str = PENDING
+    result: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    cached: bool = False
+
+
+def _call(engine, method: str, inputs: Dict[str, Any]):
+    """Run one engine method, returning (result, seconds)"""
+    start = time.perf_counter()
+    result = getattr(engine, method)(**inputs)
+    return result, time.perf_counter() - start
+
+
+# =============================================================================
+# PROCESS BACKEND WORKERS
+# =============================================================================
+
+_WORKER_ENGINE = None
+
+
+def _init_worker(snp_dict: Dict[str, str]):
+    """Give each worker process its own engine holding the kit (sent once)"""
+    global _WORKER_ENGINE
+    from comprehensive_analysis import ComprehensiveDNAAnalysisEngine
+    _WORKER_ENGINE = ComprehensiveDNAAnalysisEngine()
+    _WORKER_ENGINE.snp_dict = snp_dict
+
+
+def _call_in_worker(method: str, inputs: Dict[str, Any]):
+    return _call(_WORKER_ENGINE, method, inputs)
+
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+class AnalysisScheduler:
+    """
+    Dependency-aware runner for the analysis modules.
+
+    Args:
+        modules: name -> {'method': engine method, 'inputs': {kwarg: module}}
+        backend: 'thread', 'process' (true parallelism; the kit is copied to
+            every worker once) or 'serial' (in order, no timeouts)
+        max_workers: pool size (defaults to the CPU count)
+        timeout: seconds allowed per module (None = no limit)
+        timeouts: per-module overrides of timeout
+    """
+
+    def __init__(self, modules: Dict[str, Dict], backend: str = 'thread',
+                 max_workers: int = None, timeout: float = None,
+                 timeouts: Dict[str, float] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}' (expected one of {BACKENDS})")
+        self.modules = modules
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.order = self._topological_order()
+        # Set per run()
+        self.on_event = None
+        self.cancel = None
+
+    def _topological_order(self) -> List[str]:
+        """Modules in declaration order, moved after their inputs where needed"""
+        order = []
+        visiting = set()
+
+        def visit(name: str):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through module '{name}'")
+            if name not in self.modules:
+                raise ValueError(f"Unknown analysis module '{name}'")
+            visiting.add(name)
+            for dep in self.modules[name].get('inputs', {}).values():
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.modules:
+            visit(name)
+        return order
+
+    def _inputs(self, name: str, runs: Dict[str, ModuleRun]) -> Dict[str, Any]:
+        """Keyword arguments for a module; failed inputs are passed as None"""
+        return {kwarg: runs[dep].result if runs[dep].status == OK else None
+                for kwarg, dep in self.modules[name].get('inputs', {}).items()}
+
+    def _ready(self, name: str, runs: Dict[str, ModuleRun]) -> bool:
+        return all(runs[dep].status not in (PENDING, RUNNING)
+                   for dep in self.modules[name].get('inputs', {}).values())
+
+    def _from_memo(self, engine, name: str, runs: Dict[str, ModuleRun]) -> bool:
+        """Fill a module's run from the engine memo if it was computed before"""
+        found, result = engine.cached_result(name)
+        if found:
+            run = runs[name]
+            run.status, run.result, run.cached = OK, result, True
+            self._emit(FINISHED, run)
+        return found
+
+    def _emit(self, event: str, run: ModuleRun):
+        if self.on_event is not None:
+            try:
+                self.on_event(event, run)
+            except Exception as e:
+                print(f"Warning: progress callback failed: {e}")
+
+    def _check_cancelled(self, runs: Dict[str, ModuleRun]):
+        """Mark modules not yet started as cancelled and stop the run"""
+        if self.cancel is not None and self.cancel.is_set():
+            for run in runs.values():
+                if run.status in (PENDING, RUNNING):
+                    run.status = CANCELLED
+            raise AnalysisCancelled("analysis cancelled")
+
+    def _memoize(self, engine, name: str, runs: Dict[str, ModuleRun]):
+        """Memoize a successful result (not if it was built from failed inputs)"""
+        deps = self.modules[name].get('inputs', {}).values()
+        if runs[name].status == OK and all(runs[dep].status == OK for dep in deps):
+            engine.store_result(name, runs[name].result)
+
+    def _module_timeout(self, name: str) -> Optional[float]:
+        return self.timeouts.get(name, self.timeout)
+
+    @staticmethod
+    def _record(run: ModuleRun, result=None, elapsed: float = 0.0, error: Exception = None):
+        if error is None:
+            run.status, run.result, run.elapsed = OK, result, elapsed
+        else:
+            run.status, run.result = ERROR, {}
+            run.error = f"{type(error).__name__}: {error}"
+            print(f"Warning: {run.name} analysis failed: {run.error}")
+
+    def run(self, engine, on_event: Callable[[str, ModuleRun], None] = None,
+            cancel: threading.Event = None) -> Dict[str, ModuleRun]:
+        """
+        Run every module against engine.snp_dict; returns name -> ModuleRun.
+
+        Raises AnalysisCancelled if cancel is set before every module ran
+        (modules already running on a pool are left to finish unobserved).
+        """
+        runs = {name: ModuleRun(name) for name in self.modules}
+        self.on_event, self.cancel = on_event, cancel
+
+        if self.backend == 'serial':
+            for name in self.order:
+                self._check_cancelled(runs)
+                if self._from_memo(engine, name, runs):
+                    continue
+                runs[name].status = RUNNING
+                self._emit(STARTED, runs[name])
+                try:
+                    result, elapsed = _call(engine, self.modules[name]['method'],
+                                            self._inputs(name, runs))
+                    self._record(runs[name], result, elapsed)
+                except Exception as e:
+                    self._record(runs[name], error=e)
+                self._memoize(engine, name, runs)
+                self._emit(FINISHED, runs[name])
+            return runs
+
+        pools = [self._new_pool(engine)]
+        pending = list(self.order)
+        running = {}  # future -> (module name, start time)
+        cancelled = False
+        try:
+            while pending or running:
+                try:
+                    self._check_cancelled(runs)
+                except AnalysisCancelled:
+                    cancelled = True
+                    raise
+                # Only submit while a worker is free, so a module's clock
+                # starts when it actually starts running
+                for name in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    if not self._ready(name, runs):
+                        continue
+                    pending.remove(name)
+                    if self._from_memo(engine, name, runs):
+                        continue
+                    method, inputs = self.modules[name]['method'], self._inputs(name, runs)
+                    if self.backend == 'process':
+                        future = pools[-1].submit(_call_in_worker, method, inputs)
+                    else:
+                        future = pools[-1].submit(_call, engine, method, inputs)
+                    runs[name].status = RUNNING
+                    running[future] = (name, time.perf_counter())
+                    self._emit(STARTED, runs[name])
+
+                done, _ = wait(running, timeout=self._wait_timeout(running),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, _ = running.pop(future)
+                    try:
+                        result, elapsed = future.result()
+                        self._record(runs[name], result, elapsed)
+                    except Exception as e:
+                        self._record(runs[name], error=e)
+                    self._memoize(engine, name, runs)
+                    self._emit(FINISHED, runs[name])
+
+                now = time.perf_counter()
+                timed_out = False
+                for future, (name, started) in list(running.items()):
+                    limit = self._module_timeout(name)
+                    if limit is not None and now - started >= limit:
+                        del running[future]
+                        run = runs[name]
+                        run.status, run.result, run.elapsed = TIMEOUT, {}, now - started
+                        run.error = f"timed out after {limit:g}s"
+                        print(f"Warning: {name} analysis {run.error}")
+                        self._emit(FINISHED, run)
+                        timed_out = True
+
+                # A running module cannot be interrupted and keeps its worker
+                # busy, so later modules go to a fresh pool; the old one
+                # finishes its work in the background
+                if timed_out:
+                    pools.append(self._new_pool(engine))
+        finally:
+            for pool in pools[:-1]:
+                pool.shutdown(wait=False)
+            pools[-1].shutdown(wait=len(pools) == 1 and not cancelled, cancel_futures=True)
+
+        return runs
+
+    def _new_pool(self, engine):
+        if self.backend == 'process':
+            return ProcessPoolExecutor(max_workers=self.max_workers,
+                                       initializer=_init_worker,
+                                       initargs=(engine.snp_dict,))
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _next_deadline(self, running: Dict) -> Optional[float]:
+        """Seconds until the earliest running module times out"""
+        now = time.perf_counter()
+        remaining = [started + self._module_timeout(name) - now
+                     for name, started in running.values()
+                     if self._module_timeout(name) is not None]
+        return max(0.0, min(remaining)) if remaining else None
+
+    def _wait_timeout(self, running: Dict) -> Optional[float]:
+        """How long to wait for a module to finish before checking again"""
+        deadline = self._next_deadline(running)
+        if self.cancel is None:
+            return deadline
+        return CANCEL_POLL_SECONDS if deadline is None else min(deadline, CANCEL_POLL_SECONDS)
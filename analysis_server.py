@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Local Analysis Server
+HTTP service that analyzes uploaded raw DNA files on a pool of warm workers.
+
+Worker processes are started up front and import the marker databases once,
+so a request only pays for parsing and analysis. Uploads are spooled to a
+temporary file in 1 MB pieces and parsed in chunks by the worker. At most
+--workers kits are analyzed at once; up to --max-queue more wait their turn
+and anything beyond that is turned away with 503.
+
+Endpoints:
+    POST /analyze[?modules=a,b&filename=kit.txt]
+                    body = raw DNA file (.txt/.csv, or a .zip)
+                    returns JSON results (all sections, or just the modules
+                    asked for, plus 'ethnicity' when included)
+    GET  /modules   available section names
+    GET  /metrics   request counts, queue depth, latency percentiles
+    GET  /health
+
+Usage: python analysis_server.py [--host 127.0.0.1] [--port 8765] [--workers N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_MAX_UPLOAD_MB = 256
+DEFAULT_TIMEOUT = 300.0
+
+# How long warm-up waits for every worker to finish importing
+WARM_UP_TIMEOUT = 300.0
+
+UPLOAD_BLOCK_BYTES = 1024 * 1024
+
+# Latencies kept per endpoint for the percentiles in /metrics
+LATENCY_WINDOW = 10000
+
+# Extra section computed with the calibrated ancestry engine
+ETHNICITY = 'ethnicity'
+
+
+# =============================================================================
+# WORKERS
+# =============================================================================
+
+_ENGINE = None
+_WARM_BARRIER = None
+
+
+def _init_worker(use_cache: bool, warm_barrier=None):
+    """Import the databases and build an engine once per worker process"""
+    global _ENGINE, _WARM_BARRIER
+    from comprehensive_analysis import ComprehensiveDNAAnalysisEngine
+    from results_cache import open_results_cache
+    _ENGINE = ComprehensiveDNAAnalysisEngine(
+        results_cache=open_results_cache() if use_cache else None)
+    _WARM_BARRIER = warm_barrier
+
+
+def _warm_up() -> int:
+    """Block until every worker is up, so no worker can take two warm-up tasks"""
+    if _WARM_BARRIER is not None:
+        _WARM_BARRIER.wait(WARM_UP_TIMEOUT)
+    return os.getpid()
+
+
+def _analyze_upload(path: str, filename: str, modules: Optional[List[str]]) -> Dict:
+    """Parse and analyze one uploaded kit; returns the JSON response text and timings"""
+    from batch_analysis import json_default
+    from calibrated_ancestry_engine import CalibratedAncestryEngine
+    from comprehensive_analysis import ANALYSIS_MODULES
+    from dna_parser import parse_dna_file_streaming, snp_dict_from_dataframe
+
+    started = time.time()
+    with open(path, 'rb') as f:
+        dna_df = parse_dna_file_streaming(f, filename)
+    if dna_df is None or len(dna_df) == 0:
+        return {'status': 400, 'started': started,
+                'body': json.dumps({'error': 'could not parse DNA file'})}
+
+    wanted = modules or list(ANALYSIS_MODULES) + [ETHNICITY]
+    results = _ENGINE.run_lazy_analysis(dna_df, prefetch=False)
+    sections = {name: results.get(name) for name in wanted if name in ANALYSIS_MODULES}
+
+    if ETHNICITY in wanted:
+        ancestry = CalibratedAncestryEngine()
+        ancestry.load_dna(snp_dict_from_dataframe(dna_df, drop_no_calls=True))
+        sections[ETHNICITY] = ancestry.analyze()
+
+    body = json.dumps({
+        'kit_fingerprint': results._engine.kit_fingerprint,
+        'snps': len(dna_df),
+        'seconds': round(time.time() - started, 4),
+        'module_errors': results.module_errors,
+        'cached_modules': results.cached_modules,
+        'results': sections,
+    }, default=json_default)
+    return {'status': 200, 'started': started, 'body': body}
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+class ServerMetrics:
+    """Thread-safe request counters and latency windows"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {'requests': 0, 'ok': 0, 'client_errors': 0,
+                       'server_errors': 0, 'rejected': 0, 'timeouts': 0}
+        self.in_flight = 0
+        self.latencies = {}  # endpoint -> deque of seconds
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, endpoint: str, status: int, seconds: float):
+        with self._lock:
+            self.counts['requests'] += 1
+            if status < 400:
+                self.counts['ok'] += 1
+            elif status == 503:
+                self.counts['rejected'] += 1
+            elif status == 504:
+                self.counts['timeouts'] += 1
+            elif status < 500:
+                self.counts['client_errors'] += 1
+            else:
+                self.counts['server_errors'] += 1
+            self.latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def record_queue_wait(self, seconds: float):
+        with self._lock:
+            self.queue_waits.append(seconds)
+
+    @staticmethod
+    def _percentiles(values) -> Dict[str, float]:
+        if not values:
+            return {}
+        values = np.asarray(values)
+        return {'count': int(len(values)),
+                'p50': round(float(np.percentile(values, 50)), 4),
+                'p90': round(float(np.percentile(values, 90)), 4),
+                'p99': round(float(np.percentile(values, 99)), 4),
+                'max': round(float(values.max()), 4)}
+
+    def snapshot(self, workers: int, max_queue: int) -> Dict:
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started, 1),
+                'workers': workers,
+                'max_queue': max_queue,
+                'in_flight': self.in_flight,
+                'queued': max(0, self.in_flight - workers),
+                'counts': dict(self.counts),
+                'latency_seconds': {endpoint: self._percentiles(list(values))
+                                    for endpoint, values in self.latencies.items()},
+                'queue_wait_seconds': self._percentiles(list(self.queue_waits)),
+            }
+
+
+# =============================================================================
+# HTTP SERVER
+# =============================================================================
+
+class AnalysisServer(ThreadingHTTPServer):
+    """HTTP server owning the worker pool and admission control"""
+
+    daemon_threads = True
+
+    def __init__(self, address, workers: int, max_queue: int = DEFAULT_MAX_QUEUE,
+                 max_upload_bytes: int = DEFAULT_MAX_UPLOAD_MB * 1024 * 1024,
+                 timeout: float = DEFAULT_TIMEOUT, use_cache: bool = False):
+        super().__init__(address, AnalysisRequestHandler)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_upload_bytes = max_upload_bytes
+        self.request_timeout = timeout
+        self.metrics = ServerMetrics()
+        # Running plus waiting analyses; beyond this requests get 503
+        self.admission = threading.BoundedSemaphore(workers + max_queue)
+
+        # Start every worker now so the first requests don't pay for imports.
+        # The warm-up tasks meet at a barrier, which forces one onto each worker.
+        warm_barrier = multiprocessing.get_context().Barrier(workers)
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(use_cache, warm_barrier))
+        warm = [self.pool.submit(_warm_up) for _ in range(workers)]
+        pids = set()
+        for future in warm:
+            try:
+                pids.add(future.result())
+            except Exception as e:
+                print(f"Warning: worker warm-up failed: {type(e).__name__}: {e}")
+        self.worker_pids = sorted(pids)
+        if len(self.worker_pids) < workers:
+            print(f"Warning: only {len(self.worker_pids)} of {workers} workers warmed up")
+
+    def finish_request_job(self, path: Optional[str]):
+        """Give back an admission slot and delete the request's spooled upload"""
+        with self.metrics._lock:
+            self.metrics.in_flight -= 1
+        self.admission.release()
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    server: AnalysisServer
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Quiet by default; errors are still reported in the responses
+        pass
+
+    def _send_json(self, status: int, body):
+        data = (body if isinstance(body, str) else json.dumps(body)).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 503:
+            self.send_header('Retry-After', '5')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        start = time.perf_counter()
+        path = urlparse(self.path).path
+        if path == '/health':
+            status, body = 200, {'status': 'ok', 'workers': self.server.worker_pids}
+        elif path == '/metrics':
+            status, body = 200, self.server.metrics.snapshot(self.server.workers,
+                                                             self.server.max_queue)
+        elif path == '/modules':
+            from comprehensive_analysis import ANALYSIS_MODULES
+            status, body = 200, {'modules': list(ANALYSIS_MODULES) + [ETHNICITY]}
+        else:
+            status, body = 404, {'error': f'unknown endpoint {path}'}
+        self._send_json(status, body)
+        if path != '/metrics':
+            self.server.metrics.record(path, status, time.perf_counter() - start)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        if url.path != '/analyze':
+            self._discard_body()
+            self._send_json(404, {'error': f'unknown endpoint {url.path}'})
+            return
+
+        status, body = self._analyze(parse_qs(url.query))
+        self._send_json(status, body)
+        self.server.metrics.record('/analyze', status, time.perf_counter() - start)
+
+    def _discard_body(self):
+        remaining = int(self.headers.get('Content-Length') or 0)
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, UPLOAD_BLOCK_BYTES)) or b'x' * remaining)
+
+    def _analyze(self, query: Dict[str, List[str]]):
+        from comprehensive_analysis import ANALYSIS_MODULES
+
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return 411, {'error': 'Content-Length required'}
+        length = int(length)
+        if length > self.server.max_upload_bytes:
+            self.close_connection = True
+            return 413, {'error': f'upload larger than {self.server.max_upload_bytes} bytes'}
+
+        modules = None
+        if query.get('modules'):
+            modules = [m.strip() for m in ','.join(query['modules']).split(',') if m.strip()]
+            unknown = [m for m in modules if m not in ANALYSIS_MODULES and m != ETHNICITY]
+            if unknown:
+                self._discard_body()
+                return 400, {'error': f'unknown modules: {", ".join(unknown)}'}
+
+        if not self.server.admission.acquire(blocking=False):
+            self._discard_body()
+            return 503, {'error': 'server busy, try again later'}
+
+        path = None
+        future = None
+        metrics = self.server.metrics
+        with metrics._lock:
+            metrics.in_flight += 1
+        try:
+            path, is_zip = self._spool_upload(length)
+            filename = (query.get('filename') or ['upload.txt'])[0]
+            if is_zip and not filename.endswith('.zip'):
+                filename += '.zip'
+
+            submitted = time.time()
+            future = self.server.pool.submit(_analyze_upload, path, filename, modules)
+            try:
+                outcome = future.result(timeout=self.server.request_timeout)
+            except FutureTimeout:
+                # A queued job is dropped; a running one can't be interrupted and
+                # keeps its slot and upload until it finishes
+                future.cancel()
+                return 504, {'error': f'analysis exceeded {self.server.request_timeout:g}s'}
+            metrics.record_queue_wait(max(0.0, outcome['started'] - submitted))
+            return outcome['status'], outcome['body']
+        except Exception as e:
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            if future is None:
+                self.server.finish_request_job(path)
+            else:
+                # Runs straight away if the job is already done or cancelled
+                future.add_done_callback(lambda _, p=path: self.server.finish_request_job(p))
+
+    def _spool_upload(self, length: int):
+        """Copy the request body to a temporary file; returns (path, is_zip)"""
+        fd, path = tempfile.mkstemp(prefix='dna_upload_')
+        first = b''
+        with os.fdopen(fd, 'wb') as f:
+            remaining = length
+            while remaining > 0:
+                block = self.rfile.read(min(remaining, UPLOAD_BLOCK_BYTES))
+                if not block:
+                    break
+                if not first:
+                    first = block[:4]
+                f.write(block)
+                remaining -= len(block)
+        return path, first.startswith(b'PK\x03\x04')
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Local DNA analysis HTTP service')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help='requests allowed to wait for a worker before 503')
+    parser.add_argument('--max-upload-mb', type=float, default=DEFAULT_MAX_UPLOAD_MB)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds before a request gets 504')
+    parser.add_argument('--cache', action='store_true',
+                        help='use the persistent results cache')
+    args = parser.parse_args(argv)
+
+    print(f"Starting {args.workers} workers...")
+    server = AnalysisServer((args.host, args.port), workers=args.workers,
+                            max_queue=args.max_queue,
+                            max_upload_bytes=int(args.max_upload_mb * 1024 * 1024),
+                            timeout=args.timeout, use_cache=args.cache)
+    print(f"Listening on http://{args.host}:{args.port} (workers {server.worker_pids})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Cohort Ancestry Scoring
+Scores ancestry for many kits at once against the compiled frequency panel.
+
+A cohort is a (samples x panel markers) matrix of genotype codes. Each chunk
+of samples is one-hot encoded and scored with a few matrix multiplies
+(log-likelihood sums, LD-weight totals and marker counts), then converted to
+continental and regional percentages with the same thresholds as
+CalibratedAncestryEngine.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from calibrated_ancestry_engine import (
+    REFERENCE_POPULATIONS,
+    CONTINENTAL_GROUPS,
+    EXCLUDED_POPULATIONS,
+    MISSING_GENOTYPE,
+    N_GENOTYPE_CODES,
+    CompiledPanel,
+    encode_genotype,
+    get_compiled_panel,
+)
+
+# Samples scored per matrix multiply (bounds the one-hot block in memory)
+DEFAULT_CHUNK_SIZE = 256
+
+
+# =============================================================================
+# ENCODING
+# =============================================================================
+
+def encode_cohort(kits: Iterable[Dict[str, str]],
+                  panel: Optional[CompiledPanel] = None) -> np.ndarray:
+    """Encode rsid -> genotype dicts as a (samples x panel markers) code matrix"""
+    panel = panel or get_compiled_panel()
+    return np.array([panel.encode_kit(kit) for kit in kits],
+                    dtype=np.int16).reshape(-1, len(panel.rsids))
+
+
+def encode_genotype_frame(genotypes, panel: Optional[CompiledPanel] = None) -> np.ndarray:
+    """
+    Encode a samples x rsids DataFrame of genotype strings.
+
+    Columns not in the panel are ignored; panel markers without a column, and
+    empty cells, are treated as missing.
+    """
+    panel = panel or get_compiled_panel()
+    codes = np.full((len(genotypes), len(panel.rsids)), MISSING_GENOTYPE, dtype=np.int16)
+
+    for column in genotypes.columns:
+        m = panel.marker_index.get(column)
+        if m is None:
+            continue
+        values = genotypes[column]
+        present = values.notna().to_numpy()
+        strings = values[present].astype(str)
+        # Only a handful of distinct genotype strings per column
+        lookup = {gt: encode_genotype(gt) for gt in strings.unique()}
+        codes[present, m] = strings.map(lookup).to_numpy()
+
+    return codes
+
+
+# =============================================================================
+# SCORING
+# =============================================================================
+
+@dataclass
+class CohortScores:
+    """Ancestry scores for a cohort (one row per sample)"""
+    populations: List[str]
+    continents: List[str]
+    scores: np.ndarray         # (samples, populations) average log-likelihood
+    counts: np.ndarray         # (samples, populations) markers scored
+    markers_matched: np.ndarray  # (samples,)
+    continental: np.ndarray    # (samples, continents) percentages
+    regional: np.ndarray       # (samples, populations) percentages, 0 if not scored
+
+    def sample_results(self, i: int) -> Dict:
+        """Results for one sample in the CalibratedAncestryEngine.analyze() format"""
+        continental = {continent: round(float(pct), 1)
+                       for continent, pct in zip(self.continents, self.continental[i])
+                       if pct >= 0.1}
+
+        regional = {}
+        for pop, pct in zip(self.populations, self.regional[i]):
+            if pct >= 0.1 and pop in REFERENCE_POPULATIONS:
+                regional[REFERENCE_POPULATIONS[pop]['display']] = round(float(pct), 1)
+        regional = dict(sorted(regional.items(), key=lambda x: x[1], reverse=True))
+
+        populations = {pop: {'score': float(self.scores[i, p]), 'markers': int(self.counts[i, p])}
+                       for p, pop in enumerate(self.populations)
+                       if pop not in EXCLUDED_POPULATIONS and self.counts[i, p] >= 10}
+
+        markers_matched = int(self.markers_matched[i])
+        return {
+            'continental': continental,
+            'regional': regional,
+            'populations': populations,
+            'markers_matched': markers_matched,
+            'confidence': round(min(100, (markers_matched / 200) * 100), 1),
+        }
+
+
+def _masked_percentages(scores: np.ndarray, mask: np.ndarray,
+                        scale_factor: float) -> np.ndarray:
+    """Row-wise softmax over the masked-in columns (others get 0%)"""
+    masked = np.where(mask, scores, -np.inf)
+    row_max = masked.max(axis=1, keepdims=True)
+    row_max = np.where(np.isfinite(row_max), row_max, 0.0)
+    exp_scores = np.where(mask, np.exp((masked - row_max) * scale_factor), 0.0)
+    totals = exp_scores.sum(axis=1, keepdims=True)
+    return np.divide(exp_scores * 100, totals, out=np.zeros_like(exp_scores),
+                     where=totals > 0)
+
+
+def _score_chunk(codes: np.ndarray, panel: Optional[CompiledPanel] = None):
+    """
+    Population sums, weight totals and marker counts for a block of samples.
+
+    Returns (sums, weights, counts), all (samples x populations).
+    """
+    panel = panel or get_compiled_panel()
+    n_samples, n_markers = codes.shape
+
+    present = codes != MISSING_GENOTYPE
+    one_hot = np.zeros((n_samples, n_markers * N_GENOTYPE_CODES))
+    rows, markers = np.nonzero(present)
+    one_hot[rows, markers * N_GENOTYPE_CODES + codes[rows, markers]] = 1.0
+
+    # (markers * codes, populations), zero where a population has no data
+    log_probs = np.where(panel.valid[:, :, None], panel.log_probs, 0.0)
+    log_probs = log_probs.transpose(0, 2, 1).reshape(n_markers * N_GENOTYPE_CODES, -1)
+
+    present = present.astype(np.float64)
+    sums = one_hot @ log_probs
+    weights = present @ panel.valid_weights
+    counts = present @ panel.valid.astype(np.float64)
+    return sums, weights, counts
+
+
+def score_cohort(codes: np.ndarray, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 n_workers: int = 1) -> CohortScores:
+    """
+    Score every sample in a (samples x panel markers) genotype code matrix.
+
+    Args:
+        codes: matrix from encode_cohort / encode_genotype_frame
+        chunk_size: samples per matrix multiply
+        n_workers: >1 shards chunks across a process pool
+
+    Returns:
+        CohortScores with per-sample scores and percentages
+    """
+    panel = get_compiled_panel()
+    chunks = [codes[start:start + chunk_size]
+              for start in range(0, len(codes), chunk_size)]
+
+    if n_workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            partials = list(pool.map(_score_chunk, chunks))
+    else:
+        partials = [_score_chunk(chunk, panel) for chunk in chunks]
+
+    n_pops = len(panel.populations)
+    if partials:
+        sums, weights, counts = (np.vstack([p[i] for p in partials]) for i in range(3))
+    else:
+        sums = weights = counts = np.zeros((0, n_pops))
+
+    scores = np.where(counts > 0, sums / np.where(counts > 0, weights, 1.0), -999.0)
+    pop_index = panel.population_index
+
+    # Continental: best population with >= 20 markers per continent
+    continents = list(CONTINENTAL_GROUPS.keys())
+    continent_scores = np.full((len(codes), len(continents)), -np.inf)
+    for c, continent in enumerate(continents):
+        cols = [pop_index[pop] for pop in CONTINENTAL_GROUPS[continent] if pop in pop_index]
+        if cols:
+            eligible = np.where(counts[:, cols] >= 20, scores[:, cols], -np.inf)
+            continent_scores[:, c] = eligible.max(axis=1)
+    continent_mask = np.isfinite(continent_scores)
+    continental = _masked_percentages(continent_scores, continent_mask, 15.0)
+    # No continent with enough markers: same default as the engine
+    no_data = ~continent_mask.any(axis=1)
+    continental[no_data, continents.index('European')] = 100.0
+
+    # Regional: populations with >= 30 markers, else any with >= 10
+    scorable = np.array([pop not in EXCLUDED_POPULATIONS for pop in panel.populations])
+    scored = scorable & (counts >= 10)
+    good = scorable & (counts >= 30)
+    regional_mask = np.where(good.any(axis=1, keepdims=True), good, scored)
+    regional = _masked_percentages(scores, regional_mask, 8.0)
+
+    return CohortScores(
+        populations=list(panel.populations),
+        continents=continents,
+        scores=scores,
+        counts=counts.astype(np.int64),
+        markers_matched=(codes != MISSING_GENOTYPE).sum(axis=1),
+        continental=continental,
+        regional=regional,
+    )
+
+
+def score_kits(kits: Iterable[Dict[str, str]], chunk_size: int = DEFAULT_CHUNK_SIZE,
+               n_workers: int = 1) -> CohortScores:
+    """Encode and score a list of rsid -> genotype dicts"""
+    return score_cohort(encode_cohort(kits), chunk_size=chunk_size, n_workers=n_workers)
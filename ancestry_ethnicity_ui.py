@@ -5,7 +5,9 @@ Similar to AncestryDNA's ethnicity estimate display
 """
 
 import customtkinter as ctk
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+
+from dna_parser import snp_dict_from_dataframe
 
 
 # Color palette for regions (matching AncestryDNA-style colors)
@@ -28,10 +30,10 @@ REGION_COLORS = {
 class AncestryEthnicityFrame(ctk.CTkScrollableFrame):
     """Main frame for ancestry ethnicity estimate display"""
 
-    def __init__(self, parent, snp_dict=None, **kwargs):
+    def __init__(self, parent, snp_dict=None, results=None, **kwargs):
         super().__init__(parent, **kwargs)
         self.snp_dict = None
-        self.results = None
+        self.results = results
         self.configure(fg_color="transparent")
 
         # Convert DataFrame to dict if needed
@@ -48,36 +50,19 @@ class AncestryEthnicityFrame(ctk.CTkScrollableFrame):
                 print(f"Error converting DNA data: {e}")
                 self.snp_dict = None
 
-        if self.snp_dict:
+        # Results may already be computed (e.g. streamed during file load)
+        if self.snp_dict and self.results is None:
             self.analyze_ancestry()
 
         self.build_ui()
 
     def _dataframe_to_dict(self, df) -> Dict[str, str]:
         """Convert a DNA DataFrame to rsid -> genotype dict"""
-        snp_dict = {}
         try:
-            # Handle different column name formats
-            cols = [c.lower().strip() for c in df.columns]
-            df.columns = cols
-
-            for _, row in df.iterrows():
-                rsid = str(row.get('rsid', row.iloc[0]))
-
-                # Get genotype - either from allele1/allele2 or genotype column
-                if 'allele1' in cols and 'allele2' in cols:
-                    a1 = str(row['allele1'])
-                    a2 = str(row['allele2'])
-                    if a1 not in ['0', '-', 'N', 'D', 'I', ''] and a2 not in ['0', '-', 'N', 'D', 'I', '']:
-                        snp_dict[rsid] = a1 + a2
-                elif 'genotype' in cols:
-                    gt = str(row['genotype'])
-                    if len(gt) >= 2 and gt not in ['--', 'NN', '00', 'II', 'DD']:
-                        snp_dict[rsid] = gt
+            return snp_dict_from_dataframe(df, drop_no_calls=True)
         except Exception as e:
             print(f"Error parsing DataFrame: {e}")
-
-        return snp_dict
+            return {}
 
     def analyze_ancestry(self):
         """Run ancestry analysis on loaded DNA data"""
@@ -257,13 +242,18 @@ class AncestryEthnicityFrame(ctk.CTkScrollableFrame):
         sub_frame = ctk.CTkFrame(card, fg_color=("gray90", "gray20"), corner_radius=8)
         sub_frame.pack(fill="x", padx=15, pady=(0, 15))
 
+        intervals = self.results.get('confidence_intervals', {})
+        regional_ci = intervals.get('regional', {})
+
         for sub_name, sub_pct in sub_regions.items():
             if sub_pct < 0.5:
                 continue
-            self.create_subregion_row(sub_frame, sub_name, sub_pct, color)
+            self.create_subregion_row(sub_frame, sub_name, sub_pct, color,
+                                      regional_ci.get(sub_name), intervals.get('level', 95))
 
-    def create_subregion_row(self, parent: ctk.CTkFrame, name: str, pct: float, color: str):
-        """Create a row for a sub-region"""
+    def create_subregion_row(self, parent: ctk.CTkFrame, name: str, pct: float, color: str,
+                             ci: Optional[Tuple[float, float]] = None, ci_level: float = 95):
+        """Create a row for a sub-region, with its bootstrap interval when there is one"""
         row = ctk.CTkFrame(parent, fg_color="transparent")
         row.pack(fill="x", padx=12, pady=6)
 
@@ -291,6 +281,16 @@ class AncestryEthnicityFrame(ctk.CTkScrollableFrame):
         )
         pct_label.pack(side="right")
 
+        # Bootstrap confidence interval
+        if ci is not None:
+            ci_label = ctk.CTkLabel(
+                row,
+                text=f"{ci_level:.0f}% CI {ci[0]:.1f}-{ci[1]:.1f}%",
+                font=ctk.CTkFont(size=11),
+                text_color="gray"
+            )
+            ci_label.pack(side="right", padx=(0, 10))
+
         # Visual bar
         bar_width = max(1, min(int(pct * 2), 100))
         bar_frame = ctk.CTkFrame(row, fg_color=("gray80", "gray30"), width=100, height=6, corner_radius=3)
@@ -314,6 +314,8 @@ class AncestryEthnicityFrame(ctk.CTkScrollableFrame):
         title.pack(pady=(15, 10), padx=15, anchor="w")
 
         continental = self.results.get('continental', {})
+        intervals = self.results.get('confidence_intervals', {})
+        continental_ci = intervals.get('continental', {})
 
         for continent, pct in sorted(continental.items(), key=lambda x: x[1], reverse=True):
             if pct < 0.5:
@@ -344,6 +346,17 @@ class AncestryEthnicityFrame(ctk.CTkScrollableFrame):
             bar.pack(side="left", padx=(10, 0))
             bar.set(pct / 100)
 
+            # Bootstrap confidence interval
+            if continent in continental_ci:
+                low, high = continental_ci[continent]
+                ci_label = ctk.CTkLabel(
+                    row,
+                    text=f"{intervals.get('level', 95):.0f}% CI {low:.1f}-{high:.1f}%",
+                    font=ctk.CTkFont(size=11),
+                    text_color="gray"
+                )
+                ci_label.pack(side="left", padx=(10, 0))
+
         # Padding at bottom
         ctk.CTkLabel(section_frame, text="").pack(pady=10)
 
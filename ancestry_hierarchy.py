@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Hierarchical Ancestry Search
+Coarse-to-fine population scoring over a continent -> region tree.
+
+The tree is rooted at the calibrated engine's CONTINENTAL_GROUPS and uses the
+'parent' links in reference_populations.REFERENCE_POPULATIONS for the levels
+in between. Every internal node stores, per marker and genotype, the best
+log-probability of any population below it. At query time that gives an
+upper bound on the average log-likelihood of every leaf in the subtree, so
+the search descends best-first and stops once the remaining subtrees cannot
+reach a reportable percentage. Reported percentages match full enumeration.
+"""
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from calibrated_ancestry_engine import (
+    REFERENCE_POPULATIONS,
+    CONTINENTAL_GROUPS,
+    EXCLUDED_POPULATIONS,
+    MISSING_GENOTYPE,
+    CalibratedAncestryEngine,
+    CompiledPanel,
+    get_compiled_panel,
+)
+from reference_populations import REFERENCE_POPULATIONS as REGION_TREE
+
+# Softmax mass (relative to the best population) below which a subtree is
+# pruned. Far below the 0.1% reporting cut-off, so pruned populations cannot
+# change the rounded percentages.
+DEFAULT_PRUNE_TOLERANCE = 1e-6
+
+# Scale factors and marker-count thresholds used by CalibratedAncestryEngine
+CONTINENTAL_SCALE = 15.0
+REGIONAL_SCALE = 8.0
+CONTINENTAL_MIN_MARKERS = 20
+REGIONAL_MIN_MARKERS = 30
+SCORED_MIN_MARKERS = 10
+
+
+@dataclass
+class PopulationNode:
+    """Node of the population tree (a leaf is a scoring population)"""
+    name: str
+    continent: str
+    population: Optional[str] = None   # set on leaves
+    children: List['PopulationNode'] = field(default_factory=list)
+    leaves: List[int] = field(default_factory=list)  # panel population indices below
+    max_log_probs: Optional[np.ndarray] = None  # (markers, genotype codes), LD-weighted
+    any_valid: Optional[np.ndarray] = None      # (markers,) some leaf has data
+    all_valid: Optional[np.ndarray] = None      # (markers,) every leaf has data
+
+
+def _region_path(population: str) -> List[str]:
+    """Region labels from a population up through its parent links"""
+    path = []
+    label = REGION_TREE.get(population, {}).get('parent')
+    while label and label != population and label not in path:
+        path.append(label)
+        label = REGION_TREE.get(label, {}).get('parent')
+    return path
+
+
+def build_population_tree(populations: List[str] = None) -> PopulationNode:
+    """
+    Build the continent -> region -> population tree.
+
+    populations defaults to every scoring population of the calibrated engine
+    (CONTINENTAL_GROUPS members). Single-child region nodes are collapsed so
+    depth only grows where the tree actually branches. Raises ValueError for
+    populations with no known continent.
+    """
+    if populations is None:
+        populations = [pop for members in CONTINENTAL_GROUPS.values() for pop in members]
+
+    continent_of = {pop: continent for continent, members in CONTINENTAL_GROUPS.items()
+                    for pop in members}
+    unknown = [pop for pop in populations
+               if not (continent_of.get(pop) or REFERENCE_POPULATIONS.get(pop, {}).get('continent'))]
+    if unknown:
+        raise ValueError(f"No continent for populations: {', '.join(unknown)}")
+
+    root = PopulationNode(name='root', continent='')
+    nodes = {}
+
+    for pop in populations:
+        continent = continent_of.get(pop) or REFERENCE_POPULATIONS[pop]['continent']
+
+        if continent not in nodes:
+            nodes[continent] = PopulationNode(name=continent, continent=continent)
+            root.children.append(nodes[continent])
+        parent = nodes[continent]
+
+        # Walk from the broadest region label down to the population
+        for label in reversed(_region_path(pop)):
+            key = f"{continent}/{label}"
+            if key not in nodes:
+                nodes[key] = PopulationNode(name=label, continent=continent)
+                parent.children.append(nodes[key])
+            parent = nodes[key]
+
+        parent.children.append(PopulationNode(name=pop, continent=continent, population=pop))
+
+    def collapse(node: PopulationNode) -> PopulationNode:
+        node.children = [collapse(child) for child in node.children]
+        while (node.population is None and node.name not in CONTINENTAL_GROUPS
+               and node is not root and len(node.children) == 1):
+            node = node.children[0]
+        return node
+
+    return collapse(root)
+
+
+def _leaf_populations(node: PopulationNode) -> List[str]:
+    if node.population is not None:
+        return [node.population]
+    return [pop for child in node.children for pop in _leaf_populations(child)]
+
+
+def compile_tree(root: PopulationNode, panel: CompiledPanel) -> PopulationNode:
+    """
+    Precompute per-node log-probability bounds from the panel (offline step).
+
+    Raises ValueError if the tree has leaves the panel was not compiled for.
+    """
+    missing = [pop for pop in _leaf_populations(root) if pop not in panel.population_index]
+    if missing:
+        raise ValueError(f"Populations not in the compiled panel: {', '.join(missing)}")
+
+    def visit(node: PopulationNode):
+        if node.population is not None:
+            p = panel.population_index[node.population]
+            node.leaves = [p]
+        else:
+            node.leaves = []
+            for child in node.children:
+                visit(child)
+                node.leaves.extend(child.leaves)
+
+        valid = panel.valid[:, node.leaves]
+        log_probs = np.where(valid[:, :, None], panel.log_probs[:, node.leaves, :], -np.inf)
+        node.max_log_probs = log_probs.max(axis=1)
+        node.any_valid = valid.any(axis=1)
+        node.all_valid = valid.all(axis=1)
+
+    visit(root)
+    return root
+
+
+class HierarchicalAncestryScorer:
+    """
+    Coarse-to-fine ancestry scoring.
+
+    Produces the same continental and regional percentages as
+    CalibratedAncestryEngine.analyze(), scoring only the populations whose
+    subtree bound is within reach of the best population found so far.
+    """
+
+    def __init__(self, populations: List[str] = None,
+                 tolerance: float = DEFAULT_PRUNE_TOLERANCE):
+        self.panel = get_compiled_panel()
+        self.engine = CalibratedAncestryEngine()
+        self.root = compile_tree(build_population_tree(populations), self.panel)
+        self.regional_margin = math.log(1 / tolerance) / REGIONAL_SCALE
+        self.continental_margin = math.log(1 / tolerance) / CONTINENTAL_SCALE
+
+    def _upper_bound(self, node: PopulationNode, marker_idx: np.ndarray,
+                     codes: np.ndarray) -> float:
+        """
+        Upper bound on the average log-likelihood of any leaf below node.
+
+        Every leaf scores at least the markers all leaves have data for
+        (total LD weight w_min), and its per-marker terms are at most the node
+        maxima, so its weighted average is at most the weighted average of the
+        largest maxima filling w_min (with unit weights: the mean of the k
+        largest maxima).
+        """
+        usable_idx = marker_idx[node.any_valid[marker_idx]]
+        usable_codes = codes[node.any_valid[marker_idx]]
+        min_weight = float(self.panel.weights[marker_idx[node.all_valid[marker_idx]]].sum())
+        if min_weight == 0 or len(usable_idx) == 0:
+            return 0.0
+
+        weights = self.panel.weights[usable_idx]
+        best_terms = node.max_log_probs[usable_idx, usable_codes] / weights
+        order = np.argsort(-best_terms)
+        best_terms, weights = best_terms[order], weights[order]
+
+        # Take terms largest first until their weight reaches min_weight
+        taken = np.minimum(weights, np.maximum(min_weight - (np.cumsum(weights) - weights), 0.0))
+        return float((best_terms * taken).sum() / min_weight)
+
+    def _score_leaf(self, p: int, marker_idx: np.ndarray, codes: np.ndarray):
+        """Exact (average log-likelihood, marker count) for one population"""
+        valid = self.panel.valid[marker_idx, p]
+        count = int(valid.sum())
+        if count == 0:
+            return -999.0, 0
+        log_lik = np.where(valid, self.panel.log_probs[marker_idx, p, codes], 0.0)
+        return float(log_lik.sum()) / float(self.panel.valid_weights[marker_idx, p].sum()), count
+
+    def score(self, genotype_codes: np.ndarray) -> Dict:
+        """
+        Score a kit given its panel genotype codes (CompiledPanel.encode_kit).
+
+        Returns:
+            dict with continental and regional percentages (as in analyze()),
+            populations scored, and search statistics
+        """
+        marker_idx = np.flatnonzero(genotype_codes != MISSING_GENOTYPE)
+        codes = genotype_codes[marker_idx]
+
+        best_continental = -math.inf   # best leaf with >= 20 markers
+        best_regional = -math.inf      # best leaf with >= 30 markers
+        leaf_scores = {}
+        nodes_visited = 0
+
+        heap = [(-self._upper_bound(child, marker_idx, codes), id(child), child)
+                for child in self.root.children]
+        heapq.heapify(heap)
+
+        while heap:
+            neg_bound, _, node = heapq.heappop(heap)
+            bound = -neg_bound
+            nodes_visited += 1
+
+            # Heap is ordered by bound and bounds shrink going down the tree,
+            # so once the top is out of reach everything left is too
+            if (bound < best_regional - self.regional_margin
+                    and bound < best_continental - self.continental_margin):
+                break
+
+            if node.population is not None:
+                score, count = self._score_leaf(node.leaves[0], marker_idx, codes)
+                leaf_scores[node.population] = (score, count)
+                if count >= CONTINENTAL_MIN_MARKERS:
+                    best_continental = max(best_continental, score)
+                if count >= REGIONAL_MIN_MARKERS:
+                    best_regional = max(best_regional, score)
+                continue
+
+            for child in node.children:
+                heapq.heappush(heap, (-self._upper_bound(child, marker_idx, codes),
+                                      id(child), child))
+
+        if best_regional == -math.inf:
+            # Regional falls back to any population with >= 10 markers; that
+            # choice depends on every population, so enumerate them all
+            return self._score_all(marker_idx, codes)
+
+        return self._format(leaf_scores, nodes_visited)
+
+    def _score_all(self, marker_idx: np.ndarray, codes: np.ndarray) -> Dict:
+        """Fully enumerated scoring (every leaf)"""
+        leaf_scores = {}
+        nodes_visited = 0
+        stack = list(self.root.children)
+        while stack:
+            node = stack.pop()
+            nodes_visited += 1
+            if node.population is not None:
+                leaf_scores[node.population] = self._score_leaf(node.leaves[0], marker_idx, codes)
+            else:
+                stack.extend(node.children)
+        return self._format(leaf_scores, nodes_visited)
+
+    def _format(self, leaf_scores: Dict, nodes_visited: int) -> Dict:
+        """Continental/regional percentages from the scored leaves"""
+        # Keep REFERENCE_POPULATIONS order so ties sort as in analyze()
+        scored = {pop: leaf_scores[pop] for pop in REFERENCE_POPULATIONS
+                  if pop in leaf_scores and pop not in EXCLUDED_POPULATIONS
+                  and leaf_scores[pop][1] >= SCORED_MIN_MARKERS}
+
+        return {
+            'continental': self.engine._continental_from_scores(leaf_scores),
+            'regional': self.engine._regional_display(self.engine._regional_from_scores(scored)),
+            'populations': {pop: {'score': score, 'markers': count}
+                            for pop, (score, count) in scored.items()},
+            'populations_scored': len(leaf_scores),
+            'populations_total': len(self.root.leaves),
+            'nodes_visited': nodes_visited,
+        }
+
+
+def analyze_hierarchical(snp_dict: Dict[str, str]) -> Dict:
+    """Convenience wrapper: hierarchical ancestry for an rsid -> genotype dict"""
+    scorer = HierarchicalAncestryScorer()
+    return scorer.score(scorer.panel.encode_kit(snp_dict))
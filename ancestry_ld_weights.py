@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Ancestry Marker LD Weights (offline precompute)
+Down-weights ancestry markers that sit close together on a chromosome.
+
+Markers in linkage disequilibrium (e.g. the HERC2/OCA2 pigmentation cluster
+or the SLC24A5 region) carry largely the same information, but the
+likelihood model treats every marker as independent evidence. This script
+estimates pairwise LD from physical distance (r^2 decaying exponentially
+with distance) and gives each marker the weight 1 / (1 + sum of its r^2 with
+every other marker), so a block of n tightly linked markers counts about
+once.
+
+The ancestry tables carry no positions. By default they are taken from the
+trait tables in physical_traits_expanded_database, which cover the
+pigmentation clusters where most of the panel's LD sits; a raw DNA file
+(all supported chips report GRCh37 positions) can be given to add the
+rest. Only distances within a chromosome matter, so a cluster recorded in
+a different build still gets the right weights. The result is written to
+ancestry_marker_weights.py, which compile_panel picks up and folds into
+the frequency tensor. The generated module is committed; re-run this
+script after adding ancestry markers or position data.
+
+Usage: python ancestry_ld_weights.py [raw_dna_file] [decay_bp]
+"""
+
+import os
+import sys
+from typing import Dict, Tuple
+
+import numpy as np
+
+from calibrated_ancestry_engine import ANCESTRY_MARKERS
+
+# Distance at which the r^2 proxy falls to 1/e (bp). Background LD between
+# common SNPs is mostly gone within ~100 kb in non-African populations.
+LD_DECAY_BP = 50_000
+
+# Pairs further apart than this are treated as unlinked
+LD_WINDOW_BP = 500_000
+
+WEIGHTS_MODULE = 'ancestry_marker_weights.py'
+
+# Built-in source of marker positions (see module docstring)
+POSITIONS_MODULE = 'physical_traits_expanded_database'
+
+
+def compute_ld_weights(positions: Dict[str, Tuple[str, int]],
+                       decay_bp: int = LD_DECAY_BP,
+                       window_bp: int = LD_WINDOW_BP) -> Dict[str, float]:
+    """
+    Per-marker LD weights from physical positions.
+
+    Args:
+        positions: rsid -> (chromosome, position)
+        decay_bp: r^2 proxy is exp(-distance / decay_bp)
+        window_bp: maximum distance considered linked
+
+    Returns:
+        rsid -> weight in (0, 1]; unlinked markers get 1.0
+    """
+    by_chromosome = {}
+    for rsid, (chrom, pos) in positions.items():
+        by_chromosome.setdefault(str(chrom), []).append((int(pos), rsid))
+
+    weights = {}
+    for chrom, markers in by_chromosome.items():
+        markers.sort()
+        pos = np.array([p for p, _ in markers], dtype=np.float64)
+
+        # All pairs on the chromosome at once; panels have at most a few
+        # dozen markers per chromosome
+        distance = np.abs(pos[:, None] - pos[None, :])
+        r2 = np.where(distance <= window_bp, np.exp(-distance / decay_bp), 0.0)
+        np.fill_diagonal(r2, 0.0)
+        chrom_weights = 1.0 / (1.0 + r2.sum(axis=1))
+
+        for (_, rsid), weight in zip(markers, chrom_weights):
+            weights[rsid] = float(weight)
+
+    return weights
+
+
+def marker_positions_from_tables(module_name: str = POSITIONS_MODULE) -> Dict[str, Tuple[str, int]]:
+    """Positions of the ancestry panel markers found in a trait database's tables"""
+    import importlib
+
+    module = importlib.import_module(module_name)
+    positions = {}
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if (key in ANCESTRY_MARKERS and isinstance(value, dict)
+                        and 'chromosome' in value and 'position' in value):
+                    positions[key] = (str(value['chromosome']), int(value['position']))
+                walk(value)
+        elif isinstance(node, (list, tuple)):
+            for item in node:
+                walk(item)
+
+    for name in dir(module):
+        if name.isupper():
+            walk(getattr(module, name))
+    return positions
+
+
+def marker_positions_from_file(filepath: str) -> Dict[str, Tuple[str, int]]:
+    """Positions of the ancestry panel markers, read from a raw DNA file"""
+    from dna_parser import parse_dna_file
+
+    with open(filepath, 'rb') as f:
+        df = parse_dna_file(f, filepath)
+    if df is None:
+        return {}
+
+    df = df[df['rsid'].isin(ANCESTRY_MARKERS.keys())]
+    return {rsid: (str(chrom), int(pos))
+            for rsid, chrom, pos in zip(df['rsid'], df['chromosome'], df['position'])}
+
+
+def write_weights_module(weights: Dict[str, float],
+                         positions: Dict[str, Tuple[str, int]],
+                         decay_bp: int = LD_DECAY_BP,
+                         path: str = None):
+    """Write the generated weights (and the positions used) as a Python module"""
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), WEIGHTS_MODULE)
+
+    lines = [
+        '#!/usr/bin/env python3',
+        f'"""LD weights for the ancestry panel (generated by ancestry_ld_weights.py, decay {decay_bp} bp)"""',
+        '',
+        'ANCESTRY_MARKER_POSITIONS = {',
+    ]
+    for rsid in sorted(positions):
+        chrom, pos = positions[rsid]
+        lines.append(f'    {rsid!r}: ({chrom!r}, {pos}),')
+    lines += ['}', '', 'ANCESTRY_MARKER_WEIGHTS = {']
+    for rsid in sorted(weights):
+        lines.append(f'    {rsid!r}: {weights[rsid]:.6f},')
+    lines += ['}', '']
+
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines))
+    return path
+
+
+if __name__ == '__main__':
+    decay = int(sys.argv[2]) if len(sys.argv) > 2 else LD_DECAY_BP
+    positions = marker_positions_from_tables()
+    if len(sys.argv) > 1:
+        positions.update(marker_positions_from_file(sys.argv[1]))
+    print(f"Found positions for {len(positions)}/{len(ANCESTRY_MARKERS)} ancestry markers")
+
+    weights = compute_ld_weights(positions, decay_bp=decay)
+    linked = sum(1 for w in weights.values() if w < 0.95)
+    effective = sum(weights.values())
+    print(f"{linked} markers down-weighted for LD; "
+          f"effective marker count {effective:.1f} of {len(weights)}")
+
+    print(f"Wrote {write_weights_module(weights, positions, decay_bp=decay)}")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""LD weights for the ancestry panel (generated by ancestry_ld_weights.py, decay 50000 bp)"""
+
+ANCESTRY_MARKER_POSITIONS = {
+    'rs1042602': ('11', 88911696),
+    'rs10756819': ('9', 16798628),
+    'rs1129038': ('15', 28356859),
+    'rs11803731': ('1', 152190803),
+    'rs12203592': ('6', 396321),
+    'rs12821256': ('12', 89328335),
+    'rs12896399': ('14', 92773663),
+    'rs12913832': ('15', 28365618),
+    'rs1393350': ('11', 89011046),
+    'rs1408799': ('9', 12703371),
+    'rs1426654': ('15', 48426484),
+    'rs16891982': ('5', 33951693),
+    'rs1800407': ('15', 28230318),
+    'rs1805007': ('16', 89919709),
+    'rs1805008': ('16', 89919736),
+    'rs1805009': ('16', 89920138),
+    'rs2153271': ('9', 16893389),
+    'rs2378249': ('20', 33254891),
+    'rs3768056': ('1', 235889135),
+    'rs3827760': ('2', 109513601),
+    'rs6058017': ('20', 33558543),
+    'rs683': ('9', 12696099),
+    'rs7349332': ('2', 219754030),
+}
+
+ANCESTRY_MARKER_WEIGHTS = {
+    'rs1042602': 0.879425,
+    'rs10756819': 0.869350,
+    'rs1129038': 0.521132,
+    'rs11803731': 1.000000,
+    'rs12203592': 1.000000,
+    'rs12821256': 1.000000,
+    'rs12896399': 1.000000,
+    'rs12913832': 0.524629,
+    'rs1393350': 0.879425,
+    'rs1408799': 0.536296,
+    'rs1426654': 1.000000,
+    'rs16891982': 1.000000,
+    'rs1800407': 0.872298,
+    'rs1805007': 0.334346,
+    'rs1805008': 0.334286,
+    'rs1805009': 0.335183,
+    'rs2153271': 0.869350,
+    'rs2378249': 0.997701,
+    'rs3768056': 1.000000,
+    'rs3827760': 1.000000,
+    'rs6058017': 0.997701,
+    'rs683': 0.536296,
+    'rs7349332': 1.000000,
+}
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Ancient Population Affinity
+Scores a kit against every ancient population at once and fits its Early
+European Farmer / Western Hunter-Gatherer / Steppe mixture.
+
+ANCIENT_POPULATIONS (advanced_traits_database) lists, per population, an
+allele and its frequency at a few markers; the key naming the allele differs
+by population ('whg_allele', 'eef_allele', ...). The table is compiled once
+into columns of (rsid, allele) with a (populations x columns) frequency
+matrix, so a kit is one dosage vector and the genotype log-likelihood of
+every population is a single matrix product:
+
+    LL = log(f) @ d + log(1 - f) @ (2 - d)
+
+The reported score is the geometric mean genotype probability over the
+markers a population lists, which keeps populations with different marker
+counts comparable.
+
+The three-way mixture uses the EEF, WHG and Yamnaya rows of
+ANCIENT_POPULATIONS together with the source-labelled markers of the
+ancient_dna_history_database farmer, hunter-gatherer and steppe tables
+('farmer_allele', 'whg_allele', 'steppe_allele'). Those tables give no
+source frequencies, so a labelled allele is taken as common in its own
+source and uncommon in the others. Mixture weights are fitted by maximum
+likelihood over a grid on the simplex.
+
+Usage: python ancient_affinity.py KIT
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Mixture sources: id, display name, ANCIENT_POPULATIONS row, history table and allele key
+MIXTURE_SOURCES = (
+    ('EEF', 'Early European Farmer', 'early_european_farmer', 'ANCIENT_FARMER_MARKERS', 'farmer_allele'),
+    ('WHG', 'Western Hunter-Gatherer', 'western_hunter_gatherer', 'HUNTER_GATHERER_MARKERS', 'whg_allele'),
+    ('Steppe', 'Bronze Age Steppe', 'yamnaya_steppe', 'STEPPE_MARKERS', 'steppe_allele'),
+)
+
+# Frequency of a history-table labelled allele in its own source and in the others
+LABELLED_ALLELE_FREQ = 0.7
+OTHER_SOURCE_FREQ = 0.3
+
+# Frequencies are kept off 0 and 1 so one discordant genotype is not fatal
+FREQ_FLOOR = 0.02
+
+# Mixture fit
+MIXTURE_GRID_STEPS = 100
+MIN_MIXTURE_SITES = 3
+
+
+def _listed_allele(marker_info: Dict[str, Any]) -> str:
+    """The allele a population lists for a marker, whatever its key is called"""
+    return next((value for key, value in marker_info.items() if key.endswith('_allele')), '')
+
+
+def _dosages(snp_dict: Dict[str, str], rsids: List[str], alleles: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Copies of each allele in the kit, and whether the marker is called at all"""
+    genotypes = [snp_dict.get(rsid) or '' for rsid in rsids]
+    called = np.array([len(genotype) == 2 for genotype in genotypes], dtype=bool)
+    dosage = np.array([genotype.upper().count(allele) for genotype, allele in zip(genotypes, alleles)],
+                      dtype=float)
+    return np.where(called, dosage, 0.0), called
+
+
+def _log_likelihoods(freq: np.ndarray, dosage: np.ndarray) -> np.ndarray:
+    """Genotype log-likelihood per row of a frequency matrix, called sites only"""
+    freq = np.clip(freq, FREQ_FLOOR, 1 - FREQ_FLOOR)
+    return np.log(freq) @ dosage + np.log1p(-freq) @ (2 - dosage)
+
+
+# =============================================================================
+# COMPILED REFERENCE
+# =============================================================================
+
+@dataclass
+class CompiledAncientPanel:
+    """Ancient reference alleles and frequencies as matrices"""
+    populations: List[str]
+    info: List[Dict[str, Any]]          # per population: description, time_period, ...
+    rsids: List[str]                    # per (rsid, allele) column
+    alleles: List[str]
+    freq: np.ndarray                    # (populations, columns) 0 where not listed
+    listed: np.ndarray                  # (populations, columns)
+    log_freq: np.ndarray                # log f, 0 where not listed
+    log_other: np.ndarray               # log(1 - f), 0 where not listed
+    source_rsids: List[str]             # mixture sites, one per rsid
+    source_alleles: List[str]
+    source_freq: np.ndarray             # (sources, sites)
+
+    def score(self, snp_dict: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """Markers found, matched and log-likelihood for every population"""
+        dosage, called = _dosages(snp_dict, self.rsids, self.alleles)
+        return {
+            'found': self.listed @ called.astype(int),
+            'matched': self.listed @ (dosage > 0).astype(int),
+            'log_likelihood': self.log_freq @ dosage + self.log_other @ np.where(called, 2 - dosage, 0.0),
+        }
+
+
+def _source_frequencies(populations: Dict[str, Dict], history: Dict[str, Dict[str, Dict]]):
+    """Per mixture site: rsid, reference allele and its frequency in each source"""
+    complement = str.maketrans('ATGC', 'TACG')
+    sites: Dict[str, Dict[str, Any]] = {}
+
+    def site(rsid, allele):
+        return sites.setdefault(rsid, {'allele': allele, 'freq': {}})
+
+    def ref_freq(entry, allele, freq):
+        # Biallelic: a different (or complemented) letter is the other allele
+        return freq if allele == entry['allele'] else 1 - freq
+
+    for source, _, pop_id, _, _ in MIXTURE_SOURCES:
+        for rsid, marker_info in populations.get(pop_id, {}).get('markers', {}).items():
+            allele = _listed_allele(marker_info).upper()
+            if allele:
+                entry = site(rsid, allele)
+                entry['freq'][source] = ref_freq(entry, allele, marker_info.get('freq', 0.5))
+
+    for source, _, _, table_name, allele_key in MIXTURE_SOURCES:
+        for rsid, marker_info in history[table_name].items():
+            allele = str(marker_info.get(allele_key, '')).upper()
+            if len(allele) != 1 or allele.translate(complement) == allele:
+                continue
+            entry = site(rsid, allele)
+            entry.setdefault('labelled', {})[source] = ref_freq(entry, allele, LABELLED_ALLELE_FREQ)
+
+    freq = []
+    for entry in sites.values():
+        # A listed frequency overrides the history label for the same source
+        labelled = {source: f for source, f in entry.get('labelled', {}).items()
+                    if source not in entry['freq']}
+        known = {**labelled, **entry['freq']}
+        row = []
+        for source, *_ in MIXTURE_SOURCES:
+            if source in known:
+                row.append(known[source])
+            elif labelled:
+                # Labelled for another source: the labelled allele is uncommon here
+                other = next(iter(labelled.values()))
+                row.append(OTHER_SOURCE_FREQ if other > 0.5 else 1 - OTHER_SOURCE_FREQ)
+            else:
+                # Listed for other populations only: uninformative for this source
+                row.append(float(np.mean(list(known.values()))))
+        freq.append(row)
+    return (list(sites), [entry['allele'] for entry in sites.values()],
+            np.array(freq, dtype=float).reshape(-1, len(MIXTURE_SOURCES)).T)
+
+
+def compile_ancient_panel() -> CompiledAncientPanel:
+    """Compile ANCIENT_POPULATIONS and the history marker tables"""
+    from advanced_traits_database import ANCIENT_POPULATIONS
+    import ancient_dna_history_database
+
+    columns: Dict[Tuple[str, str], int] = {}
+    entries = []
+    for p, (pop_id, pop_data) in enumerate(ANCIENT_POPULATIONS.items()):
+        for rsid, marker_info in pop_data.get('markers', {}).items():
+            allele = _listed_allele(marker_info)
+            if allele:
+                column = columns.setdefault((rsid, allele), len(columns))
+                entries.append((p, column, marker_info.get('freq', 0.5)))
+
+    freq = np.zeros((len(ANCIENT_POPULATIONS), len(columns)))
+    listed = np.zeros(freq.shape, dtype=bool)
+    for p, column, f in entries:
+        freq[p, column] = f
+        listed[p, column] = True
+    clipped = np.clip(freq, FREQ_FLOOR, 1 - FREQ_FLOOR)
+
+    history = {table: getattr(ancient_dna_history_database, table)
+               for _, _, _, table, _ in MIXTURE_SOURCES}
+    source_rsids, source_alleles, source_freq = _source_frequencies(ANCIENT_POPULATIONS, history)
+
+    return CompiledAncientPanel(
+        populations=list(ANCIENT_POPULATIONS),
+        info=[{k: v for k, v in pop_data.items() if k != 'markers'}
+              for pop_data in ANCIENT_POPULATIONS.values()],
+        rsids=[rsid for rsid, _ in columns],
+        alleles=[allele for _, allele in columns],
+        freq=freq,
+        listed=listed,
+        log_freq=np.where(listed, np.log(clipped), 0.0),
+        log_other=np.where(listed, np.log1p(-clipped), 0.0),
+        source_rsids=source_rsids,
+        source_alleles=source_alleles,
+        source_freq=source_freq,
+    )
+
+
+_COMPILED_ANCIENT_PANEL = None
+
+
+def get_compiled_ancient_panel() -> CompiledAncientPanel:
+    """Compiled ancient reference (cached)"""
+    global _COMPILED_ANCIENT_PANEL
+    if _COMPILED_ANCIENT_PANEL is None:
+        _COMPILED_ANCIENT_PANEL = compile_ancient_panel()
+    return _COMPILED_ANCIENT_PANEL
+
+
+# =============================================================================
+# AFFINITY AND MIXTURE
+# =============================================================================
+
+def _compositions(steps: int, k: int) -> np.ndarray:
+    """All ways of splitting steps into k non-negative integer parts"""
+    if k == 1:
+        return np.array([[steps]])
+    return np.vstack([np.column_stack([np.full(len(rest), i), rest])
+                      for i in range(steps + 1)
+                      for rest in [_compositions(steps - i, k - 1)]])
+
+
+_MIXTURE_GRID = None
+
+
+def fit_mixture(snp_dict: Dict[str, str],
+                panel: CompiledAncientPanel = None) -> Optional[Dict[str, Any]]:
+    """Maximum-likelihood EEF/WHG/Steppe weights, or None with too few sites called"""
+    global _MIXTURE_GRID
+    panel = panel or get_compiled_ancient_panel()
+    dosage, called = _dosages(snp_dict, panel.source_rsids, panel.source_alleles)
+    if np.count_nonzero(called) < MIN_MIXTURE_SITES:
+        return None
+
+    if _MIXTURE_GRID is None:
+        _MIXTURE_GRID = _compositions(MIXTURE_GRID_STEPS, len(MIXTURE_SOURCES)) / MIXTURE_GRID_STEPS
+    mixed = _MIXTURE_GRID @ panel.source_freq[:, called]
+    log_likelihood = _log_likelihoods(mixed, dosage[called])
+    best = int(np.argmax(log_likelihood))
+    weights = _MIXTURE_GRID[best]
+
+    return {
+        'components': [{
+            'source': source,
+            'name': name,
+            'percentage': round(float(weight) * 100, 1),
+        } for (source, name, *_), weight in zip(MIXTURE_SOURCES, weights)],
+        'sites_used': int(np.count_nonzero(called)),
+        'log_likelihood': round(float(log_likelihood[best]), 3),
+    }
+
+
+def population_affinity(snp_dict: Dict[str, str],
+                        panel: CompiledAncientPanel = None) -> Dict[str, Dict[str, Any]]:
+    """Per ancient population with markers in the kit: score and marker counts"""
+    panel = panel or get_compiled_ancient_panel()
+    scores = panel.score(snp_dict)
+    affinity = {}
+    for p, pop_id in enumerate(panel.populations):
+        found = int(scores['found'][p])
+        if found == 0:
+            continue
+        info = panel.info[p]
+        log_likelihood = float(scores['log_likelihood'][p])
+        affinity[pop_id] = {
+            'name': info['description'],
+            'score': round(100 * float(np.exp(log_likelihood / found)), 1),
+            'time_period': info['time_period'],
+            'location': info['location'],
+            'contribution': info.get('contribution', ''),
+            'typical_traits': info.get('typical_traits', []),
+            'markers_found': found,
+            'markers_matched': int(scores['matched'][p]),
+            'log_likelihood': round(log_likelihood, 3),
+        }
+    return affinity
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Ancient population affinity and EEF/WHG/Steppe mixture')
+    parser.add_argument('kit', help='raw DNA file')
+    args = parser.parse_args(argv)
+
+    from dna_parser import parse_dna_file, snp_dict_from_dataframe
+    with open(args.kit, 'rb') as f:
+        df = parse_dna_file(f, args.kit)
+    if df is None:
+        print(f"Could not parse {args.kit}")
+        return 1
+    snp_dict = snp_dict_from_dataframe(df, drop_no_calls=True)
+
+    affinity = population_affinity(snp_dict)
+    for pop_id, data in sorted(affinity.items(), key=lambda x: x[1]['score'], reverse=True):
+        print(f"{data['score']:5.1f}%  {data['name']} "
+              f"({data['markers_matched']}/{data['markers_found']} markers)")
+
+    mixture = fit_mixture(snp_dict)
+    if mixture is None:
+        print(f"Mixture: fewer than {MIN_MIXTURE_SITES} reference sites called")
+    else:
+        parts = ', '.join(f"{c['source']} {c['percentage']}%" for c in mixture['components'])
+        print(f"Mixture ({mixture['sites_used']} sites): {parts}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
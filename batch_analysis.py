@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Headless Batch Analysis
+Parses and analyzes a directory (or glob) of raw DNA files on a process pool,
+without the GUI.
+
+Every kit's results are written to <output>/kits/<kit>.json as soon as the
+kit finishes (atomically, so a crash never leaves a half-written file). With
+--resume, kits whose JSON already exists for an unchanged input file are
+skipped. --format csv / parquet additionally collects all kits into one
+table (one row per kit, one column per section).
+
+Usage:
+    python batch_analysis.py <dir|glob|file>... -o results/ [-j 8]
+        [--format json|csv|parquet] [--resume] [--cache [--keep-kits]]
+        [--modules a,b,...]
+"""
+
+import argparse
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Extensions picked up when a directory is given (same as the file dialog)
+KIT_EXTENSIONS = ('.txt', '.csv', '.zip')
+
+OUTPUT_FORMATS = ('json', 'csv', 'parquet')
+
+# Extra section computed with the calibrated ancestry engine
+ETHNICITY = 'ethnicity'
+
+
+# =============================================================================
+# INPUT DISCOVERY
+# =============================================================================
+
+def find_kit_files(inputs: List[str]) -> List[str]:
+    """Expand directories, globs and file names into a sorted list of kit files"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.update(os.path.join(root, f) for f in files
+                             if f.lower().endswith(KIT_EXTENSIONS))
+        elif os.path.isfile(item):
+            paths.add(item)
+        else:
+            paths.update(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+    return sorted(os.path.abspath(p) for p in paths)
+
+
+def kit_names(paths: List[str]) -> Dict[str, str]:
+    """Output name per kit file: the file name, disambiguated when it repeats"""
+    stems = {}
+    for path in paths:
+        stems.setdefault(os.path.splitext(os.path.basename(path))[0], []).append(path)
+
+    names = {}
+    for stem, group in stems.items():
+        for path in group:
+            suffix = hashlib.sha1(path.encode()).hexdigest()[:8]
+            names[path] = stem if len(group) == 1 else f"{stem}-{suffix}"
+    return names
+
+
+def _source_stamp(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+# =============================================================================
+# WORKERS
+# =============================================================================
+
+_ENGINE = None
+
+
+def _init_worker(use_cache: bool, keep_kits: bool = False):
+    """Load the databases once per worker process"""
+    global _ENGINE
+    from comprehensive_analysis import ComprehensiveDNAAnalysisEngine
+    from results_cache import open_results_cache
+    _ENGINE = ComprehensiveDNAAnalysisEngine(
+        results_cache=open_results_cache(store_kits=keep_kits) if use_cache else None)
+
+
+def json_default(obj):
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    return str(obj)
+
+
+def _write_json(path: str, data: Dict):
+    """Write JSON atomically (temp file + rename)"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, default=json_default)
+    os.replace(tmp_path, path)
+
+
+def analyze_kit_file(path: str, output_path: str, modules: List[str] = None) -> Dict[str, Any]:
+    """
+    Parse, analyze and write one kit (runs in a worker process).
+
+    modules limits the output to those sections ('ethnicity' included); only
+    they and the modules they depend on are computed. Returns a small status
+    record; the results themselves go to output_path.
+    """
+    from calibrated_ancestry_engine import CalibratedAncestryEngine
+    from dna_parser import parse_dna_file, snp_dict_from_dataframe
+
+    start = time.perf_counter()
+    record = {'path': path, 'output': output_path, 'status': 'ok', 'error': None,
+              'snps': 0, 'seconds': 0.0, 'module_timings': {}}
+    try:
+        with open(path, 'rb') as f:
+            dna_df = parse_dna_file(f, path)
+        if dna_df is None or len(dna_df) == 0:
+            raise ValueError("could not parse DNA file")
+        parse_seconds = time.perf_counter() - start
+
+        engine_modules = None if modules is None else [m for m in modules if m != ETHNICITY]
+        results = _ENGINE.run_full_analysis(dna_df, backend='serial', modules=engine_modules)
+
+        timings = dict(results.module_timings)
+        timings['parse'] = round(parse_seconds, 4)
+        if engine_modules is None:
+            sections = {f.name: getattr(results, f.name) for f in dataclasses.fields(results)}
+        else:
+            sections = {name: getattr(results, name) for name in engine_modules}
+
+        if modules is None or ETHNICITY in modules:
+            ancestry_start = time.perf_counter()
+            ancestry = CalibratedAncestryEngine()
+            ancestry.load_dna(snp_dict_from_dataframe(dna_df, drop_no_calls=True))
+            sections[ETHNICITY] = ancestry.analyze()
+            timings[ETHNICITY] = round(time.perf_counter() - ancestry_start, 4)
+        record['snps'] = len(dna_df)
+        record['module_timings'] = timings
+        record['module_errors'] = results.module_errors
+        record['seconds'] = round(time.perf_counter() - start, 4)
+
+        _write_json(output_path, {
+            'source': _source_stamp(path),
+            'kit_fingerprint': _ENGINE.kit_fingerprint,
+            'snps': len(dna_df),
+            'seconds': record['seconds'],
+            'modules': modules,
+            'results': sections,
+        })
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def _is_done(path: str, output_path: str, modules: List[str] = None) -> bool:
+    """Output exists and was produced from the current version of the file
+    with the same module selection"""
+    if not os.path.exists(output_path):
+        return False
+    try:
+        with open(output_path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    source = data.get('source', {})
+    stamp = _source_stamp(path)
+    return (source.get('size') == stamp['size'] and source.get('mtime') == stamp['mtime']
+            and data.get('modules') == modules)
+
+
+# =============================================================================
+# BATCH RUN
+# =============================================================================
+
+def write_table(kit_jsons: List[str], output_dir: str, fmt: str) -> str:
+    """Collect per-kit JSON into one table: a row per kit, a column per section"""
+    import pandas as pd
+
+    rows = []
+    for path in kit_jsons:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        row = {'kit': os.path.splitext(os.path.basename(path))[0],
+               'source': data['source']['path'],
+               'kit_fingerprint': data['kit_fingerprint'],
+               'snps': data['snps']}
+        row.update({section: json.dumps(value) for section, value in data['results'].items()})
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    table_path = os.path.join(output_dir, f"results.{fmt}")
+    if fmt == 'parquet':
+        table.to_parquet(table_path, index=False)
+    else:
+        table.to_csv(table_path, index=False)
+    return table_path
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def print_summary(records: List[Dict], skipped: int, wall_seconds: float):
+    done = [r for r in records if r['status'] == 'ok']
+    failed = [r for r in records if r['status'] != 'ok']
+    rate = len(done) / wall_seconds * 60 if wall_seconds > 0 else 0.0
+
+    print("\n" + "=" * 60)
+    print("BATCH SUMMARY")
+    print("=" * 60)
+    print(f"  Analyzed: {len(done)}   Failed: {len(failed)}   Skipped (resume): {skipped}")
+    print(f"  Wall time: {wall_seconds:.1f}s   Throughput: {rate:.1f} kits/min")
+    if done:
+        print(f"  Per kit: mean {np.mean([r['seconds'] for r in done]):.2f}s, "
+              f"p95 {_percentile([r['seconds'] for r in done], 95):.2f}s")
+
+        timings = {}
+        for record in done:
+            for module, seconds in record['module_timings'].items():
+                timings.setdefault(module, []).append(seconds)
+        print(f"\n  {'Module':<28} {'mean':>8} {'p95':>8} {'max':>8}   (seconds)")
+        for module, values in sorted(timings.items(), key=lambda x: -np.mean(x[1]))[:15]:
+            print(f"  {module:<28} {np.mean(values):>8.4f} "
+                  f"{_percentile(values, 95):>8.4f} {max(values):>8.4f}")
+
+    for record in failed:
+        print(f"  FAILED {record['path']}: {record['error']}")
+
+
+def run_batch(inputs: List[str], output_dir: str, workers: int = None,
+              fmt: str = 'json', resume: bool = False, use_cache: bool = False,
+              modules: List[str] = None, keep_kits: bool = False) -> List[Dict]:
+    """
+    Analyze every kit found under inputs; returns one status record per kit run.
+
+    modules selects the sections to compute (default: all, see analyze_kit_file).
+    keep_kits also stores each kit's genotypes in the results cache, so
+    'results_cache.py reanalyze' can update it after database changes.
+    """
+    paths = find_kit_files(inputs)
+    names = kit_names(paths)
+    kits_dir = os.path.join(output_dir, 'kits')
+    os.makedirs(kits_dir, exist_ok=True)
+
+    outputs = {path: os.path.join(kits_dir, f"{names[path]}.json") for path in paths}
+    todo = [path for path in paths
+            if not (resume and _is_done(path, outputs[path], modules))]
+    skipped = len(paths) - len(todo)
+    workers = workers or os.cpu_count() or 1
+    print(f"{len(paths)} kits found, {len(todo)} to analyze on {workers} workers"
+          + (f" ({skipped} already done)" if skipped else ""))
+
+    start = time.perf_counter()
+    records = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo)),
+                                 initializer=_init_worker,
+                                 initargs=(use_cache, keep_kits)) as pool:
+            futures = [pool.submit(analyze_kit_file, path, outputs[path], modules)
+                       for path in todo]
+            for future in as_completed(futures):
+                record = future.result()
+                records.append(record)
+                status = (f"ok  {record['snps']:,} SNPs" if record['status'] == 'ok'
+                          else f"FAILED ({record['error']})")
+                print(f"  [{len(records)}/{len(todo)}] {names[record['path']]}: "
+                      f"{status}  {record['seconds']:.2f}s")
+    wall_seconds = time.perf_counter() - start
+
+    if fmt != 'json':
+        finished = [outputs[path] for path in paths if os.path.exists(outputs[path])]
+        if finished:
+            print(f"Wrote {write_table(finished, output_dir, fmt)}")
+
+    print_summary(records, skipped, wall_seconds)
+    return records
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Analyze raw DNA files without the GUI')
+    parser.add_argument('inputs', nargs='+', help='kit files, directories or glob patterns')
+    parser.add_argument('-o', '--output', required=True, help='output directory')
+    parser.add_argument('-j', '--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='json',
+                        help='json: per-kit files only; csv/parquet: also one table of all kits')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip kits already written for an unchanged input file')
+    parser.add_argument('--cache', action='store_true',
+                        help='use the persistent results cache')
+    parser.add_argument('--keep-kits', action='store_true',
+                        help='with --cache, also store the kits so they can be reanalyzed '
+                             'after database updates (results_cache.py reanalyze)')
+    parser.add_argument('--modules',
+                        help='comma-separated sections to compute (default: all; '
+                             f'"{ETHNICITY}" for the calibrated ethnicity estimate)')
+    args = parser.parse_args(argv)
+
+    modules = None
+    if args.modules:
+        from comprehensive_analysis import resolve_modules
+        modules = [m.strip() for m in args.modules.split(',') if m.strip()]
+        try:
+            resolve_modules([m for m in modules if m != ETHNICITY])
+        except ValueError as e:
+            parser.error(str(e))
+
+    records = run_batch(args.inputs, args.output, workers=args.workers, fmt=args.format,
+                        resume=args.resume, use_cache=args.cache, modules=modules,
+                        keep_kits=args.keep_kits)
+    return 1 if any(r['status'] != 'ok' for r in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
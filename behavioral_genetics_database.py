@@ -2725,20 +2725,122 @@ CREATIVITY_GENETICS = {
     }
 }
 
+# =============================================================================
+# SCORE RULES (compiled by score_rules)
+# =============================================================================
+
+def _behavioral_rule(markers, levels, result=None):
+    """Score rule shared by the behavioral categories: mean score, traits collected"""
+    return {
+        'markers': markers,
+        'genotypes': 'alleles',
+        'score': 'score',
+        'result': result or {
+            'level': 'Average',
+            'score': 0.5,
+            'markers_found': [],
+            'traits': [],
+            'description': ''
+        },
+        'found': {'phenotype': 'phenotype'},
+        'collect': {'traits': 'traits'},
+        'levels': levels,
+    }
+
+
+BEHAVIORAL_SCORE_RULES = {
+    'empathy': _behavioral_rule(EMPATHY_GENETICS, [
+        {'min': 0.65, 'set': {'level': 'Higher', 'description': 'You likely have higher natural empathy and social sensitivity.'}},
+        {'max': 0.4, 'set': {'level': 'Lower', 'description': 'You may be more self-reliant and less affected by social dynamics.'}},
+        {'set': {'level': 'Average', 'description': 'You have typical empathy levels.'}},
+    ]),
+    'novelty_seeking': _behavioral_rule(DOPAMINE_GENETICS, [
+        {'min': 0.65, 'set': {'level': 'Higher', 'description': 'You likely seek novelty and stimulation more than average.'}},
+        {'max': 0.4, 'set': {'level': 'Lower', 'description': 'You may prefer routine and familiar experiences.'}},
+        {'set': {'level': 'Average', 'description': 'You have balanced novelty-seeking tendencies.'}},
+    ]),
+    'stress_response': {
+        # COMT (warrior/worrier) first, then the serotonin system
+        'sources': [
+            {'markers': DOPAMINE_GENETICS, 'rsids': ['rs4680']},
+            {'markers': SEROTONIN_GENETICS},
+        ],
+        'genotypes': 'alleles',
+        'score': 'score',
+        'result': {
+            'type': 'Balanced',
+            'resilience': 'Average',
+            'score': 0.5,
+            'markers_found': [],
+            'traits': [],
+            'description': ''
+        },
+        'found': {'phenotype': 'phenotype'},
+        'collect': {'traits': 'traits'},
+        'levels': [
+            {'min': 0.65, 'set': {'resilience': 'Higher', 'description': 'You likely have good stress resilience and emotional regulation.'}},
+            {'max': 0.4, 'set': {'resilience': 'Sensitive', 'description': 'You may be more environmentally sensitive - this can be a strength in positive environments.'}},
+            {'set': {'resilience': 'Average', 'description': 'You have typical stress response patterns.'}},
+        ]
+    },
+    'cognitive_style': _behavioral_rule(COGNITIVE_GENETICS, [
+        {'min': 0.65, 'set': {'memory': 'Enhanced', 'attention': 'Strong', 'description': 'You likely have good natural memory and attention abilities.'}},
+        {'max': 0.4, 'set': {'memory': 'May benefit from strategies', 'attention': 'May need support', 'description': 'You may benefit from memory techniques and exercise for brain health.'}},
+        {'set': {'memory': 'Average', 'attention': 'Average', 'description': 'You have typical cognitive abilities.'}},
+    ], result={
+        'memory': 'Average',
+        'attention': 'Average',
+        'score': 0.5,
+        'markers_found': [],
+        'traits': [],
+        'description': ''
+    }),
+    'impulse_control': _behavioral_rule(IMPULSE_GENETICS, [
+        {'min': 0.6, 'set': {'level': 'Good', 'description': 'You likely have good natural impulse control.'}},
+        {'max': 0.4, 'set': {'level': 'May need strategies', 'description': 'You may benefit from impulse control strategies and mindfulness.'}},
+        {'set': {'level': 'Average', 'description': 'You have typical impulse control.'}},
+    ]),
+    'optimism': _behavioral_rule(RESILIENCE_GENETICS, [
+        {'min': 0.65, 'set': {'level': 'Optimistic', 'description': 'You likely have a naturally positive outlook.'}},
+        {'max': 0.4, 'set': {'level': 'Realistic', 'description': 'You may have a more cautious, realistic outlook.'}},
+        {'set': {'level': 'Balanced', 'description': 'You have a balanced outlook on life.'}},
+    ], result={
+        'level': 'Balanced',
+        'score': 0.5,
+        'markers_found': [],
+        'traits': [],
+        'description': ''
+    }),
+    'creativity': _behavioral_rule(CREATIVITY_GENETICS, [
+        {'min': 0.65, 'set': {'level': 'Higher', 'description': 'You likely have enhanced creative and divergent thinking.'}},
+        {'max': 0.4, 'set': {'level': 'Systematic', 'description': 'You may prefer systematic, convergent thinking.'}},
+        {'set': {'level': 'Balanced', 'description': 'You have balanced creative abilities.'}},
+    ]),
+}
+
+
 # =============================================================================
 # ANALYSIS FUNCTIONS
 # =============================================================================
 
 def analyze_behavioral_genetics(dna_data: dict) -> dict:
     """Comprehensive behavioral genetics analysis"""
-    # Get individual analyses
-    empathy = analyze_empathy(dna_data)
-    novelty = analyze_novelty_seeking(dna_data)
-    stress = analyze_stress_response(dna_data)
-    cognitive = analyze_cognitive_style(dna_data)
-    impulse = analyze_impulse_control(dna_data)
-    optimism = analyze_optimism(dna_data)
-    creativity = analyze_creativity(dna_data)
+    # Score categories are evaluated together from BEHAVIORAL_SCORE_RULES
+    from score_rules import evaluate_score_rules
+    scored = evaluate_score_rules('behavioral_genetics_database', 'BEHAVIORAL_SCORE_RULES', dna_data)
+    empathy = scored['empathy']
+    novelty = scored['novelty_seeking']
+    stress = scored['stress_response']
+    cognitive = scored['cognitive_style']
+    impulse = scored['impulse_control']
+    optimism = scored['optimism']
+    creativity = scored['creativity']
+
+    # Stress type is the COMT warrior/worrier phenotype
+    for marker in stress['markers_found']:
+        if marker['rsid'] == 'rs4680':
+            stress['type'] = marker['phenotype'].split(' - ')[0]
+            break
 
     # Build results in format expected by behavioral_ui.py
     results = {
@@ -2853,324 +2955,6 @@ def _get_profile_considerations(stress, cognitive, impulse):
     return considerations[:3]
 
 
-def analyze_empathy(dna_data: dict) -> dict:
-    """Analyze empathy-related genetics"""
-    result = {
-        'level': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'traits': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, info in EMPATHY_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            _key = get_genotype_key(genotype, info['alleles'])
-            if _key:
-                data = info['alleles'][_key]
-                scores.append(data['score'])
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': info['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype']
-                })
-                result['traits'].extend(data.get('traits', []))
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.65:
-            result['level'] = 'Higher'
-            result['description'] = 'You likely have higher natural empathy and social sensitivity.'
-        elif avg <= 0.4:
-            result['level'] = 'Lower'
-            result['description'] = 'You may be more self-reliant and less affected by social dynamics.'
-        else:
-            result['level'] = 'Average'
-            result['description'] = 'You have typical empathy levels.'
-
-    return result
-
-
-def analyze_novelty_seeking(dna_data: dict) -> dict:
-    """Analyze novelty seeking and reward sensitivity"""
-    result = {
-        'level': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'traits': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, info in DOPAMINE_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            _key = get_genotype_key(genotype, info['alleles'])
-            if _key:
-                data = info['alleles'][_key]
-                scores.append(data['score'])
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': info['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype']
-                })
-                result['traits'].extend(data.get('traits', []))
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.65:
-            result['level'] = 'Higher'
-            result['description'] = 'You likely seek novelty and stimulation more than average.'
-        elif avg <= 0.4:
-            result['level'] = 'Lower'
-            result['description'] = 'You may prefer routine and familiar experiences.'
-        else:
-            result['level'] = 'Average'
-            result['description'] = 'You have balanced novelty-seeking tendencies.'
-
-    return result
-
-
-def analyze_stress_response(dna_data: dict) -> dict:
-    """Analyze stress response and anxiety genetics"""
-    result = {
-        'type': 'Balanced',
-        'resilience': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'traits': [],
-        'description': ''
-    }
-
-    scores = []
-
-    # Check COMT (Warrior/Worrier)
-    if 'rs4680' in dna_data:
-        genotype = dna_data['rs4680']
-        info = DOPAMINE_GENETICS['rs4680']
-        _key = get_genotype_key(genotype, info['alleles'])
-        if _key:
-            data = info['alleles'][_key]
-            result['type'] = data['phenotype'].split(' - ')[0]
-            scores.append(data['score'])
-            result['markers_found'].append({
-                'rsid': 'rs4680',
-                'gene': 'COMT',
-                'genotype': genotype,
-                'phenotype': data['phenotype']
-            })
-            result['traits'].extend(data.get('traits', []))
-
-    # Check serotonin genetics
-    for rsid, info in SEROTONIN_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            _key = get_genotype_key(genotype, info['alleles'])
-            if _key:
-                data = info['alleles'][_key]
-                scores.append(data['score'])
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': info['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype']
-                })
-                result['traits'].extend(data.get('traits', []))
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.65:
-            result['resilience'] = 'Higher'
-            result['description'] = 'You likely have good stress resilience and emotional regulation.'
-        elif avg <= 0.4:
-            result['resilience'] = 'Sensitive'
-            result['description'] = 'You may be more environmentally sensitive - this can be a strength in positive environments.'
-        else:
-            result['resilience'] = 'Average'
-            result['description'] = 'You have typical stress response patterns.'
-
-    return result
-
-
-def analyze_cognitive_style(dna_data: dict) -> dict:
-    """Analyze learning and cognitive genetics"""
-    result = {
-        'memory': 'Average',
-        'attention': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'traits': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, info in COGNITIVE_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            _key = get_genotype_key(genotype, info['alleles'])
-            if _key:
-                data = info['alleles'][_key]
-                scores.append(data['score'])
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': info['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype']
-                })
-                result['traits'].extend(data.get('traits', []))
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.65:
-            result['memory'] = 'Enhanced'
-            result['attention'] = 'Strong'
-            result['description'] = 'You likely have good natural memory and attention abilities.'
-        elif avg <= 0.4:
-            result['memory'] = 'May benefit from strategies'
-            result['attention'] = 'May need support'
-            result['description'] = 'You may benefit from memory techniques and exercise for brain health.'
-        else:
-            result['memory'] = 'Average'
-            result['attention'] = 'Average'
-            result['description'] = 'You have typical cognitive abilities.'
-
-    return result
-
-
-def analyze_impulse_control(dna_data: dict) -> dict:
-    """Analyze impulse control genetics"""
-    result = {
-        'level': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'traits': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, info in IMPULSE_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            _key = get_genotype_key(genotype, info['alleles'])
-            if _key:
-                data = info['alleles'][_key]
-                scores.append(data['score'])
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': info['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype']
-                })
-                result['traits'].extend(data.get('traits', []))
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.6:
-            result['level'] = 'Good'
-            result['description'] = 'You likely have good natural impulse control.'
-        elif avg <= 0.4:
-            result['level'] = 'May need strategies'
-            result['description'] = 'You may benefit from impulse control strategies and mindfulness.'
-        else:
-            result['level'] = 'Average'
-            result['description'] = 'You have typical impulse control.'
-
-    return result
-
-
-def analyze_optimism(dna_data: dict) -> dict:
-    """Analyze optimism and positive affect genetics"""
-    result = {
-        'level': 'Balanced',
-        'score': 0.5,
-        'markers_found': [],
-        'traits': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, info in RESILIENCE_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            _key = get_genotype_key(genotype, info['alleles'])
-            if _key:
-                data = info['alleles'][_key]
-                scores.append(data['score'])
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': info['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype']
-                })
-                result['traits'].extend(data.get('traits', []))
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.65:
-            result['level'] = 'Optimistic'
-            result['description'] = 'You likely have a naturally positive outlook.'
-        elif avg <= 0.4:
-            result['level'] = 'Realistic'
-            result['description'] = 'You may have a more cautious, realistic outlook.'
-        else:
-            result['level'] = 'Balanced'
-            result['description'] = 'You have a balanced outlook on life.'
-
-    return result
-
-
-def analyze_creativity(dna_data: dict) -> dict:
-    """Analyze creativity genetics"""
-    result = {
-        'level': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'traits': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, info in CREATIVITY_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            _key = get_genotype_key(genotype, info['alleles'])
-            if _key:
-                data = info['alleles'][_key]
-                scores.append(data['score'])
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': info['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype']
-                })
-                result['traits'].extend(data.get('traits', []))
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.65:
-            result['level'] = 'Higher'
-            result['description'] = 'You likely have enhanced creative and divergent thinking.'
-        elif avg <= 0.4:
-            result['level'] = 'Systematic'
-            result['description'] = 'You may prefer systematic, convergent thinking.'
-        else:
-            result['level'] = 'Balanced'
-            result['description'] = 'You have balanced creative abilities.'
-
-    return result
-
-
 def generate_behavioral_summary(results: dict) -> dict:
     """Generate overall behavioral summary"""
     summary = {
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Blood Group Resolver
+Resolves blood group phenotypes from genotype lookup tables and matches
+donors to recipients across whole cohorts.
+
+Each system of BLOOD_TYPE_GENETICS (expanded_genetics_database) is compiled
+once. Every marker gets a genotype -> code lookup (1-based, 0 = no call)
+that already accepts the reversed genotype and, where the alleles make the
+strand unambiguous, the complemented one; C/G, A/T and insertion/deletion
+markers are only matched as listed. A system's marker codes are packed into
+one mixed-radix integer, and a table over every packed combination gives
+the phenotype, so resolving a kit is a handful of dict lookups and one
+table index per system. The phenotype rules (which marker results make an
+ABO type, which result field names a system's phenotype) are the data in
+BLOOD_GROUP_PHENOTYPES, evaluated only while the tables are built.
+
+For donor matching every phenotype also has an antigen bitmask
+(SYSTEM_ANTIGENS): a donor is compatible when, in every matched system,
+their red cells carry no antigen the recipient lacks. A cohort is one
+(kits x markers) code matrix, so thousands of recipients and donors are
+matched in one array expression.
+
+Usage: python blood_groups.py KIT [DONOR_KIT ...]
+"""
+
+import sys
+from dataclasses import dataclass
+from itertools import product
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+# Phenotype rules per system. 'signals' maps marker results to ABO alleles
+# and 'types' names the first type whose alleles are all signalled; 'field'
+# takes the phenotype from that result field of the last marker found.
+BLOOD_GROUP_PHENOTYPES = {
+    'abo_blood_type': {
+        'signals': {
+            # Any non-deletion allele means A or B; it counts as A
+            'rs8176719': {'DD': 'O', 'DI': 'A', 'II': 'A'},
+            'rs8176746': {'TT': 'B'},
+        },
+        'types': [('O', ['O']), ('AB', ['A', 'B']), ('A', ['A']), ('B', ['B'])],
+    },
+    'rh_factor': {'field': 'rh_status'},
+    'kell_system': {'field': 'kell_status'},
+    'duffy_system': {'field': 'duffy_status'},
+    'kidd_system': {'field': 'kidd_status'},
+    'mn_system': {'field': 'mn_status'},
+    'lewis_system': {'field': 'lewis_status'},
+}
+
+UNDETERMINED_ABO = 'Unable to determine'
+
+ABO_TRANSFUSION_NOTES = {
+    'O': ['Universal donor (red blood cells)', 'Can only receive type O blood'],
+    'AB': ['Universal recipient', 'Can donate to AB recipients only'],
+    'A': ['Can donate to A and AB recipients', 'Can receive from A and O donors'],
+    'B': ['Can donate to B and AB recipients', 'Can receive from B and O donors'],
+}
+
+# Notes raised by single marker results: system -> field, text it contains, note
+MARKER_TRANSFUSION_NOTES = {
+    'kell_system': ('kell_status', 'K positive',
+                    'Kell positive (K+) - important for transfusion matching'),
+}
+
+# Clinical findings: system -> label, finding field, clinical field (when present)
+MARKER_CLINICAL_FINDINGS = {
+    'duffy_system': ('Duffy', 'duffy_status', 'malaria'),
+}
+
+# Red cell antigens of each phenotype; phenotypes not listed cannot be matched
+SYSTEM_ANTIGENS = {
+    'abo_blood_type': {'O': [], 'A': ['A'], 'B': ['B'], 'AB': ['A', 'B']},
+    'rh_factor': {'Rh positive likely': ['D'], 'Rh positive': ['D'], 'Possible Rh negative': []},
+    'kell_system': {'K negative (k positive)': ['k'], 'K/k heterozygous': ['K', 'k'],
+                    'K positive (KK)': ['K']},
+    'kidd_system': {'Jk(a+b-)': ['Jka'], 'Jk(a+b+)': ['Jka', 'Jkb'], 'Jk(a-b+)': ['Jkb']},
+    'mn_system': {'MM': ['M'], 'MN': ['M', 'N'], 'NN': ['N']},
+}
+
+MATCHING_SYSTEMS = ('abo_blood_type', 'rh_factor')
+EXTENDED_MATCHING_SYSTEMS = ('abo_blood_type', 'rh_factor', 'kell_system', 'kidd_system')
+
+# Match outcomes
+INCOMPATIBLE, COMPATIBLE, UNDETERMINED = 0, 1, -1
+
+COMPLEMENT = str.maketrans('ACGT', 'TGCA')
+
+
+def _oriented_lookup(keys: List[str]) -> Dict[str, int]:
+    """Upper-case genotype -> 1-based key index, reversed and (when unambiguous) complemented"""
+    alleles = set(''.join(keys).upper())
+    flip = not alleles & set(''.join(alleles).translate(COMPLEMENT))
+    lookup = {}
+    for code, key in enumerate(keys, 1):
+        forward = key.upper()
+        lookup.setdefault(forward, code)
+        lookup.setdefault(forward[::-1], code)
+    if flip:
+        for code, key in enumerate(keys, 1):
+            complement = key.upper().translate(COMPLEMENT)
+            lookup.setdefault(complement, code)
+            lookup.setdefault(complement[::-1], code)
+    return lookup
+
+
+def _phenotype(rule: Optional[Dict[str, Any]], found: List[tuple]) -> Optional[str]:
+    """Phenotype of a system from its found (rsid, key, result) markers"""
+    if rule is None:
+        return None
+    if 'signals' in rule:
+        signals = {rule['signals'].get(rsid, {}).get(key) for rsid, key, _ in found}
+        for name, required in rule['types']:
+            if signals.issuperset(required):
+                return name
+        return None
+    phenotype = None
+    for _, _, result in found:
+        if rule['field'] in result:
+            phenotype = result[rule['field']]
+    return phenotype
+
+
+# =============================================================================
+# COMPILED SYSTEMS
+# =============================================================================
+
+@dataclass
+class CompiledBloodGroups:
+    """Blood group systems as genotype-code lookups and packed phenotype tables"""
+    systems: List[str]                  # BLOOD_TYPE_GENETICS order
+    rsids: List[str]                    # (markers,) grouped by system, table order
+    marker_system: List[int]            # (markers,) index into systems
+    marker_info: List[Dict[str, Any]]   # the table's marker entry
+    lookups: List[Dict[str, int]]       # per marker: upper-case genotype -> code
+    marker_results: List[List[tuple]]   # per marker, per code - 1: (key, result, notes, findings)
+    places: List[List[tuple]]           # per system: (marker, place value of its code)
+    packing: np.ndarray                 # (markers, systems) the same place values as a matrix
+    tables: List[List[int]]             # per system: packed codes -> phenotype index
+    phenotypes: List[List[Optional[str]]]   # per system: phenotype index -> name (0: None)
+    antigen_masks: List[np.ndarray]     # per system: phenotype index -> antigen bits, -1 unknown
+
+    def encode(self, snp_dict: Dict[str, str]) -> List[int]:
+        """Genotype code per marker, 0 when not in the kit or not in the table"""
+        codes = []
+        for rsid, lookup in zip(self.rsids, self.lookups):
+            genotype = snp_dict.get(rsid)
+            codes.append(lookup.get(genotype.upper(), 0) if genotype else 0)
+        return codes
+
+    def resolve_kit(self, codes: List[int]) -> List[int]:
+        """Phenotype index per system for one kit's codes"""
+        resolved = []
+        for table, places in zip(self.tables, self.places):
+            packed = 0
+            for m, place in places:
+                packed += codes[m] * place
+            resolved.append(table[packed])
+        return resolved
+
+    def resolve(self, codes: np.ndarray) -> np.ndarray:
+        """(kits x systems) phenotype index for (kits x markers) codes"""
+        packed = codes @ self.packing
+        return np.stack([np.asarray(table, dtype=np.int16)[packed[:, s]]
+                         for s, table in enumerate(self.tables)], axis=-1)
+
+    def phenotype_names(self, row) -> Dict[str, Optional[str]]:
+        return {system: self.phenotypes[s][int(row[s])] for s, system in enumerate(self.systems)}
+
+
+def compile_blood_groups() -> CompiledBloodGroups:
+    """Compile BLOOD_TYPE_GENETICS with BLOOD_GROUP_PHENOTYPES"""
+    from expanded_genetics_database import BLOOD_TYPE_GENETICS
+
+    systems = list(BLOOD_TYPE_GENETICS)
+    rsids, marker_system, marker_info, lookups, marker_results = [], [], [], [], []
+    for s, system in enumerate(systems):
+        note_rule = MARKER_TRANSFUSION_NOTES.get(system)
+        finding_rule = MARKER_CLINICAL_FINDINGS.get(system)
+        for rsid, marker in BLOOD_TYPE_GENETICS[system].items():
+            keys = [key for key, value in marker.items() if isinstance(value, dict)]
+            results = []
+            for key in keys:
+                result = marker[key]
+                notes = []
+                if note_rule and note_rule[1] in str(result.get(note_rule[0], '')):
+                    notes.append(note_rule[2])
+                findings = []
+                if finding_rule and finding_rule[2] in result:
+                    findings.append({'system': finding_rule[0], 'finding': result[finding_rule[1]],
+                                     'clinical': result[finding_rule[2]]})
+                results.append((key, result, notes, findings))
+            rsids.append(rsid)
+            marker_system.append(s)
+            marker_info.append(marker)
+            lookups.append(_oriented_lookup(keys))
+            marker_results.append(results)
+
+    packing = np.zeros((len(rsids), len(systems)), dtype=np.int64)
+    places, tables, phenotypes, antigen_masks = [], [], [], []
+    for s, system in enumerate(systems):
+        markers = [m for m, marker_s in enumerate(marker_system) if marker_s == s]
+        sizes = [len(marker_results[m]) + 1 for m in markers]
+        place = 1
+        system_places = []
+        for m, size in zip(markers, sizes):
+            system_places.append((m, place))
+            packing[m, s] = place
+            place *= size
+        places.append(system_places)
+
+        # Phenotype of every combination of the system's codes
+        rule = BLOOD_GROUP_PHENOTYPES.get(system)
+        names: List[Optional[str]] = [None]
+        table = [0] * place
+        for codes in product(*[range(size) for size in sizes]):
+            found = [(rsids[m], marker_results[m][code - 1][0], marker_results[m][code - 1][1])
+                     for m, code in zip(markers, codes) if code]
+            name = _phenotype(rule, found)
+            if name is not None:
+                if name not in names:
+                    names.append(name)
+                table[sum(p * code for (_, p), code in zip(system_places, codes))] = names.index(name)
+        tables.append(table)
+        phenotypes.append(names)
+
+        antigens = SYSTEM_ANTIGENS.get(system, {})
+        bits = {antigen: 1 << i for i, antigen in
+                enumerate(sorted({a for listed in antigens.values() for a in listed}))}
+        antigen_masks.append(np.array(
+            [sum(bits[a] for a in antigens[name]) if name in antigens else -1 for name in names],
+            dtype=np.int64))
+
+    return CompiledBloodGroups(
+        systems=systems,
+        rsids=rsids,
+        marker_system=marker_system,
+        marker_info=marker_info,
+        lookups=lookups,
+        marker_results=marker_results,
+        places=places,
+        packing=packing,
+        tables=tables,
+        phenotypes=phenotypes,
+        antigen_masks=antigen_masks,
+    )
+
+
+_COMPILED_BLOOD_GROUPS = None
+
+
+def get_compiled_blood_groups() -> CompiledBloodGroups:
+    """Compiled blood group systems (cached)"""
+    global _COMPILED_BLOOD_GROUPS
+    if _COMPILED_BLOOD_GROUPS is None:
+        _COMPILED_BLOOD_GROUPS = compile_blood_groups()
+    return _COMPILED_BLOOD_GROUPS
+
+
+# =============================================================================
+# SINGLE KIT
+# =============================================================================
+
+def blood_type_report(snp_dict: Dict[str, str],
+                      groups: CompiledBloodGroups = None) -> Dict[str, Any]:
+    """ABO/Rh type, every blood group system found, transfusion notes and clinical findings"""
+    if groups is None:
+        groups = get_compiled_blood_groups()
+    codes = groups.encode(snp_dict)
+    names = groups.phenotype_names(groups.resolve_kit(codes))
+
+    results = {
+        'abo_type': None,
+        'rh_factor': names.get('rh_factor'),
+        'full_type': None,
+        'blood_systems': {},
+        'transfusion_notes': [],
+        'clinical_significance': []
+    }
+    for m, code in enumerate(codes):
+        if not code:
+            continue
+        system = groups.systems[groups.marker_system[m]]
+        _, result, notes, findings = groups.marker_results[m][code - 1]
+        if system not in results['blood_systems']:
+            results['blood_systems'][system] = {
+                'system': system.replace('_', ' ').title(),
+                'markers_found': [],
+                'interpretation': ''
+            }
+        results['blood_systems'][system]['markers_found'].append({
+            'rsid': groups.rsids[m],
+            'genotype': snp_dict[groups.rsids[m]],
+            'description': groups.marker_info[m].get('description', ''),
+            'result': result
+        })
+        results['transfusion_notes'].extend(notes)
+        results['clinical_significance'].extend(findings)
+
+    abo = names.get('abo_blood_type') or UNDETERMINED_ABO
+    results['abo_type'] = abo
+    if abo != UNDETERMINED_ABO:
+        rh = str(results['rh_factor']).lower()
+        results['full_type'] = f"{abo}{'+' if 'positive' in rh else '-' if 'negative' in rh else '?'}"
+    results['transfusion_notes'].extend(ABO_TRANSFUSION_NOTES.get(abo, []))
+    return results
+
+
+# =============================================================================
+# COHORTS AND DONOR MATCHING
+# =============================================================================
+
+def phenotype_matrix(snp_dicts: List[Dict[str, str]],
+                     groups: CompiledBloodGroups = None) -> np.ndarray:
+    """
+    (kits x systems) phenotype index, into groups.phenotypes.
+
+    Compute it once for a donor database and pass it to compatibility_matrix.
+    """
+    if groups is None:
+        groups = get_compiled_blood_groups()
+    codes = np.array([groups.encode(snp_dict) for snp_dict in snp_dicts], dtype=np.int64)
+    return groups.resolve(codes.reshape(len(snp_dicts), len(groups.rsids)))
+
+
+def _antigens(phenotypes: np.ndarray, systems: List[int], groups: CompiledBloodGroups) -> np.ndarray:
+    """(kits x matched systems) antigen bitmasks, -1 where the phenotype is unknown"""
+    return np.stack([groups.antigen_masks[s][phenotypes[:, s]] for s in systems], axis=1)
+
+
+def compatibility_matrix(recipients: Union[List[Dict[str, str]], np.ndarray],
+                         donors: Union[List[Dict[str, str]], np.ndarray],
+                         systems=MATCHING_SYSTEMS,
+                         groups: CompiledBloodGroups = None) -> np.ndarray:
+    """
+    (recipients x donors) red cell match: COMPATIBLE, INCOMPATIBLE or UNDETERMINED.
+
+    recipients and donors are lists of snp dicts or phenotype_matrix results.
+    A pair is incompatible when any matched system gives the donor an antigen
+    the recipient lacks, and undetermined when none does but a phenotype on
+    either side is unknown.
+    """
+    if groups is None:
+        groups = get_compiled_blood_groups()
+    if not isinstance(recipients, np.ndarray):
+        recipients = phenotype_matrix(recipients, groups)
+    if not isinstance(donors, np.ndarray):
+        donors = phenotype_matrix(donors, groups)
+    matched = [groups.systems.index(system) for system in systems]
+    # Cohorts share few antigen profiles: match the distinct ones, then gather
+    recipient_profiles, recipient_index = np.unique(_antigens(recipients, matched, groups),
+                                                    axis=0, return_inverse=True)
+    donor_profiles, donor_index = np.unique(_antigens(donors, matched, groups),
+                                            axis=0, return_inverse=True)
+    recipient_antigens = recipient_profiles[:, None, :]
+    donor_antigens = donor_profiles[None, :, :]
+
+    unknown = (recipient_antigens < 0) | (donor_antigens < 0)
+    foreign = (donor_antigens & ~recipient_antigens) != 0
+    incompatible = np.any(foreign & ~unknown, axis=2)
+    undetermined = np.any(unknown, axis=2) & ~incompatible
+    profile_match = np.where(incompatible, INCOMPATIBLE,
+                             np.where(undetermined, UNDETERMINED, COMPATIBLE)).astype(np.int8)
+    return profile_match[np.ix_(recipient_index.reshape(-1), donor_index.reshape(-1))]
+
+
+def match_donors(snp_dict: Dict[str, str], donors: Union[List[Dict[str, str]], np.ndarray],
+                 names: List[str] = None, systems=MATCHING_SYSTEMS,
+                 include_undetermined: bool = False,
+                 groups: CompiledBloodGroups = None) -> List[Dict[str, Any]]:
+    """Donors whose red cells a kit can receive, with their phenotypes in the matched systems"""
+    if groups is None:
+        groups = get_compiled_blood_groups()
+    donor_matrix = donors if isinstance(donors, np.ndarray) else phenotype_matrix(donors, groups)
+    if names is None:
+        names = [f"donor_{i + 1}" for i in range(len(donor_matrix))]
+    match = compatibility_matrix([snp_dict], donor_matrix, systems, groups)[0]
+
+    matches = []
+    for d in np.flatnonzero(match != INCOMPATIBLE):
+        if match[d] == UNDETERMINED and not include_undetermined:
+            continue
+        phenotypes = groups.phenotype_names(donor_matrix[d])
+        matches.append({
+            'donor': names[d],
+            'compatible': True if match[d] == COMPATIBLE else None,
+            'phenotypes': {system: phenotypes[system] for system in systems},
+        })
+    return matches
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Blood groups of a kit and the donors it can receive from')
+    parser.add_argument('kit', help='raw DNA file')
+    parser.add_argument('donors', nargs='*', help='donor raw DNA files')
+    parser.add_argument('--extended', action='store_true',
+                        help='also match Kell and Kidd antigens')
+    args = parser.parse_args(argv)
+
+    from dna_parser import parse_dna_file, snp_dict_from_dataframe
+
+    def load(path: str) -> Optional[Dict[str, str]]:
+        with open(path, 'rb') as f:
+            df = parse_dna_file(f, path)
+        if df is None:
+            print(f"Could not parse {path}")
+            return None
+        return snp_dict_from_dataframe(df, drop_no_calls=True)
+
+    snp_dict = load(args.kit)
+    if snp_dict is None:
+        return 1
+    report = blood_type_report(snp_dict)
+    print(f"Blood type: {report['full_type'] or report['abo_type']}")
+    for system, system_results in report['blood_systems'].items():
+        for marker in system_results['markers_found']:
+            print(f"  {system_results['system']}: {marker['rsid']} {marker['genotype']}")
+
+    donors = [(path, load(path)) for path in args.donors]
+    donors = [(path, kit) for path, kit in donors if kit is not None]
+    if not donors:
+        return 0
+    systems = EXTENDED_MATCHING_SYSTEMS if args.extended else MATCHING_SYSTEMS
+    matches = {match['donor']: match for match in
+               match_donors(snp_dict, [kit for _, kit in donors], names=[path for path, _ in donors],
+                            systems=systems, include_undetermined=True)}
+    for path, _ in donors:
+        match = matches.get(path)
+        status = 'incompatible' if match is None else 'compatible' if match['compatible'] else 'undetermined'
+        print(f"{path}: {status}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -45,7 +45,13 @@ def build_exe():
         # Core modules
         "dna_parser", "traits_data", "expanded_traits",
         "reference_populations", "real_ancestry_data",
-        "calibrated_ancestry_engine", "comprehensive_analysis",
+        "calibrated_ancestry_engine", "comprehensive_analysis", "analysis_scheduler",
+        "results_cache", "polygenic_risk_engine", "star_allele_caller",
+        "haplogroup_tree", "carrier_panel", "introgression_scanner",
+        "ancient_affinity",
+        "score_rules",
+        "blood_groups",
+        "ancestry_marker_weights",
         # Ancestry markers
         "ancestry_markers_real", "ancestry_markers_expanded", "ancestry_markers_merged",
         # Databases
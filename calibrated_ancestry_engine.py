@@ -2,13 +2,19 @@
 """
 Ancestry Analysis Engine
 Uses real population allele frequencies from 1000 Genomes and gnomAD.
-No hardcoded weights - pure statistical inference.
+No hardcoded weights - pure statistical inference (markers are only
+down-weighted for linkage, see ancestry_ld_weights.py).
 """
 
 import math
 import json
 import os
-from typing import Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dna_parser import NO_CALL_GENOTYPES, snp_dict_from_dataframe
 
 # Use merged markers (608 with real population frequencies)
 try:
@@ -19,6 +25,12 @@ except ImportError:
     except ImportError:
         from ancestry_markers_real import ANCESTRY_MARKERS
 
+# LD weights generated offline by ancestry_ld_weights.py (optional)
+try:
+    from ancestry_marker_weights import ANCESTRY_MARKER_WEIGHTS
+except ImportError:
+    ANCESTRY_MARKER_WEIGHTS = {}
+
 
 # =============================================================================
 # REFERENCE POPULATIONS FROM 1000 GENOMES / GNOMAD
@@ -157,6 +169,184 @@ POPULATION_FALLBACKS = {
 }
 
 
+# =============================================================================
+# COMPILED FREQUENCY PANEL
+# The marker dict is compiled once into a (marker x population x genotype)
+# log-probability tensor, so scoring a kit is an array gather and a sum
+# instead of a dict walk per population.
+# =============================================================================
+
+PANEL_ALLELES = ['A', 'C', 'G', 'T']
+
+# Any allele outside A/C/G/T (D, I, ...) takes the default rare frequency
+OTHER_ALLELE = len(PANEL_ALLELES)
+
+# Same defaults and clamping as CalibratedAncestryEngine._calc_genotype_probability
+DEFAULT_ALLELE_FREQ = 0.001
+MIN_ALLELE_FREQ = 0.001
+MAX_ALLELE_FREQ = 0.999
+INVALID_GENOTYPE_PROBABILITY = 0.001
+
+
+def _build_genotype_codes() -> Dict[Tuple[int, int], int]:
+    """Assign a code to every unordered allele pair (A/C/G/T/other)"""
+    codes = {}
+    for i in range(OTHER_ALLELE + 1):
+        for j in range(i, OTHER_ALLELE + 1):
+            codes[(i, j)] = len(codes)
+    return codes
+
+
+GENOTYPE_PAIR_CODES = _build_genotype_codes()
+# Two *different* non-ACGT alleles (e.g. DI) are heterozygous, unlike DD/II
+OTHER_HET_CODE = len(GENOTYPE_PAIR_CODES)
+# Genotypes that are not two alleles long (haploid calls, no-calls)
+INVALID_GENOTYPE_CODE = OTHER_HET_CODE + 1
+N_GENOTYPE_CODES = INVALID_GENOTYPE_CODE + 1
+MISSING_GENOTYPE = -1
+
+_ALLELE_INDEX = {allele: i for i, allele in enumerate(PANEL_ALLELES)}
+
+
+def encode_genotype(genotype: str) -> int:
+    """Encode a genotype string as a panel genotype code"""
+    if len(genotype) != 2:
+        return INVALID_GENOTYPE_CODE
+    allele1, allele2 = genotype[0].upper(), genotype[1].upper()
+    i = _ALLELE_INDEX.get(allele1, OTHER_ALLELE)
+    j = _ALLELE_INDEX.get(allele2, OTHER_ALLELE)
+    if i == OTHER_ALLELE and j == OTHER_ALLELE and allele1 != allele2:
+        return OTHER_HET_CODE
+    if i > j:
+        i, j = j, i
+    return GENOTYPE_PAIR_CODES[(i, j)]
+
+
+def _population_frequencies(frequencies: Dict, population: str) -> Optional[Dict]:
+    """Frequency data for a population, falling back via POPULATION_FALLBACKS"""
+    if population in frequencies:
+        return frequencies[population]
+
+    for fallback in POPULATION_FALLBACKS.get(population, []):
+        if fallback in frequencies:
+            return frequencies[fallback]
+
+    return None
+
+
+@dataclass
+class CompiledPanel:
+    """Ancestry markers compiled into dense arrays"""
+    rsids: List[str]
+    marker_index: Dict[str, int]
+    populations: List[str]
+    population_index: Dict[str, int]
+    log_probs: np.ndarray   # (markers, populations, genotype codes), weighted
+    valid: np.ndarray       # (markers, populations) - population has frequency data
+    weights: np.ndarray     # (markers,) LD weight, 1.0 = independent marker
+    valid_weights: np.ndarray  # (markers, populations) - valid * weights
+
+    def encode_kit(self, snp_dict: Dict[str, str]) -> np.ndarray:
+        """Genotype code per panel marker, MISSING_GENOTYPE where absent"""
+        codes = np.full(len(self.rsids), MISSING_GENOTYPE, dtype=np.int16)
+        for i, rsid in enumerate(self.rsids):
+            genotype = snp_dict.get(rsid)
+            if genotype is not None:
+                codes[i] = encode_genotype(genotype)
+        return codes
+
+
+def compile_panel(markers: Dict = None, populations: List[str] = None,
+                  marker_weights: Dict[str, float] = None) -> CompiledPanel:
+    """
+    Compile marker frequencies into a log-probability tensor.
+
+    Each (marker, population) row holds log P(genotype) under Hardy-Weinberg
+    for every genotype code, using the same defaults, clamping and fallbacks
+    as the per-marker scoring path. Rows are pre-multiplied by the marker's
+    LD weight, so correlated markers share one marker's worth of evidence
+    and scoring needs no extra work; scores divide by the summed weights.
+    """
+    if markers is None:
+        markers = ANCESTRY_MARKERS
+    if populations is None:
+        populations = list(REFERENCE_POPULATIONS.keys())
+    if marker_weights is None:
+        marker_weights = ANCESTRY_MARKER_WEIGHTS
+
+    rsids = list(markers.keys())
+    n_markers, n_pops = len(rsids), len(populations)
+
+    freqs = np.full((n_markers, n_pops, OTHER_ALLELE + 1), DEFAULT_ALLELE_FREQ)
+    valid = np.zeros((n_markers, n_pops), dtype=bool)
+
+    for m, rsid in enumerate(rsids):
+        frequencies = markers[rsid].get('frequencies', {})
+        for p, population in enumerate(populations):
+            pop_freqs = _population_frequencies(frequencies, population)
+            if pop_freqs is None:
+                continue
+            valid[m, p] = True
+            for allele, a in _ALLELE_INDEX.items():
+                freqs[m, p, a] = pop_freqs.get(allele, DEFAULT_ALLELE_FREQ)
+
+    freqs = np.clip(freqs, MIN_ALLELE_FREQ, MAX_ALLELE_FREQ)
+
+    log_probs = np.empty((n_markers, n_pops, N_GENOTYPE_CODES))
+    for (i, j), code in GENOTYPE_PAIR_CODES.items():
+        if i == j:
+            log_probs[:, :, code] = np.log(freqs[:, :, i] * freqs[:, :, i])
+        else:
+            log_probs[:, :, code] = np.log(2 * freqs[:, :, i] * freqs[:, :, j])
+    log_probs[:, :, OTHER_HET_CODE] = math.log(2 * DEFAULT_ALLELE_FREQ * DEFAULT_ALLELE_FREQ)
+    log_probs[:, :, INVALID_GENOTYPE_CODE] = math.log(INVALID_GENOTYPE_PROBABILITY)
+
+    weights = np.array([marker_weights.get(rsid, 1.0) for rsid in rsids])
+    log_probs *= weights[:, None, None]
+
+    return CompiledPanel(
+        rsids=rsids,
+        marker_index={rsid: i for i, rsid in enumerate(rsids)},
+        populations=list(populations),
+        population_index={pop: i for i, pop in enumerate(populations)},
+        log_probs=log_probs,
+        valid=valid,
+        weights=weights,
+        valid_weights=valid * weights[:, None],
+    )
+
+
+_COMPILED_PANEL = None
+
+
+def get_compiled_panel() -> CompiledPanel:
+    """Compiled panel for the default markers and reference populations (cached)"""
+    global _COMPILED_PANEL
+    if _COMPILED_PANEL is None:
+        _COMPILED_PANEL = compile_panel()
+    return _COMPILED_PANEL
+
+
+def likelihood_to_percentages(scores: np.ndarray, scale_factor: float) -> np.ndarray:
+    """
+    Row-wise softmax of log-likelihood scores, as percentages.
+
+    Array version of CalibratedAncestryEngine._likelihood_to_percentage
+    (without the rounding and the 0.1% cut-off).
+    """
+    scaled = (scores - scores.max(axis=-1, keepdims=True)) * scale_factor
+    exp_scores = np.exp(scaled)
+    return exp_scores / exp_scores.sum(axis=-1, keepdims=True) * 100
+
+
+# Bootstrap defaults
+BOOTSTRAP_REPLICATES = 500
+BOOTSTRAP_CI_LEVEL = 95.0
+# Block length for the block bootstrap (bp); markers within a block are
+# resampled together so linked markers don't count as independent evidence
+BOOTSTRAP_BLOCK_SIZE = 5_000_000
+
+
 class CalibratedAncestryEngine:
     """
     Ancestry analysis using maximum likelihood estimation.
@@ -168,10 +358,20 @@ class CalibratedAncestryEngine:
 
     def __init__(self):
         self.snp_dict = {}
+        self.positions = {}
         self.markers = ANCESTRY_MARKERS
+        self.panel = get_compiled_panel()
+        self.genotype_codes = np.full(len(self.panel.rsids), MISSING_GENOTYPE, dtype=np.int16)
+        self._matched = None
+
+    def load_dna(self, snp_dict: Dict[str, str],
+                 positions: Optional[Dict[str, Tuple[str, int]]] = None):
+        """
+        Load DNA data and standardize genotypes.
 
-    def load_dna(self, snp_dict: Dict[str, str]):
-        """Load DNA data and standardize genotypes"""
+        positions optionally maps rsid -> (chromosome, position); when given,
+        confidence intervals use a block bootstrap over chromosome segments.
+        """
         self.snp_dict = {}
         for rsid, genotype in snp_dict.items():
             if len(genotype) == 2:
@@ -180,6 +380,28 @@ class CalibratedAncestryEngine:
             else:
                 self.snp_dict[rsid] = genotype.upper()
 
+        self.positions = positions or {}
+        self.genotype_codes = self.panel.encode_kit(self.snp_dict)
+        self._matched = None
+
+    def _matched_log_likelihoods(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Per-marker log-likelihoods for the markers present in the kit.
+
+        Returns (marker_indices, log_likelihoods, valid, weights) where
+        log_likelihoods is (matched markers x populations), LD-weighted and
+        zeroed where a population has no frequency data for that marker, and
+        weights is the matching valid * LD weight matrix (score denominators).
+        """
+        if self._matched is None:
+            idx = np.flatnonzero(self.genotype_codes != MISSING_GENOTYPE)
+            codes = self.genotype_codes[idx]
+            log_lik = self.panel.log_probs[idx, :, codes]
+            valid = self.panel.valid[idx]
+            self._matched = (idx, np.where(valid, log_lik, 0.0), valid,
+                             self.panel.valid_weights[idx])
+        return self._matched
+
     def _calc_genotype_probability(self, genotype: str, pop_freqs: Dict) -> float:
         """
         Calculate probability of genotype under Hardy-Weinberg equilibrium.
@@ -213,17 +435,7 @@ class CalibratedAncestryEngine:
         """
         Get frequency data for a population, using fallbacks if primary isn't available.
         """
-        # First try the exact population
-        if population in frequencies:
-            return frequencies[population]
-
-        # Try fallback populations
-        fallbacks = POPULATION_FALLBACKS.get(population, [])
-        for fallback in fallbacks:
-            if fallback in frequencies:
-                return frequencies[fallback]
-
-        return None
+        return _population_frequencies(frequencies, population)
 
     def _calculate_population_likelihood(self, population: str) -> Tuple[float, int]:
         """
@@ -231,33 +443,18 @@ class CalibratedAncestryEngine:
         Returns (average_log_likelihood, marker_count)
         Uses fallback populations when primary data isn't available.
         """
-        total_log_likelihood = 0.0
-        marker_count = 0
-
-        for rsid, marker_data in self.markers.items():
-            # Skip if user doesn't have this SNP
-            if rsid not in self.snp_dict:
-                continue
-
-            genotype = self.snp_dict[rsid]
-            frequencies = marker_data.get('frequencies', {})
-
-            # Get frequency data, using fallbacks if needed
-            pop_freqs = self._get_population_frequencies(frequencies, population)
-            if pop_freqs is None:
-                continue
-
-            probability = self._calc_genotype_probability(genotype, pop_freqs)
+        p = self.panel.population_index.get(population)
+        if p is None:
+            return -999.0, 0
 
-            if probability > 0:
-                total_log_likelihood += math.log(probability)
-                marker_count += 1
+        _, log_lik, valid, weights = self._matched_log_likelihoods()
+        marker_count = int(valid[:, p].sum())
 
         if marker_count == 0:
             return -999.0, 0
 
-        # Return average log-likelihood per marker
-        return total_log_likelihood / marker_count, marker_count
+        # Return (LD-weighted) average log-likelihood per marker
+        return float(log_lik[:, p].sum()) / float(weights[:, p].sum()), marker_count
 
     def _likelihood_to_percentage(self, scores: Dict[str, float],
                                    scale_factor: float = 10.0) -> Dict[str, float]:
@@ -299,6 +496,13 @@ class CalibratedAncestryEngine:
         Calculate broad continental ancestry breakdown.
         Uses the best-matching population from each continent.
         """
+        pop_scores = {pop: self._calculate_population_likelihood(pop)
+                      for populations in CONTINENTAL_GROUPS.values()
+                      for pop in populations}
+        return self._continental_from_scores(pop_scores)
+
+    def _continental_from_scores(self, pop_scores: Dict[str, Tuple[float, int]]) -> Dict[str, float]:
+        """Continental percentages from {population: (score, marker_count)}"""
         continent_scores = {}
         continent_counts = {}
 
@@ -307,7 +511,9 @@ class CalibratedAncestryEngine:
             best_count = 0
 
             for pop in populations:
-                score, count = self._calculate_population_likelihood(pop)
+                if pop not in pop_scores:
+                    continue
+                score, count = pop_scores[pop]
                 # Only consider populations with sufficient markers
                 if count >= 20 and score > best_score:
                     best_score = score
@@ -348,8 +554,10 @@ class CalibratedAncestryEngine:
         Calculate ancestry breakdown by reference population.
         Only includes populations with sufficient data.
         """
-        all_scores = self.calculate_population_ancestry()
+        return self._regional_from_scores(self.calculate_population_ancestry())
 
+    def _regional_from_scores(self, all_scores: Dict[str, Tuple[float, int]]) -> Dict[str, float]:
+        """Regional percentages from calculate_population_ancestry-style scores"""
         # Filter to populations with good coverage
         good_scores = {pop: score for pop, (score, count) in all_scores.items()
                        if count >= 30}
@@ -364,17 +572,145 @@ class CalibratedAncestryEngine:
         # Use lower scale factor for regional breakdown to show ancestry mixture
         return self._likelihood_to_percentage(good_scores, scale_factor=8.0)
 
-    def analyze(self) -> Dict:
+    def _regional_display(self, regional: Dict[str, float]) -> Dict[str, float]:
+        """Regional percentages keyed by display name, largest first"""
+        regional_display = {}
+        for pop, pct in regional.items():
+            if pop in REFERENCE_POPULATIONS:
+                display_name = REFERENCE_POPULATIONS[pop]['display']
+                regional_display[display_name] = pct
+
+        # Sort by percentage
+        return dict(sorted(regional_display.items(),
+                           key=lambda x: x[1], reverse=True))
+
+    def _bootstrap_weights(self, marker_indices: np.ndarray, n_replicates: int,
+                           block_size: Optional[int],
+                           rng: np.random.Generator) -> Tuple[np.ndarray, str]:
+        """
+        Resampling weights (replicates x matched markers).
+
+        Each row counts how often each marker is drawn in that replicate. With
+        positions and a block size, whole chromosome segments are drawn instead.
+        """
+        n_markers = len(marker_indices)
+
+        if block_size and self.positions:
+            block_keys = []
+            for i in marker_indices:
+                rsid = self.panel.rsids[i]
+                if rsid in self.positions:
+                    chrom, pos = self.positions[rsid]
+                    block_keys.append(f"{chrom}:{int(pos) // block_size}")
+                else:
+                    # Unplaced markers form their own block
+                    block_keys.append(rsid)
+            _, block_of_marker = np.unique(block_keys, return_inverse=True)
+            n_blocks = int(block_of_marker.max()) + 1
+            block_weights = rng.multinomial(n_blocks, np.full(n_blocks, 1.0 / n_blocks),
+                                            size=n_replicates)
+            return block_weights[:, block_of_marker], 'block'
+
+        weights = rng.multinomial(n_markers, np.full(n_markers, 1.0 / n_markers),
+                                  size=n_replicates)
+        return weights, 'marker'
+
+    def bootstrap_confidence_intervals(self, n_replicates: int = BOOTSTRAP_REPLICATES,
+                                       ci_level: float = BOOTSTRAP_CI_LEVEL,
+                                       block_size: Optional[int] = BOOTSTRAP_BLOCK_SIZE,
+                                       seed: Optional[int] = None) -> Dict:
+        """
+        Bootstrap confidence intervals for continental and regional percentages.
+
+        Markers (or chromosome blocks, when positions were loaded) are resampled
+        with replacement and the population scoring is rerun for every replicate.
+        All replicates are scored together as one weights @ log-likelihood
+        matrix product. Population eligibility (marker-count thresholds) is
+        fixed from the full data so every replicate ranks the same populations.
+
+        Returns:
+            dict with continental and regional {name: (low, high)} intervals,
+            plus replicates, level and method ('marker' or 'block')
+        """
+        marker_indices, log_lik, valid, marker_weights = self._matched_log_likelihoods()
+        if len(marker_indices) == 0 or n_replicates <= 0:
+            return {}
+
+        rng = np.random.default_rng(seed)
+        weights, method = self._bootstrap_weights(marker_indices, n_replicates,
+                                                  block_size, rng)
+
+        # (replicates x populations) average log-likelihoods
+        sums = weights @ log_lik
+        counts = weights @ marker_weights
+        # Weighted counts are fractional, so divide by them directly
+        scores = np.full_like(sums, -999.0)
+        np.divide(sums, counts, out=scores, where=counts > 0)
+
+        pop_counts = valid.sum(axis=0)
+        pop_index = self.panel.population_index
+        tail = (100.0 - ci_level) / 2
+
+        def intervals(percentages: np.ndarray, names: List[str]) -> Dict[str, Tuple[float, float]]:
+            low, high = np.percentile(percentages, [tail, 100.0 - tail], axis=0)
+            return {name: (round(float(lo), 1), round(float(hi), 1))
+                    for name, lo, hi in zip(names, low, high)}
+
+        # Continental: best eligible population per continent, as in
+        # calculate_continental_ancestry
+        continents, continent_scores = [], []
+        for continent, populations in CONTINENTAL_GROUPS.items():
+            eligible = [pop_index[pop] for pop in populations
+                        if pop in pop_index and pop_counts[pop_index[pop]] >= 20]
+            if eligible:
+                continents.append(continent)
+                continent_scores.append(scores[:, eligible].max(axis=1))
+
+        continental = {}
+        if continents:
+            continental = intervals(
+                likelihood_to_percentages(np.column_stack(continent_scores), 15.0),
+                continents)
+
+        # Regional: same population filter as calculate_regional_ancestry
+        scored = [pop for pop in REFERENCE_POPULATIONS
+                  if pop not in EXCLUDED_POPULATIONS and pop in pop_index
+                  and pop_counts[pop_index[pop]] >= 10]
+        regional_pops = [pop for pop in scored if pop_counts[pop_index[pop]] >= 30] or scored
+
+        regional = {}
+        if regional_pops:
+            regional_pct = likelihood_to_percentages(
+                scores[:, [pop_index[pop] for pop in regional_pops]], 8.0)
+            display_names = [REFERENCE_POPULATIONS[pop]['display'] for pop in regional_pops]
+            regional = intervals(regional_pct, display_names)
+
+        return {
+            'continental': continental,
+            'regional': regional,
+            'replicates': n_replicates,
+            'level': ci_level,
+            'method': method,
+        }
+
+    def analyze(self, n_bootstrap: int = BOOTSTRAP_REPLICATES,
+                seed: Optional[int] = None) -> Dict:
         """
         Run complete ancestry analysis.
 
+        Args:
+            n_bootstrap: bootstrap replicates for confidence intervals (0 to skip)
+            seed: random seed for reproducible intervals
+
         Returns:
             dict with:
             - continental: broad continental percentages
             - regional: reference population percentages
+            - grouped: regional percentages under their continent
             - populations: detailed scores for each population
             - markers_matched: number of markers found in user's data
             - confidence: confidence level based on marker coverage
+            - confidence_intervals: bootstrap intervals per continent/region
         """
         markers_matched = sum(1 for rsid in self.markers if rsid in self.snp_dict)
 
@@ -388,15 +724,7 @@ class CalibratedAncestryEngine:
         regional = self.calculate_regional_ancestry()
 
         # Format regional with display names
-        regional_display = {}
-        for pop, pct in regional.items():
-            if pop in REFERENCE_POPULATIONS:
-                display_name = REFERENCE_POPULATIONS[pop]['display']
-                regional_display[display_name] = pct
-
-        # Sort by percentage
-        regional_display = dict(sorted(regional_display.items(),
-                                       key=lambda x: x[1], reverse=True))
+        regional_display = self._regional_display(regional)
 
         # Calculate confidence based on marker coverage
         # 608 markers available, need at least 200 for good confidence
@@ -405,11 +733,14 @@ class CalibratedAncestryEngine:
         return {
             'continental': continental,
             'regional': regional_display,
+            'grouped': self.group_subregions(regional),
             'populations': {pop: {'score': score, 'markers': count}
                            for pop, (score, count) in pop_scores.items()},
             'markers_total': len(self.markers),
             'markers_matched': markers_matched,
             'confidence': round(confidence, 1),
+            'confidence_intervals': self.bootstrap_confidence_intervals(
+                n_replicates=n_bootstrap, seed=seed),
         }
 
     # Legacy compatibility - these methods return data in the old format
@@ -476,6 +807,102 @@ class CalibratedAncestryEngine:
         return grouped
 
 
+# =============================================================================
+# INCREMENTAL (STREAMING) ANCESTRY
+# =============================================================================
+
+class IncrementalAncestryAccumulator:
+    """
+    Ancestry estimate that refines while a DNA file is still being parsed.
+
+    Keeps running per-population log-likelihood sums and marker counts over
+    the panel markers seen so far, so every chunk from the streaming parser
+    updates the estimate in O(chunk) time. finalize() scores the collected
+    panel genotypes through CalibratedAncestryEngine, so the final numbers
+    are identical to a batch run on the whole file.
+    """
+
+    def __init__(self):
+        self.engine = CalibratedAncestryEngine()
+        self.panel = self.engine.panel
+        self.genotypes = {}  # panel rsid -> genotype (last call wins)
+        self.codes = np.full(len(self.panel.rsids), MISSING_GENOTYPE, dtype=np.int16)
+        self.sums = np.zeros(len(self.panel.populations))
+        self.weights = np.zeros(len(self.panel.populations))
+        self.counts = np.zeros(len(self.panel.populations), dtype=np.int64)
+        self.snps_seen = 0
+
+    def _contribution(self, marker_idx: np.ndarray, codes: np.ndarray):
+        """Per-population (sums, weights, counts) contributed by the given markers"""
+        valid = self.panel.valid[marker_idx]
+        log_lik = np.where(valid, self.panel.log_probs[marker_idx, :, codes], 0.0)
+        return (log_lik.sum(axis=0), self.panel.valid_weights[marker_idx].sum(axis=0),
+                valid.sum(axis=0))
+
+    def add_chunk(self, rsids, genotypes):
+        """Add a chunk of (rsid, genotype) calls from the parser"""
+        updates = {}
+        for rsid, genotype in zip(rsids, genotypes):
+            self.snps_seen += 1
+            m = self.panel.marker_index.get(rsid)
+            if m is None:
+                continue
+            genotype = str(genotype)
+            if len(genotype) < 2 or genotype in NO_CALL_GENOTYPES:
+                continue
+            self.genotypes[rsid] = genotype
+            updates[m] = encode_genotype(genotype.upper())
+
+        if not updates:
+            return
+
+        marker_idx = np.fromiter(updates.keys(), dtype=np.int64, count=len(updates))
+        new_codes = np.fromiter(updates.values(), dtype=np.int16, count=len(updates))
+
+        # Retract markers seen in an earlier chunk before adding the new call
+        old_codes = self.codes[marker_idx]
+        seen = old_codes != MISSING_GENOTYPE
+        if seen.any():
+            sums, weights, counts = self._contribution(marker_idx[seen], old_codes[seen])
+            self.sums -= sums
+            self.weights -= weights
+            self.counts -= counts
+
+        sums, weights, counts = self._contribution(marker_idx, new_codes)
+        self.sums += sums
+        self.weights += weights
+        self.counts += counts
+        self.codes[marker_idx] = new_codes
+
+    def interim(self) -> Dict:
+        """Current estimate from the running sums (continental and regional)"""
+        pop_scores = {}
+        for p, pop in enumerate(self.panel.populations):
+            count = int(self.counts[p])
+            if pop in EXCLUDED_POPULATIONS or count < 10:
+                continue
+            pop_scores[pop] = (float(self.sums[p]) / float(self.weights[p]), count)
+
+        markers_matched = int((self.codes != MISSING_GENOTYPE).sum())
+        if markers_matched == 0:
+            return {'continental': {}, 'regional': {}, 'markers_matched': 0,
+                    'markers_total': len(self.panel.rsids), 'snps_seen': self.snps_seen}
+
+        return {
+            'continental': self.engine._continental_from_scores(pop_scores),
+            'regional': self.engine._regional_display(self.engine._regional_from_scores(pop_scores)),
+            'markers_matched': markers_matched,
+            'markers_total': len(self.panel.rsids),
+            'snps_seen': self.snps_seen,
+        }
+
+    def finalize(self, n_bootstrap: int = BOOTSTRAP_REPLICATES,
+                 seed: Optional[int] = None) -> Dict:
+        """Full analysis of everything added (same result as a batch run)"""
+        self.engine.load_dna(self.genotypes)
+        return self.engine.analyze(n_bootstrap=n_bootstrap, seed=seed)
+
+
 def test_with_file(filepath: str):
     """Test ancestry analysis with a DNA file"""
     import pandas as pd
@@ -484,34 +911,44 @@ def test_with_file(filepath: str):
     df = pd.read_csv(filepath, sep='\t', comment='#')
     df.columns = ['rsid', 'chromosome', 'position', 'allele1', 'allele2']
 
-    snp_dict = {}
-    for _, row in df.iterrows():
-        rsid = str(row['rsid'])
-        a1, a2 = str(row['allele1']), str(row['allele2'])
-        if a1 not in ['0', '-', 'N', 'D', 'I'] and a2 not in ['0', '-', 'N', 'D', 'I']:
-            snp_dict[rsid] = a1 + a2
+    snp_dict = snp_dict_from_dataframe(df, drop_no_calls=True)
+    called = df[df['rsid'].astype(str).isin(snp_dict)]
+    positions = dict(zip(called['rsid'].astype(str),
+                         zip(called['chromosome'].astype(str), called['position'].astype(int))))
 
     print(f"Loaded {len(snp_dict):,} SNPs")
 
     engine = CalibratedAncestryEngine()
-    engine.load_dna(snp_dict)
+    engine.load_dna(snp_dict, positions=positions)
     results = engine.analyze()
 
     print(f"\nMarkers matched: {results['markers_matched']}/{results['markers_total']}")
     print(f"Confidence: {results['confidence']}%")
 
+    intervals = results.get('confidence_intervals', {})
+    continental_ci = intervals.get('continental', {})
+    regional_ci = intervals.get('regional', {})
+
     print("\n" + "=" * 60)
     print("CONTINENTAL ANCESTRY")
     print("=" * 60)
     for continent, pct in sorted(results['continental'].items(),
                                   key=lambda x: x[1], reverse=True):
-        print(f"  {continent}: {pct}%")
+        if continent in continental_ci:
+            low, high = continental_ci[continent]
+            print(f"  {continent}: {pct}%  ({intervals['level']:.0f}% CI {low}-{high}%)")
+        else:
+            print(f"  {continent}: {pct}%")
 
     print("\n" + "=" * 60)
     print("REGIONAL BREAKDOWN")
     print("=" * 60)
     for region, pct in results['regional'].items():
-        print(f"  {region}: {pct}%")
+        if region in regional_ci:
+            low, high = regional_ci[region]
+            print(f"  {region}: {pct}%  ({intervals['level']:.0f}% CI {low}-{high}%)")
+        else:
+            print(f"  {region}: {pct}%")
 
     print("\n" + "=" * 60)
     print("RAW POPULATION SCORES (for debugging)")
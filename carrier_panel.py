@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Compiled Carrier Panel
+Evaluates every carrier-screening marker in one pass and screens couples for
+offspring risk.
+
+CARRIER_STATUS_DATABASE (carrier_status_database) and the older
+CARRIER_STATUS table (expanded_traits) are compiled once into a flat marker
+table: rsid -> condition, genotype lookup and result. Genotype orientation
+(reversed, complemented) is resolved at compile time, so a kit is one dict
+lookup per marker. Each result also carries the pathogenic allele dosage
+(0, 1 or 2) read off the genotype against the normal homozygote, which is
+the zygosity rule partner screening uses.
+
+For partner screening a kit becomes, per condition, the chance of passing on
+a pathogenic allele: 1 when homozygous at any of the condition's markers,
+0.5 when heterozygous (a compound heterozygote of unknown phase counts as a
+carrier), otherwise 0. For autosomal conditions the chance of an affected
+child is the product of the two parents' values, so screening one kit
+against thousands of partners is one (partners x conditions) array product.
+X-linked conditions depend on which parent is the mother and are left out
+of couple risk.
+
+Usage: python carrier_panel.py KIT [PARTNER_KIT ...]
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+# Sources compiled into the panel: module, table, genotype matching
+PANEL_SOURCES = (
+    ('carrier_status_database', 'CARRIER_STATUS_DATABASE', 'oriented'),
+    ('expanded_traits', 'CARRIER_STATUS', 'exact'),
+)
+
+# Result categories
+NO_FINDING, CARRIER, AFFECTED, TRAIT = 0, 1, 2, 3
+
+
+def _status_category(status: str, matching: str) -> int:
+    """Category of a table status, using each source's own wording rules"""
+    if matching == 'oriented':
+        if 'Carrier' in status:
+            return CARRIER
+        if 'Affected' in status or 'At Risk' in status:
+            return AFFECTED
+        return NO_FINDING
+    if any(word in status for word in ('Affected', 'At risk', 'Deficient', 'Major')):
+        return AFFECTED
+    if 'Carrier' in status:
+        return CARRIER
+    if 'Trait' in status:
+        return TRAIT
+    return NO_FINDING
+
+
+def _pathogenic_dosage(genotype: str, status: str, normal: Optional[str]) -> int:
+    """Pathogenic alleles in a genotype, against the normal homozygote when there is one"""
+    if normal and len(genotype) == 2:
+        return sum(allele != normal[0] for allele in genotype)
+    if 'Carrier' in status:
+        return 1
+    if any(word in status for word in ('Affected', 'At Risk', 'At risk', 'Homozygous')):
+        return 2
+    return 0
+
+
+def _oriented_lookup(alleles: Dict[str, Dict]) -> Dict[str, str]:
+    """Every upper-case genotype get_genotype_key resolves, mapped to its table key"""
+    from carrier_status_database import get_genotype_key
+
+    complement = str.maketrans('ATGC', 'TACG')
+    lookup = {}
+    for key in alleles:
+        forward = key.upper()
+        for genotype in (forward, forward[::-1], forward.translate(complement),
+                         forward.translate(complement)[::-1]):
+            resolved = get_genotype_key(genotype, alleles)
+            if resolved is not None:
+                lookup[genotype] = resolved
+    return lookup
+
+
+# =============================================================================
+# COMPILED PANEL
+# =============================================================================
+
+@dataclass
+class CompiledCarrierPanel:
+    """Carrier-screening markers as one flat rsid table"""
+    conditions: List[Dict[str, Any]]    # id, source, matching, table entry
+    rsids: List[str]                    # (markers,) grouped by condition, table order
+    marker_condition: np.ndarray        # (markers,) index into conditions
+    marker_info: List[Dict[str, Any]]   # the table's marker entry
+    lookups: List[Dict[str, int]]       # per marker: genotype -> index into results
+    upper_case: List[bool]              # per marker: lookup keys are upper case
+    results: List[Dict[str, Any]]       # key, status, description, category
+    result_dosage: np.ndarray           # (results,)
+    screened: np.ndarray                # indices of conditions used for couple risk
+    screened_markers: np.ndarray        # markers of those conditions, in order
+    screened_starts: np.ndarray         # first of each condition's markers in screened_markers
+
+    def evaluate(self, snp_dict: Dict[str, str]) -> np.ndarray:
+        """Result index per marker: -2 not in the kit, -1 no matching genotype"""
+        out = np.full(len(self.rsids), -2, dtype=np.int32)
+        for i, rsid in enumerate(self.rsids):
+            genotype = snp_dict.get(rsid)
+            if genotype is not None:
+                out[i] = self.lookup(i, genotype)
+        return out
+
+    def lookup(self, marker: int, genotype: str) -> int:
+        if self.upper_case[marker]:
+            genotype = genotype.upper()
+        return self.lookups[marker].get(genotype, -1)
+
+
+def compile_carrier_panel() -> CompiledCarrierPanel:
+    """Compile PANEL_SOURCES into one marker table"""
+    import importlib
+
+    conditions, rsids, marker_condition, marker_info, lookups = [], [], [], [], []
+    upper_case = []
+    results, dosages = [], []
+    for module_name, table_name, matching in PANEL_SOURCES:
+        table = getattr(importlib.import_module(module_name), table_name)
+        for condition_id, condition_data in table.items():
+            c = len(conditions)
+            conditions.append({'id': condition_id, 'source': table_name,
+                               'matching': matching, 'data': condition_data})
+            for rsid, marker in condition_data['markers'].items():
+                genotypes = marker.get('alleles', {}) if matching == 'oriented' else marker
+                normal = next((g for g, r in genotypes.items()
+                               if r['status'].startswith(('Normal', 'Not a carrier'))
+                               and len(g) == 2 and g[0] == g[1]), None)
+                keys = {}
+                for genotype, result in genotypes.items():
+                    keys[genotype] = len(results)
+                    results.append({
+                        'key': genotype,
+                        'status': result.get('status', 'Unknown'),
+                        'description': result.get('description', ''),
+                        'category': _status_category(result.get('status', 'Unknown'), matching),
+                    })
+                    dosages.append(_pathogenic_dosage(genotype, result.get('status', ''), normal))
+                if matching == 'oriented':
+                    lookup = {g: keys[k] for g, k in _oriented_lookup(genotypes).items()}
+                else:
+                    lookup = keys
+                rsids.append(rsid)
+                marker_condition.append(c)
+                marker_info.append(marker)
+                lookups.append(lookup)
+                upper_case.append(matching == 'oriented')
+
+    marker_condition = np.array(marker_condition, dtype=np.int32)
+    screened = np.array([c for c, condition in enumerate(conditions)
+                         if condition['source'] == PANEL_SOURCES[0][1]
+                         and 'Autosomal' in condition['data'].get('inheritance', '')
+                         and np.any(marker_condition == c)], dtype=np.int32)
+    screened_markers = np.flatnonzero(np.isin(marker_condition, screened))
+    screened_starts = np.searchsorted(marker_condition[screened_markers], screened)
+    return CompiledCarrierPanel(
+        conditions=conditions,
+        rsids=rsids,
+        marker_condition=marker_condition,
+        marker_info=marker_info,
+        lookups=lookups,
+        upper_case=upper_case,
+        results=results,
+        result_dosage=np.array(dosages, dtype=np.int8),
+        screened=screened,
+        screened_markers=screened_markers,
+        screened_starts=screened_starts,
+    )
+
+
+_COMPILED_CARRIER_PANEL = None
+
+
+def get_compiled_carrier_panel() -> CompiledCarrierPanel:
+    """Compiled carrier panel (cached)"""
+    global _COMPILED_CARRIER_PANEL
+    if _COMPILED_CARRIER_PANEL is None:
+        _COMPILED_CARRIER_PANEL = compile_carrier_panel()
+    return _COMPILED_CARRIER_PANEL
+
+
+# =============================================================================
+# SINGLE KIT
+# =============================================================================
+
+def carrier_report(snp_dict: Dict[str, str], include_legacy: bool = False,
+                   panel: CompiledCarrierPanel = None) -> Dict[str, Any]:
+    """
+    Carrier status for every CARRIER_STATUS_DATABASE condition.
+
+    With include_legacy, carriers the CARRIER_STATUS table finds for
+    conditions not already reported are appended to carriers_found.
+    """
+    if panel is None:
+        panel = get_compiled_carrier_panel()
+    evaluated = panel.evaluate(snp_dict)
+
+    results = {
+        'carriers_found': [],
+        'conditions_clear': [],
+        'conditions_analyzed': [],
+        'high_risk_conditions': [],
+        'markers_tested': 0,
+        'recommendations': []
+    }
+    legacy_carriers = []
+
+    markers_by_condition: Dict[int, List[int]] = {}
+    for m, c in enumerate(panel.marker_condition):
+        if evaluated[m] != -2:
+            markers_by_condition.setdefault(int(c), []).append(m)
+
+    for c, condition in enumerate(panel.conditions):
+        condition_data = condition['data']
+        markers = markers_by_condition.get(c, [])
+        if condition['matching'] == 'exact':
+            if include_legacy:
+                legacy_carriers.extend(_legacy_carriers(panel, condition, markers, evaluated, snp_dict))
+            continue
+
+        condition_result = {
+            'condition': condition_data['condition'],
+            'gene': condition_data['gene'],
+            'inheritance': condition_data['inheritance'],
+            'status': 'Unknown',
+            'variants_found': [],
+            'description': condition_data['description']
+        }
+        carrier_variants = []
+        affected_variants = []
+        results['markers_tested'] += len(markers)
+
+        for m in markers:
+            r = evaluated[m]
+            if r < 0:
+                continue
+            result = panel.results[r]
+            variant_info = {
+                'rsid': panel.rsids[m],
+                'name': panel.marker_info[m].get('name', panel.rsids[m]),
+                'genotype': snp_dict[panel.rsids[m]],
+                'status': result['status'],
+                'description': result['description']
+            }
+            if result['category'] == CARRIER:
+                carrier_variants.append(variant_info)
+            elif result['category'] == AFFECTED:
+                affected_variants.append(variant_info)
+            condition_result['variants_found'].append(variant_info)
+
+        if affected_variants:
+            condition_result['status'] = 'At Risk / Affected'
+            condition_result['implications'] = condition_data.get('implications', {}).get('Affected', [])
+            results['high_risk_conditions'].append({
+                **condition_result,
+                'carrier_frequency': condition_data.get('carrier_frequency', {})
+            })
+        elif carrier_variants:
+            condition_result['status'] = 'Carrier'
+            carrier_key = next((k for k in condition_data.get('implications', {}).keys() if 'Carrier' in k), 'Carrier')
+            condition_result['implications'] = condition_data.get('implications', {}).get(carrier_key, [])
+            results['carriers_found'].append({
+                **condition_result,
+                'carrier_frequency': condition_data.get('carrier_frequency', {})
+            })
+        elif markers:
+            condition_result['status'] = 'Clear (no variants detected)'
+            results['conditions_clear'].append(condition_result)
+
+        if markers:
+            results['conditions_analyzed'].append({
+                'condition': condition_data['condition'],
+                'markers_tested': len(markers),
+                'status': condition_result['status']
+            })
+
+    if results['high_risk_conditions']:
+        results['recommendations'].append('IMPORTANT: Consult a genetic counselor about high-risk conditions')
+
+    if results['carriers_found']:
+        results['recommendations'].append('Consider partner testing for carrier conditions before pregnancy')
+        results['recommendations'].append('Genetic counseling recommended for family planning')
+
+    # Older-table carriers come after the recommendations, which cover the
+    # main database only
+    if legacy_carriers:
+        reported = {c.get('condition', '') for c in results['carriers_found']}
+        results['carriers_found'].extend(c for c in legacy_carriers if c['condition'] not in reported)
+
+    results['summary'] = {
+        'total_conditions_tested': len(results['conditions_analyzed']),
+        'carriers_detected': len(results['carriers_found']),
+        'high_risk_detected': len(results['high_risk_conditions']),
+        'clear_conditions': len(results['conditions_clear'])
+    }
+    return results
+
+
+def _legacy_carriers(panel: CompiledCarrierPanel, condition: Dict, markers: List[int],
+                     evaluated: np.ndarray, snp_dict: Dict[str, str]) -> List[Dict]:
+    """Carrier entries the CARRIER_STATUS table reports for one condition"""
+    name = condition['id'].replace('_', ' ').title()
+    carriers = []
+    worst_is_normal = True
+    for m in markers:
+        r = evaluated[m]
+        if r < 0:
+            continue
+        result = panel.results[r]
+        if result['category'] == AFFECTED:
+            worst_is_normal = False
+        elif result['category'] == CARRIER or (result['category'] == TRAIT and worst_is_normal):
+            worst_is_normal = False
+            carriers.append({
+                'condition': name,
+                'status': result['status'],
+                'description': result['description'],
+                'population_frequency': condition['data']['frequency']
+            })
+    return carriers
+
+
+# =============================================================================
+# PARTNER SCREENING
+# =============================================================================
+
+def transmission_matrix(snp_dicts: List[Dict[str, str]],
+                        panel: CompiledCarrierPanel = None) -> np.ndarray:
+    """
+    (kits x screened conditions) chance of passing on a pathogenic allele.
+
+    Compute it once for a partner database and pass it to screen_partners.
+    """
+    if panel is None:
+        panel = get_compiled_carrier_panel()
+    markers = [(i, int(m), panel.rsids[m]) for i, m in enumerate(panel.screened_markers)]
+    dosage = np.zeros((len(snp_dicts), len(markers)), dtype=np.int8)
+    for k, snp_dict in enumerate(snp_dicts):
+        for i, m, rsid in markers:
+            genotype = snp_dict.get(rsid)
+            if genotype is not None:
+                r = panel.lookup(m, genotype)
+                if r >= 0:
+                    dosage[k, i] = panel.result_dosage[r]
+    if not markers:
+        return np.zeros((len(snp_dicts), 0))
+    worst = np.maximum.reduceat(dosage, panel.screened_starts, axis=1)
+    return np.where(worst >= 2, 1.0, np.where(worst == 1, 0.5, 0.0))
+
+
+def screen_partners(snp_dict: Dict[str, str],
+                    partners: Union[List[Dict[str, str]], np.ndarray],
+                    names: List[str] = None, min_risk: float = 0.0, limit: int = None,
+                    panel: CompiledCarrierPanel = None) -> List[Dict[str, Any]]:
+    """
+    Offspring risk per screened condition for a kit and each partner.
+
+    partners is a list of snp dicts or a transmission_matrix. Partners are
+    returned highest combined risk first (the first limit of them);
+    conditions at or below min_risk are left out of each partner's list.
+    """
+    if panel is None:
+        panel = get_compiled_carrier_panel()
+    own = transmission_matrix([snp_dict], panel)[0]
+    partner_matrix = partners if isinstance(partners, np.ndarray) else transmission_matrix(partners, panel)
+    if names is None:
+        names = [f"partner_{i + 1}" for i in range(len(partner_matrix))]
+
+    risk = partner_matrix * own[None, :]                    # (partners, conditions)
+    # Chance that at least one screened condition affects a child
+    any_risk = 1.0 - np.prod(1.0 - risk, axis=1)
+    order = np.argsort(-any_risk, kind='stable')[:limit]
+
+    condition_names = [panel.conditions[c]['data']['condition'] for c in panel.screened]
+    screened = []
+    for p in order:
+        hits = np.flatnonzero(risk[p] > min_risk)
+        screened.append({
+            'partner': names[p],
+            'offspring_risk': float(any_risk[p]),
+            'conditions': [{
+                'condition': condition_names[c],
+                'offspring_risk': float(risk[p, c]),
+                'transmission': {'self': float(own[c]), 'partner': float(partner_matrix[p, c])},
+            } for c in hits[np.argsort(-risk[p, hits], kind='stable')]],
+        })
+    return screened
+
+
+def couple_risk(snp_dict_a: Dict[str, str], snp_dict_b: Dict[str, str]) -> Dict[str, Any]:
+    """Offspring risk per screened condition for two kits"""
+    return screen_partners(snp_dict_a, [snp_dict_b], names=['partner'])[0]
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Carrier screening for a kit and its partners')
+    parser.add_argument('kit', help='raw DNA file')
+    parser.add_argument('partners', nargs='*', help='partner raw DNA files')
+    args = parser.parse_args(argv)
+
+    from dna_parser import parse_dna_file, snp_dict_from_dataframe
+
+    def load(path: str) -> Optional[Dict[str, str]]:
+        with open(path, 'rb') as f:
+            df = parse_dna_file(f, path)
+        if df is None:
+            print(f"Could not parse {path}")
+            return None
+        return snp_dict_from_dataframe(df, drop_no_calls=True)
+
+    snp_dict = load(args.kit)
+    if snp_dict is None:
+        return 1
+    report = carrier_report(snp_dict)
+    for finding in report['high_risk_conditions'] + report['carriers_found']:
+        print(f"{finding['condition']}: {finding['status']}")
+    print(f"{report['summary']['total_conditions_tested']} conditions tested")
+
+    partners = [(path, load(path)) for path in args.partners]
+    partners = [(path, kit) for path, kit in partners if kit is not None]
+    if not partners:
+        return 0
+    for result in screen_partners(snp_dict, [kit for _, kit in partners],
+                                  names=[path for path, _ in partners]):
+        print(f"\n{result['partner']}: {result['offspring_risk']:.1%} chance of an affected child")
+        for condition in result['conditions']:
+            print(f"  {condition['condition']}: {condition['offspring_risk']:.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
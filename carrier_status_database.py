@@ -822,104 +822,9 @@ def analyze_carrier_status(dna_data: dict) -> dict:
     Returns:
         Dictionary with carrier status for all conditions
     """
-    results = {
-        'carriers_found': [],
-        'conditions_clear': [],
-        'conditions_analyzed': [],
-        'high_risk_conditions': [],
-        'markers_tested': 0,
-        'recommendations': []
-    }
-
-    for condition_id, condition_data in CARRIER_STATUS_DATABASE.items():
-        condition_name = condition_data['condition']
-        gene = condition_data['gene']
-        inheritance = condition_data['inheritance']
-
-        condition_result = {
-            'condition': condition_name,
-            'gene': gene,
-            'inheritance': inheritance,
-            'status': 'Unknown',
-            'variants_found': [],
-            'description': condition_data['description']
-        }
-
-        markers_checked = 0
-        carrier_variants = []
-        affected_variants = []
-
-        for rsid, marker_info in condition_data['markers'].items():
-            if rsid in dna_data:
-                markers_checked += 1
-                results['markers_tested'] += 1
-                genotype = dna_data[rsid]
-
-                alleles = marker_info.get('alleles', {})
-                _key = get_genotype_key(genotype, alleles)
-                if _key:
-                    variant_status = alleles[_key]
-                    status = variant_status.get('status', 'Unknown')
-
-                    variant_info = {
-                        'rsid': rsid,
-                        'name': marker_info.get('name', rsid),
-                        'genotype': genotype,
-                        'status': status,
-                        'description': variant_status.get('description', '')
-                    }
-
-                    if 'Carrier' in status:
-                        carrier_variants.append(variant_info)
-                    elif 'Affected' in status or 'At Risk' in status:
-                        affected_variants.append(variant_info)
-
-                    condition_result['variants_found'].append(variant_info)
-
-        # Determine overall status
-        if affected_variants:
-            condition_result['status'] = 'At Risk / Affected'
-            condition_result['implications'] = condition_data.get('implications', {}).get('Affected', [])
-            results['high_risk_conditions'].append({
-                **condition_result,
-                'carrier_frequency': condition_data.get('carrier_frequency', {})
-            })
-        elif carrier_variants:
-            condition_result['status'] = 'Carrier'
-            carrier_key = next((k for k in condition_data.get('implications', {}).keys() if 'Carrier' in k), 'Carrier')
-            condition_result['implications'] = condition_data.get('implications', {}).get(carrier_key, [])
-            results['carriers_found'].append({
-                **condition_result,
-                'carrier_frequency': condition_data.get('carrier_frequency', {})
-            })
-        elif markers_checked > 0:
-            condition_result['status'] = 'Clear (no variants detected)'
-            results['conditions_clear'].append(condition_result)
-
-        if markers_checked > 0:
-            results['conditions_analyzed'].append({
-                'condition': condition_name,
-                'markers_tested': markers_checked,
-                'status': condition_result['status']
-            })
-
-    # Generate recommendations
-    if results['high_risk_conditions']:
-        results['recommendations'].append('IMPORTANT: Consult a genetic counselor about high-risk conditions')
-
-    if results['carriers_found']:
-        results['recommendations'].append('Consider partner testing for carrier conditions before pregnancy')
-        results['recommendations'].append('Genetic counseling recommended for family planning')
-
-    # Summary stats
-    results['summary'] = {
-        'total_conditions_tested': len(results['conditions_analyzed']),
-        'carriers_detected': len(results['carriers_found']),
-        'high_risk_detected': len(results['high_risk_conditions']),
-        'clear_conditions': len(results['conditions_clear'])
-    }
-
-    return results
+    # Evaluated through the compiled panel (one lookup per marker)
+    from carrier_panel import carrier_report
+    return carrier_report(dna_data)
 
 
 def get_condition_info(condition_id: str) -> dict:
@@ -7,9 +7,14 @@ Integrates all analysis modules for a complete DNA analysis experience
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Callable
 from dataclasses import dataclass, field
+from collections import OrderedDict
+import copy
+import hashlib
 import math
+import threading
+import time
 
 # Import the expanded reference populations (177 regions)
 from reference_populations import REFERENCE_POPULATIONS
@@ -22,7 +27,6 @@ from expanded_traits import (
     PHYSICAL_TRAITS_EXPANDED,
     HEALTH_TRAITS_EXPANDED,
     PHARMACOGENOMICS_EXPANDED,
-    CARRIER_STATUS,
     IMMUNITY_EXPANDED,
     NUTRITION_EXPANDED,
     FITNESS_EXPANDED
@@ -40,10 +44,8 @@ from ancient_dna_database import (
 
 # Import expanded genetics (Blood types, Athletic, PRS, Longevity)
 from expanded_genetics_database import (
-    BLOOD_TYPE_GENETICS,
     ATHLETIC_GENES,
     ADAPTATION_GENETICS,
-    POLYGENIC_RISK_SCORES,
     LONGEVITY_MARKERS
 )
 
@@ -57,61 +59,13 @@ from advanced_traits_database import (
     SENSORY_GENETICS,
     BODY_ODOR_GENETICS,
     HANDEDNESS_GENETICS,
-    ANCIENT_POPULATIONS,
     VOICE_GENETICS,
     LONGEVITY_MARKERS_FIXED
 )
 
-# Import comprehensive sensory genetics database
-from sensory_genetics_database import analyze_sensory_genetics
-
-# Import comprehensive carrier status database
-from carrier_status_database import analyze_carrier_status as analyze_carrier_status_comprehensive
-
-# Import comprehensive behavioral genetics database
-from behavioral_genetics_database import analyze_behavioral_genetics
-
-# Import comprehensive sleep genetics database
-from sleep_genetics_database import analyze_sleep_genetics
-
-# Import expanded physical traits database
-from physical_traits_expanded_database import analyze_physical_traits_expanded
-
-# Import sports genetics database
-from sports_genetics_database import analyze_sports_genetics
-
-# Import reproduction genetics database
-from reproduction_genetics_database import analyze_reproduction_genetics
-
-# Import immune deep genetics database
-from immune_deep_genetics_database import analyze_immune_deep_genetics
-
-# Import nutrition metabolism database
-from nutrition_metabolism_database import analyze_nutrition_metabolism
-
-# Import ancient DNA history database
-from ancient_dna_history_database import analyze_ancient_dna_history
-
-# Import longevity genetics database
-from longevity_genetics_database import analyze_longevity_genetics
-
-# Import pharmacogenomics database
-from pharmacogenomics_database import analyze_pharmacogenomics
-
-# Import mental health genetics database
-from mental_health_database import analyze_mental_health_genetics
-
-# Import cancer risk genetics database
-from cancer_risk_database import analyze_cancer_risk_genetics
-
-# Import cardiovascular genetics database
-from cardiovascular_database import analyze_cardiovascular_genetics
-
-# Import skin dermatology genetics database
-from skin_dermatology_database import analyze_skin_dermatology
-
-# Import deep ancestry genetics database
-from ancestry_deep_database import analyze_deep_ancestry
+from analysis_scheduler import AnalysisScheduler, ModuleRun, ERROR, FINISHED, OK, STARTED
+from results_cache import ResultsCache, table_hash
+from dna_parser import snp_dict_from_dataframe
 
 # =============================================================================
 # DATA CLASSES FOR RESULTS
@@ -235,6 +189,356 @@ class ComprehensiveResults:
     deep_ancestry: Dict[str, Any] = field(default_factory=dict)
     # Unique features
     unique_features: Dict[str, Any] = field(default_factory=dict)
+    # Run bookkeeping: module -> error message / seconds taken, and the
+    # modules served from the engine's memo instead of being recomputed
+    module_errors: Dict[str, str] = field(default_factory=dict)
+    module_timings: Dict[str, float] = field(default_factory=dict)
+    cached_modules: List[str] = field(default_factory=list)
+
+
+# Bump when analysis code changes so memoized and cached module results are
+# recomputed. module_version only hashes the marker tables a module reads, so
+# table edits are picked up automatically but a code-only change to an
+# analyzer keeps serving stale results from the disk cache until this changes.
+ANALYSIS_DATABASE_VERSION = '2'
+
+# Kits whose module results the engine keeps in memory
+MEMO_MAX_KITS = 4
+
+
+def kit_fingerprint(snp_dict: Dict[str, str]) -> str:
+    """Content hash of a kit (independent of SNP order, stable across runs)"""
+    rows = pd.util.hash_pandas_object(
+        pd.DataFrame({'rsid': list(snp_dict.keys()), 'genotype': list(snp_dict.values())}),
+        index=False)
+    return hashlib.sha1(np.sort(rows.to_numpy()).tobytes()).hexdigest()
+
+
+# =============================================================================
+# ANALYSIS MODULE REGISTRY
+# ComprehensiveResults field -> engine method computing it, the modules whose
+# results it takes as keyword arguments ({kwarg: module}), and the marker
+# tables it reads ('module.TABLE', or 'module' for all of a database's
+# tables). Modules with no inputs only read the kit and can run in any order
+# or in parallel. 'memoize': False keeps a module out of the memo and disk
+# cache (results that depend on more than the kit, e.g. the analysis date).
+# =============================================================================
+
+PLAN_INPUTS = {
+    'health_traits': 'health_traits',
+    'nutrition_fitness': 'nutrition_fitness',
+    'athletic_genetics': 'athletic_genetics',
+    'pharmacogenomics': 'pharmacogenomics',
+    'polygenic_scores': 'polygenic_scores',
+    'carrier_status': 'carrier_status',
+    'longevity': 'longevity',
+    'immunity': 'immunity',
+    'mental_traits': 'mental_traits',
+    'chronotype': 'chronotype',
+    'cardiovascular': 'cardiovascular_genetics',
+    'cancer_risk': 'cancer_risk_genetics',
+    'nutrition_metabolism': 'nutrition_metabolism',
+}
+
+ANALYSIS_MODULES = {
+    # analyze_ancestry is disabled and reads no tables; the LD weights are
+    # only used by the calibrated ethnicity engine
+    'ancestry': {'method': 'analyze_ancestry', 'tables': []},
+    'physical_traits': {'method': 'analyze_physical_traits',
+                        'tables': ['expanded_traits.PHYSICAL_TRAITS_EXPANDED']},
+    'health_traits': {'method': 'analyze_health_traits',
+                      'tables': ['expanded_traits.HEALTH_TRAITS_EXPANDED']},
+    'pharmacogenomics': {'method': 'analyze_pharmacogenomics',
+                         'tables': ['expanded_traits.PHARMACOGENOMICS_EXPANDED']},
+    'haplogroups': {'method': 'analyze_haplogroups',
+                    'tables': ['comprehensive_analysis.MTDNA_HAPLOGROUPS',
+                               'comprehensive_analysis.YDNA_HAPLOGROUPS']},
+    'immunity': {'method': 'analyze_immunity',
+                 'tables': ['expanded_traits.IMMUNITY_EXPANDED']},
+    'longevity': {'method': 'analyze_longevity',
+                  'tables': ['advanced_traits_database.LONGEVITY_MARKERS_FIXED']},
+    'nutrition_fitness': {'method': 'analyze_nutrition_fitness',
+                          'tables': ['expanded_traits.NUTRITION_EXPANDED',
+                                     'expanded_traits.FITNESS_EXPANDED']},
+    'climate_adaptation': {'method': 'analyze_climate_adaptation',
+                           'tables': ['comprehensive_analysis.CLIMATE_MARKERS']},
+    'polygenic_scores': {'method': 'analyze_polygenic_scores',
+                         'tables': ['expanded_genetics_database.POLYGENIC_RISK_SCORES',
+                                    'ancestry_markers_merged.ANCESTRY_MARKERS_MERGED']},
+    'ancient_dna': {'method': 'analyze_ancient_dna',
+                    'tables': ['ancient_dna_database.NEANDERTHAL_SNPS',
+                               'ancient_dna_database.DENISOVAN_SNPS',
+                               'ancient_dna_database.NEANDERTHAL_TRAIT_CATEGORIES',
+                               'ancient_dna_database.HUMAN_MIGRATION_TIMELINE',
+                               'ancient_dna_database.MTDNA_MIGRATION_PATHS',
+                               'ancient_dna_database.YDNA_MIGRATION_PATHS',
+                               'introgression_scanner.ARCHAIC_PANEL_FILES']},
+    'carrier_status': {'method': 'analyze_carrier_status',
+                       'tables': ['expanded_traits.CARRIER_STATUS',
+                                  'carrier_status_database']},
+    'blood_type': {'method': 'analyze_blood_type',
+                   'tables': ['expanded_genetics_database.BLOOD_TYPE_GENETICS',
+                              'blood_groups.BLOOD_GROUP_PHENOTYPES',
+                              'blood_groups.ABO_TRANSFUSION_NOTES',
+                              'blood_groups.MARKER_TRANSFUSION_NOTES',
+                              'blood_groups.MARKER_CLINICAL_FINDINGS']},
+    'athletic_genetics': {'method': 'analyze_athletic_genes',
+                          'tables': ['expanded_genetics_database.ATHLETIC_GENES']},
+    'adaptation': {'method': 'analyze_adaptation',
+                   'tables': ['expanded_genetics_database.ADAPTATION_GENETICS']},
+    'facial_features': {'method': 'analyze_facial_features',
+                        'tables': ['advanced_traits_database.FACIAL_FEATURES']},
+    'chronotype': {'method': 'analyze_chronotype',
+                   'tables': ['advanced_traits_database.CHRONOTYPE_GENETICS']},
+    'pain_sensitivity': {'method': 'analyze_pain_sensitivity',
+                         'tables': ['advanced_traits_database.PAIN_GENETICS']},
+    'addiction_risk': {'method': 'analyze_addiction_risk',
+                       'tables': ['advanced_traits_database.ADDICTION_GENETICS']},
+    'mental_traits': {'method': 'analyze_mental_traits',
+                      'tables': ['advanced_traits_database.MENTAL_GENETICS']},
+    'sensory_traits': {'method': 'analyze_sensory_traits',
+                       'tables': ['advanced_traits_database.BODY_ODOR_GENETICS',
+                                  'advanced_traits_database.HANDEDNESS_GENETICS',
+                                  'sensory_genetics_database']},
+    'ancient_population_match': {'method': 'analyze_ancient_population_match',
+                                 'tables': ['advanced_traits_database.ANCIENT_POPULATIONS',
+                                            'ancient_dna_history_database.ANCIENT_FARMER_MARKERS',
+                                            'ancient_dna_history_database.HUNTER_GATHERER_MARKERS',
+                                            'ancient_dna_history_database.STEPPE_MARKERS']},
+    'personalized_plan': {'method': 'generate_personalized_plan',
+                          'inputs': PLAN_INPUTS,
+                          'tables': []},
+    'summary': {'method': 'generate_summary', 'tables': [], 'memoize': False},
+    'behavioral_genetics': {'method': 'analyze_behavioral_genetics',
+                            'tables': ['behavioral_genetics_database']},
+    'sleep_genetics': {'method': 'analyze_sleep_genetics',
+                       'tables': ['sleep_genetics_database']},
+    'physical_traits_expanded': {'method': 'analyze_physical_traits_expanded',
+                                 'tables': ['physical_traits_expanded_database']},
+    'sports_genetics': {'method': 'analyze_sports_genetics',
+                        'tables': ['sports_genetics_database']},
+    'reproduction_genetics': {'method': 'analyze_reproduction_genetics',
+                              'tables': ['reproduction_genetics_database']},
+    'immune_deep_genetics': {'method': 'analyze_immune_deep_genetics',
+                             'tables': ['immune_deep_genetics_database']},
+    'nutrition_metabolism': {'method': 'analyze_nutrition_metabolism',
+                             'tables': ['nutrition_metabolism_database']},
+    'ancient_dna_history': {'method': 'analyze_ancient_dna_history',
+                            'tables': ['ancient_dna_history_database']},
+    'longevity_genetics': {'method': 'analyze_longevity_genetics',
+                           'tables': ['longevity_genetics_database']},
+    'pharmacogenomics_detailed': {'method': 'analyze_pharmacogenomics_detailed',
+                                  'tables': ['pharmacogenomics_database']},
+    'mental_health_genetics': {'method': 'analyze_mental_health_genetics',
+                               'tables': ['mental_health_database']},
+    'cancer_risk_genetics': {'method': 'analyze_cancer_risk_genetics',
+                             'tables': ['cancer_risk_database']},
+    'cardiovascular_genetics': {'method': 'analyze_cardiovascular_genetics',
+                                'tables': ['cardiovascular_database']},
+    'skin_dermatology': {'method': 'analyze_skin_dermatology',
+                         'tables': ['skin_dermatology_database']},
+    'deep_ancestry': {'method': 'analyze_deep_ancestry', 'tables': ['ancestry_deep_database']},
+    'unique_features': {'method': 'analyze_unique_features',
+                        'inputs': {'ancestry_results': 'ancestry', 'haplogroups': 'haplogroups'},
+                        # 'All Markers' compiles every trait table as well
+                        'tables': ['unique_features_database',
+                                   'expanded_traits.PHYSICAL_TRAITS_EXPANDED',
+                                   'expanded_traits.HEALTH_TRAITS_EXPANDED',
+                                   'expanded_traits.PHARMACOGENOMICS_EXPANDED',
+                                   'expanded_traits.CARRIER_STATUS',
+                                   'expanded_traits.IMMUNITY_EXPANDED',
+                                   'expanded_traits.NUTRITION_EXPANDED',
+                                   'expanded_traits.FITNESS_EXPANDED',
+                                   'expanded_genetics_database.ATHLETIC_GENES',
+                                   'expanded_genetics_database.ADAPTATION_GENETICS',
+                                   'expanded_genetics_database.POLYGENIC_RISK_SCORES',
+                                   'expanded_genetics_database.LONGEVITY_MARKERS',
+                                   'advanced_traits_database.FACIAL_FEATURES',
+                                   'advanced_traits_database.CHRONOTYPE_GENETICS',
+                                   'advanced_traits_database.PAIN_GENETICS',
+                                   'advanced_traits_database.ADDICTION_GENETICS',
+                                   'advanced_traits_database.MENTAL_GENETICS',
+                                   'advanced_traits_database.SENSORY_GENETICS']},
+}
+
+_MODULE_VERSIONS = {}
+
+
+def module_version(name: str) -> str:
+    """
+    Version of a module's result: ANALYSIS_DATABASE_VERSION plus a hash of
+    the tables it reads and of its inputs' versions. Changes whenever any
+    table feeding the module changes.
+    """
+    if name not in _MODULE_VERSIONS:
+        spec = ANALYSIS_MODULES[name]
+        digest = hashlib.sha1(ANALYSIS_DATABASE_VERSION.encode())
+        for ref in spec.get('tables', []):
+            digest.update(table_hash(ref).encode())
+        for dep in sorted(spec.get('inputs', {}).values()):
+            digest.update(module_version(dep).encode())
+        _MODULE_VERSIONS[name] = f"{ANALYSIS_DATABASE_VERSION}-{digest.hexdigest()[:12]}"
+    return _MODULE_VERSIONS[name]
+
+
+def resolve_modules(names: List[str]) -> List[str]:
+    """
+    The requested modules plus every module they take as input (recursively),
+    in ANALYSIS_MODULES order. E.g. ['unique_features'] also needs
+    'ancestry' and 'haplogroups'.
+    """
+    unknown = [name for name in names if name not in ANALYSIS_MODULES]
+    if unknown:
+        raise ValueError(f"Unknown analysis modules: {', '.join(unknown)}")
+
+    needed = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(ANALYSIS_MODULES[name].get('inputs', {}).values())
+    return [name for name in ANALYSIS_MODULES if name in needed]
+
+
+# Background prefetch order for lazy results: sidebar order (ethnicity first),
+# then sections without their own sidebar entry, with export's summary last
+PREFETCH_PRIORITY = [
+    'ancestry', 'haplogroups', 'unique_features', 'ancient_dna_history',
+    'physical_traits', 'health_traits', 'athletic_genetics', 'behavioral_genetics',
+    'sleep_genetics', 'sensory_traits', 'pharmacogenomics', 'carrier_status',
+    'polygenic_scores', 'cancer_risk_genetics', 'cardiovascular_genetics',
+    'immunity', 'longevity', 'nutrition_metabolism', 'sports_genetics',
+    'reproduction_genetics', 'skin_dermatology', 'mental_health_genetics',
+    'personalized_plan',
+]
+
+
+class LazyComprehensiveResults:
+    """
+    ComprehensiveResults whose sections are computed on first access.
+
+    Has the same attributes as ComprehensiveResults. Reading a section runs
+    its module (and any inputs it needs) once through the engine memo; later
+    reads return the stored value. start_prefetch() fills in the remaining
+    sections on a background thread in PREFETCH_PRIORITY order.
+
+    on_event(event, run) is called as each section starts and finishes
+    (see AnalysisScheduler), from whichever thread computes it.
+    """
+
+    def __init__(self, engine: 'ComprehensiveDNAAnalysisEngine',
+                 on_event: Callable[[str, ModuleRun], None] = None):
+        self._engine = engine
+        self._on_event = on_event
+        self._locks = {name: threading.Lock() for name in ANALYSIS_MODULES}
+        self._stop = threading.Event()
+        self._prefetch_thread = None
+        self.module_errors = {}
+        self.module_timings = {}
+        self.cached_modules = []
+
+    def __getattr__(self, name):
+        # Only called for sections not computed yet
+        if name in ANALYSIS_MODULES:
+            return self.get(name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def is_ready(self, name: str) -> bool:
+        return name in self.__dict__
+
+    def get(self, name: str) -> Any:
+        """Section value, computing it (and its inputs) if needed"""
+        if name in self.__dict__:
+            return self.__dict__[name]
+
+        with self._locks[name]:
+            if name not in self.__dict__:
+                self.__dict__[name] = self._compute(name)
+        return self.__dict__[name]
+
+    def _compute(self, name: str) -> Any:
+        spec = ANALYSIS_MODULES[name]
+        inputs = {}
+        for kwarg, dep in spec.get('inputs', {}).items():
+            value = self.get(dep)
+            inputs[kwarg] = None if dep in self.module_errors else value
+
+        run = ModuleRun(name)
+        found, result = self._engine.cached_result(name)
+        if found:
+            self.cached_modules.append(name)
+            self.module_timings[name] = 0.0
+            run.status, run.result, run.cached = OK, result, True
+            self.__dict__[name] = result
+            self._emit(FINISHED, run)
+            return result
+
+        self._emit(STARTED, run)
+        start = time.perf_counter()
+        try:
+            result = getattr(self._engine, spec['method'])(**inputs)
+            run.status, run.result = OK, result
+        except Exception as e:
+            self.module_errors[name] = f"{type(e).__name__}: {e}"
+            print(f"Warning: {name} analysis failed: {self.module_errors[name]}")
+            run.status, run.result, run.error = ERROR, {}, self.module_errors[name]
+        run.elapsed = time.perf_counter() - start
+        self.module_timings[name] = round(run.elapsed, 4)
+
+        if run.status == OK and not any(dep in self.module_errors
+                                        for dep in spec.get('inputs', {}).values()):
+            self._engine.store_result(name, result)
+        # Publish the value before announcing it, so the listener can read it
+        self.__dict__[name] = run.result
+        self._emit(FINISHED, run)
+        return run.result
+
+    def _emit(self, event: str, run: ModuleRun):
+        if self._on_event is not None:
+            try:
+                self._on_event(event, run)
+            except Exception as e:
+                print(f"Warning: progress callback failed: {e}")
+
+    # -------------------------------------------------------------------------
+    # BACKGROUND PREFETCH
+    # -------------------------------------------------------------------------
+
+    def start_prefetch(self, priority: List[str] = None):
+        """Compute the remaining sections in the background, highest priority first"""
+        order = [name for name in (priority or PREFETCH_PRIORITY) if name in ANALYSIS_MODULES]
+        order += [name for name in ANALYSIS_MODULES if name not in order and name != 'summary']
+        order.append('summary')
+
+        def prefetch():
+            for name in order:
+                if self._stop.is_set():
+                    return
+                self.get(name)
+
+        self._prefetch_thread = threading.Thread(target=prefetch, daemon=True)
+        self._prefetch_thread.start()
+
+    def stop_prefetch(self):
+        """Stop prefetching after the module currently running"""
+        self._stop.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait for prefetch to finish; True if every section is ready"""
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.join(timeout)
+        return all(name in self.__dict__ for name in ANALYSIS_MODULES)
+
+    def to_results(self) -> ComprehensiveResults:
+        """Compute anything missing and return a plain ComprehensiveResults"""
+        values = {name: self.get(name) for name in ANALYSIS_MODULES}
+        return ComprehensiveResults(
+            **values,
+            module_errors=dict(self.module_errors),
+            module_timings=dict(self.module_timings),
+            cached_modules=list(self.cached_modules),
+        )
 
 
 # Note: REFERENCE_POPULATIONS (177 regions) imported from reference_populations.py
@@ -464,26 +768,49 @@ PHARMACOGENOMICS = {
 # HAPLOGROUP MARKERS
 # =============================================================================
 
+# Phylogenies: haplogroup -> parent and defining SNPs (rsid -> (ancestral,
+# derived)). Internal nodes without markers in this database only carry the
+# topology. Classified by haplogroup_tree.
+
 MTDNA_HAPLOGROUPS = {
-    'H': {'markers': ['rs2032658', 'rs3928306'], 'origin': 'Europe', 'freq': 0.45},
-    'U': {'markers': ['rs41323649'], 'origin': 'Western Eurasia', 'freq': 0.15},
-    'K': {'markers': ['rs8896'], 'origin': 'Near East', 'freq': 0.10},
-    'J': {'markers': ['rs2853499'], 'origin': 'Near East', 'freq': 0.12},
-    'T': {'markers': ['rs41456348'], 'origin': 'Near East', 'freq': 0.08},
-    'L': {'markers': ['rs2853515'], 'origin': 'Africa', 'freq': 0.05},
-    'A': {'markers': ['rs3928305'], 'origin': 'East Asia/Americas', 'freq': 0.03},
-    'B': {'markers': ['rs8896'], 'origin': 'East Asia/Oceania', 'freq': 0.03}
+    'mt-MRCA': {'parent': None, 'snps': {}, 'origin': 'Africa'},
+    'L': {'parent': 'mt-MRCA', 'snps': {'rs2853515': ('G', 'A')}, 'origin': 'Africa', 'freq': 0.05},
+    'L3': {'parent': 'mt-MRCA', 'snps': {}, 'origin': 'East Africa'},
+    'N': {'parent': 'L3', 'snps': {}, 'origin': 'Middle East'},
+    'A': {'parent': 'N', 'snps': {'rs3928305': ('C', 'T')}, 'origin': 'East Asia/Americas', 'freq': 0.03},
+    'R': {'parent': 'N', 'snps': {}, 'origin': 'Southwest Asia'},
+    'HV': {'parent': 'R', 'snps': {}, 'origin': 'Near East'},
+    'H': {'parent': 'HV', 'snps': {'rs2032658': ('A', 'G'), 'rs3928306': ('G', 'A')},
+          'origin': 'Europe', 'freq': 0.45},
+    'JT': {'parent': 'R', 'snps': {}, 'origin': 'Near East'},
+    'J': {'parent': 'JT', 'snps': {'rs2853499': ('C', 'T')}, 'origin': 'Near East', 'freq': 0.12},
+    'T': {'parent': 'JT', 'snps': {'rs41456348': ('A', 'G')}, 'origin': 'Near East', 'freq': 0.08},
+    'U': {'parent': 'R', 'snps': {'rs41323649': ('C', 'T')}, 'origin': 'Western Eurasia', 'freq': 0.15},
+    'K': {'parent': 'U', 'snps': {'rs8896': ('G', 'A')}, 'origin': 'Near East', 'freq': 0.10},
+    # rs8896 defines K; no B-defining marker is in this database yet
+    'B': {'parent': 'R', 'snps': {}, 'origin': 'East Asia/Oceania', 'freq': 0.03},
 }
 
 YDNA_HAPLOGROUPS = {
-    'R1b': {'markers': ['rs9786184'], 'origin': 'Western Europe', 'freq': 0.50},
-    'R1a': {'markers': ['rs17250535'], 'origin': 'Eastern Europe/South Asia', 'freq': 0.15},
-    'I': {'markers': ['rs2032597'], 'origin': 'Northern Europe', 'freq': 0.20},
-    'J': {'markers': ['rs9341296'], 'origin': 'Middle East', 'freq': 0.08},
-    'E': {'markers': ['rs2032652'], 'origin': 'Africa', 'freq': 0.05},
-    'G': {'markers': ['rs2032636'], 'origin': 'Caucasus', 'freq': 0.02},
-    'N': {'markers': ['rs9341301'], 'origin': 'Northern Eurasia', 'freq': 0.03},
-    'O': {'markers': ['rs2032595'], 'origin': 'East Asia', 'freq': 0.02}
+    'Y-MRCA': {'parent': None, 'snps': {}, 'origin': 'Africa'},
+    'CT': {'parent': 'Y-MRCA', 'snps': {}, 'origin': 'Africa'},
+    'DE': {'parent': 'CT', 'snps': {}, 'origin': 'Africa/Middle East'},
+    'E': {'parent': 'DE', 'snps': {'rs2032652': ('C', 'T')}, 'origin': 'Africa', 'freq': 0.05},
+    'CF': {'parent': 'CT', 'snps': {}, 'origin': 'Middle East'},
+    'F': {'parent': 'CF', 'snps': {}, 'origin': 'Middle East'},
+    'G': {'parent': 'F', 'snps': {'rs2032636': ('G', 'T')}, 'origin': 'Caucasus', 'freq': 0.02},
+    'HIJK': {'parent': 'F', 'snps': {}, 'origin': 'Middle East'},
+    'IJ': {'parent': 'HIJK', 'snps': {}, 'origin': 'Middle East'},
+    'I': {'parent': 'IJ', 'snps': {'rs2032597': ('A', 'C')}, 'origin': 'Northern Europe', 'freq': 0.20},
+    'J': {'parent': 'IJ', 'snps': {'rs9341296': ('C', 'T')}, 'origin': 'Middle East', 'freq': 0.08},
+    'K': {'parent': 'HIJK', 'snps': {}, 'origin': 'South Asia'},
+    'NO': {'parent': 'K', 'snps': {}, 'origin': 'East Asia'},
+    'N': {'parent': 'NO', 'snps': {'rs9341301': ('T', 'C')}, 'origin': 'Northern Eurasia', 'freq': 0.03},
+    'O': {'parent': 'NO', 'snps': {'rs2032595': ('A', 'G')}, 'origin': 'East Asia', 'freq': 0.02},
+    'P': {'parent': 'K', 'snps': {}, 'origin': 'Central Asia'},
+    'R': {'parent': 'P', 'snps': {}, 'origin': 'Central Asia'},
+    'R1a': {'parent': 'R', 'snps': {'rs17250535': ('C', 'T')}, 'origin': 'Eastern Europe/South Asia', 'freq': 0.15},
+    'R1b': {'parent': 'R', 'snps': {'rs9786184': ('C', 'A')}, 'origin': 'Western Europe', 'freq': 0.50},
 }
 
 
@@ -664,18 +991,100 @@ ANCIENT_DNA_COMPONENTS = {
 class ComprehensiveDNAAnalysisEngine:
     """Complete DNA analysis engine integrating all modules"""
 
-    def __init__(self):
+    def __init__(self, results_cache: Optional[ResultsCache] = None):
         self.snp_dict = {}
         self.results = None
+        self.kit_fingerprint = None
+        # (kit fingerprint, module, database version) -> module result
+        self._memo = OrderedDict()
+        self._memo_lock = threading.RLock()
+        self.memo_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'by_module': {}}
+        # Optional on-disk cache behind the memo
+        self.results_cache = results_cache
 
     def load_dna_data(self, dna_df: pd.DataFrame):
         """Load DNA data into the engine"""
-        self.snp_dict = {}
-        for _, row in dna_df.iterrows():
-            rsid = row.get('rsid', '')
-            genotype = row.get('genotype', '')
-            if rsid and genotype:
-                self.snp_dict[rsid] = self._standardize_genotype(genotype)
+        self.load_snp_dict(snp_dict_from_dataframe(dna_df))
+
+    def load_snp_dict(self, snp_dict: Dict[str, str], fingerprint: str = None):
+        """Load a kit as rsid -> genotype (e.g. one stored in the results cache)"""
+        self.snp_dict = snp_dict
+        self.kit_fingerprint = fingerprint or kit_fingerprint(snp_dict)
+
+        # Keep the genotypes so the kit can be reanalyzed after database updates
+        cache = self.results_cache
+        if cache is not None and cache.store_kits:
+            try:
+                if not cache.has_kit(self.kit_fingerprint):
+                    cache.put_kit(self.kit_fingerprint, snp_dict)
+            except Exception as e:
+                print(f"Warning: could not store kit in results cache: {e}")
+
+    # -------------------------------------------------------------------------
+    # PER-KIT RESULT MEMO
+    # -------------------------------------------------------------------------
+
+    def _memo_key(self, module: str) -> Tuple[str, str, str]:
+        if self.kit_fingerprint is None:
+            self.kit_fingerprint = kit_fingerprint(self.snp_dict)
+        return (self.kit_fingerprint, module, self.module_database_version(module))
+
+    def module_database_version(self, module: str) -> str:
+        """Version of the marker tables a module reads (part of the memo key)"""
+        return module_version(module)
+
+    def cached_result(self, module: str) -> Tuple[bool, Any]:
+        """(found, result) for a module already computed on the loaded kit"""
+        if not ANALYSIS_MODULES.get(module, {}).get('memoize', True):
+            return False, None
+        key = self._memo_key(module)
+        with self._memo_lock:
+            counts = self.memo_stats['by_module'].setdefault(
+                module, {'hits': 0, 'disk_hits': 0, 'misses': 0})
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.memo_stats['hits'] += 1
+                counts['hits'] += 1
+                return True, self._memo[key]
+
+        if self.results_cache is not None:
+            found, result = self.results_cache.get(*key)
+            if found:
+                self.store_result(module, result, persist=False)
+                with self._memo_lock:
+                    self.memo_stats['disk_hits'] += 1
+                    counts['disk_hits'] += 1
+                return True, result
+
+        with self._memo_lock:
+            self.memo_stats['misses'] += 1
+            counts['misses'] += 1
+        return False, None
+
+    def store_result(self, module: str, result: Any, persist: bool = True):
+        """Remember a module result for the loaded kit (and on disk if enabled)"""
+        if not ANALYSIS_MODULES.get(module, {}).get('memoize', True):
+            return
+        key = self._memo_key(module)
+        if persist and self.results_cache is not None:
+            try:
+                self.results_cache.put(*key, result)
+            except Exception as e:
+                print(f"Warning: could not cache {module} results: {e}")
+
+        with self._memo_lock:
+            self._memo[key] = result
+            self._memo.move_to_end(key)
+
+            # Keep results for the most recently used kits only
+            kits = list(OrderedDict.fromkeys(k[0] for k in reversed(self._memo)))
+            for stale in kits[MEMO_MAX_KITS:]:
+                for k in [k for k in self._memo if k[0] == stale]:
+                    del self._memo[k]
+
+    def clear_memo(self):
+        with self._memo_lock:
+            self._memo.clear()
 
     def _standardize_genotype(self, genotype: str) -> str:
         """Standardize genotype format (alphabetically sorted)"""
@@ -683,113 +1092,95 @@ class ComprehensiveDNAAnalysisEngine:
             return ''.join(sorted(genotype))
         return genotype
 
-    def run_full_analysis(self, dna_df: pd.DataFrame) -> ComprehensiveResults:
-        """Run all analysis modules including unique features"""
+    def run_full_analysis(self, dna_df: pd.DataFrame, backend: str = 'thread',
+                          max_workers: int = None, timeout: float = None,
+                          timeouts: Dict[str, float] = None,
+                          modules: List[str] = None,
+                          on_event: Callable[[str, ModuleRun], None] = None,
+                          cancel: threading.Event = None) -> ComprehensiveResults:
+        """
+        Run all analysis modules including unique features.
+
+        Modules run on an AnalysisScheduler following ANALYSIS_MODULES: those
+        with no inputs run concurrently, unique features waits for ancestry
+        and haplogroups, and the personalized plan for its 13 inputs.
+        Modules already computed for this kit (same database version) are
+        taken from the engine's memo.
+
+        Args:
+            dna_df: parsed raw DNA data
+            backend: 'thread', 'process' or 'serial'
+            max_workers: worker pool size (defaults to the CPU count)
+            timeout: seconds allowed per module; modules that fail or time
+                out get an empty section and are listed in module_errors
+            timeouts: per-module overrides of timeout, by module name
+            modules: run only these modules and the ones they need (see
+                resolve_modules); sections not run are left empty and have
+                no entry in module_timings
+            on_event: progress callback, called with ('started' | 'finished',
+                ModuleRun) for every module
+            cancel: Event checked between modules; raises AnalysisCancelled
+                once set
+        """
         self.load_dna_data(dna_df)
+        return self.analyze_loaded_kit(backend=backend, max_workers=max_workers,
+                                       timeout=timeout, timeouts=timeouts,
+                                       modules=modules, on_event=on_event, cancel=cancel)
+
+    def analyze_loaded_kit(self, backend: str = 'thread', max_workers: int = None,
+                           timeout: float = None, timeouts: Dict[str, float] = None,
+                           modules: List[str] = None,
+                           on_event: Callable[[str, ModuleRun], None] = None,
+                           cancel: threading.Event = None) -> ComprehensiveResults:
+        """run_full_analysis on the kit already loaded (same arguments)"""
+        unknown = [name for name in (timeouts or {}) if name not in ANALYSIS_MODULES]
+        if unknown:
+            raise ValueError(f"Unknown analysis modules in timeouts: {', '.join(unknown)}")
+
+        selected = ANALYSIS_MODULES
+        if modules is not None:
+            selected = {name: ANALYSIS_MODULES[name] for name in resolve_modules(modules)}
+
+        scheduler = AnalysisScheduler(selected, backend=backend,
+                                      max_workers=max_workers, timeout=timeout,
+                                      timeouts=timeouts)
+        runs = scheduler.run(self, on_event=on_event, cancel=cancel)
+
+        sections = {name: {} for name in ANALYSIS_MODULES}
+        sections.update({name: run.result for name, run in runs.items()})
+        return ComprehensiveResults(
+            **sections,
+            module_errors={name: run.error for name, run in runs.items() if run.error},
+            module_timings={name: round(run.elapsed, 4) for name, run in runs.items()},
+            cached_modules=[name for name, run in runs.items() if run.cached],
+        )
 
-        # Run standard analysis first
-        ancestry = self.analyze_ancestry()
-        haplogroups = self.analyze_haplogroups()
+    def run_lazy_analysis(self, dna_df: pd.DataFrame, prefetch: bool = True,
+                          on_event: Callable[[str, ModuleRun], None] = None
+                          ) -> LazyComprehensiveResults:
+        """
+        Load a kit and return results that compute each section on first access.
 
-        # Run unique features analysis
+        The results hold a copy of the engine pinned to this kit (sharing the
+        memo), so loading another kit does not disturb a running prefetch.
+        on_event is told as each section starts and finishes.
+        """
+        self.load_dna_data(dna_df)
+        results = LazyComprehensiveResults(copy.copy(self), on_event=on_event)
+        if prefetch:
+            results.start_prefetch()
+        return results
+
+    def analyze_unique_features(self, ancestry_results: Dict = None,
+                                haplogroups: Dict = None,
+                                chronological_age: int = 30) -> Dict[str, Any]:
+        """Unique features (superpowers, time machine, ancestry story...)"""
         from unique_features_analysis import run_unique_features_analysis
-        unique_features = run_unique_features_analysis(
+        return run_unique_features_analysis(
             self.snp_dict,
-            ancestry_results=ancestry,
-            haplogroups=haplogroups,
-            chronological_age=30  # Default age, could be user input
-        )
-
-        # Run all analysis modules and store for plan generation
-        health_traits = self.analyze_health_traits()
-        nutrition_fitness = self.analyze_nutrition_fitness()
-        athletic_genetics = self.analyze_athletic_genes()
-        pharmacogenomics = self.analyze_pharmacogenomics()
-        polygenic_scores = self.analyze_polygenic_scores()
-        carrier_status = self.analyze_carrier_status()
-        longevity = self.analyze_longevity()
-        immunity = self.analyze_immunity()
-        mental_traits = self.analyze_mental_traits()
-        chronotype = self.analyze_chronotype()
-        cardiovascular = self.analyze_cardiovascular_genetics()
-        cancer_risk = self.analyze_cancer_risk_genetics()
-        nutrition_metabolism = self.analyze_nutrition_metabolism()
-
-        # Generate personalized plan with all analysis data
-        personalized_plan = self.generate_personalized_plan(
-            health_traits=health_traits,
-            nutrition_fitness=nutrition_fitness,
-            athletic_genetics=athletic_genetics,
-            pharmacogenomics=pharmacogenomics,
-            polygenic_scores=polygenic_scores,
-            carrier_status=carrier_status,
-            longevity=longevity,
-            immunity=immunity,
-            mental_traits=mental_traits,
-            chronotype=chronotype,
-            cardiovascular=cardiovascular,
-            cancer_risk=cancer_risk,
-            nutrition_metabolism=nutrition_metabolism
-        )
-
-        return ComprehensiveResults(
-            ancestry=ancestry,
-            physical_traits=self.analyze_physical_traits(),
-            health_traits=health_traits,
-            pharmacogenomics=pharmacogenomics,
+            ancestry_results=ancestry_results,
             haplogroups=haplogroups,
-            immunity=immunity,
-            longevity=longevity,
-            nutrition_fitness=nutrition_fitness,
-            climate_adaptation=self.analyze_climate_adaptation(),
-            polygenic_scores=polygenic_scores,
-            ancient_dna=self.analyze_ancient_dna(),
-            carrier_status=carrier_status,
-            blood_type=self.analyze_blood_type(),
-            athletic_genetics=athletic_genetics,
-            adaptation=self.analyze_adaptation(),
-            # New advanced traits
-            facial_features=self.analyze_facial_features(),
-            chronotype=chronotype,
-            pain_sensitivity=self.analyze_pain_sensitivity(),
-            addiction_risk=self.analyze_addiction_risk(),
-            mental_traits=mental_traits,
-            sensory_traits=self.analyze_sensory_traits(),
-            ancient_population_match=self.analyze_ancient_population_match(),
-            personalized_plan=personalized_plan,
-            summary=self.generate_summary(),
-            # Behavioral & cognitive genetics
-            behavioral_genetics=self.analyze_behavioral_genetics(),
-            # Sleep & circadian genetics
-            sleep_genetics=self.analyze_sleep_genetics(),
-            # Expanded physical traits
-            physical_traits_expanded=self.analyze_physical_traits_expanded(),
-            # Sports & injury genetics
-            sports_genetics=self.analyze_sports_genetics(),
-            # Reproduction & fertility genetics
-            reproduction_genetics=self.analyze_reproduction_genetics(),
-            # Immune system deep dive
-            immune_deep_genetics=self.analyze_immune_deep_genetics(),
-            # Nutrition & metabolism
-            nutrition_metabolism=self.analyze_nutrition_metabolism(),
-            # Ancient DNA & history
-            ancient_dna_history=self.analyze_ancient_dna_history(),
-            # Longevity genetics
-            longevity_genetics=self.analyze_longevity_genetics(),
-            # Pharmacogenomics - detailed drug metabolism
-            pharmacogenomics_detailed=self.analyze_pharmacogenomics_detailed(),
-            # Mental health genetics
-            mental_health_genetics=self.analyze_mental_health_genetics(),
-            # Cancer risk genetics
-            cancer_risk_genetics=self.analyze_cancer_risk_genetics(),
-            # Cardiovascular genetics
-            cardiovascular_genetics=self.analyze_cardiovascular_genetics(),
-            # Skin & dermatology genetics
-            skin_dermatology=self.analyze_skin_dermatology(),
-            # Deep ancestry genetics
-            deep_ancestry=self.analyze_deep_ancestry(),
-            # Unique features
-            unique_features=unique_features
+            chronological_age=chronological_age  # Default age, could be user input
         )
 
     # -------------------------------------------------------------------------
@@ -1006,47 +1397,23 @@ class ComprehensiveDNAAnalysisEngine:
 
     def _analyze_mtdna(self) -> Dict:
         """Analyze mitochondrial DNA haplogroup"""
-        best_match = None
-        best_score = 0
-
-        for haplogroup, data in MTDNA_HAPLOGROUPS.items():
-            score = sum(1 for m in data['markers'] if m in self.snp_dict)
-            if score > best_score:
-                best_score = score
-                best_match = haplogroup
-
-        if best_match:
-            data = MTDNA_HAPLOGROUPS[best_match]
-            return {
-                'haplogroup': best_match,
-                'confidence': min(0.9, 0.5 + best_score * 0.2),
-                'origin': data['origin'],
-                'description': f"Maternal lineage from {data['origin']}",
-                'population_frequency': data['freq']
-            }
-        return {'haplogroup': 'Unknown', 'confidence': 0.0}
+        from haplogroup_tree import classify, get_compiled_tree
+
+        call = classify(get_compiled_tree('mtDNA'), self.snp_dict)
+        if call is None:
+            return {'haplogroup': 'Unknown', 'confidence': 0.0}
+        call['description'] = f"Maternal lineage from {call['origin']}"
+        return call
 
     def _analyze_ydna(self) -> Dict:
         """Analyze Y-chromosome haplogroup"""
-        best_match = None
-        best_score = 0
-
-        for haplogroup, data in YDNA_HAPLOGROUPS.items():
-            score = sum(1 for m in data['markers'] if m in self.snp_dict)
-            if score > best_score:
-                best_score = score
-                best_match = haplogroup
-
-        if best_match:
-            data = YDNA_HAPLOGROUPS[best_match]
-            return {
-                'haplogroup': best_match,
-                'confidence': min(0.9, 0.5 + best_score * 0.2),
-                'origin': data['origin'],
-                'description': f"Paternal lineage from {data['origin']}",
-                'population_frequency': data['freq']
-            }
-        return {'haplogroup': 'Unknown (or female sample)', 'confidence': 0.0}
+        from haplogroup_tree import classify, get_compiled_tree
+
+        call = classify(get_compiled_tree('Y_DNA'), self.snp_dict)
+        if call is None:
+            return {'haplogroup': 'Unknown (or female sample)', 'confidence': 0.0}
+        call['description'] = f"Paternal lineage from {call['origin']}"
+        return call
 
     # -------------------------------------------------------------------------
     # IMMUNITY ANALYSIS (EXPANDED - 9 conditions with actions)
@@ -1325,75 +1692,8 @@ class ComprehensiveDNAAnalysisEngine:
 
     def analyze_polygenic_scores(self) -> Dict[str, Any]:
         """Calculate polygenic risk scores using 100s of markers per condition"""
-        results = {}
-
-        for condition_id, condition_data in POLYGENIC_RISK_SCORES.items():
-            markers = condition_data['markers']
-            score = 0.0
-            markers_found = 0
-            risk_alleles = 0
-            marker_details = []
-
-            for rsid, marker_info in markers.items():
-                if rsid in self.snp_dict:
-                    genotype = self.snp_dict[rsid]
-                    markers_found += 1
-                    risk_allele = marker_info['risk_allele']
-                    weight = marker_info['weight']
-
-                    # Count risk alleles
-                    allele_count = genotype.count(risk_allele)
-                    if allele_count > 0:
-                        risk_alleles += allele_count
-                        score += weight * allele_count
-
-                        marker_details.append({
-                            'rsid': rsid,
-                            'genotype': genotype,
-                            'risk_allele': risk_allele,
-                            'copies': allele_count,
-                            'odds_ratio': marker_info['odds_ratio']
-                        })
-
-            if markers_found >= 5:  # Need at least 5 markers for meaningful score
-                # Calculate percentile (higher score = higher risk)
-                # Normalize score to 0-100 range
-                max_possible = sum(m['weight'] * 2 for m in markers.values())
-                if max_possible > 0:
-                    normalized_score = (score / max_possible) * 100
-                else:
-                    normalized_score = 50
-
-                # Determine risk level
-                if normalized_score >= 70:
-                    risk_level = 'Significantly elevated'
-                    percentile = min(95, 50 + normalized_score * 0.5)
-                elif normalized_score >= 55:
-                    risk_level = 'Moderately elevated'
-                    percentile = 60 + (normalized_score - 55) * 2
-                elif normalized_score >= 45:
-                    risk_level = 'Average'
-                    percentile = 40 + (normalized_score - 45) * 2
-                elif normalized_score >= 30:
-                    risk_level = 'Below average'
-                    percentile = 20 + (normalized_score - 30) * 1.5
-                else:
-                    risk_level = 'Low'
-                    percentile = max(5, normalized_score * 0.7)
-
-                results[condition_id] = {
-                    'condition': condition_data['description'],
-                    'risk_level': risk_level,
-                    'percentile': round(percentile, 0),
-                    'score': round(score, 2),
-                    'markers_analyzed': markers_found,
-                    'total_markers': len(markers),
-                    'risk_alleles_found': risk_alleles,
-                    'top_risk_markers': sorted(marker_details, key=lambda x: x['odds_ratio'], reverse=True)[:5],
-                    'recommendations': condition_data['recommendations']
-                }
-
-        return results
+        from polygenic_risk_engine import score_kit
+        return score_kit(self.snp_dict)
 
     # -------------------------------------------------------------------------
     # ANCIENT DNA ANALYSIS (Neanderthal & Denisovan)
@@ -1505,6 +1805,31 @@ class ComprehensiveDNAAnalysisEngine:
             else:
                 results['denisovan']['percentage'] = 0.2  # Trace
 
+        # With a positioned archaic panel installed, estimate the percentages
+        # from introgressed segments instead of the marker match rate. The
+        # status says which of the two the percentages above came from.
+        from introgression_scanner import MIN_SITES_FOR_ESTIMATE, scan_snp_dict
+        scan = scan_snp_dict(self.snp_dict)
+        if scan is None:
+            results['introgression'] = {
+                'status': 'no panel',
+                'method': 'marker match rate',
+                'note': 'No archaic panel installed; percentages are fixed bands '
+                        'chosen from the marker match rate'}
+        elif scan['sites_found'] < MIN_SITES_FOR_ESTIMATE:
+            results['introgression'] = {
+                'status': 'too few sites',
+                'method': 'marker match rate',
+                'sites_found': scan['sites_found'],
+                'note': f"Kit covers {scan['sites_found']} of the {MIN_SITES_FOR_ESTIMATE} "
+                        f"panel sites needed; percentages are fixed bands chosen "
+                        f"from the marker match rate"}
+        else:
+            results['neanderthal']['percentage'] = scan['neanderthal']['percentage']
+            results['denisovan']['percentage'] = scan['denisovan']['percentage']
+            results['introgression'] = dict(scan, status='segments',
+                                            method='introgressed segments')
+
         # Build SEPARATE maternal (mtDNA) and paternal (Y-DNA) journeys
         # Your mom and dad had different ancestral paths!
 
@@ -1655,20 +1980,10 @@ class ComprehensiveDNAAnalysisEngine:
         - Familial Mediterranean Fever (MEFV)
         - Alpha-1 Antitrypsin Deficiency (SERPINA1)
         """
-        # Use the comprehensive carrier status analysis module
-        comprehensive_results = analyze_carrier_status_comprehensive(self.snp_dict)
-
-        # Also run the legacy analysis for any conditions not in the new database
-        legacy_results = self._analyze_carrier_status_legacy()
-
-        # Merge results, preferring comprehensive data
-        results = comprehensive_results.copy()
-
-        # Add any legacy carriers not already found
-        legacy_conditions = {c.get('condition', '') for c in results.get('carriers_found', [])}
-        for carrier in legacy_results.get('carriers_found', []):
-            if carrier.get('condition', '') not in legacy_conditions:
-                results['carriers_found'].append(carrier)
+        from carrier_panel import carrier_report
+        # One pass over the compiled panel; the older CARRIER_STATUS table is
+        # part of it and only adds carriers for conditions not already found
+        results = carrier_report(self.snp_dict, include_legacy=True)
 
         # Update summary
         results['summary'] = {
@@ -1682,172 +1997,16 @@ class ComprehensiveDNAAnalysisEngine:
 
         return results
 
-    def _analyze_carrier_status_legacy(self) -> Dict[str, Any]:
-        """Legacy carrier status analysis for backward compatibility"""
-        results = {
-            'conditions': {},
-            'carriers_found': [],
-            'affected_found': [],
-            'summary': {}
-        }
-
-        for condition_name, condition_data in CARRIER_STATUS.items():
-            condition_result = {
-                'condition_name': condition_name.replace('_', ' ').title(),
-                'description': condition_data['description'],
-                'inheritance': condition_data['inheritance'],
-                'population_frequency': condition_data['frequency'],
-                'markers_tested': 0,
-                'status': 'Not tested',
-                'marker_results': []
-            }
-
-            worst_status = 'Normal'
-            for marker, genotypes in condition_data['markers'].items():
-                if marker in self.snp_dict:
-                    genotype = self.snp_dict[marker]
-                    condition_result['markers_tested'] += 1
-
-                    if genotype in genotypes:
-                        data = genotypes[genotype]
-                        marker_result = {
-                            'marker': marker,
-                            'genotype': genotype,
-                            'status': data['status'],
-                            'description': data['description']
-                        }
-                        condition_result['marker_results'].append(marker_result)
-
-                        if 'Affected' in data['status'] or 'At risk' in data['status'] or 'Deficient' in data['status'] or 'Major' in data['status']:
-                            worst_status = data['status']
-                            results['affected_found'].append({
-                                'condition': condition_name.replace('_', ' ').title(),
-                                'status': data['status'],
-                                'description': data['description']
-                            })
-                        elif 'Carrier' in data['status'] or 'Trait' in data['status'] and worst_status == 'Normal':
-                            worst_status = data['status']
-                            results['carriers_found'].append({
-                                'condition': condition_name.replace('_', ' ').title(),
-                                'status': data['status'],
-                                'description': data['description'],
-                                'population_frequency': condition_data['frequency']
-                            })
-
-            if condition_result['markers_tested'] > 0:
-                condition_result['status'] = worst_status
-                results['conditions'][condition_name] = condition_result
-
-        return results
-
     # -------------------------------------------------------------------------
     # BLOOD TYPE ANALYSIS (7 blood group systems)
     # -------------------------------------------------------------------------
 
     def analyze_blood_type(self) -> Dict[str, Any]:
         """Analyze blood type genetics across multiple blood group systems"""
-        results = {
-            'abo_type': None,
-            'rh_factor': None,
-            'full_type': None,
-            'blood_systems': {},
-            'transfusion_notes': [],
-            'clinical_significance': []
-        }
-
-        # ABO Blood Type
-        abo_result = {'o_likely': False, 'a_likely': False, 'b_likely': False}
-
-        for system_name, markers in BLOOD_TYPE_GENETICS.items():
-            system_results = {
-                'system': system_name.replace('_', ' ').title(),
-                'markers_found': [],
-                'interpretation': ''
-            }
-
-            for rsid, marker_data in markers.items():
-                if rsid in self.snp_dict:
-                    genotype = self.snp_dict[rsid]
-                    if genotype in marker_data:
-                        data = marker_data[genotype]
-                        system_results['markers_found'].append({
-                            'rsid': rsid,
-                            'genotype': genotype,
-                            'description': marker_data.get('description', ''),
-                            'result': data
-                        })
-
-                        # Determine ABO type
-                        if system_name == 'abo_blood_type':
-                            if rsid == 'rs8176719':
-                                if 'blood_type' in data:
-                                    if data['blood_type'] == 'O':
-                                        abo_result['o_likely'] = True
-                                    elif 'A' in data['blood_type']:
-                                        abo_result['a_likely'] = True
-                                    elif 'B' in data['blood_type']:
-                                        abo_result['b_likely'] = True
-                            elif rsid == 'rs8176746':
-                                if data.get('modifier', '') == 'B allele present':
-                                    abo_result['b_likely'] = True
-
-                        # Determine Rh factor
-                        if system_name == 'rh_factor':
-                            if 'rh_status' in data:
-                                results['rh_factor'] = data['rh_status']
-
-                        # Duffy system - malaria resistance
-                        if system_name == 'duffy_system':
-                            if 'malaria' in data:
-                                results['clinical_significance'].append({
-                                    'system': 'Duffy',
-                                    'finding': data['duffy_status'],
-                                    'clinical': data['malaria']
-                                })
-
-                        # Kell system - transfusion importance
-                        if system_name == 'kell_system':
-                            if 'K positive' in str(data.get('kell_status', '')):
-                                results['transfusion_notes'].append(
-                                    'Kell positive (K+) - important for transfusion matching'
-                                )
-
-            if system_results['markers_found']:
-                results['blood_systems'][system_name] = system_results
-
-        # Determine final ABO type
-        if abo_result['o_likely']:
-            results['abo_type'] = 'O'
-        elif abo_result['a_likely'] and abo_result['b_likely']:
-            results['abo_type'] = 'AB'
-        elif abo_result['a_likely']:
-            results['abo_type'] = 'A'
-        elif abo_result['b_likely']:
-            results['abo_type'] = 'B'
-        else:
-            results['abo_type'] = 'Unable to determine'
-
-        # Combine ABO and Rh
-        if results['abo_type'] and results['abo_type'] != 'Unable to determine':
-            rh = '+' if 'positive' in str(results['rh_factor']).lower() else '-' if 'negative' in str(results['rh_factor']).lower() else '?'
-            results['full_type'] = f"{results['abo_type']}{rh}"
-
-        # Add transfusion compatibility info
-        abo = results['abo_type']
-        if abo == 'O':
-            results['transfusion_notes'].append('Universal donor (red blood cells)')
-            results['transfusion_notes'].append('Can only receive type O blood')
-        elif abo == 'AB':
-            results['transfusion_notes'].append('Universal recipient')
-            results['transfusion_notes'].append('Can donate to AB recipients only')
-        elif abo == 'A':
-            results['transfusion_notes'].append('Can donate to A and AB recipients')
-            results['transfusion_notes'].append('Can receive from A and O donors')
-        elif abo == 'B':
-            results['transfusion_notes'].append('Can donate to B and AB recipients')
-            results['transfusion_notes'].append('Can receive from B and O donors')
-
-        return results
+        from blood_groups import blood_type_report
+        # Phenotypes come from the compiled genotype-combination tables, which
+        # also accept reversed and strand-flipped genotypes
+        return blood_type_report(self.snp_dict)
 
     # -------------------------------------------------------------------------
     # ATHLETIC GENETICS ANALYSIS (12 performance genes)
@@ -2478,6 +2637,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Touch sensitivity (PIEZO2)
         - Temperature sensitivity (TRP channels)
         """
+        from sensory_genetics_database import analyze_sensory_genetics
         # Use the comprehensive sensory genetics analysis module
         comprehensive_results = analyze_sensory_genetics(self.snp_dict)
 
@@ -2558,6 +2718,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Memory & learning (KIBRA, BDNF, COMT)
         - Attention & impulsivity (DAT1, ADRA2A)
         """
+        from behavioral_genetics_database import analyze_behavioral_genetics
         # Use the comprehensive behavioral genetics analysis module
         return analyze_behavioral_genetics(self.snp_dict)
 
@@ -2579,6 +2740,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Delayed sleep phase syndrome risk
         - Caffeine and sleep interaction
         """
+        from sleep_genetics_database import analyze_sleep_genetics
         # Use the comprehensive sleep genetics analysis module
         return analyze_sleep_genetics(self.snp_dict)
 
@@ -2600,6 +2762,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Tongue rolling ability
         - Finger length ratio (2D:4D)
         """
+        from physical_traits_expanded_database import analyze_physical_traits_expanded
         # Use the comprehensive physical traits expanded analysis module
         return analyze_physical_traits_expanded(self.snp_dict)
 
@@ -2620,6 +2783,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Blood pressure response to exercise
         - Lactate clearance
         """
+        from sports_genetics_database import analyze_sports_genetics
         # Use the comprehensive sports genetics analysis module
         return analyze_sports_genetics(self.snp_dict)
 
@@ -2640,6 +2804,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Estrogen metabolism
         - Pregnancy complications (thrombosis risk)
         """
+        from reproduction_genetics_database import analyze_reproduction_genetics
         # Use the comprehensive reproduction genetics analysis module
         return analyze_reproduction_genetics(self.snp_dict)
 
@@ -2661,6 +2826,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Psoriasis risk
         - IBD/Crohn's disease risk
         """
+        from immune_deep_genetics_database import analyze_immune_deep_genetics
         # Use the comprehensive immune deep genetics analysis module
         return analyze_immune_deep_genetics(self.snp_dict)
 
@@ -2682,6 +2848,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Sodium sensitivity
         - Alcohol metabolism (ADH1B, ALDH2)
         """
+        from nutrition_metabolism_database import analyze_nutrition_metabolism
         # Use the comprehensive nutrition metabolism analysis module
         return analyze_nutrition_metabolism(self.snp_dict)
 
@@ -2702,6 +2869,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Blue eye and light skin origins
         - Historical migration markers
         """
+        from ancient_dna_history_database import analyze_ancient_dna_history
         # Use the comprehensive ancient DNA history analysis module
         return analyze_ancient_dna_history(self.snp_dict)
 
@@ -2721,6 +2889,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Inflammaging markers
         - Klotho anti-aging hormone
         """
+        from longevity_genetics_database import analyze_longevity_genetics
         return analyze_longevity_genetics(self.snp_dict)
 
     # -------------------------------------------------------------------------
@@ -2741,6 +2910,7 @@ class ComprehensiveDNAAnalysisEngine:
         - CYP1A2 (caffeine metabolism)
         - MTHFR (folate metabolism)
         """
+        from pharmacogenomics_database import analyze_pharmacogenomics
         return analyze_pharmacogenomics(self.snp_dict)
 
     # -------------------------------------------------------------------------
@@ -2759,6 +2929,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Addiction vulnerability (OPRM1, DRD2)
         - Cognitive profile (COMT warrior/worrier)
         """
+        from mental_health_database import analyze_mental_health_genetics
         return analyze_mental_health_genetics(self.snp_dict)
 
     # -------------------------------------------------------------------------
@@ -2777,6 +2948,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Pancreatic cancer (ABO, NR5A2)
         Note: Does not include rare pathogenic BRCA1/2 mutations
         """
+        from cancer_risk_database import analyze_cancer_risk_genetics
         return analyze_cancer_risk_genetics(self.snp_dict)
 
     # -------------------------------------------------------------------------
@@ -2795,6 +2967,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Atrial fibrillation risk (PITX2, ZFHX3)
         - Clotting/thrombosis (Factor V Leiden, Prothrombin)
         """
+        from cardiovascular_database import analyze_cardiovascular_genetics
         return analyze_cardiovascular_genetics(self.snp_dict)
 
     # -------------------------------------------------------------------------
@@ -2813,6 +2986,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Skin elasticity and stretch marks
         - Vitamin D synthesis efficiency
         """
+        from skin_dermatology_database import analyze_skin_dermatology
         return analyze_skin_dermatology(self.snp_dict)
 
     # -------------------------------------------------------------------------
@@ -2832,6 +3006,7 @@ class ComprehensiveDNAAnalysisEngine:
         - Ancient migration patterns (Neolithic Farmer, Bronze Age Steppe)
         - Isolated population markers
         """
+        from ancestry_deep_database import analyze_deep_ancestry
         return analyze_deep_ancestry(self.snp_dict)
 
     # -------------------------------------------------------------------------
@@ -2846,31 +3021,9 @@ class ComprehensiveDNAAnalysisEngine:
             'match_scores': {}
         }
 
-        for pop_id, pop_data in ANCIENT_POPULATIONS.items():
-            match_score = 0
-            markers_found = 0
-            markers_matched = 0
-
-            markers = pop_data.get('markers', {})
-            for rsid, marker_info in markers.items():
-                if rsid in self.snp_dict:
-                    markers_found += 1
-                    genotype = self.snp_dict[rsid]
-                    expected = marker_info.get(f'{pop_id}_allele', marker_info.get('yamnaya_allele', ''))
-                    if expected and expected in genotype:
-                        markers_matched += 1
-                        match_score += marker_info.get('freq', 0.5)
-
-            if markers_found > 0:
-                score = (markers_matched / markers_found) * 100
-                results['match_scores'][pop_id] = {
-                    'name': pop_data['description'],
-                    'score': round(score, 1),
-                    'time_period': pop_data['time_period'],
-                    'location': pop_data['location'],
-                    'contribution': pop_data.get('contribution', ''),
-                    'typical_traits': pop_data.get('typical_traits', [])
-                }
+        from ancient_affinity import fit_mixture, population_affinity
+        results['match_scores'] = population_affinity(self.snp_dict)
+        results['mixture'] = fit_mixture(self.snp_dict)
 
         # Sort by score
         sorted_matches = sorted(
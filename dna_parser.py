@@ -6,7 +6,9 @@ Supports: AncestryDNA, 23andMe, MyHeritage, FamilyTreeDNA, and generic formats
 import pandas as pd
 import zipfile
 import io
-from typing import Optional
+from typing import Dict, Optional
+
+from analysis_scheduler import AnalysisCancelled
 
 
 def parse_dna_file(file_obj, file_path: str) -> Optional[pd.DataFrame]:
@@ -56,6 +58,102 @@ def parse_dna_file(file_obj, file_path: str) -> Optional[pd.DataFrame]:
         return None
 
 
+# Data lines handed to the provider parser per streamed chunk
+STREAM_CHUNK_LINES = 50000
+
+
+def _iter_text_lines(file_obj, file_path: str):
+    """Yield decoded lines from a DNA file (or the data file inside a ZIP)"""
+    if file_path.endswith('.zip'):
+        try:
+            with zipfile.ZipFile(file_obj) as z:
+                for filename in z.namelist():
+                    if filename.endswith(('.txt', '.csv')) and not filename.startswith('__'):
+                        with z.open(filename) as f:
+                            yield from io.TextIOWrapper(f, encoding='utf-8', errors='ignore')
+                        return
+        except Exception as e:
+            print(f"ZIP extraction error: {e}")
+        return
+
+    if isinstance(file_obj, io.TextIOBase):
+        yield from file_obj
+    else:
+        yield from io.TextIOWrapper(file_obj, encoding='utf-8', errors='ignore')
+
+
+def parse_dna_file_streaming(file_obj, file_path: str, on_chunk=None,
+                             chunk_lines: int = STREAM_CHUNK_LINES,
+                             cancel=None) -> Optional[pd.DataFrame]:
+    """
+    Parse a DNA file in chunks, calling on_chunk(DataFrame) as each is parsed.
+
+    Produces the same standardized DataFrame as parse_dna_file, but lets the
+    caller start work (e.g. an ancestry estimate) before the whole file is in.
+    If the cancel Event is set, parsing stops at the next chunk and
+    AnalysisCancelled is raised.
+    """
+    try:
+        lines = _iter_text_lines(file_obj, file_path)
+
+        # Buffer enough of the file to detect the provider and the data start
+        head = []
+        data_start = None
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if not head and not line.strip():
+                continue
+            head.append(line)
+            if data_start is None and not line.startswith('#') and not line.startswith('/') and line.strip():
+                data_start = len(head) - 1
+            if data_start is not None and len(head) >= 30:
+                break
+
+        if not head:
+            return None
+
+        provider = detect_provider(head[:30])
+        parser = {
+            'ancestry': parse_ancestry_dna,
+            '23andme': parse_23andme_dna,
+            'myheritage': parse_myheritage_dna,
+            'ftdna': parse_ftdna,
+        }.get(provider, parse_generic_dna)
+
+        # MyHeritage rows are only read after the CSV header line
+        header = [head[data_start]] if provider == 'myheritage' and data_start is not None else []
+
+        chunks = []
+
+        def flush(batch):
+            if cancel is not None and cancel.is_set():
+                raise AnalysisCancelled("parsing cancelled")
+            chunk = parser(batch)
+            if chunk is not None:
+                chunks.append(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
+
+        batch = head[data_start or 0:]
+        for line in lines:
+            batch.append(line.rstrip('\r\n'))
+            if len(batch) >= chunk_lines:
+                flush(batch)
+                batch = list(header)
+        if len(batch) > len(header) or not chunks:
+            flush(batch)
+
+        if not chunks:
+            return None
+        return pd.concat(chunks, ignore_index=True)
+
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        print(f"Parse error: {e}")
+        return None
+
+
 def extract_zip_content(file_obj) -> Optional[str]:
     """Extract DNA data from ZIP archive"""
     try:
@@ -338,3 +436,64 @@ def parse_generic_dna(lines: list) -> pd.DataFrame:
                     continue
 
     return pd.DataFrame(data) if data else None
+
+
+# =============================================================================
+# KIT LOOKUP
+# =============================================================================
+
+# Allele / genotype strings that mean "no call"
+NO_CALL_ALLELES = ['0', '-', 'N', 'D', 'I', '']
+NO_CALL_GENOTYPES = ['--', 'NN', '00', 'II', 'DD']
+
+# Canonical (alphabetically sorted) form of every A/C/G/T pair
+CANONICAL_GENOTYPES = {a + b: ''.join(sorted(a + b)) for a in 'ACGT' for b in 'ACGT'}
+
+
+def canonicalize_genotypes(genotypes: pd.Series) -> pd.Series:
+    """
+    Sort two-letter genotypes alphabetically (GA -> AG), column-wise.
+
+    Uses CANONICAL_GENOTYPES, extended with any other values in the column
+    (no-calls, indels), so each distinct string is handled once.
+    """
+    table = dict(CANONICAL_GENOTYPES)
+    for genotype in genotypes.unique():
+        if genotype not in table:
+            table[genotype] = ''.join(sorted(genotype)) if len(genotype) == 2 else genotype
+    return genotypes.map(table)
+
+
+def snp_dict_from_dataframe(df: pd.DataFrame, drop_no_calls: bool = False) -> Dict[str, str]:
+    """
+    Build the rsid -> canonical genotype lookup for a kit in bulk.
+
+    Accepts a 'genotype' column or 'allele1'/'allele2' columns (names in any
+    case; without an 'rsid' column the first column is used). Rows missing an
+    rsid or genotype are skipped, and with drop_no_calls so are no-calls.
+    Later rows win for duplicated rsids.
+    """
+    columns = {str(c).lower().strip(): c for c in df.columns}
+    rsids = df[columns['rsid']] if 'rsid' in columns else df.iloc[:, 0]
+    keep = rsids.notna()
+
+    if 'allele1' in columns and 'allele2' in columns:
+        allele1, allele2 = df[columns['allele1']], df[columns['allele2']]
+        keep &= allele1.notna() & allele2.notna()
+        allele1, allele2 = allele1.astype(str), allele2.astype(str)
+        if drop_no_calls:
+            keep &= ~allele1.isin(NO_CALL_ALLELES) & ~allele2.isin(NO_CALL_ALLELES)
+        genotypes = allele1 + allele2
+    elif 'genotype' in columns:
+        genotypes = df[columns['genotype']]
+        keep &= genotypes.notna()
+        genotypes = genotypes.astype(str)
+        keep &= genotypes != ''
+        if drop_no_calls:
+            keep &= (genotypes.str.len() >= 2) & ~genotypes.isin(NO_CALL_GENOTYPES)
+    else:
+        return {}
+
+    rsids = rsids.astype(str)
+    keep &= rsids != ''
+    return dict(zip(rsids[keep], canonicalize_genotypes(genotypes[keep])))
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Drug Index
+Answers "what does this kit say about clopidogrel?" without scanning every
+pharmacogenomics table.
+
+The index is built once from every *_GENETICS table in
+pharmacogenomics_database, PHARMACOGENOMICS_EXPANDED (expanded_traits) and
+DRUG_RECOMMENDATIONS. It maps a normalised drug name - and its brand names
+and the drug classes it belongs to ("SSRIs", "PPIs") - to the genes, rsids
+and recommendation rules that mention it. A query evaluates only those
+markers, plus the star-allele diplotype of the drug's genes.
+
+A marker's advice text ("Reduce warfarin dose ~20%") is a recommendation
+only for the drug it names first; advice naming no drug only for a table
+entry listing a single drug. Otherwise the marker is reported as a finding.
+
+Usage: python drug_index.py KIT DRUG [DRUG ...]
+       python drug_index.py --check
+"""
+
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Brand and alternative names -> the generic name used in the tables
+DRUG_SYNONYMS = {
+    'plavix': 'clopidogrel', 'coumadin': 'warfarin', 'jantoven': 'warfarin',
+    'prilosec': 'omeprazole', 'nexium': 'esomeprazole', 'protonix': 'pantoprazole',
+    'zocor': 'simvastatin', 'lipitor': 'atorvastatin', 'crestor': 'rosuvastatin',
+    'pravachol': 'pravastatin', 'lescol': 'fluvastatin',
+    'tylenol': 'acetaminophen', 'paracetamol': 'acetaminophen',
+    'ultram': 'tramadol', 'oxycontin': 'oxycodone', 'vicodin': 'hydrocodone',
+    'zoloft': 'sertraline', 'celexa': 'citalopram', 'lexapro': 'escitalopram',
+    'prozac': 'fluoxetine', 'paxil': 'paroxetine', 'effexor': 'venlafaxine',
+    'wellbutrin': 'bupropion', 'elavil': 'amitriptyline', 'pamelor': 'nortriptyline',
+    'lopressor': 'metoprolol', 'toprol': 'metoprolol', 'coreg': 'carvedilol',
+    'nolvadex': 'tamoxifen', 'dilantin': 'phenytoin', 'tegretol': 'carbamazepine',
+    'celebrex': 'celecoxib', 'advil': 'ibuprofen', 'motrin': 'ibuprofen',
+    'glucotrol': 'glipizide', 'amaryl': 'glimepiride', 'cozaar': 'losartan',
+    'imuran': 'azathioprine', '6-mercaptopurine': 'mercaptopurine', '6-mp': 'mercaptopurine',
+    'purinethol': 'mercaptopurine', '5-fu': '5-fluorouracil', 'fluorouracil': '5-fluorouracil',
+    'xeloda': 'capecitabine', 'prograf': 'tacrolimus', 'neoral': 'cyclosporine',
+    'sandimmune': 'cyclosporine', 'rapamune': 'sirolimus', 'camptosar': 'irinotecan',
+    'reyataz': 'atazanavir', 'sustiva': 'efavirenz', 'ziagen': 'abacavir',
+    'vfend': 'voriconazole', 'clozaril': 'clozapine', 'zyprexa': 'olanzapine',
+    'risperdal': 'risperidone', 'haldol': 'haloperidol', 'ethanol': 'alcohol',
+}
+
+# Drug classes named in the tables -> member drugs, so a class-level rule
+# reaches its members
+DRUG_CLASSES = {
+    'ssris': ['citalopram', 'escitalopram', 'sertraline', 'fluoxetine', 'paroxetine',
+              'fluvoxamine'],
+    'antidepressants': ['citalopram', 'escitalopram', 'sertraline', 'fluoxetine', 'paroxetine',
+                        'venlafaxine', 'amitriptyline', 'nortriptyline', 'bupropion'],
+    'ppis': ['omeprazole', 'esomeprazole', 'pantoprazole', 'lansoprazole', 'rabeprazole'],
+    'nsaids': ['celecoxib', 'flurbiprofen', 'ibuprofen', 'meloxicam', 'piroxicam'],
+    'statins': ['simvastatin', 'atorvastatin', 'pravastatin', 'rosuvastatin', 'fluvastatin'],
+    'opioids': ['codeine', 'tramadol', 'oxycodone', 'hydrocodone', 'morphine', 'fentanyl',
+                'methadone', 'buprenorphine'],
+    'beta-blockers': ['metoprolol', 'carvedilol', 'atenolol', 'propranolol'],
+    'sulfonylureas': ['glimepiride', 'glipizide', 'tolbutamide', 'glyburide'],
+    'antipsychotics': ['clozapine', 'olanzapine', 'risperidone', 'haloperidol', 'aripiprazole'],
+    'atypical antipsychotics': ['clozapine', 'olanzapine', 'risperidone', 'aripiprazole'],
+    'anticoagulants': ['warfarin', 'acenocoumarol', 'phenprocoumon'],
+}
+
+# Diplotype phenotype -> DRUG_RECOMMENDATIONS keys to try, in order
+PHENOTYPE_RECOMMENDATION_KEYS = {
+    'Ultrarapid Metabolizer': ['ultrarapid_metabolizer'],
+    'Rapid Metabolizer': ['rapid_metabolizer', 'normal_metabolizer', 'normal'],
+    'Normal Metabolizer': ['normal_metabolizer', 'normal'],
+    'Intermediate Metabolizer': ['intermediate_metabolizer', 'intermediate'],
+    'Poor Metabolizer': ['poor_metabolizer', 'poor', 'deficient'],
+}
+
+# Effect fields carrying advice rather than a description
+_ADVICE_FIELDS = ('recommendation', 'action', 'dose_adjustment')
+
+# Singular spellings of DRUG_CLASSES used in advice text ("Standard statin dosing")
+_CLASS_SINGULARS = {name[:-1]: name for name in DRUG_CLASSES if name.endswith('s')}
+
+
+def normalize_drug_name(name: str) -> str:
+    """Lower-case generic name: 'Clopidogrel (Plavix)' -> 'clopidogrel', 'Zocor' -> 'simvastatin'"""
+    name = re.sub(r'\s+', ' ', re.sub(r'\(.*?\)', '', name)).strip().lower()
+    return DRUG_SYNONYMS.get(name, name)
+
+
+def _names_in(entry: str) -> List[str]:
+    """Normalised names an entry of a drug list stands for ('alcohol/ethanol', 'X (Brand)')"""
+    names = [normalize_drug_name(part) for part in entry.split('/')]
+    names += [normalize_drug_name(brand) for brand in re.findall(r'\((.*?)\)', entry)]
+    return [name for name in dict.fromkeys(names) if name]
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+@dataclass
+class MarkerRule:
+    """One table entry saying how a marker affects a drug"""
+    source: str                     # 'module.TABLE'
+    gene: str
+    rsid: str
+    label: str                      # variant / star allele as in the table
+    effects: Dict[str, Any]         # genotype -> effect (dict or phenotype fields)
+    via: str                        # the drug or class name as the table writes it
+    shared: bool = False            # the table entry lists other drugs too
+
+    def advice_texts(self) -> List[str]:
+        texts = []
+        for effect in self.effects.values():
+            if isinstance(effect, dict):
+                texts += [effect[f] for f in _ADVICE_FIELDS if effect.get(f)]
+        return list(dict.fromkeys(texts))
+
+
+@dataclass
+class DrugEntry:
+    drug: str
+    names: List[str] = field(default_factory=list)      # spellings in the sources
+    genes: List[str] = field(default_factory=list)
+    markers: List[MarkerRule] = field(default_factory=list)
+    recommendations: List[Dict[str, Any]] = field(default_factory=list)  # DRUG_RECOMMENDATIONS
+    # (source, rsid) -> marker advice written for this drug
+    advice: Dict[Tuple[str, str], List[str]] = field(default_factory=dict)
+
+
+@dataclass
+class DrugIndex:
+    drugs: Dict[str, DrugEntry]
+    aliases: Dict[str, str]         # any accepted name -> key in drugs
+    _name_pattern: Any = field(default=None, init=False, repr=False)
+
+    def resolve(self, name: str) -> Optional[str]:
+        key = normalize_drug_name(name)
+        return self.aliases.get(key)
+
+    def entry(self, name: str) -> Optional[DrugEntry]:
+        key = self.resolve(name)
+        return self.drugs.get(key) if key else None
+
+    def drugs_named(self, text: str) -> List[List[str]]:
+        """The drugs each drug or class name in text stands for, in text order"""
+        if self._name_pattern is None:
+            names = sorted(set(self.aliases) | set(_CLASS_SINGULARS), key=len, reverse=True)
+            self._name_pattern = re.compile(
+                r'(?<![\w-])(' + '|'.join(map(re.escape, names)) + r')(?![\w-])', re.I)
+        mentions = []
+        for match in self._name_pattern.finditer(text):
+            name = match.group(1).lower()
+            key = self.aliases.get(_CLASS_SINGULARS.get(name, name))
+            mentions.append([key] + DRUG_CLASSES.get(key, []))
+        return mentions
+
+
+def build_drug_index() -> DrugIndex:
+    """Invert the pharmacogenomics tables into drug -> genes, markers and rules"""
+    import pharmacogenomics_database
+    from expanded_traits import PHARMACOGENOMICS_EXPANDED
+
+    drugs: Dict[str, DrugEntry] = {}
+
+    def add(names: List[str], written: str, gene: str, rule: MarkerRule = None,
+            recommendation: Dict = None):
+        # Class names also reach every member drug
+        targets = list(names)
+        for name in names:
+            targets += DRUG_CLASSES.get(name, [])
+        for drug in dict.fromkeys(targets):
+            entry = drugs.setdefault(drug, DrugEntry(drug))
+            if written not in entry.names:
+                entry.names.append(written)
+            if gene and gene not in entry.genes:
+                entry.genes.append(gene)
+            if rule is not None:
+                entry.markers.append(rule)
+            if recommendation is not None:
+                entry.recommendations.append(recommendation)
+
+    for table_name in sorted(n for n in vars(pharmacogenomics_database) if n.endswith('_GENETICS')):
+        table = getattr(pharmacogenomics_database, table_name)
+        for rsid, info in table.items():
+            affected = info.get('affected_drugs', [])
+            for written in affected:
+                rule = MarkerRule(
+                    source=f"pharmacogenomics_database.{table_name}",
+                    gene=info.get('gene', ''),
+                    rsid=rsid,
+                    label=info.get('variant', info.get('variant_name', '')),
+                    effects=info.get('effect', {}),
+                    via=written,
+                    shared=len(affected) > 1,
+                )
+                add(_names_in(written), written, rule.gene, rule=rule)
+
+    for gene, data in PHARMACOGENOMICS_EXPANDED.items():
+        listed = data.get('drugs', [])
+        for written in listed:
+            for rsid, effects in data.get('markers', {}).items():
+                rule = MarkerRule(
+                    source='expanded_traits.PHARMACOGENOMICS_EXPANDED',
+                    gene=gene, rsid=rsid, label='', effects=effects, via=written,
+                    shared=len(listed) > 1)
+                add(_names_in(written), written, gene, rule=rule)
+
+    for written, recommendation in pharmacogenomics_database.DRUG_RECOMMENDATIONS.items():
+        genes = recommendation.get('genes') or [recommendation.get('gene', '')]
+        for gene in genes:
+            add(_names_in(written), written, gene)
+        add(_names_in(written), written, '', recommendation=recommendation)
+
+    aliases = {drug: drug for drug in drugs}
+    for synonym, generic in DRUG_SYNONYMS.items():
+        if generic in drugs:
+            aliases[synonym] = generic
+    index = DrugIndex(drugs, aliases)
+
+    # A gene's marker advice is often written for one of its drugs ("Avoid
+    # codeine" under CYP2D6, which also lists tamoxifen)
+    for entry in drugs.values():
+        for rule in entry.markers:
+            for text in rule.advice_texts():
+                mentions = index.drugs_named(text)
+                written_for = entry.drug in mentions[0] if mentions else not rule.shared
+                texts = entry.advice.setdefault((rule.source, rule.rsid), [])
+                if written_for and text not in texts:
+                    texts.append(text)
+    return index
+
+
+_DRUG_INDEX = None
+
+
+def get_drug_index() -> DrugIndex:
+    """The drug index over the current tables (cached)"""
+    global _DRUG_INDEX
+    if _DRUG_INDEX is None:
+        _DRUG_INDEX = build_drug_index()
+    return _DRUG_INDEX
+
+
+def list_drugs() -> List[str]:
+    return sorted(get_drug_index().drugs)
+
+
+# =============================================================================
+# QUERIES
+# =============================================================================
+
+def _recommendation_text(recommendation: Dict, gene_calls: Dict[str, Dict]) -> Optional[str]:
+    genes = recommendation.get('genes') or [recommendation.get('gene', '')]
+    for gene in genes:
+        call = gene_calls.get(gene)
+        if not call:
+            continue
+        for key in PHENOTYPE_RECOMMENDATION_KEYS.get(call['phenotype'], []):
+            if key in recommendation:
+                return recommendation[key]
+    return None
+
+
+def query_drug(drug: str, snp_dict: Dict[str, str],
+               diplotypes: Dict[str, Dict] = None) -> Optional[Dict[str, Any]]:
+    """
+    What a kit's genotypes say about one drug.
+
+    Args:
+        drug: generic, brand or class name (any case)
+        snp_dict: rsid -> genotype
+        diplotypes: star_allele_caller.call_diplotypes() output for the kit,
+            when already computed (otherwise only the drug's genes are called)
+
+    Returns None for a drug no table mentions.
+    """
+    from pharmacogenomics_database import get_effect_with_complement
+    from star_allele_caller import call_diplotypes, get_compiled_star_alleles
+
+    index = get_drug_index()
+    entry = index.entry(drug)
+    if entry is None:
+        return None
+
+    if diplotypes is None:
+        compiled = get_compiled_star_alleles()
+        genes = {gene: compiled[gene] for gene in entry.genes if gene in compiled}
+        diplotypes = call_diplotypes(snp_dict, genes) if genes else {}
+    gene_calls = {gene: diplotypes[gene] for gene in entry.genes if gene in diplotypes}
+
+    findings = []
+    seen = set()
+    for rule in entry.markers:
+        genotype = snp_dict.get(rule.rsid)
+        if not genotype or (rule.source, rule.rsid) in seen:
+            continue
+        effect = get_effect_with_complement(genotype, rule.effects)
+        if effect is None:
+            continue
+        seen.add((rule.source, rule.rsid))
+        findings.append({
+            'gene': rule.gene,
+            'rsid': rule.rsid,
+            'variant': rule.label,
+            'genotype': genotype,
+            'effect': effect,
+            'source': rule.source,
+            'via': rule.via,
+        })
+
+    recommendations = []
+    for recommendation in entry.recommendations:
+        text = _recommendation_text(recommendation, gene_calls)
+        if text:
+            recommendations.append(text)
+    for finding in findings:
+        effect = finding['effect']
+        if isinstance(effect, dict):
+            written = entry.advice.get((finding['source'], finding['rsid']), [])
+            recommendations += [effect[f] for f in _ADVICE_FIELDS if effect.get(f) in written]
+
+    # Standard-dosing notes from unaffected markers only matter when nothing else applies
+    recommendations = list(dict.fromkeys(recommendations))
+    specific = [text for text in recommendations if not text.lower().startswith('standard')]
+
+    return {
+        'drug': entry.drug,
+        'query': drug,
+        'genes': entry.genes,
+        'diplotypes': gene_calls,
+        'findings': findings,
+        'markers_checked': len({(r.source, r.rsid) for r in entry.markers}),
+        'markers_found': len(findings),
+        'recommendations': specific or recommendations,
+    }
+
+
+def query_drugs(drugs: List[str], snp_dict: Dict[str, str]) -> Dict[str, Optional[Dict]]:
+    """query_drug for a medication list, calling each gene's diplotype once"""
+    from star_allele_caller import call_diplotypes, get_compiled_star_alleles
+
+    index = get_drug_index()
+    compiled = get_compiled_star_alleles()
+    genes = {gene for name in drugs for gene in (getattr(index.entry(name), 'genes', None) or [])}
+    diplotypes = call_diplotypes(snp_dict, {g: compiled[g] for g in genes if g in compiled})
+    return {name: query_drug(name, snp_dict, diplotypes) for name in drugs}
+
+
+def check_recommendations() -> List[str]:
+    """
+    Query every drug with each genotype its marker tables list and return
+    the recommendations that name other drugs but not the drug queried.
+    The drug's own DRUG_RECOMMENDATIONS may name alternatives.
+    """
+    index = get_drug_index()
+    problems = []
+    for drug, entry in index.drugs.items():
+        own = {text for rec in entry.recommendations for text in rec.values()
+               if isinstance(text, str)}
+        for rule in entry.markers:
+            for genotype in rule.effects:
+                result = query_drug(drug, {rule.rsid: genotype}, diplotypes={})
+                for text in result['recommendations']:
+                    mentions = index.drugs_named(text)
+                    if (text not in own and mentions
+                            and not any(drug in mention for mention in mentions)):
+                        problems.append(f"{drug} ({rule.rsid} {genotype}): {text}")
+    return list(dict.fromkeys(problems))
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+    import difflib
+
+    parser = argparse.ArgumentParser(description='What a kit says about specific drugs')
+    parser.add_argument('kit', nargs='?', help='raw DNA file')
+    parser.add_argument('drugs', nargs='*', help='drug, brand or class names')
+    parser.add_argument('--check', action='store_true',
+                        help='verify no drug is given advice written for another drug')
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problems = check_recommendations()
+        for problem in problems:
+            print(f"Advice for another drug: {problem}")
+        print(f"{len(get_drug_index().drugs)} drugs checked, {len(problems)} problems")
+        return 1 if problems else 0
+    if not args.kit or not args.drugs:
+        parser.error('a kit and at least one drug are required')
+
+    from dna_parser import parse_dna_file, snp_dict_from_dataframe
+    with open(args.kit, 'rb') as f:
+        df = parse_dna_file(f, args.kit)
+    if df is None:
+        print(f"Could not parse {args.kit}")
+        return 1
+    snp_dict = snp_dict_from_dataframe(df, drop_no_calls=True)
+
+    for name, result in query_drugs(args.drugs, snp_dict).items():
+        if result is None:
+            close = difflib.get_close_matches(normalize_drug_name(name),
+                                              list(get_drug_index().aliases), n=3)
+            hint = f" (did you mean {', '.join(close)}?)" if close else ''
+            print(f"{name}: no pharmacogenomic data{hint}")
+            continue
+        print(f"{result['drug']}: genes {', '.join(result['genes'])}; "
+              f"{result['markers_found']}/{result['markers_checked']} markers in kit")
+        for gene, call in result['diplotypes'].items():
+            print(f"  {gene} {call['diplotype']} (activity {call['activity_score']:g}) "
+                  f"- {call['phenotype']}")
+        for finding in result['findings']:
+            effect = finding['effect']
+            summary = effect.get('phenotype') or effect.get('description') if isinstance(effect, dict) else effect
+            print(f"  {finding['gene']} {finding['rsid']} {finding['genotype']}: {summary}")
+        for text in result['recommendations']:
+            print(f"  -> {text}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Haplogroup Tree Classifier
+Places a kit on the mtDNA or Y-DNA phylogeny by walking the tree from the
+root, descending only into branches whose defining SNPs carry the derived
+allele.
+
+A phylogeny (haplogroup -> parent and defining SNPs with their ancestral and
+derived alleles) is compiled once into preorder arrays: a node's subtree is
+the contiguous range [i, subtree_end[i]) and its children a slice of a CSR
+child list. Per kit, every defining SNP is read once and each node marked
+supported when its derived calls outnumber its ancestral ones; a prefix sum
+over preorder then counts the supported nodes in any subtree in O(1). The
+walk looks only at the children of the current node, prunes a child whose
+own SNPs are ancestral and follows the child whose subtree holds the most
+support, so it costs depth x branching whatever the tree size. Nodes with
+no marker in the kit are passed through when something below them is
+derived.
+
+The built-in trees are MTDNA_HAPLOGROUPS and YDNA_HAPLOGROUPS in
+comprehensive_analysis; full phylogenies (tens of thousands of nodes) can be
+loaded from a tab-separated file with load_phylogeny().
+
+Usage: python haplogroup_tree.py KIT [--mt-tree FILE] [--y-tree FILE]
+"""
+
+import gzip
+import sys
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Lineage -> built-in phylogeny table in comprehensive_analysis
+PHYLOGENIES = {
+    'mtDNA': 'MTDNA_HAPLOGROUPS',
+    'Y_DNA': 'YDNA_HAPLOGROUPS',
+}
+
+# Columns of a phylogeny file, one row per defining SNP (rsid may be empty)
+PHYLOGENY_COLUMNS = ('haplogroup', 'parent', 'rsid', 'ancestral', 'derived')
+
+
+# =============================================================================
+# COMPILED TREE
+# =============================================================================
+
+@dataclass
+class CompiledTree:
+    """A phylogeny as preorder arrays"""
+    name: str
+    nodes: List[str]                # preorder, root first
+    index: Dict[str, int]           # haplogroup -> preorder position
+    parent: np.ndarray              # (nodes,) -1 for the root
+    subtree_end: np.ndarray         # subtree of i is [i, subtree_end[i])
+    child_ptr: np.ndarray           # children of i are children[child_ptr[i]:child_ptr[i + 1]]
+    children: np.ndarray
+    snp_ptr: np.ndarray             # SNPs of i are snp_*[snp_ptr[i]:snp_ptr[i + 1]]
+    snp_node: np.ndarray
+    snp_rsids: List[str]
+    snp_states: List[Dict[str, int]]    # per SNP: genotype -> +1 derived / -1 ancestral
+    info: List[Dict[str, Any]]      # per node: origin, freq
+
+    def encode(self, snp_dict: Dict[str, str]) -> np.ndarray:
+        """+1 derived, -1 ancestral, 0 not called, per defining SNP"""
+        genotypes = map(snp_dict.get, self.snp_rsids)
+        return np.fromiter(map(dict.get, self.snp_states, genotypes, repeat(0)),
+                           dtype=np.int8, count=len(self.snp_rsids))
+
+    def path(self, node: int) -> List[int]:
+        """Preorder positions from the root down to node"""
+        path = []
+        while node >= 0:
+            path.append(node)
+            node = int(self.parent[node])
+        return path[::-1]
+
+
+def _haploid_states(ancestral: str, derived: str) -> Dict[str, int]:
+    """Genotype strings for a haploid site; heterozygous calls stay uncalled"""
+    ancestral, derived = ancestral.upper(), derived.upper()
+    states = {}
+    for allele, state in ((ancestral, -1), (derived, 1)):
+        states[allele] = state
+        states[allele * 2] = state
+        states[allele.lower()] = state
+        states[allele.lower() * 2] = state
+    return states
+
+
+def compile_tree(table: Dict[str, Dict], name: str = '') -> CompiledTree:
+    """Compile a phylogeny table (haplogroup -> {'parent', 'snps', ...})"""
+    kids: Dict[str, List[str]] = {node: [] for node in table}
+    roots = []
+    for node, data in table.items():
+        parent = data.get('parent')
+        if parent is None:
+            roots.append(node)
+        elif parent not in table:
+            raise ValueError(f"{name}: parent {parent} of {node} is not in the tree")
+        else:
+            kids[parent].append(node)
+    if len(roots) != 1:
+        raise ValueError(f"{name}: expected one root, found {len(roots)}")
+
+    # Iterative preorder, children in table order
+    nodes = []
+    stack = [roots[0]]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(kids[node]))
+    if len(nodes) != len(table):
+        raise ValueError(f"{name}: {len(table) - len(nodes)} nodes are not reachable from the root")
+
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    parent = np.array([index.get(table[node].get('parent'), -1) for node in nodes], dtype=np.int32)
+
+    subtree_end = np.arange(1, n + 1, dtype=np.int32)
+    for i in range(n - 1, 0, -1):
+        p = parent[i]
+        subtree_end[p] = max(subtree_end[p], subtree_end[i])
+
+    child_counts = np.bincount(parent[1:], minlength=n)
+    child_ptr = np.concatenate([[0], np.cumsum(child_counts)]).astype(np.int32)
+    children = np.array([index[child] for node in nodes for child in kids[node]], dtype=np.int32)
+
+    snp_rsids, snp_states, snp_node = [], [], []
+    snp_ptr = [0]
+    rsid_nodes: Dict[str, List[int]] = {}
+    for i, node in enumerate(nodes):
+        for rsid, (ancestral, derived) in table[node].get('snps', {}).items():
+            snp_rsids.append(rsid)
+            snp_states.append(_haploid_states(ancestral, derived))
+            snp_node.append(i)
+            rsid_nodes.setdefault(rsid, []).append(i)
+        snp_ptr.append(len(snp_rsids))
+
+    # A SNP may recur along one lineage, but on two unrelated branches a
+    # derived call would support both of them
+    for rsid, positions in rsid_nodes.items():
+        for a, b in zip(positions, positions[1:]):
+            if b >= subtree_end[a]:
+                raise ValueError(f"{name}: defining SNP {rsid} is shared by unrelated "
+                                 f"haplogroups {nodes[a]} and {nodes[b]}")
+
+    return CompiledTree(
+        name=name,
+        nodes=nodes,
+        index=index,
+        parent=parent,
+        subtree_end=subtree_end,
+        child_ptr=child_ptr,
+        children=children,
+        snp_ptr=np.array(snp_ptr, dtype=np.int32),
+        snp_node=np.array(snp_node, dtype=np.int32),
+        snp_rsids=snp_rsids,
+        snp_states=snp_states,
+        info=[{k: v for k, v in table[node].items() if k not in ('parent', 'snps')}
+              for node in nodes],
+    )
+
+
+def load_phylogeny(path: str) -> Dict[str, Dict]:
+    """
+    Read a phylogeny file into table form.
+
+    Tab-separated (optionally gzipped) with a header naming PHYLOGENY_COLUMNS;
+    a haplogroup with several defining SNPs has one row per SNP, and the root
+    has an empty parent.
+    """
+    table: Dict[str, Dict] = {}
+    opener = gzip.open if path.lower().endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        header = [c.strip().lower() for c in f.readline().rstrip('\n').split('\t')]
+        missing = [c for c in PHYLOGENY_COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+        cols = [header.index(c) for c in PHYLOGENY_COLUMNS]
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < len(header):
+                fields += [''] * (len(header) - len(fields))
+            node, parent, rsid, ancestral, derived = (fields[c].strip() for c in cols)
+            if not node:
+                continue
+            data = table.setdefault(node, {'parent': parent or None, 'snps': {}})
+            if rsid and ancestral and derived:
+                data['snps'][rsid] = (ancestral, derived)
+    return table
+
+
+_COMPILED_TREES: Dict[str, CompiledTree] = {}
+
+
+def get_compiled_tree(lineage: str) -> CompiledTree:
+    """Compiled built-in phylogeny for 'mtDNA' or 'Y_DNA' (cached)"""
+    if lineage not in _COMPILED_TREES:
+        import comprehensive_analysis
+        table = getattr(comprehensive_analysis, PHYLOGENIES[lineage])
+        _COMPILED_TREES[lineage] = compile_tree(table, lineage)
+    return _COMPILED_TREES[lineage]
+
+
+# =============================================================================
+# CLASSIFICATION
+# =============================================================================
+
+def classify(tree: CompiledTree, snp_dict: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Deepest haplogroup supported by the kit, or None when no defining SNP
+    is called (or none is derived).
+    """
+    state = tree.encode(snp_dict)
+    if not state.any():
+        return None
+
+    n = len(tree.nodes)
+    derived = np.bincount(tree.snp_node, weights=state == 1, minlength=n)
+    ancestral = np.bincount(tree.snp_node, weights=state == -1, minlength=n)
+    supported = derived > ancestral
+    support_prefix = np.concatenate([[0], np.cumsum(supported)])
+    if support_prefix[-1] == 0:
+        return None
+
+    node = 0
+    while True:
+        best, best_support = -1, 0
+        for child in tree.children[tree.child_ptr[node]:tree.child_ptr[node + 1]]:
+            if ancestral[child] > derived[child]:
+                continue                # pruned with its whole subtree
+            support = support_prefix[tree.subtree_end[child]] - support_prefix[child]
+            if support > best_support:
+                best, best_support = child, support
+        if best < 0:
+            break
+        node = int(best)
+
+    path = tree.path(node)
+    path_snps = np.concatenate([np.arange(tree.snp_ptr[i], tree.snp_ptr[i + 1]) for i in path])
+    path_states = state[path_snps]
+    markers_derived = [tree.snp_rsids[s] for s in path_snps[path_states == 1]]
+    markers_ancestral = [tree.snp_rsids[s] for s in path_snps[path_states == -1]]
+    n_derived, n_ancestral = len(markers_derived), len(markers_ancestral)
+
+    origin = next((tree.info[i]['origin'] for i in reversed(path) if tree.info[i].get('origin')),
+                  'Unknown')
+    return {
+        'haplogroup': tree.nodes[node],
+        'confidence': min(0.9, 0.5 + n_derived * 0.2) * n_derived / (n_derived + n_ancestral),
+        'origin': origin,
+        'population_frequency': tree.info[node].get('freq'),
+        'path': [tree.nodes[i] for i in path],
+        'markers_derived': markers_derived,
+        'markers_ancestral': markers_ancestral,
+        'sites_called': int(np.count_nonzero(state)),
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Place a kit on the mtDNA and Y-DNA phylogenies')
+    parser.add_argument('kit', help='raw DNA file')
+    parser.add_argument('--mt-tree', help='mtDNA phylogeny file (default: built-in)')
+    parser.add_argument('--y-tree', help='Y-DNA phylogeny file (default: built-in)')
+    args = parser.parse_args(argv)
+
+    from dna_parser import parse_dna_file, snp_dict_from_dataframe
+    with open(args.kit, 'rb') as f:
+        df = parse_dna_file(f, args.kit)
+    if df is None:
+        print(f"Could not parse {args.kit}")
+        return 1
+    snp_dict = snp_dict_from_dataframe(df, drop_no_calls=True)
+
+    for lineage, path in (('mtDNA', args.mt_tree), ('Y_DNA', args.y_tree)):
+        tree = compile_tree(load_phylogeny(path), lineage) if path else get_compiled_tree(lineage)
+        call = classify(tree, snp_dict)
+        if call is None:
+            print(f"{lineage}: no derived defining SNPs called ({len(tree.nodes)} haplogroups)")
+            continue
+        print(f"{lineage}: {call['haplogroup']} (confidence {call['confidence']:.2f}, "
+              f"{call['origin']})")
+        print(f"  path: {' > '.join(call['path'])}")
+        if call['markers_ancestral']:
+            print(f"  conflicting: {', '.join(call['markers_ancestral'])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -636,6 +636,96 @@ IBD_GENETICS = {
 }
 
 
+# =============================================================================
+# SCORE RULES (compiled by score_rules)
+# =============================================================================
+
+def _immune_rule(markers, result, checks, levels, **options):
+    """Rule shared by the immune categories: every SNP in the kit listed, risk points summed"""
+    return {
+        "markers": markers,
+        "genotypes": "effect",
+        "result": result,
+        "found_field": "snps_analyzed",
+        "list_present": True,
+        "aggregate": "sum",
+        "score_field": None,
+        "checks": checks,
+        "levels_when": "present",
+        "levels": levels,
+        **options,
+    }
+
+
+IMMUNE_SCORE_RULES = {
+    "allergy_susceptibility": _immune_rule(ALLERGY_GENETICS, {
+        "snps_analyzed": [],
+        "ige_tendency": "Unknown",
+        "skin_barrier": "Unknown",
+        "histamine_sensitivity": "Unknown",
+        "overall_allergy_risk": "Unknown",
+        "risk_score": 0,
+        "findings": []
+    }, [
+        {"key": "ige_levels", "cases": [
+            {"equals": "High", "score": 2, "set": {"ige_tendency": "High"},
+             "append": {"findings": "High IgE tendency - increased allergy susceptibility"}},
+            {"equals": "Moderate", "score": 1, "set": {"ige_tendency": "Moderate"}},
+        ]},
+        {"key": "skin_barrier", "copy_to": "skin_barrier", "cases": [
+            {"contains": "Impaired", "score": 2,
+             "append": {"findings": "Impaired skin barrier (FLG) - eczema and food allergy risk"}},
+        ]},
+        {"key": "histamine_sensitivity", "copy_to": "histamine_sensitivity", "cases": [
+            {"equals": "High", "score": 1,
+             "append": {"findings": "High histamine sensitivity - may react strongly to histamine"}},
+        ]},
+    ], [
+        {"min": 4, "set": {"overall_allergy_risk": "High"}},
+        {"min": 2, "set": {"overall_allergy_risk": "Elevated"}},
+        {"set": {"overall_allergy_risk": "Normal"}},
+    ], score_field="risk_score"),
+    "lupus_risk": _immune_rule(LUPUS_GENETICS, {
+        "snps_analyzed": [],
+        "risk_variants_found": 0,
+        "risk_score": 0,
+        "risk_level": "Unknown",
+        "key_genes": [],
+        "findings": []
+    }, [
+        {"key": "sle_risk", "cases": [
+            {"in": ["High", "Elevated"], "add": {"risk_variants_found": 1},
+             "append": {"key_genes": "{gene}", "findings": "{gene}: {value} SLE risk"}},
+        ]},
+    ], [
+        {"min": 4, "set": {"risk_level": "High"}},
+        {"min": 2, "set": {"risk_level": "Elevated"}},
+        {"set": {"risk_level": "Normal"}},
+    ], score="risk_score", default=0, score_field="risk_score"),
+    "ms_risk": _immune_rule(MS_GENETICS, {
+        "snps_analyzed": [],
+        "hla_drb1_1501": "Unknown",
+        "risk_variants_found": 0,
+        "risk_level": "Unknown",
+        "findings": []
+    }, [
+        {"key": "hla_drb1_1501", "cases": [
+            {"equals": True, "score": 3, "set": {"hla_drb1_1501": "Positive"},
+             "append": {"findings": "HLA-DRB1*15:01 positive - major MS risk factor (3x)"}},
+            {"equals": "Likely", "score": 2, "set": {"hla_drb1_1501": "Likely Positive"}},
+            {"set": {"hla_drb1_1501": "Negative"}},
+        ]},
+        {"key": "ms_risk", "cases": [
+            {"in": ["Elevated", "High", "Very High"], "score": 1, "add": {"risk_variants_found": 1}},
+        ]},
+    ], [
+        {"min": 4, "set": {"risk_level": "High"}},
+        {"min": 2, "set": {"risk_level": "Elevated"}},
+        {"set": {"risk_level": "Normal"}},
+    ]),
+}
+
+
 # =============================================================================
 # MAIN ANALYSIS FUNCTION
 # =============================================================================
@@ -650,14 +740,19 @@ def analyze_immune_deep_genetics(dna_data: dict) -> Dict[str, Any]:
     Returns:
         Dictionary containing all immune deep dive analysis results
     """
+    # Categories that fit the rule kernel are evaluated together from
+    # IMMUNE_SCORE_RULES; the rest branch on the gene or combine tables
+    from score_rules import evaluate_score_rules
+    scored = evaluate_score_rules("immune_deep_genetics_database", "IMMUNE_SCORE_RULES", dna_data)
+
     results = {
         "hla_analysis": analyze_hla_types(dna_data),
         "cytokine_response": analyze_cytokine_genetics(dna_data),
         "inflammatory_markers": analyze_inflammatory_genetics(dna_data),
-        "allergy_susceptibility": analyze_allergy_genetics(dna_data),
+        "allergy_susceptibility": scored["allergy_susceptibility"],
         "celiac_risk": analyze_celiac_genetics(dna_data),
-        "lupus_risk": analyze_lupus_genetics(dna_data),
-        "ms_risk": analyze_ms_genetics(dna_data),
+        "lupus_risk": scored["lupus_risk"],
+        "ms_risk": scored["ms_risk"],
         "ra_risk": analyze_ra_genetics(dna_data),
         "psoriasis_risk": analyze_psoriasis_genetics(dna_data),
         "ibd_risk": analyze_ibd_genetics(dna_data),
@@ -851,75 +946,6 @@ def analyze_inflammatory_genetics(dna_data: dict) -> Dict[str, Any]:
     return result
 
 
-def analyze_allergy_genetics(dna_data: dict) -> Dict[str, Any]:
-    """Analyze allergy susceptibility genetics"""
-    result = {
-        "snps_analyzed": [],
-        "ige_tendency": "Unknown",
-        "skin_barrier": "Unknown",
-        "histamine_sensitivity": "Unknown",
-        "overall_allergy_risk": "Unknown",
-        "risk_score": 0,
-        "findings": []
-    }
-
-    risk_count = 0
-    snps_found = 0
-
-    for rsid, info in ALLERGY_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-            snps_found += 1
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                # IgE levels
-                if "ige_levels" in effect:
-                    if effect["ige_levels"] == "High":
-                        result["ige_tendency"] = "High"
-                        risk_count += 2
-                        result["findings"].append("High IgE tendency - increased allergy susceptibility")
-                    elif effect["ige_levels"] == "Moderate":
-                        result["ige_tendency"] = "Moderate"
-                        risk_count += 1
-
-                # Skin barrier
-                if "skin_barrier" in effect:
-                    result["skin_barrier"] = effect["skin_barrier"]
-                    if "Impaired" in effect["skin_barrier"]:
-                        risk_count += 2
-                        result["findings"].append("Impaired skin barrier (FLG) - eczema and food allergy risk")
-
-                # Histamine
-                if "histamine_sensitivity" in effect:
-                    result["histamine_sensitivity"] = effect["histamine_sensitivity"]
-                    if effect["histamine_sensitivity"] == "High":
-                        risk_count += 1
-                        result["findings"].append("High histamine sensitivity - may react strongly to histamine")
-
-    result["risk_score"] = risk_count
-
-    if snps_found > 0:
-        if risk_count >= 4:
-            result["overall_allergy_risk"] = "High"
-        elif risk_count >= 2:
-            result["overall_allergy_risk"] = "Elevated"
-        else:
-            result["overall_allergy_risk"] = "Normal"
-
-    return result
-
-
 def analyze_celiac_genetics(dna_data: dict) -> Dict[str, Any]:
     """Analyze celiac disease genetic risk"""
     result = {
@@ -991,106 +1017,6 @@ def analyze_celiac_genetics(dna_data: dict) -> Dict[str, Any]:
     return result
 
 
-def analyze_lupus_genetics(dna_data: dict) -> Dict[str, Any]:
-    """Analyze systemic lupus erythematosus (SLE) genetic risk"""
-    result = {
-        "snps_analyzed": [],
-        "risk_variants_found": 0,
-        "risk_score": 0,
-        "risk_level": "Unknown",
-        "key_genes": [],
-        "findings": []
-    }
-
-    for rsid, info in LUPUS_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-                risk_score = effect.get("risk_score", 0)
-                result["risk_score"] += risk_score
-
-                if effect.get("sle_risk") in ["High", "Elevated"]:
-                    result["risk_variants_found"] += 1
-                    result["key_genes"].append(info.get("gene", ""))
-                    result["findings"].append(f"{info.get('gene', rsid)}: {effect.get('sle_risk')} SLE risk")
-
-    if result["snps_analyzed"]:
-        if result["risk_score"] >= 4:
-            result["risk_level"] = "High"
-        elif result["risk_score"] >= 2:
-            result["risk_level"] = "Elevated"
-        else:
-            result["risk_level"] = "Normal"
-
-    return result
-
-
-def analyze_ms_genetics(dna_data: dict) -> Dict[str, Any]:
-    """Analyze multiple sclerosis genetic risk"""
-    result = {
-        "snps_analyzed": [],
-        "hla_drb1_1501": "Unknown",
-        "risk_variants_found": 0,
-        "risk_level": "Unknown",
-        "findings": []
-    }
-
-    risk_count = 0
-
-    for rsid, info in MS_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                # HLA-DRB1*15:01
-                if "hla_drb1_1501" in effect:
-                    if effect["hla_drb1_1501"] == True:
-                        result["hla_drb1_1501"] = "Positive"
-                        risk_count += 3
-                        result["findings"].append("HLA-DRB1*15:01 positive - major MS risk factor (3x)")
-                    elif effect["hla_drb1_1501"] == "Likely":
-                        result["hla_drb1_1501"] = "Likely Positive"
-                        risk_count += 2
-                    else:
-                        result["hla_drb1_1501"] = "Negative"
-
-                if effect.get("ms_risk") in ["Elevated", "High", "Very High"]:
-                    result["risk_variants_found"] += 1
-                    risk_count += 1
-
-    if result["snps_analyzed"]:
-        if risk_count >= 4:
-            result["risk_level"] = "High"
-        elif risk_count >= 2:
-            result["risk_level"] = "Elevated"
-        else:
-            result["risk_level"] = "Normal"
-
-    return result
-
-
 def analyze_ra_genetics(dna_data: dict) -> Dict[str, Any]:
     """Analyze rheumatoid arthritis genetic risk"""
     result = {
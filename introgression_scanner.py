@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Archaic Introgression Scanner
+Finds Neanderthal and Denisovan segments along the genome instead of
+counting archaic alleles.
+
+An archaic reference panel lists informative sites: position, the archaic
+allele, its frequency on introgressed haplotypes and its frequency in an
+African reference (where introgressed alleles are rare). Each site the kit
+covers scores the log-likelihood ratio of the kit's genotype under
+"introgressed here" against "not introgressed": carrying the allele where
+Africans rarely do scores high, lacking it where introgressed haplotypes
+nearly always have it scores low. Per chromosome, site scores are summed
+into STEP_BP bins and sliding WINDOW_BP windows with one cumulative sum;
+windows scoring at least MIN_WINDOW_SCORE with MIN_ARCHAIC_SITES carried
+sites are merged into segments (overlapping or touching windows join) and
+trimmed to their outermost carried sites. Everything is array operations
+over the chromosome's sites, so 700k panel sites take about a second.
+
+Panels are tab-separated files in ARCHAIC_DIR (columns below, optionally
+gzipped), converted on first use to a binary copy in ARCHAIC_CACHE_DIR.
+Without one, the NEANDERTHAL_SNPS and DENISOVAN_SNPS tables serve as a small
+built-in panel, positioned from the kit's own chromosome/position columns.
+
+Usage: python introgression_scanner.py KIT [--panel FILE ...]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from polygenic_risk_engine import (CHROMOSOME_CODES, KitIndex, encode_alleles,
+                                   locus_keys, rsid_numbers)
+from results_cache import DEFAULT_CACHE_DIR
+
+# Locally stored archaic reference panels, and their binary copies
+ARCHAIC_DIR = os.environ.get('DNA_ANALYSIS_ARCHAIC_DIR',
+                             os.path.join(DEFAULT_CACHE_DIR, 'archaic'))
+ARCHAIC_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'archaic_cache')
+ARCHAIC_FILE_EXTENSIONS = ('.txt', '.tsv', '.txt.gz', '.tsv.gz')
+
+# Bump when ARCHAIC_DTYPE or the parsing changes, to rebuild binary copies
+ARCHAIC_CACHE_FORMAT = 1
+
+# Accepted column names (lower case) per field
+ARCHAIC_COLUMNS = {
+    'rsid': ['rsid', 'snp', 'id'],
+    'chrom': ['chrom', 'chromosome', 'chr'],
+    'pos': ['pos', 'position', 'bp'],
+    'archaic': ['archaic_allele', 'allele'],
+    'archaic_freq': ['archaic_freq', 'introgressed_freq'],
+    'african_freq': ['african_freq', 'afr_freq', 'yri_freq'],
+    'source': ['source', 'archaic'],
+}
+
+# Segment calling
+WINDOW_BP = 100_000
+STEP_BP = 25_000
+MIN_WINDOW_SCORE = 4.0          # natural-log likelihood ratio
+MIN_ARCHAIC_SITES = 2
+
+# Frequencies assumed where a panel gives none
+DEFAULT_ARCHAIC_FREQ = 0.9
+DEFAULT_AFRICAN_FREQ = 0.02
+AFRICAN_REFERENCES = ('Yoruba_African', 'African')
+
+# Panel sites the kit must cover before the engine reports segment-based
+# percentages instead of the marker match rate
+MIN_SITES_FOR_ESTIMATE = 1000
+
+SOURCES = ('Neanderthal', 'Denisovan')
+
+# One panel site; rsid or locus is 0 when unknown
+ARCHAIC_DTYPE = np.dtype([('rsid', '<i8'), ('locus', '<i8'), ('archaic', 'i1'),
+                          ('source', 'i1'), ('archaic_freq', '<f4'), ('african_freq', '<f4')])
+
+CHROMOSOME_NAMES = {code: name for name, code in CHROMOSOME_CODES.items() if name != 'M'}
+
+
+def list_panel_files(directory: str = None) -> List[str]:
+    directory = directory or ARCHAIC_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(ARCHAIC_FILE_EXTENSIONS))
+
+
+def _panel_signature() -> List[List[Any]]:
+    signature = []
+    for path in list_panel_files():
+        stat = os.stat(path)
+        signature.append([os.path.basename(path), stat.st_size, stat.st_mtime])
+    return signature
+
+
+# Installed panel files (name, size, mtime), so cached ancient-DNA results
+# are recomputed when a panel is added or replaced
+ARCHAIC_PANEL_FILES = _panel_signature()
+
+
+# =============================================================================
+# REFERENCE PANEL
+# =============================================================================
+
+def _column_map(columns: List[str]) -> Dict[str, str]:
+    lower = {str(c).lower().strip(): c for c in columns}
+    fields = {}
+    for field, names in ARCHAIC_COLUMNS.items():
+        found = next((lower[name] for name in names if name in lower), None)
+        if found is not None:
+            fields[field] = found
+    if 'archaic' not in fields:
+        raise ValueError("archaic panel needs an archaic allele column")
+    if 'chrom' not in fields or 'pos' not in fields:
+        raise ValueError("archaic panel needs chromosome and position columns")
+    return fields
+
+
+def _parse_panel(path: str) -> np.ndarray:
+    columns = pd.read_csv(path, sep='\t', comment='#', nrows=0, compression='infer').columns
+    fields = _column_map(list(columns))
+    dtypes = {column: str for column in columns}
+    for field in ('pos', 'archaic_freq', 'african_freq'):
+        if field in fields:
+            dtypes[fields[field]] = np.float64
+    df = pd.read_csv(path, sep='\t', comment='#', dtype=dtypes, compression='infer')
+
+    sites = np.zeros(len(df), dtype=ARCHAIC_DTYPE)
+    if 'rsid' in fields:
+        sites['rsid'] = rsid_numbers(df[fields['rsid']])
+    sites['locus'] = locus_keys(df[fields['chrom']], df[fields['pos']])
+    sites['archaic'] = encode_alleles(df[fields['archaic']])
+    sites['archaic_freq'] = (df[fields['archaic_freq']].fillna(DEFAULT_ARCHAIC_FREQ)
+                             if 'archaic_freq' in fields else DEFAULT_ARCHAIC_FREQ)
+    sites['african_freq'] = (df[fields['african_freq']].fillna(DEFAULT_AFRICAN_FREQ)
+                             if 'african_freq' in fields else DEFAULT_AFRICAN_FREQ)
+    if 'source' in fields:
+        sites['source'] = df[fields['source']].fillna('').str.lower().str.startswith('d')
+    return sites[(sites['archaic'] >= 0) & (sites['locus'] > 0)]
+
+
+def load_panel_file(path: str, cache_dir: str = None) -> np.ndarray:
+    """
+    Sites of one panel file through its binary copy, building the copy on
+    first use (or when the file has changed).
+    """
+    cache_dir = cache_dir or ARCHAIC_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    base = os.path.join(cache_dir, f"{os.path.basename(path).split('.')[0]}-{key}")
+    data_path, meta_path = base + '.npy', base + '.json'
+
+    stat = os.stat(path)
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(data_path):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+    if meta and (meta.get('format'), meta.get('size'), meta.get('mtime')) == (
+            ARCHAIC_CACHE_FORMAT, stat.st_size, stat.st_mtime):
+        return np.load(data_path, mmap_mode='r')
+
+    sites = _parse_panel(path)
+    sites = sites[np.argsort(sites['locus'], kind='stable')]
+    np.save(data_path, sites)
+    with open(meta_path, 'w') as f:
+        json.dump({'format': ARCHAIC_CACHE_FORMAT, 'source': os.path.abspath(path),
+                   'size': stat.st_size, 'mtime': stat.st_mtime, 'sites': len(sites)}, f, indent=1)
+    return sites
+
+
+def load_panel(paths: List[str]) -> np.ndarray:
+    """All sites of the given panel files, sorted by locus"""
+    sites = np.concatenate([np.asarray(load_panel_file(path)) for path in paths])
+    return sites[np.argsort(sites['locus'], kind='stable')]
+
+
+def builtin_panel() -> np.ndarray:
+    """NEANDERTHAL_SNPS and DENISOVAN_SNPS as panel sites (no positions)"""
+    from ancestry_markers_merged import ANCESTRY_MARKERS_MERGED
+    from ancient_dna_database import DENISOVAN_SNPS, NEANDERTHAL_SNPS
+
+    rows = []
+    for source, (table, field) in enumerate(((NEANDERTHAL_SNPS, 'neanderthal_allele'),
+                                             (DENISOVAN_SNPS, 'denisovan_allele'))):
+        for rsid, data in table.items():
+            allele = data[field]
+            frequencies = ANCESTRY_MARKERS_MERGED.get(rsid, {}).get('frequencies', {})
+            reference = next((frequencies[p] for p in AFRICAN_REFERENCES if p in frequencies), None)
+            african = reference.get(allele, 0.0) if reference else DEFAULT_AFRICAN_FREQ
+            rows.append((rsid, allele, source, african))
+
+    sites = np.zeros(len(rows), dtype=ARCHAIC_DTYPE)
+    sites['rsid'] = rsid_numbers(pd.Series([r[0] for r in rows], dtype=object))
+    sites['archaic'] = encode_alleles(pd.Series([r[1] for r in rows], dtype=object))
+    sites['source'] = [r[2] for r in rows]
+    sites['archaic_freq'] = DEFAULT_ARCHAIC_FREQ
+    sites['african_freq'] = [r[3] for r in rows]
+    return sites
+
+
+_PANEL = None
+
+
+def get_archaic_panel() -> Optional[np.ndarray]:
+    """Sites of every panel file in ARCHAIC_DIR (cached); None when there are none"""
+    global _PANEL
+    if _PANEL is None:
+        paths = list_panel_files()
+        if not paths:
+            return None
+        _PANEL = load_panel(paths)
+    return _PANEL
+
+
+# =============================================================================
+# SEGMENTS
+# =============================================================================
+
+@dataclass
+class IntrogressionSegments:
+    """Disjoint segments sorted by chromosome and start (half-open intervals)"""
+    chrom: np.ndarray               # chromosome codes
+    start: np.ndarray
+    end: np.ndarray
+    sites: np.ndarray               # carried archaic sites in the segment
+    score: np.ndarray               # summed log-likelihood ratio
+    copies: np.ndarray              # mean archaic allele copies at carried sites
+    source: np.ndarray              # index into SOURCES
+
+    @property
+    def length(self) -> np.ndarray:
+        return self.end - self.start
+
+    def overlapping(self, chrom: int, start: int, end: int) -> np.ndarray:
+        """Indices of segments overlapping [start, end) on a chromosome"""
+        lo = np.searchsorted((self.chrom.astype(np.int64) << 32) | self.end,
+                             (chrom << 32) | start, side='right')
+        hi = np.searchsorted((self.chrom.astype(np.int64) << 32) | self.start,
+                             (chrom << 32) | end, side='left')
+        return np.arange(lo, max(lo, hi))
+
+    def length_by_chromosome(self, source: int = None) -> Dict[str, int]:
+        keep = np.ones(len(self.chrom), dtype=bool) if source is None else self.source == source
+        totals = np.bincount(self.chrom[keep], weights=self.length[keep], minlength=27)
+        return {CHROMOSOME_NAMES[c]: int(totals[c]) for c in np.flatnonzero(totals)}
+
+
+def _site_scores(copies: np.ndarray, archaic_freq: np.ndarray,
+                 african_freq: np.ndarray) -> np.ndarray:
+    """Log-likelihood ratio of the genotype, introgressed vs not, per site"""
+    p_introgressed = np.clip(archaic_freq, 0.01, 0.99)
+    # Chance a non-introgressed diploid carries the allele at all
+    p_background = np.clip(1.0 - (1.0 - african_freq) ** 2, 0.001, 0.99)
+    return np.where(copies > 0,
+                    np.log(p_introgressed / p_background),
+                    np.log((1.0 - p_introgressed) / (1.0 - p_background)))
+
+
+def _chromosome_segments(pos: np.ndarray, score: np.ndarray, copies: np.ndarray,
+                         source: np.ndarray) -> List[np.ndarray]:
+    """(start, end, sites, score, copies, source) arrays for one chromosome's sites"""
+    bins = pos // STEP_BP
+    span = WINDOW_BP // STEP_BP
+    n_bins = int(bins[-1]) + span
+    carried = copies > 0
+    bin_score = np.bincount(bins, weights=score, minlength=n_bins)
+    bin_carried = np.bincount(bins, weights=carried, minlength=n_bins)
+
+    # Window w covers bins [w, w + span)
+    score_sum = np.concatenate([[0.0], np.cumsum(bin_score)])
+    carried_sum = np.concatenate([[0.0], np.cumsum(bin_carried)])
+    windows = np.arange(n_bins - span + 1)
+    flagged = windows[(score_sum[windows + span] - score_sum[windows] >= MIN_WINDOW_SCORE) &
+                      (carried_sum[windows + span] - carried_sum[windows] >= MIN_ARCHAIC_SITES)]
+    if not len(flagged):
+        return [np.zeros(0, dtype=t) for t in (np.int64, np.int64, np.int64, float, float, np.int8)]
+
+    # Merge overlapping or touching windows into intervals
+    breaks = np.flatnonzero(np.diff(flagged) > span)
+    first = flagged[np.concatenate([[0], breaks + 1])]
+    last = flagged[np.concatenate([breaks, [len(flagged) - 1]])]
+    starts, ends = first * STEP_BP, (last + span) * STEP_BP
+
+    # Trim each interval to its outermost carried sites
+    carried_pos = pos[carried]
+    lo = np.searchsorted(carried_pos, starts, side='left')
+    hi = np.searchsorted(carried_pos, ends, side='left')
+    keep = hi - lo >= MIN_ARCHAIC_SITES
+    lo, hi = lo[keep], hi[keep]
+    seg_start, seg_end = carried_pos[lo], carried_pos[hi - 1] + 1
+
+    site_lo = np.searchsorted(pos, seg_start, side='left')
+    site_hi = np.searchsorted(pos, seg_end, side='left')
+    all_score = np.concatenate([[0.0], np.cumsum(score)])
+    carried_copies = np.concatenate([[0.0], np.cumsum(copies[carried])])
+    carried_denisovan = np.concatenate([[0.0], np.cumsum(source[carried] == 1)])
+    n_sites = hi - lo
+    return [seg_start, seg_end, n_sites,
+            all_score[site_hi] - all_score[site_lo],
+            (carried_copies[hi] - carried_copies[lo]) / n_sites,
+            ((carried_denisovan[hi] - carried_denisovan[lo]) * 2 > n_sites).astype(np.int8)]
+
+
+def find_segments(kit: KitIndex, panel: np.ndarray) -> Dict[str, Any]:
+    """
+    Introgressed segments of a kit against a panel.
+
+    Panel sites without a locus take the kit's position for that rsid.
+    Returns the segments and the scanned span per chromosome.
+    """
+    alleles, found = kit.join(panel)
+    loci = panel['locus'].astype(np.int64)
+    unplaced = loci == 0
+    if unplaced.any():
+        loci = loci.copy()
+        loci[unplaced] = kit.loci_of(panel['rsid'][unplaced])
+    keep = found & (loci > 0)
+    loci, alleles, sites = loci[keep], alleles[keep], panel[keep]
+    if unplaced.any():
+        order = np.argsort(loci, kind='stable')
+        loci, alleles, sites = loci[order], alleles[order], sites[order]
+
+    copies = (alleles == sites['archaic'][:, None]).sum(axis=1)
+    score = _site_scores(copies, sites['archaic_freq'].astype(float),
+                         sites['african_freq'].astype(float))
+    chrom = loci >> 32
+    pos = loci & 0xFFFFFFFF
+
+    parts, scanned = [], {}
+    bounds = np.flatnonzero(np.diff(chrom)) + 1
+    for lo, hi in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(chrom)]])):
+        if hi <= lo:
+            continue
+        c = int(chrom[lo])
+        scanned[c] = int(pos[hi - 1] - pos[lo] + 1)
+        segment = _chromosome_segments(pos[lo:hi], score[lo:hi], copies[lo:hi],
+                                       sites['source'][lo:hi])
+        parts.append([np.full(len(segment[0]), c, dtype=np.int64)] + segment)
+
+    if parts:
+        columns = [np.concatenate([part[i] for part in parts]) for i in range(7)]
+    else:
+        columns = [np.zeros(0, dtype=np.int64)] * 3 + [np.zeros(0)] * 3 + [np.zeros(0, dtype=np.int8)]
+    return {
+        'segments': IntrogressionSegments(*columns),
+        'scanned_bp': scanned,
+        'sites_found': int(len(loci)),
+        'sites_carried': int(np.count_nonzero(copies)),
+    }
+
+
+def introgression_report(scan: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-friendly summary of find_segments: lengths, percentages, segments"""
+    segments = scan['segments']
+    scanned_total = sum(scan['scanned_bp'].values())
+    report = {
+        'sites_found': scan['sites_found'],
+        'sites_carried': scan['sites_carried'],
+        'scanned_bp': scanned_total,
+        'segments_found': len(segments.chrom),
+    }
+    for s, name in enumerate(SOURCES):
+        mine = segments.source == s
+        # Segments are mostly heterozygous: weight by archaic copies out of two
+        haploid_bp = float(np.sum(segments.length[mine] * segments.copies[mine] / 2))
+        report[name.lower()] = {
+            'segments': int(np.count_nonzero(mine)),
+            'total_length_bp': int(np.sum(segments.length[mine])),
+            'length_by_chromosome': segments.length_by_chromosome(s),
+            'percentage': round(100 * haploid_bp / scanned_total, 2) if scanned_total else 0.0,
+        }
+    report['segments'] = [{
+        'chromosome': CHROMOSOME_NAMES[int(segments.chrom[i])],
+        'start': int(segments.start[i]),
+        'end': int(segments.end[i]),
+        'length_bp': int(segments.length[i]),
+        'archaic_sites': int(segments.sites[i]),
+        'score': round(float(segments.score[i]), 2),
+        'source': SOURCES[int(segments.source[i])],
+    } for i in np.argsort(-segments.length, kind='stable')]
+    return report
+
+
+def scan_snp_dict(snp_dict: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """introgression_report for a kit against the installed panel; None without one"""
+    panel = get_archaic_panel()
+    if panel is None:
+        return None
+    return introgression_report(find_segments(KitIndex.from_snp_dict(snp_dict), panel))
+
+
+def main(argv: List[str] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Archaic introgression segments of a kit')
+    parser.add_argument('kit', help='raw DNA file')
+    parser.add_argument('--panel', nargs='+', help=f"panel files (default: those in {ARCHAIC_DIR})")
+    parser.add_argument('--top', type=int, default=10, help='longest segments to list')
+    args = parser.parse_args(argv)
+
+    from dna_parser import parse_dna_file
+    with open(args.kit, 'rb') as f:
+        df = parse_dna_file(f, args.kit)
+    if df is None:
+        print(f"Could not parse {args.kit}")
+        return 1
+
+    paths = args.panel or list_panel_files()
+    if paths:
+        panel = load_panel(paths)
+    else:
+        print(f"No panel files in {ARCHAIC_DIR}; using the built-in marker tables")
+        panel = builtin_panel()
+    report = introgression_report(find_segments(KitIndex.from_dataframe(df), panel))
+
+    print(f"{report['sites_found']:,} panel sites in kit, {report['sites_carried']:,} carry "
+          f"the archaic allele; {report['scanned_bp'] / 1e6:,.0f} Mb scanned")
+    for name in SOURCES:
+        summary = report[name.lower()]
+        print(f"{name}: {summary['segments']} segments, "
+              f"{summary['total_length_bp'] / 1e6:.2f} Mb, ~{summary['percentage']}%")
+        for chromosome, length in summary['length_by_chromosome'].items():
+            print(f"  chr{chromosome}: {length / 1e3:,.0f} kb")
+    for segment in report['segments'][:args.top]:
+        print(f"  {segment['source']} chr{segment['chromosome']}:{segment['start']:,}-"
+              f"{segment['end']:,} ({segment['archaic_sites']} sites, score {segment['score']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,8 +14,11 @@ import sys
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from dna_parser import parse_dna_file
-from comprehensive_analysis import ComprehensiveDNAAnalysisEngine
+from dna_parser import parse_dna_file_streaming
+from comprehensive_analysis import ANALYSIS_MODULES, ComprehensiveDNAAnalysisEngine
+from analysis_scheduler import AnalysisCancelled, FINISHED
+from results_cache import open_results_cache
+from calibrated_ancestry_engine import IncrementalAncestryAccumulator
 
 # Import unique features UI
 from unique_features_ui import (
@@ -90,6 +93,43 @@ ctk.set_default_color_theme("blue")
 # SIDEBAR FRAME
 # =============================================================================
 
+# Result sections each sidebar page reads; a page is enabled once they are
+# all computed (pages not listed only need the parsed file)
+NAV_SECTION_MODULES = {
+    "haplogroup": ["haplogroups", "unique_features"],
+    "archaicdna": ["unique_features"],
+    "ancienthistory": ["ancient_dna_history"],
+    "physical": ["physical_traits", "physical_traits_expanded"],
+    "health": ["health_traits"],
+    "athletic": ["athletic_genetics"],
+    "behavioral": ["behavioral_genetics"],
+    "sleep": ["sleep_genetics"],
+    "sensory": ["sensory_traits"],
+    "pharma": ["pharmacogenomics", "pharmacogenomics_detailed"],
+    "carrier": ["carrier_status"],
+    "polygenic": ["polygenic_scores"],
+    "cancerrisk": ["cancer_risk_genetics"],
+    "cardiovasc": ["cardiovascular_genetics"],
+    "immunity": ["immunity", "immune_deep_genetics"],
+    "longevity": ["longevity", "longevity_genetics"],
+    "nutrimetab": ["nutrition_metabolism"],
+    "diettraining": ["unique_features"],
+    "sportsgen": ["sports_genetics"],
+    "reproduction": ["reproduction_genetics"],
+    "skinderm": ["skin_dermatology"],
+    "mentalhealth": ["mental_health_genetics"],
+    "allmarkers": ["unique_features"],
+    "historical": ["unique_features"],
+    "superpowers": ["unique_features"],
+    "survival": ["unique_features"],
+    "epiage": ["unique_features"],
+    "plan": ["personalized_plan"],
+    "export": ["ancestry", "physical_traits", "health_traits", "pharmacogenomics",
+               "carrier_status", "immunity", "nutrition_fitness", "longevity",
+               "haplogroups", "summary"],
+}
+
+
 class SidebarFrame(ctk.CTkFrame):
     """Sidebar navigation with scrollable sections"""
 
@@ -99,6 +139,8 @@ class SidebarFrame(ctk.CTkFrame):
         self.on_navigate = on_navigate
         self.active_button = None
         self.nav_buttons = {}
+        self.ready_modules = set()
+        self.navigation_enabled = False
 
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
@@ -189,7 +231,13 @@ class SidebarFrame(ctk.CTkFrame):
             bottom_frame, text="", font=ctk.CTkFont(size=11, weight="bold"),
             text_color="#22c55e"
         )
-        self.snp_info.pack(padx=10, pady=(0, 8))
+        self.snp_info.pack(padx=10, pady=(0, 2))
+
+        self.progress_info = ctk.CTkLabel(
+            bottom_frame, text="", font=ctk.CTkFont(size=10),
+            text_color="gray50", wraplength=220
+        )
+        self.progress_info.pack(padx=10, pady=(0, 8))
 
     def navigate(self, section):
         """Handle navigation"""
@@ -203,14 +251,41 @@ class SidebarFrame(ctk.CTkFrame):
             else:
                 btn.configure(fg_color="transparent", text_color="gray70")
 
-    def enable_navigation(self, snp_count, file_name):
-        """Enable navigation buttons after file load"""
+    def reset_navigation(self):
+        """Disable navigation while a new file is loaded"""
+        self.navigation_enabled = False
+        self.ready_modules = set()
         for btn in self.nav_buttons.values():
-            btn.configure(state="normal", text_color="gray70")
+            btn.configure(state="disabled", text_color="gray60", fg_color="transparent")
+        self.progress_info.configure(text="")
+
+    def enable_navigation(self, snp_count, file_name):
+        """Enable navigation after file load; pages whose results are still
+        being computed are enabled by mark_ready as they arrive"""
+        self.navigation_enabled = True
+        self._refresh_navigation()
 
         self.file_info.configure(text=f"File: {file_name}")
         self.snp_info.configure(text=f"{snp_count:,} SNPs analyzed")
 
+    def mark_ready(self, module):
+        """A result section finished computing"""
+        self.ready_modules.add(module)
+        done = len(self.ready_modules & set(ANALYSIS_MODULES))
+        self.progress_info.configure(
+            text="" if done == len(ANALYSIS_MODULES)
+            else f"Analyzing... {done}/{len(ANALYSIS_MODULES)} sections ready")
+        self._refresh_navigation()
+
+    def _refresh_navigation(self):
+        if not self.navigation_enabled:
+            return
+        for key, btn in self.nav_buttons.items():
+            if btn.cget("state") == "normal":
+                continue
+            if all(m in self.ready_modules for m in NAV_SECTION_MODULES.get(key, [])):
+                btn.configure(state="normal", text_color="gray70")
+
 
 # =============================================================================
 # WELCOME FRAME
@@ -295,7 +370,7 @@ class WelcomeFrame(ctk.CTkFrame):
 class LoadingFrame(ctk.CTkFrame):
     """Loading/progress indicator"""
 
-    def __init__(self, parent, message="Analyzing..."):
+    def __init__(self, parent, message="Analyzing...", on_cancel=None):
         super().__init__(parent, fg_color="transparent")
 
         self.grid_columnconfigure(0, weight=1)
@@ -307,6 +382,7 @@ class LoadingFrame(ctk.CTkFrame):
         self.progress = ctk.CTkProgressBar(center, width=400, mode="indeterminate")
         self.progress.pack(pady=20)
         self.progress.start()
+        self.determinate = False
 
         self.label = ctk.CTkLabel(
             center, text=message,
@@ -314,6 +390,44 @@ class LoadingFrame(ctk.CTkFrame):
         )
         self.label.pack()
 
+        self.estimate_label = ctk.CTkLabel(
+            center, text="",
+            font=ctk.CTkFont(size=13), text_color="gray60",
+            justify="center"
+        )
+        self.estimate_label.pack(pady=(15, 0))
+
+        if on_cancel is not None:
+            self.cancel_btn = ctk.CTkButton(
+                center, text="Cancel", command=on_cancel,
+                font=ctk.CTkFont(size=13), width=120,
+                fg_color="gray30", hover_color="gray25"
+            )
+            self.cancel_btn.pack(pady=(25, 0))
+
+    def set_progress(self, fraction):
+        """Show how far through the file parsing is (0..1)"""
+        if not self.determinate:
+            self.progress.stop()
+            self.progress.configure(mode="determinate")
+            self.determinate = True
+        self.progress.set(max(0.0, min(1.0, fraction)))
+
+    def update_estimate(self, estimate):
+        """Show the preliminary ancestry estimate while parsing continues"""
+        continental = estimate.get('continental', {}) if estimate else {}
+        if not continental:
+            return
+
+        parts = [f"{name} {pct:.0f}%" for name, pct in
+                 sorted(continental.items(), key=lambda x: x[1], reverse=True)
+                 if pct >= 1]
+        self.estimate_label.configure(
+            text=f"Preliminary ancestry: {', '.join(parts)}\n"
+                 f"({estimate.get('markers_matched', 0)} of "
+                 f"{estimate.get('markers_total', 0)} ancestry markers so far)"
+        )
+
 
 # =============================================================================
 # ANCESTRY FRAME
@@ -2152,6 +2266,19 @@ class AncientDNAFrame(ctk.CTkFrame):
             font=ctk.CTkFont(size=12), text_color="white"
         ).pack(pady=(5, 15))
 
+        # Where the percentages come from (segment scan or marker match bands)
+        introgression = ancient.get('introgression', {})
+        if introgression.get('status') == 'segments':
+            method_text = (f"Estimated from {introgression.get('segments_found', 0)} introgressed "
+                           f"segments across {introgression.get('sites_found', 0)} archaic panel sites")
+        else:
+            method_text = introgression.get(
+                'note', 'Percentages are fixed bands chosen from the marker match rate')
+        ctk.CTkLabel(
+            scroll, text=method_text,
+            font=ctk.CTkFont(size=12), text_color="gray60", wraplength=600
+        ).pack(anchor="w", padx=20, pady=(0, 10))
+
         # Neanderthal trait categories
         trait_cats = neanderthal.get('trait_categories', {})
         if trait_cats:
@@ -3291,6 +3418,14 @@ class AncientPopulationFrame(ctk.CTkFrame):
         ancient = results.ancient_population_match
         matches = ancient.get('matches', [])
 
+        mixture = ancient.get('mixture')
+        if mixture:
+            parts = "  |  ".join(f"{c['name']}: {c['percentage']}%" for c in mixture['components'])
+            ctk.CTkLabel(
+                scroll, text=f"Ancient ancestry mix ({mixture['sites_used']} markers): {parts}",
+                font=ctk.CTkFont(size=13), text_color="gray60", wraplength=700, justify="left"
+            ).pack(anchor="w", padx=10, pady=(0, 8))
+
         if matches:
             for i, match in enumerate(matches):
                 color = "#7c3aed" if i == 0 else "gray20"
@@ -3887,8 +4022,12 @@ class DNAAnalysisApp(ctk.CTk):
         # Application state
         self.dna_data = None
         self.analysis_results = None
-        self.analysis_engine = ComprehensiveDNAAnalysisEngine()
+        self.ancestry_results = None
+        self.ancestry_estimate = None
+        self.analysis_engine = ComprehensiveDNAAnalysisEngine(results_cache=open_results_cache())
         self.current_frame = None
+        # Set to cancel the file currently being loaded
+        self.load_cancel = None
 
         # Configure grid
         self.grid_columnconfigure(1, weight=1)
@@ -3914,7 +4053,8 @@ class DNAAnalysisApp(ctk.CTk):
         # Bind keyboard shortcuts
         self.bind("<Control-o>", lambda e: self.load_dna_file())
         self.bind("<Control-e>", lambda e: self.navigate_to("export") if self.dna_data is not None else None)
-        self.bind("<Escape>", lambda e: self.show_welcome())
+        self.bind("<Escape>", lambda e: self.cancel_loading()
+                  if isinstance(self.current_frame, LoadingFrame) else self.show_welcome())
 
     def clear_content(self):
         """Clear the main content area"""
@@ -3933,10 +4073,27 @@ class DNAAnalysisApp(ctk.CTk):
     def show_loading(self, message="Analyzing your DNA..."):
         """Show loading screen during analysis"""
         self.clear_content()
-        self.current_frame = LoadingFrame(self.content_frame, message)
+        self.current_frame = LoadingFrame(self.content_frame, message,
+                                          on_cancel=self.cancel_loading)
         self.current_frame.grid(row=0, column=0, sticky="nsew")
+        self.current_frame.update_estimate(self.ancestry_estimate)
         self.update()
 
+    def cancel_loading(self):
+        """Stop loading the current file (at the next chunk, or after the current step once parsed)"""
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+
+    def update_load_progress(self, fraction):
+        if isinstance(self.current_frame, LoadingFrame):
+            self.current_frame.set_progress(fraction)
+
+    def update_ancestry_estimate(self, estimate):
+        """Publish an interim ancestry estimate to the loading screen"""
+        self.ancestry_estimate = estimate
+        if isinstance(self.current_frame, LoadingFrame):
+            self.current_frame.update_estimate(estimate)
+
     def load_dna_file(self):
         """Open file dialog and load DNA data"""
         file_path = filedialog.askopenfilename(
@@ -3955,13 +4112,41 @@ class DNAAnalysisApp(ctk.CTk):
 
     def process_dna_file(self, file_path):
         """Process the loaded DNA file"""
+        if self.analysis_results is not None:
+            self.analysis_results.stop_prefetch()
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+        cancel = self.load_cancel = threading.Event()
+        self.dna_data = None
+        self.analysis_results = None
+        self.ancestry_results = None
+        self.ancestry_estimate = None
+        self.sidebar.reset_navigation()
         self.show_loading("Loading and parsing DNA data...")
 
+        def on_event(event, run):
+            if event == FINISHED:
+                self.after(0, lambda: self._section_ready(cancel, run.name))
+
         def analyze():
             try:
-                # Parse DNA file
+                # Parse DNA file, refining the ancestry estimate chunk by chunk
+                accumulator = IncrementalAncestryAccumulator()
+                file_size = max(os.path.getsize(file_path), 1)
+
+                def on_chunk(chunk):
+                    accumulator.add_chunk(chunk['rsid'], chunk['genotype'])
+                    estimate = accumulator.interim()
+                    fraction = f.tell() / file_size
+                    self.after(0, lambda e=estimate: self.update_ancestry_estimate(e))
+                    self.after(0, lambda: self.update_load_progress(fraction))
+
                 with open(file_path, 'rb') as f:
-                    self.dna_data = parse_dna_file(f, file_path)
+                    dna_data = parse_dna_file_streaming(f, file_path, on_chunk=on_chunk,
+                                                        cancel=cancel)
+                if cancel.is_set():
+                    raise AnalysisCancelled("loading cancelled")
+                self.dna_data = dna_data
 
                 if self.dna_data is None or len(self.dna_data) == 0:
                     self.after(0, lambda: messagebox.showerror(
@@ -3976,8 +4161,20 @@ class DNAAnalysisApp(ctk.CTk):
                     f"Running comprehensive analysis on {len(self.dna_data):,} genetic markers..."
                 ))
 
-                # Run comprehensive analysis
-                self.analysis_results = self.analysis_engine.run_full_analysis(self.dna_data)
+                # Final ancestry numbers (identical to a batch run on the file)
+                self.ancestry_results = accumulator.finalize()
+                if cancel.is_set():
+                    raise AnalysisCancelled("loading cancelled")
+
+                # Sections are computed when first opened; the rest fill in
+                # in the background and their sidebar pages are enabled as
+                # each one arrives
+                analysis_results = self.analysis_engine.run_lazy_analysis(
+                    self.dna_data, on_event=on_event)
+                if cancel.is_set():
+                    analysis_results.stop_prefetch()
+                    raise AnalysisCancelled("loading cancelled")
+                self.analysis_results = analysis_results
 
                 # Update sidebar with results
                 self.after(0, lambda: self.sidebar.enable_navigation(
@@ -3988,6 +4185,11 @@ class DNAAnalysisApp(ctk.CTk):
                 # Show ethnicity estimate by default
                 self.after(0, lambda: self.navigate_to("ethnicity"))
 
+            except AnalysisCancelled:
+                # Back to the start, unless another file is already loading
+                if cancel is self.load_cancel:
+                    self.after(0, self.show_welcome)
+
             except Exception as e:
                 import traceback
                 traceback.print_exc()
@@ -4001,6 +4203,11 @@ class DNAAnalysisApp(ctk.CTk):
         thread = threading.Thread(target=analyze, daemon=True)
         thread.start()
 
+    def _section_ready(self, cancel, module):
+        """Enable the sidebar pages of a finished section (current file only)"""
+        if cancel is self.load_cancel:
+            self.sidebar.mark_ready(module)
+
     def navigate_to(self, section):
         """Navigate to a specific analysis section"""
         if self.dna_data is None or self.analysis_results is None:
@@ -4065,7 +4272,8 @@ class DNAAnalysisApp(ctk.CTk):
             # Special handling for ancestry ethnicity frame
             self.current_frame = AncestryEthnicityFrame(
                 self.content_frame,
-                snp_dict=self.dna_data
+                snp_dict=self.dna_data,
+                results=self.ancestry_results
             )
             self.current_frame.grid(row=0, column=0, sticky="nsew")
             self.sidebar.set_active(section)
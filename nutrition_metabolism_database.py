@@ -966,223 +966,222 @@ ALCOHOL_GENETICS = {
 
 
 # =============================================================================
-# MAIN ANALYSIS FUNCTION
+# SCORE RULES (compiled by score_rules)
 # =============================================================================
 
-def analyze_nutrition_metabolism(dna_data: dict) -> Dict[str, Any]:
-    """
-    Perform comprehensive nutrition and metabolism genetic analysis.
-
-    Args:
-        dna_data: Dictionary of rsid -> genotype
-
-    Returns:
-        Dictionary containing all nutrition metabolism analysis results
-    """
-    results = {
-        "vitamin_a_metabolism": analyze_vitamin_a(dna_data),
-        "vitamin_b12_metabolism": analyze_vitamin_b12(dna_data),
-        "vitamin_c_metabolism": analyze_vitamin_c(dna_data),
-        "vitamin_e_metabolism": analyze_vitamin_e(dna_data),
-        "omega3_metabolism": analyze_omega3(dna_data),
-        "saturated_fat_response": analyze_saturated_fat(dna_data),
-        "carbohydrate_metabolism": analyze_carbohydrate(dna_data),
-        "protein_metabolism": analyze_protein(dna_data),
-        "sodium_sensitivity": analyze_sodium(dna_data),
-        "alcohol_metabolism": analyze_alcohol(dna_data),
-        "summary": {}
+def _nutrition_rule(markers, result, checks, **options):
+    """Rule shared by the nutrition categories: every SNP in the kit listed, effect fields checked"""
+    return {
+        "markers": markers,
+        "genotypes": "effect",
+        "result": result,
+        "found_field": "snps_analyzed",
+        "list_present": True,
+        "score_field": None,
+        "checks": checks,
+        **options,
     }
 
-    # Generate overall summary
-    results["summary"] = generate_nutrition_summary(results)
 
-    return results
-
-
-def analyze_vitamin_a(dna_data: dict) -> Dict[str, Any]:
-    """Analyze vitamin A / beta-carotene metabolism"""
-    result = {
+NUTRITION_SCORE_RULES = {
+    "vitamin_a_metabolism": _nutrition_rule(VITAMIN_A_GENETICS, {
         "snps_analyzed": [],
         "conversion_efficiency": "Unknown",
         "beta_carotene_converter": "Unknown",
         "recommendation": "",
         "findings": []
-    }
-
-    conversion_scores = []
-
-    for rsid, info in VITAMIN_A_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-                if "conversion_efficiency" in effect:
-                    result["conversion_efficiency"] = effect["conversion_efficiency"]
-                    if "Poor" in effect["conversion_efficiency"]:
-                        conversion_scores.append(0)
-                        result["findings"].append("Poor beta-carotene to vitamin A conversion")
-                    elif "Reduced" in effect["conversion_efficiency"]:
-                        conversion_scores.append(1)
-                    else:
-                        conversion_scores.append(2)
-
-                if effect.get("recommendation"):
-                    result["recommendation"] = effect["recommendation"]
-
-    if conversion_scores:
-        avg = sum(conversion_scores) / len(conversion_scores)
-        if avg <= 0.5:
-            result["beta_carotene_converter"] = "Poor Converter"
-        elif avg <= 1.5:
-            result["beta_carotene_converter"] = "Moderate Converter"
-        else:
-            result["beta_carotene_converter"] = "Good Converter"
-
-    return result
-
-
-def analyze_vitamin_b12(dna_data: dict) -> Dict[str, Any]:
-    """Analyze vitamin B12 metabolism"""
-    result = {
+    }, [
+        {"key": "conversion_efficiency", "copy_to": "conversion_efficiency", "cases": [
+            {"contains": "Poor", "score": 0,
+             "append": {"findings": "Poor beta-carotene to vitamin A conversion"}},
+            {"contains": "Reduced", "score": 1},
+            {"score": 2},
+        ]},
+        # Empty recommendations leave an earlier one in place
+        {"key": "recommendation", "cases": [
+            {"equals": ""},
+            {"copy_to": "recommendation"},
+        ]},
+    ], levels_when="scored", levels=[
+        {"max": 0.5, "set": {"beta_carotene_converter": "Poor Converter"}},
+        {"max": 1.5, "set": {"beta_carotene_converter": "Moderate Converter"}},
+        {"set": {"beta_carotene_converter": "Good Converter"}},
+    ]),
+    "vitamin_b12_metabolism": _nutrition_rule(VITAMIN_B12_GENETICS, {
         "snps_analyzed": [],
         "secretor_status": "Unknown",
         "b12_transport": "Unknown",
         "mthfr_status": "Unknown",
         "overall_b12_need": "Normal",
         "findings": []
-    }
-
-    risk_count = 0
-
-    for rsid, info in VITAMIN_B12_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype,
-                "common_name": info.get("common_name", "")
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                # Secretor status
-                if "secretor_status" in effect:
-                    result["secretor_status"] = effect["secretor_status"]
-                    if effect["secretor_status"] == "Non-Secretor":
-                        risk_count += 1
-                        result["findings"].append("Non-secretor - may have reduced B12 absorption")
-
-                # Transport
-                if "b12_transport" in effect:
-                    result["b12_transport"] = effect["b12_transport"]
-                    if "Reduced" in effect["b12_transport"]:
-                        risk_count += 1
-
-                # MTHFR
-                if "mthfr_activity" in effect:
-                    result["mthfr_status"] = effect["mthfr_activity"]
-                    if "Low" in effect["mthfr_activity"]:
-                        risk_count += 2
-                        result["findings"].append("MTHFR C677T TT - reduced enzyme activity, needs active folate")
-                    elif "Reduced" in effect["mthfr_activity"]:
-                        risk_count += 1
-
-    if risk_count >= 3:
-        result["overall_b12_need"] = "Increased"
-    elif risk_count >= 1:
-        result["overall_b12_need"] = "Slightly Increased"
-
-    return result
-
-
-def analyze_vitamin_c(dna_data: dict) -> Dict[str, Any]:
-    """Analyze vitamin C metabolism"""
-    result = {
+    }, [
+        {"key": "secretor_status", "copy_to": "secretor_status", "cases": [
+            {"equals": "Non-Secretor", "score": 1,
+             "append": {"findings": "Non-secretor - may have reduced B12 absorption"}},
+        ]},
+        {"key": "b12_transport", "copy_to": "b12_transport", "cases": [
+            {"contains": "Reduced", "score": 1},
+        ]},
+        {"key": "mthfr_activity", "copy_to": "mthfr_status", "cases": [
+            {"contains": "Low", "score": 2,
+             "append": {"findings": "MTHFR C677T TT - reduced enzyme activity, needs active folate"}},
+            {"contains": "Reduced", "score": 1},
+        ]},
+    ], marker_fields={"common_name": ["common_name", ""]}, aggregate="sum", levels=[
+        {"min": 3, "set": {"overall_b12_need": "Increased"}},
+        {"min": 1, "set": {"overall_b12_need": "Slightly Increased"}},
+    ]),
+    "vitamin_c_metabolism": _nutrition_rule(VITAMIN_C_GENETICS, {
         "snps_analyzed": [],
         "vitamin_c_transport": "Unknown",
         "antioxidant_capacity": "Unknown",
         "findings": []
-    }
-
-    for rsid, info in VITAMIN_C_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                if "vit_c_transport" in effect:
-                    result["vitamin_c_transport"] = effect["vit_c_transport"]
-                    if "Reduced" in effect["vit_c_transport"]:
-                        result["findings"].append("Reduced vitamin C transport - may need higher intake")
-
-                if "antioxidant_activity" in effect:
-                    result["antioxidant_capacity"] = effect["antioxidant_activity"]
-                    if "Low" in effect["antioxidant_activity"]:
-                        result["findings"].append("Lower antioxidant enzyme activity - increased antioxidant needs")
-
-    return result
-
-
-def analyze_vitamin_e(dna_data: dict) -> Dict[str, Any]:
-    """Analyze vitamin E metabolism"""
-    result = {
+    }, [
+        {"key": "vit_c_transport", "copy_to": "vitamin_c_transport", "cases": [
+            {"contains": "Reduced",
+             "append": {"findings": "Reduced vitamin C transport - may need higher intake"}},
+        ]},
+        {"key": "antioxidant_activity", "copy_to": "antioxidant_capacity", "cases": [
+            {"contains": "Low",
+             "append": {"findings": "Lower antioxidant enzyme activity - increased antioxidant needs"}},
+        ]},
+    ]),
+    "vitamin_e_metabolism": _nutrition_rule(VITAMIN_E_GENETICS, {
         "snps_analyzed": [],
         "vitamin_e_retention": "Unknown",
         "metabolism_rate": "Unknown",
         "findings": []
-    }
+    }, [
+        {"key": "vit_e_status", "copy_to": "vitamin_e_retention", "cases": [
+            {"contains": "Low",
+             "append": {"findings": "Lower vitamin E retention - may benefit from higher intake"}},
+        ]},
+        {"key": "vit_e_metabolism", "copy_to": "metabolism_rate"},
+    ]),
+    "saturated_fat_response": _nutrition_rule(SATURATED_FAT_GENETICS, {
+        "snps_analyzed": [],
+        "sat_fat_sensitivity": "Unknown",
+        "apoe_status": "Unknown",
+        "weight_risk_with_sat_fat": "Unknown",
+        "recommendation": "",
+        "findings": []
+    }, [
+        {"key": "sat_fat_response", "copy_to": "sat_fat_sensitivity", "cases": [
+            {"contains": "Highly Sensitive",
+             "append": {"findings": "APOA2 CC - weight gain risk with high saturated fat"},
+             "set": {"recommendation": "Limit saturated fat intake"}},
+        ]},
+        {"key": "apoe_partial", "copy_to": "apoe_status", "cases": [
+            {"contains": "E4",
+             "append": {"findings": "APOE4 carrier - cholesterol more responsive to sat fat"}},
+        ]},
+        {"key": "weight_risk", "copy_to": "weight_risk_with_sat_fat"},
+    ]),
+    "carbohydrate_metabolism": _nutrition_rule(CARBOHYDRATE_GENETICS, {
+        "snps_analyzed": [],
+        "starch_digestion": "Unknown",
+        "insulin_response": "Unknown",
+        "t2d_genetic_risk": "Unknown",
+        "sugar_preference": "Unknown",
+        "recommendation": "",
+        "findings": []
+    }, [
+        {"key": "starch_digestion", "copy_to": "starch_digestion"},
+        {"key": "t2d_risk", "copy_to": "t2d_genetic_risk", "cases": [
+            {"contains": "High",
+             "append": {"findings": "TCF7L2 TT - significantly elevated T2D genetic risk"}},
+        ]},
+        {"key": "insulin_response", "copy_to": "insulin_response", "cases": [
+            {"contains": "Reduced", "set": {"recommendation": "Consider lower glycemic index foods"}},
+        ]},
+        {"key": "sugar_preference", "copy_to": "sugar_preference", "cases": [
+            {"contains": "Stronger",
+             "append": {"findings": "Genetic tendency for stronger sweet preference"}},
+        ]},
+    ]),
+    "protein_metabolism": _nutrition_rule(PROTEIN_GENETICS, {
+        "snps_analyzed": [],
+        "satiety_response": "Unknown",
+        "protein_benefit": "Unknown",
+        "metabolic_efficiency": "Unknown",
+        "findings": []
+    }, [
+        {"key": "satiety", "copy_to": "satiety_response", "cases": [
+            {"contains": "Reduced",
+             "append": {"findings": "FTO risk variant - may experience reduced satiety"}},
+        ]},
+        {"key": "protein_benefit", "copy_to": "protein_benefit", "cases": [
+            {"contains": "High",
+             "append": {"findings": "Higher protein intake may help with appetite control"}},
+        ]},
+        {"key": "metabolic_type", "copy_to": "metabolic_efficiency"},
+    ]),
+    "sodium_sensitivity": _nutrition_rule(SODIUM_GENETICS, {
+        "snps_analyzed": [],
+        "salt_sensitivity": "Unknown",
+        "blood_pressure_response": "Unknown",
+        "hypertension_risk": "Unknown",
+        "recommendation": "",
+        "findings": []
+    }, [
+        {"key": "salt_sensitivity", "cases": [
+            {"equals": "Higher", "score": 2},
+            {"equals": "Moderate", "score": 1},
+        ]},
+        {"key": "hypertension_risk", "cases": [
+            {"contains": "Elevated", "append": {"findings": "{gene}: elevated hypertension risk"}},
+        ]},
+    ], aggregate="sum", levels_when="present", levels=[
+        {"min": 4, "set": {"salt_sensitivity": "High",
+                           "blood_pressure_response": "Very Sensitive",
+                           "recommendation": "Strong recommendation to limit sodium intake"}},
+        {"min": 2, "set": {"salt_sensitivity": "Moderate",
+                           "blood_pressure_response": "Moderately Sensitive",
+                           "recommendation": "Monitor sodium intake"}},
+        {"set": {"salt_sensitivity": "Normal",
+                 "blood_pressure_response": "Normal",
+                 "recommendation": "Standard dietary sodium recommendations"}},
+    ]),
+}
 
-    for rsid, info in VITAMIN_E_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
 
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
+# =============================================================================
+# MAIN ANALYSIS FUNCTION
+# =============================================================================
 
-            _key = get_genotype_key(genotype, effects)
-            if _key:
+def analyze_nutrition_metabolism(dna_data: dict) -> Dict[str, Any]:
+    """
+    Perform comprehensive nutrition and metabolism genetic analysis.
 
-                effect = effects[_key]
+    Args:
+        dna_data: Dictionary of rsid -> genotype
 
-                if "vit_e_status" in effect:
-                    result["vitamin_e_retention"] = effect["vit_e_status"]
-                    if "Low" in effect["vit_e_status"]:
-                        result["findings"].append("Lower vitamin E retention - may benefit from higher intake")
+    Returns:
+        Dictionary containing all nutrition metabolism analysis results
+    """
+    # Categories that fit the rule kernel are evaluated together from
+    # NUTRITION_SCORE_RULES; omega-3 and alcohol branch on the gene
+    from score_rules import evaluate_score_rules
+    scored = evaluate_score_rules("nutrition_metabolism_database", "NUTRITION_SCORE_RULES", dna_data)
 
-                if "vit_e_metabolism" in effect:
-                    result["metabolism_rate"] = effect["vit_e_metabolism"]
+    results = {
+        "vitamin_a_metabolism": scored["vitamin_a_metabolism"],
+        "vitamin_b12_metabolism": scored["vitamin_b12_metabolism"],
+        "vitamin_c_metabolism": scored["vitamin_c_metabolism"],
+        "vitamin_e_metabolism": scored["vitamin_e_metabolism"],
+        "omega3_metabolism": analyze_omega3(dna_data),
+        "saturated_fat_response": scored["saturated_fat_response"],
+        "carbohydrate_metabolism": scored["carbohydrate_metabolism"],
+        "protein_metabolism": scored["protein_metabolism"],
+        "sodium_sensitivity": scored["sodium_sensitivity"],
+        "alcohol_metabolism": analyze_alcohol(dna_data),
+        "summary": {}
+    }
 
-    return result
+    # Generate overall summary
+    results["summary"] = generate_nutrition_summary(results)
+
+    return results
 
 
 def analyze_omega3(dna_data: dict) -> Dict[str, Any]:
@@ -1242,203 +1241,6 @@ def analyze_omega3(dna_data: dict) -> Dict[str, Any]:
     return result
 
 
-def analyze_saturated_fat(dna_data: dict) -> Dict[str, Any]:
-    """Analyze saturated fat metabolism response"""
-    result = {
-        "snps_analyzed": [],
-        "sat_fat_sensitivity": "Unknown",
-        "apoe_status": "Unknown",
-        "weight_risk_with_sat_fat": "Unknown",
-        "recommendation": "",
-        "findings": []
-    }
-
-    for rsid, info in SATURATED_FAT_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                if "sat_fat_response" in effect:
-                    result["sat_fat_sensitivity"] = effect["sat_fat_response"]
-                    if "Highly Sensitive" in effect["sat_fat_response"]:
-                        result["findings"].append("APOA2 CC - weight gain risk with high saturated fat")
-                        result["recommendation"] = "Limit saturated fat intake"
-
-                if "apoe_partial" in effect:
-                    result["apoe_status"] = effect["apoe_partial"]
-                    if "E4" in effect["apoe_partial"]:
-                        result["findings"].append("APOE4 carrier - cholesterol more responsive to sat fat")
-
-                if "weight_risk" in effect:
-                    result["weight_risk_with_sat_fat"] = effect["weight_risk"]
-
-    return result
-
-
-def analyze_carbohydrate(dna_data: dict) -> Dict[str, Any]:
-    """Analyze carbohydrate metabolism"""
-    result = {
-        "snps_analyzed": [],
-        "starch_digestion": "Unknown",
-        "insulin_response": "Unknown",
-        "t2d_genetic_risk": "Unknown",
-        "sugar_preference": "Unknown",
-        "recommendation": "",
-        "findings": []
-    }
-
-    risk_score = 0
-
-    for rsid, info in CARBOHYDRATE_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                if "starch_digestion" in effect:
-                    result["starch_digestion"] = effect["starch_digestion"]
-
-                if "t2d_risk" in effect:
-                    result["t2d_genetic_risk"] = effect["t2d_risk"]
-                    if "High" in effect["t2d_risk"]:
-                        risk_score += 2
-                        result["findings"].append("TCF7L2 TT - significantly elevated T2D genetic risk")
-                    elif "Increased" in effect["t2d_risk"]:
-                        risk_score += 1
-
-                if "insulin_response" in effect:
-                    result["insulin_response"] = effect["insulin_response"]
-                    if "Reduced" in effect["insulin_response"]:
-                        result["recommendation"] = "Consider lower glycemic index foods"
-
-                if "sugar_preference" in effect:
-                    result["sugar_preference"] = effect["sugar_preference"]
-                    if "Stronger" in effect["sugar_preference"]:
-                        result["findings"].append("Genetic tendency for stronger sweet preference")
-
-    return result
-
-
-def analyze_protein(dna_data: dict) -> Dict[str, Any]:
-    """Analyze protein metabolism"""
-    result = {
-        "snps_analyzed": [],
-        "satiety_response": "Unknown",
-        "protein_benefit": "Unknown",
-        "metabolic_efficiency": "Unknown",
-        "findings": []
-    }
-
-    for rsid, info in PROTEIN_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                if "satiety" in effect:
-                    result["satiety_response"] = effect["satiety"]
-                    if "Reduced" in effect["satiety"]:
-                        result["findings"].append("FTO risk variant - may experience reduced satiety")
-
-                if "protein_benefit" in effect:
-                    result["protein_benefit"] = effect["protein_benefit"]
-                    if "High" in effect["protein_benefit"]:
-                        result["findings"].append("Higher protein intake may help with appetite control")
-
-                if "metabolic_type" in effect:
-                    result["metabolic_efficiency"] = effect["metabolic_type"]
-
-    return result
-
-
-def analyze_sodium(dna_data: dict) -> Dict[str, Any]:
-    """Analyze sodium sensitivity"""
-    result = {
-        "snps_analyzed": [],
-        "salt_sensitivity": "Unknown",
-        "blood_pressure_response": "Unknown",
-        "hypertension_risk": "Unknown",
-        "recommendation": "",
-        "findings": []
-    }
-
-    sensitivity_score = 0
-    snps_found = 0
-
-    for rsid, info in SODIUM_GENETICS.items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            effects = info.get("effect", {})
-            snps_found += 1
-
-            result["snps_analyzed"].append({
-                "rsid": rsid,
-                "gene": info.get("gene", ""),
-                "genotype": genotype
-            })
-
-            _key = get_genotype_key(genotype, effects)
-            if _key:
-
-                effect = effects[_key]
-
-                if effect.get("salt_sensitivity") == "Higher":
-                    sensitivity_score += 2
-                elif effect.get("salt_sensitivity") == "Moderate":
-                    sensitivity_score += 1
-
-                if "hypertension_risk" in effect:
-                    if "Elevated" in effect["hypertension_risk"]:
-                        result["findings"].append(f"{info.get('gene', rsid)}: elevated hypertension risk")
-
-    if snps_found > 0:
-        if sensitivity_score >= 4:
-            result["salt_sensitivity"] = "High"
-            result["blood_pressure_response"] = "Very Sensitive"
-            result["recommendation"] = "Strong recommendation to limit sodium intake"
-        elif sensitivity_score >= 2:
-            result["salt_sensitivity"] = "Moderate"
-            result["blood_pressure_response"] = "Moderately Sensitive"
-            result["recommendation"] = "Monitor sodium intake"
-        else:
-            result["salt_sensitivity"] = "Normal"
-            result["blood_pressure_response"] = "Normal"
-            result["recommendation"] = "Standard dietary sodium recommendations"
-
-    return result
-
-
 def analyze_alcohol(dna_data: dict) -> Dict[str, Any]:
     """Analyze alcohol metabolism"""
     result = {
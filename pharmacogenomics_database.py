@@ -1866,6 +1866,98 @@ DRUG_RECOMMENDATIONS = {
     }
 }
 
+# =============================================================================
+# STAR ALLELE DEFINITIONS (CPIC allele function and activity values)
+# =============================================================================
+# Each allele lists the sites (from the gene's SNP table) where it carries the
+# variant allele - the allele homozygous in the table's last genotype. The
+# reference allele carries none. Phenotypes are assigned from the diplotype's
+# activity score (the sum of both alleles' values) by the first threshold it
+# reaches. CYP2C19 and TPMT have no CPIC activity score; their allele function
+# is scored no = 0, normal = 1, increased = 1.5 so the same thresholds apply.
+# Gene duplications and deletions (CYP2D6 *1xN, *5) are not visible on arrays.
+
+STAR_ALLELE_DEFINITIONS = {
+    "CYP2D6": {
+        "table": "CYP2D6_GENETICS",
+        "reference": "*1",
+        "alleles": {
+            "*2": {"sites": ["rs16947"], "function": "normal", "activity": 1.0},
+            "*3": {"sites": ["rs5030862"], "function": "no", "activity": 0.0},
+            "*4": {"sites": ["rs3892097", "rs1065852"], "function": "no", "activity": 0.0},
+            "*6": {"sites": ["rs5030655"], "function": "no", "activity": 0.0},
+            "*7": {"sites": ["rs28371703"], "function": "no", "activity": 0.0},
+            "*8": {"sites": ["rs5030867"], "function": "no", "activity": 0.0},
+            "*9": {"sites": ["rs5030656"], "function": "decreased", "activity": 0.5},
+            "*10": {"sites": ["rs1065852"], "function": "decreased", "activity": 0.25},
+            "*11": {"sites": ["rs5030865"], "function": "no", "activity": 0.0},
+            "*12": {"sites": ["rs28371704"], "function": "no", "activity": 0.0},
+            "*14": {"sites": ["rs72549353", "rs1065852"], "function": "decreased", "activity": 0.5},
+            "*17": {"sites": ["rs28371706", "rs16947"], "function": "decreased", "activity": 0.5},
+            "*29": {"sites": ["rs59421388", "rs16947"], "function": "decreased", "activity": 0.5},
+            "*35": {"sites": ["rs769258", "rs16947"], "function": "normal", "activity": 1.0},
+            "*41": {"sites": ["rs28371725", "rs16947"], "function": "decreased", "activity": 0.5},
+        },
+        "phenotypes": [(2.5, "Ultrarapid Metabolizer"), (1.25, "Normal Metabolizer"),
+                       (0.25, "Intermediate Metabolizer"), (0.0, "Poor Metabolizer")]
+    },
+    "CYP2C19": {
+        "table": "CYP2C19_GENETICS",
+        "reference": "*1",
+        "alleles": {
+            "*2": {"sites": ["rs4244285"], "function": "no", "activity": 0.0},
+            "*3": {"sites": ["rs4986893"], "function": "no", "activity": 0.0},
+            "*4": {"sites": ["rs28399504"], "function": "no", "activity": 0.0},
+            "*5": {"sites": ["rs56337013"], "function": "no", "activity": 0.0},
+            "*6": {"sites": ["rs72552267"], "function": "no", "activity": 0.0},
+            "*8": {"sites": ["rs72558186"], "function": "no", "activity": 0.0},
+            "*17": {"sites": ["rs12248560"], "function": "increased", "activity": 1.5},
+        },
+        "phenotypes": [(3.0, "Ultrarapid Metabolizer"), (2.5, "Rapid Metabolizer"),
+                       (2.0, "Normal Metabolizer"), (1.0, "Intermediate Metabolizer"),
+                       (0.0, "Poor Metabolizer")]
+    },
+    "CYP2C9": {
+        "table": "CYP2C9_GENETICS",
+        "reference": "*1",
+        "alleles": {
+            "*2": {"sites": ["rs1799853"], "function": "decreased", "activity": 0.5},
+            "*3": {"sites": ["rs1057910"], "function": "no", "activity": 0.0},
+            "*5": {"sites": ["rs28371686"], "function": "decreased", "activity": 0.5},
+            "*6": {"sites": ["rs9332131"], "function": "no", "activity": 0.0},
+            "*8": {"sites": ["rs7900194"], "function": "decreased", "activity": 0.5},
+            "*11": {"sites": ["rs28371685"], "function": "decreased", "activity": 0.5},
+        },
+        "phenotypes": [(2.0, "Normal Metabolizer"), (1.0, "Intermediate Metabolizer"),
+                       (0.0, "Poor Metabolizer")]
+    },
+    "TPMT": {
+        "table": "TPMT_GENETICS",
+        "reference": "*1",
+        "alleles": {
+            "*2": {"sites": ["rs1800462"], "function": "no", "activity": 0.0},
+            "*3A": {"sites": ["rs1800460", "rs1142345"], "function": "no", "activity": 0.0},
+            "*3B": {"sites": ["rs1800460"], "function": "no", "activity": 0.0},
+            "*3C": {"sites": ["rs1142345"], "function": "no", "activity": 0.0},
+            "*3D": {"sites": ["rs1800584"], "function": "no", "activity": 0.0},
+        },
+        "phenotypes": [(2.0, "Normal Metabolizer"), (1.0, "Intermediate Metabolizer"),
+                       (0.0, "Poor Metabolizer")]
+    },
+    "DPYD": {
+        "table": "DPYD_GENETICS",
+        "reference": "*1",
+        "alleles": {
+            "*2A": {"sites": ["rs3918290"], "function": "no", "activity": 0.0},
+            "*13": {"sites": ["rs55886062"], "function": "no", "activity": 0.0},
+            "D949V": {"sites": ["rs67376798"], "function": "decreased", "activity": 0.5},
+            "HapB3": {"sites": ["rs75017182"], "function": "decreased", "activity": 0.5},
+        },
+        "phenotypes": [(2.0, "Normal Metabolizer"), (1.0, "Intermediate Metabolizer"),
+                       (0.0, "Poor Metabolizer")]
+    }
+}
+
 # =============================================================================
 # MAIN ANALYSIS FUNCTION
 # =============================================================================
@@ -1894,6 +1986,26 @@ def get_effect_with_complement(genotype, effect_dict):
     return None
 
 
+# Metabolizer phenotype -> the TPMT / DPYD status wording
+PHENOTYPE_STATUS = {
+    "Normal Metabolizer": "Normal",
+    "Intermediate Metabolizer": "Intermediate",
+    "Poor Metabolizer": "Deficient",
+}
+
+
+def _diplotype_fields(call: Dict[str, Any]) -> Dict[str, Any]:
+    """Diplotype call details added to a gene's results (empty when not called)"""
+    if not call:
+        return {}
+    return {
+        "diplotype": call["diplotype"],
+        "activity_score": call["activity_score"],
+        "diplotype_candidates": call["candidates"],
+        "diplotype_exact": call["exact"],
+    }
+
+
 def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
     """
     Analyze DNA data for pharmacogenomics markers
@@ -1904,11 +2016,15 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
     Returns:
         Dictionary containing pharmacogenomics analysis results
     """
+    from star_allele_caller import call_diplotypes
+
     results = {}
+    # Star-allele diplotypes and activity scores set the metabolizer
+    # phenotypes; the per-SNP effects below are listed for display
+    diplotypes = call_diplotypes(dna_data)
 
     # Analyze CYP2D6
     cyp2d6_results = []
-    cyp2d6_phenotype = "Normal Metabolizer"
     for rsid, snp_info in CYP2D6_GENETICS.items():
         genotype = dna_data.get(rsid)
         if genotype:
@@ -1921,14 +2037,12 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
                     "genotype": genotype,
                     "phenotype": effect["phenotype"]
                 })
-                if effect["activity"] in ["none", "decreased"]:
-                    if "Poor" in effect["phenotype"]:
-                        cyp2d6_phenotype = "Poor Metabolizer"
-                    elif cyp2d6_phenotype != "Poor Metabolizer":
-                        cyp2d6_phenotype = "Intermediate Metabolizer"
+    cyp2d6_call = diplotypes.get("CYP2D6", {})
+    cyp2d6_phenotype = cyp2d6_call.get("phenotype", "Normal Metabolizer")
 
     results["cyp2d6"] = {
         "phenotype": cyp2d6_phenotype,
+        **_diplotype_fields(cyp2d6_call),
         "affected_drugs": ["codeine", "tramadol", "oxycodone", "tamoxifen", "fluoxetine",
                          "paroxetine", "metoprolol", "carvedilol"],
         "recommendation": get_cyp2d6_recommendation(cyp2d6_phenotype),
@@ -1938,7 +2052,6 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
 
     # Analyze CYP2C19
     cyp2c19_results = []
-    cyp2c19_phenotype = "Normal Metabolizer"
     for rsid, snp_info in CYP2C19_GENETICS.items():
         genotype = dna_data.get(rsid)
         if genotype:
@@ -1951,17 +2064,12 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
                     "genotype": genotype,
                     "phenotype": effect["phenotype"]
                 })
-                if "Poor" in effect["phenotype"]:
-                    cyp2c19_phenotype = "Poor Metabolizer"
-                elif "Ultrarapid" in effect["phenotype"]:
-                    cyp2c19_phenotype = "Ultrarapid Metabolizer"
-                elif "Rapid" in effect["phenotype"] and cyp2c19_phenotype == "Normal Metabolizer":
-                    cyp2c19_phenotype = "Rapid Metabolizer"
-                elif "Intermediate" in effect["phenotype"] and cyp2c19_phenotype == "Normal Metabolizer":
-                    cyp2c19_phenotype = "Intermediate Metabolizer"
+    cyp2c19_call = diplotypes.get("CYP2C19", {})
+    cyp2c19_phenotype = cyp2c19_call.get("phenotype", "Normal Metabolizer")
 
     results["cyp2c19"] = {
         "phenotype": cyp2c19_phenotype,
+        **_diplotype_fields(cyp2c19_call),
         "affected_drugs": ["clopidogrel", "omeprazole", "pantoprazole", "citalopram",
                          "escitalopram", "sertraline", "voriconazole"],
         "recommendation": get_cyp2c19_recommendation(cyp2c19_phenotype),
@@ -1971,7 +2079,6 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
 
     # Analyze CYP2C9
     cyp2c9_results = []
-    cyp2c9_phenotype = "Normal Metabolizer"
     for rsid, snp_info in CYP2C9_GENETICS.items():
         genotype = dna_data.get(rsid)
         if genotype:
@@ -1984,11 +2091,12 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
                     "genotype": genotype,
                     "activity": effect["activity"]
                 })
-                if effect["activity"] in ["poor", "decreased"]:
-                    cyp2c9_phenotype = "Poor Metabolizer" if effect["activity"] == "poor" else "Intermediate Metabolizer"
+    cyp2c9_call = diplotypes.get("CYP2C9", {})
+    cyp2c9_phenotype = cyp2c9_call.get("phenotype", "Normal Metabolizer")
 
     results["cyp2c9"] = {
         "phenotype": cyp2c9_phenotype,
+        **_diplotype_fields(cyp2c9_call),
         "affected_drugs": ["warfarin", "phenytoin", "celecoxib", "glimepiride", "glipizide"],
         "recommendation": get_cyp2c9_recommendation(cyp2c9_phenotype),
         "variants_analyzed": len(cyp2c9_results),
@@ -2049,7 +2157,6 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
 
     # Analyze TPMT
     tpmt_results = []
-    tpmt_status = "Normal"
     for rsid, snp_info in TPMT_GENETICS.items():
         genotype = dna_data.get(rsid)
         if genotype:
@@ -2061,13 +2168,12 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
                     "genotype": genotype,
                     "activity": effect["activity"]
                 })
-                if effect["activity"] == "deficient":
-                    tpmt_status = "Deficient"
-                elif effect["activity"] == "intermediate" and tpmt_status != "Deficient":
-                    tpmt_status = "Intermediate"
+    tpmt_call = diplotypes.get("TPMT", {})
+    tpmt_status = PHENOTYPE_STATUS.get(tpmt_call.get("phenotype"), "Normal")
 
     results["tpmt_thiopurines"] = {
         "status": tpmt_status,
+        **_diplotype_fields(tpmt_call),
         "affected_drugs": ["azathioprine", "mercaptopurine", "thioguanine"],
         "recommendation": get_tpmt_recommendation(tpmt_status),
         "variants_analyzed": len(tpmt_results),
@@ -2076,7 +2182,6 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
 
     # Analyze DPYD
     dpyd_results = []
-    dpyd_status = "Normal"
     for rsid, snp_info in DPYD_GENETICS.items():
         genotype = dna_data.get(rsid)
         if genotype:
@@ -2088,13 +2193,12 @@ def analyze_pharmacogenomics(dna_data: Dict[str, str]) -> Dict[str, Any]:
                     "genotype": genotype,
                     "activity": effect["activity"]
                 })
-                if effect["activity"] == "deficient":
-                    dpyd_status = "Deficient"
-                elif effect["activity"] == "intermediate" and dpyd_status != "Deficient":
-                    dpyd_status = "Intermediate"
+    dpyd_call = diplotypes.get("DPYD", {})
+    dpyd_status = PHENOTYPE_STATUS.get(dpyd_call.get("phenotype"), "Normal")
 
     results["dpyd_fluoropyrimidines"] = {
         "status": dpyd_status,
+        **_diplotype_fields(dpyd_call),
         "affected_drugs": ["5-fluorouracil", "capecitabine"],
         "recommendation": get_dpyd_recommendation(dpyd_status),
         "variants_analyzed": len(dpyd_results),
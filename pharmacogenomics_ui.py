@@ -71,6 +71,17 @@ class PharmacogenomicsFrame(ctk.CTkScrollableFrame):
 
         return frame
 
+    def create_diplotype_row(self, parent: ctk.CTkFrame, data: Dict[str, Any]):
+        """Star-allele diplotype and activity score, when the gene was called"""
+        if not data.get("diplotype"):
+            return
+        detail = "" if data.get("diplotype_exact", True) else "closest match"
+        self.create_result_row(
+            parent, "Diplotype:",
+            f"{data['diplotype']} (activity score {data['activity_score']:g})",
+            detail=detail, color="#4ECDC4"
+        )
+
     def create_result_row(self, parent: ctk.CTkFrame, label: str, value: str,
                           detail: str = "", color: str = None):
         """Create a row displaying a result"""
@@ -199,6 +210,7 @@ class PharmacogenomicsFrame(ctk.CTkScrollableFrame):
             frame, "Metabolizer Status:",
             data.get("phenotype", "Unknown")
         )
+        self.create_diplotype_row(frame, data)
 
         rec = data.get("recommendation", "")
         if rec:
@@ -235,6 +247,7 @@ class PharmacogenomicsFrame(ctk.CTkScrollableFrame):
             frame, "Metabolizer Status:",
             data.get("phenotype", "Unknown")
         )
+        self.create_diplotype_row(frame, data)
 
         rec = data.get("recommendation", "")
         if rec:
@@ -261,6 +274,7 @@ class PharmacogenomicsFrame(ctk.CTkScrollableFrame):
             frame, "Metabolizer Status:",
             data.get("phenotype", "Unknown")
         )
+        self.create_diplotype_row(frame, data)
 
         rec = data.get("recommendation", "")
         if rec:
@@ -338,6 +352,7 @@ class PharmacogenomicsFrame(ctk.CTkScrollableFrame):
             frame, "TPMT Status:",
             data.get("status", "Unknown")
         )
+        self.create_diplotype_row(frame, data)
 
         rec = data.get("recommendation", "")
         if rec:
@@ -364,6 +379,7 @@ class PharmacogenomicsFrame(ctk.CTkScrollableFrame):
             frame, "DPYD Status:",
             data.get("status", "Unknown")
         )
+        self.create_diplotype_row(frame, data)
 
         rec = data.get("recommendation", "")
         if rec:
@@ -1964,6 +1964,149 @@ REPRODUCTION_GENETICS_DATABASE = {
 }
 
 
+# =============================================================================
+# SCORE RULES (compiled by score_rules)
+# =============================================================================
+
+REPRODUCTION_SCORE_RULES = {
+    'male_fertility': {
+        'markers': MALE_FERTILITY_GENETICS['markers'],
+        'score': 'fertility_score', 'default': 0.5,
+        'result': {
+            'overall': 'Normal',
+            'score': 0.5,
+            'markers_found': [],
+            'description': ''
+        },
+        'found': {'phenotype': 'phenotype'},
+        'levels': [
+            {'min': 0.6, 'set': {'overall': 'Favorable', 'description': 'Your genetics suggest good male reproductive health markers.'}},
+            {'max': 0.4, 'set': {'overall': 'May need attention', 'description': 'Some genetic factors may affect fertility. Consider consultation if trying to conceive.'}},
+            {'set': {'overall': 'Normal', 'description': 'Your male fertility genetics are typical.'}},
+        ]
+    },
+    'female_fertility': {
+        'markers': FEMALE_FERTILITY_GENETICS['markers'],
+        'score': 'fertility_score', 'default': 0.5,
+        'result': {
+            'overall': 'Normal',
+            'score': 0.5,
+            'ovarian_response': 'Normal',
+            'markers_found': [],
+            'description': ''
+        },
+        'found': {'phenotype': 'phenotype'},
+        'levels': [
+            {'min': 0.6, 'set': {'overall': 'Favorable', 'ovarian_response': 'Good', 'description': 'Your genetics suggest good ovarian reserve and response markers.'}},
+            {'max': 0.4, 'set': {'overall': 'May benefit from early planning', 'ovarian_response': 'May be lower', 'description': 'Consider fertility assessment if planning pregnancy.'}},
+            {'set': {'overall': 'Normal', 'description': 'Your female fertility genetics are typical.'}},
+        ]
+    },
+    'menopause_timing': {
+        'markers': MENOPAUSE_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'timing': 'Average',
+            'score': 0.5,
+            'markers_found': [],
+            'description': ''
+        },
+        'found': {'phenotype': 'phenotype'},
+        'levels': [
+            {'min': 0.6, 'set': {'timing': 'Later than average', 'description': 'Your genetics suggest menopause may occur later than average.'}},
+            {'max': 0.4, 'set': {'timing': 'Earlier than average', 'description': 'Your genetics suggest menopause may occur earlier. Consider fertility timeline planning.'}},
+            {'set': {'timing': 'Average', 'description': 'Your menopause timing genetics are typical (average ~51 years).'}},
+        ]
+    },
+    'twin_probability': {
+        'markers': TWIN_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'probability': 'Normal',
+            'odds_multiplier': '1x',
+            'score': 0.5,
+            'markers_found': [],
+            'description': ''
+        },
+        'found': {'twin_odds': ['twin_odds', '1x']},
+        'levels': [
+            {'min': 0.6, 'set': {'probability': 'Increased', 'odds_multiplier': '~1.3-1.5x baseline', 'description': 'You have genetic variants associated with higher fraternal twin probability.'}},
+            {'set': {'probability': 'Normal', 'odds_multiplier': '~1x baseline', 'description': 'Your twin probability genetics are typical.'}},
+        ]
+    },
+    'endometriosis_risk': {
+        'markers': ENDOMETRIOSIS_GENETICS['markers'],
+        'score': 'risk_score', 'default': 0.5,
+        'score_field': 'risk_score',
+        'count_field': 'risk_variants_found',
+        'result': {
+            'risk_level': 'Unknown',
+            'risk_score': 0.5,
+            'markers_found': [],
+            'risk_variants_found': 0,
+            'description': 'No genetic markers for this condition were found in your DNA file.'
+        },
+        'found': {'phenotype': 'phenotype'},
+        'levels': [
+            {'min': 0.6, 'set': {'risk_level': 'Elevated', 'description': 'You have genetic variants associated with higher endometriosis risk.'}},
+            {'max': 0.4, 'set': {'risk_level': 'Lower', 'description': 'You have lower genetic risk for endometriosis.'}},
+            {'set': {'risk_level': 'Average', 'description': 'Your endometriosis risk genetics are typical.'}},
+        ]
+    },
+    'pcos_risk': {
+        'markers': PCOS_GENETICS['markers'],
+        'score': 'risk_score', 'default': 0.5,
+        'score_field': 'risk_score',
+        'count_field': 'risk_variants_found',
+        'result': {
+            'risk_level': 'Unknown',
+            'risk_score': 0.5,
+            'markers_found': [],
+            'risk_variants_found': 0,
+            'description': 'No genetic markers for this condition were found in your DNA file.'
+        },
+        'found': {'phenotype': 'phenotype'},
+        'levels': [
+            {'min': 0.6, 'set': {'risk_level': 'Elevated', 'description': 'You have genetic variants associated with higher PCOS risk.'}},
+            {'max': 0.4, 'set': {'risk_level': 'Lower', 'description': 'You have lower genetic risk for PCOS.'}},
+            {'set': {'risk_level': 'Average', 'description': 'Your PCOS risk genetics are typical.'}},
+        ]
+    },
+    'testosterone': {
+        'markers': TESTOSTERONE_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'level_tendency': 'Average',
+            'score': 0.5,
+            'markers_found': [],
+            'description': ''
+        },
+        'found': {'phenotype': 'phenotype'},
+        'levels': [
+            {'min': 0.6, 'set': {'level_tendency': 'Higher', 'description': 'Your genetics suggest higher free testosterone levels.'}},
+            {'max': 0.4, 'set': {'level_tendency': 'Lower', 'description': 'Your genetics suggest lower free testosterone levels.'}},
+            {'set': {'level_tendency': 'Average', 'description': 'Your testosterone genetics are typical.'}},
+        ]
+    },
+    'estrogen_metabolism': {
+        'markers': ESTROGEN_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'metabolism': 'Normal',
+            'score': 0.5,
+            'markers_found': [],
+            'description': ''
+        },
+        'found': {'metabolism': ['metabolism', '']},
+        'levels': [
+            {'min': 0.6, 'set': {'metabolism': 'Faster', 'description': 'You metabolize estrogen more quickly.'}},
+            {'max': 0.4, 'set': {'metabolism': 'Slower', 'description': 'You metabolize estrogen more slowly - may have longer estrogen exposure.'}},
+            {'set': {'metabolism': 'Normal', 'description': 'Your estrogen metabolism is typical.'}},
+        ]
+    },
+}
+
+
 # =============================================================================
 # ANALYSIS FUNCTIONS
 # =============================================================================
@@ -2045,17 +2188,11 @@ def analyze_reproduction_genetics(dna_data: dict) -> dict:
     Returns:
         Dictionary with all reproduction trait analysis
     """
-    results = {
-        'male_fertility': analyze_male_fertility(dna_data),
-        'female_fertility': analyze_female_fertility(dna_data),
-        'menopause_timing': analyze_menopause(dna_data),
-        'twin_probability': analyze_twins(dna_data),
-        'endometriosis_risk': analyze_endometriosis(dna_data),
-        'pcos_risk': analyze_pcos(dna_data),
-        'testosterone': analyze_testosterone(dna_data),
-        'estrogen_metabolism': analyze_estrogen(dna_data),
-        'pregnancy_risks': analyze_pregnancy_risks(dna_data)
-    }
+    # Score categories are evaluated together from REPRODUCTION_SCORE_RULES
+    from score_rules import evaluate_score_rules
+    results = evaluate_score_rules('reproduction_genetics_database', 'REPRODUCTION_SCORE_RULES',
+                                   dna_data, resolver='get_genotype_match')
+    results['pregnancy_risks'] = analyze_pregnancy_risks(dna_data)
 
     results['summary'] = generate_reproduction_summary(results)
     results['recommendations'] = generate_reproduction_recommendations(results)
@@ -2063,311 +2200,6 @@ def analyze_reproduction_genetics(dna_data: dict) -> dict:
     return results
 
 
-def analyze_male_fertility(dna_data: dict) -> dict:
-    """Analyze male fertility genetics"""
-    result = {
-        'overall': 'Normal',
-        'score': 0.5,
-        'markers_found': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, marker_data in MALE_FERTILITY_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('fertility_score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'phenotype': data['phenotype']
-                })
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.6:
-            result['overall'] = 'Favorable'
-            result['description'] = 'Your genetics suggest good male reproductive health markers.'
-        elif avg <= 0.4:
-            result['overall'] = 'May need attention'
-            result['description'] = 'Some genetic factors may affect fertility. Consider consultation if trying to conceive.'
-        else:
-            result['overall'] = 'Normal'
-            result['description'] = 'Your male fertility genetics are typical.'
-
-    return result
-
-
-def analyze_female_fertility(dna_data: dict) -> dict:
-    """Analyze female fertility genetics"""
-    result = {
-        'overall': 'Normal',
-        'score': 0.5,
-        'ovarian_response': 'Normal',
-        'markers_found': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, marker_data in FEMALE_FERTILITY_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('fertility_score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'phenotype': data['phenotype']
-                })
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.6:
-            result['overall'] = 'Favorable'
-            result['ovarian_response'] = 'Good'
-            result['description'] = 'Your genetics suggest good ovarian reserve and response markers.'
-        elif avg <= 0.4:
-            result['overall'] = 'May benefit from early planning'
-            result['ovarian_response'] = 'May be lower'
-            result['description'] = 'Consider fertility assessment if planning pregnancy.'
-        else:
-            result['overall'] = 'Normal'
-            result['description'] = 'Your female fertility genetics are typical.'
-
-    return result
-
-
-def analyze_menopause(dna_data: dict) -> dict:
-    """Analyze menopause timing genetics"""
-    result = {
-        'timing': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, marker_data in MENOPAUSE_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'phenotype': data['phenotype']
-                })
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.6:
-            result['timing'] = 'Later than average'
-            result['description'] = 'Your genetics suggest menopause may occur later than average.'
-        elif avg <= 0.4:
-            result['timing'] = 'Earlier than average'
-            result['description'] = 'Your genetics suggest menopause may occur earlier. Consider fertility timeline planning.'
-        else:
-            result['timing'] = 'Average'
-            result['description'] = 'Your menopause timing genetics are typical (average ~51 years).'
-
-    return result
-
-
-def analyze_twins(dna_data: dict) -> dict:
-    """Analyze twin probability genetics"""
-    result = {
-        'probability': 'Normal',
-        'odds_multiplier': '1x',
-        'score': 0.5,
-        'markers_found': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, marker_data in TWIN_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'twin_odds': data.get('twin_odds', '1x')
-                })
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.6:
-            result['probability'] = 'Increased'
-            result['odds_multiplier'] = '~1.3-1.5x baseline'
-            result['description'] = 'You have genetic variants associated with higher fraternal twin probability.'
-        else:
-            result['probability'] = 'Normal'
-            result['odds_multiplier'] = '~1x baseline'
-            result['description'] = 'Your twin probability genetics are typical.'
-
-    return result
-
-
-def analyze_endometriosis(dna_data: dict) -> dict:
-    """Analyze endometriosis risk genetics"""
-    result = {
-        'risk_level': 'Unknown',
-        'risk_score': 0.5,
-        'markers_found': [],
-        'risk_variants_found': 0,
-        'description': 'No genetic markers for this condition were found in your DNA file.'
-    }
-
-    scores = []
-    for rsid, marker_data in ENDOMETRIOSIS_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('risk_score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'phenotype': data['phenotype']
-                })
-
-    result['risk_variants_found'] = len(result['markers_found'])
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['risk_score'] = avg
-        if avg >= 0.6:
-            result['risk_level'] = 'Elevated'
-            result['description'] = 'You have genetic variants associated with higher endometriosis risk.'
-        elif avg <= 0.4:
-            result['risk_level'] = 'Lower'
-            result['description'] = 'You have lower genetic risk for endometriosis.'
-        else:
-            result['risk_level'] = 'Average'
-            result['description'] = 'Your endometriosis risk genetics are typical.'
-
-    return result
-
-
-def analyze_pcos(dna_data: dict) -> dict:
-    """Analyze PCOS risk genetics"""
-    result = {
-        'risk_level': 'Unknown',
-        'risk_score': 0.5,
-        'markers_found': [],
-        'risk_variants_found': 0,
-        'description': 'No genetic markers for this condition were found in your DNA file.'
-    }
-
-    scores = []
-    for rsid, marker_data in PCOS_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('risk_score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'phenotype': data['phenotype']
-                })
-
-    result['risk_variants_found'] = len(result['markers_found'])
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['risk_score'] = avg
-        if avg >= 0.6:
-            result['risk_level'] = 'Elevated'
-            result['description'] = 'You have genetic variants associated with higher PCOS risk.'
-        elif avg <= 0.4:
-            result['risk_level'] = 'Lower'
-            result['description'] = 'You have lower genetic risk for PCOS.'
-        else:
-            result['risk_level'] = 'Average'
-            result['description'] = 'Your PCOS risk genetics are typical.'
-
-    return result
-
-
-def analyze_testosterone(dna_data: dict) -> dict:
-    """Analyze testosterone genetics"""
-    result = {
-        'level_tendency': 'Average',
-        'score': 0.5,
-        'markers_found': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, marker_data in TESTOSTERONE_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'phenotype': data['phenotype']
-                })
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.6:
-            result['level_tendency'] = 'Higher'
-            result['description'] = 'Your genetics suggest higher free testosterone levels.'
-        elif avg <= 0.4:
-            result['level_tendency'] = 'Lower'
-            result['description'] = 'Your genetics suggest lower free testosterone levels.'
-        else:
-            result['level_tendency'] = 'Average'
-            result['description'] = 'Your testosterone genetics are typical.'
-
-    return result
-
-
-def analyze_estrogen(dna_data: dict) -> dict:
-    """Analyze estrogen metabolism genetics"""
-    result = {
-        'metabolism': 'Normal',
-        'score': 0.5,
-        'markers_found': [],
-        'description': ''
-    }
-
-    scores = []
-    for rsid, marker_data in ESTROGEN_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            matched_key, data = get_genotype_match(genotype, marker_data['genotypes'])
-            if data:
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid, 'gene': marker_data['gene'],
-                    'genotype': genotype, 'metabolism': data.get('metabolism', '')
-                })
-
-    if scores:
-        avg = sum(scores) / len(scores)
-        result['score'] = avg
-        if avg >= 0.6:
-            result['metabolism'] = 'Faster'
-            result['description'] = 'You metabolize estrogen more quickly.'
-        elif avg <= 0.4:
-            result['metabolism'] = 'Slower'
-            result['description'] = 'You metabolize estrogen more slowly - may have longer estrogen exposure.'
-        else:
-            result['metabolism'] = 'Normal'
-            result['description'] = 'Your estrogen metabolism is typical.'
-
-    return result
-
-
 def analyze_pregnancy_risks(dna_data: dict) -> dict:
     """Analyze pregnancy complication risks"""
     result = {
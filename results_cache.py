@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Persistent Results Cache
+Stores each analysis module's output per kit on disk, so re-opening a kit
+loads unchanged sections instantly.
+
+Entries are keyed by (kit fingerprint, module, module version). The module
+version is a hash of the marker tables the module reads (the 'tables' of its
+ANALYSIS_MODULES entry) and of its inputs' versions, so when a database
+changes only the modules reading it miss and are recomputed. The cache is a
+single SQLite file with a size cap; least recently used entries are evicted
+first.
+
+With store_kits the kits' genotypes are kept as well, so after a database
+update 'reanalyze' recomputes just the modules whose tables changed, for
+every stored kit, without the original files.
+
+Usage: python results_cache.py [--path FILE] stats|list|prune|reanalyze|clear
+    stats                   entry count and size per module
+    list [--kit PREFIX]     cached kits (or one kit's modules)
+    prune [--max-mb N] [--older-than DAYS] [--stale]
+                            evict down to a size, drop old entries, or drop
+                            entries whose tables have changed since
+    reanalyze [-j N] [--dry-run]
+                            recompute stale modules of the stored kits
+    clear                   delete everything
+"""
+
+import argparse
+import functools
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'DNA_ANALYSIS_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.dna_analysis_tool'))
+DEFAULT_CACHE_FILE = 'results_cache.sqlite'
+
+# Size cap for the cache file contents
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Seconds a writer waits for another process holding the database lock
+BUSY_TIMEOUT = 60.0
+
+
+# =============================================================================
+# TABLE HASHES
+# =============================================================================
+
+def _json_default(obj):
+    # Sets have no stable order; everything else falls back to repr
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    return repr(obj)
+
+
+@functools.lru_cache(maxsize=None)
+def table_hash(ref: str) -> str:
+    """
+    Content hash of a marker table.
+
+    ref is 'module.TABLE' for one table, or 'module' for every upper-case
+    table the module defines.
+    """
+    module_name, _, table = ref.partition('.')
+    module = importlib.import_module(module_name)
+    names = [table] if table else sorted(n for n in vars(module) if n.isupper())
+
+    digest = hashlib.sha1()
+    for name in names:
+        digest.update(name.encode())
+        digest.update(json.dumps(getattr(module, name), sort_keys=True,
+                                 default=_json_default).encode())
+    return digest.hexdigest()[:16]
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class ResultsCache:
+    """On-disk LRU cache of module results per kit"""
+
+    def __init__(self, path: str = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 store_kits: bool = False):
+        if path is None:
+            path = os.path.join(DEFAULT_CACHE_DIR, DEFAULT_CACHE_FILE)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        # Keep kit genotypes for reanalysis (see put_kit)
+        self.store_kits = store_kits
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                kit TEXT NOT NULL,
+                module TEXT NOT NULL,
+                version TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (kit, module)
+            )''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS kits (
+                kit TEXT PRIMARY KEY,
+                snps INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                data BLOB NOT NULL
+            )''')
+        self._db.commit()
+
+    def get(self, kit: str, module: str, version: str) -> Tuple[bool, Any]:
+        """(found, result); an entry stored under another version is a miss"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT data FROM results WHERE kit = ? AND module = ? AND version = ?',
+                (kit, module, version)).fetchone()
+            if row is None:
+                return False, None
+            self._db.execute('UPDATE results SET accessed = ? WHERE kit = ? AND module = ?',
+                             (time.time(), kit, module))
+            self._db.commit()
+        try:
+            return True, pickle.loads(zlib.decompress(row[0]))
+        except Exception:
+            # Unreadable entry (e.g. written by an incompatible version)
+            self.delete(kit, module)
+            return False, None
+
+    def put(self, kit: str, module: str, version: str, result: Any):
+        """Store a result, replacing any older version for the kit and module"""
+        data = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kit, module, version, len(data), now, now, data))
+            self._db.commit()
+        self.evict(self.max_bytes)
+
+    def delete(self, kit: str, module: str = None):
+        with self._lock:
+            if module is None:
+                self._db.execute('DELETE FROM results WHERE kit = ?', (kit,))
+                self._db.execute('DELETE FROM kits WHERE kit = ?', (kit,))
+            else:
+                self._db.execute('DELETE FROM results WHERE kit = ? AND module = ?', (kit, module))
+            self._db.commit()
+
+    # -------------------------------------------------------------------------
+    # STORED KITS
+    # -------------------------------------------------------------------------
+
+    def has_kit(self, kit: str) -> bool:
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM kits WHERE kit = ?', (kit,)).fetchone() is not None
+
+    def put_kit(self, kit: str, snp_dict: Dict[str, str]):
+        """Store a kit's genotypes (rsid -> genotype) under its fingerprint"""
+        data = zlib.compress(pickle.dumps(snp_dict, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO kits VALUES (?, ?, ?, ?, ?)',
+                             (kit, len(snp_dict), len(data), time.time(), data))
+            self._db.commit()
+
+    def get_kit(self, kit: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._db.execute('SELECT data FROM kits WHERE kit = ?', (kit,)).fetchone()
+        return None if row is None else pickle.loads(zlib.decompress(row[0]))
+
+    def stored_kits(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute('SELECT kit FROM kits ORDER BY created')]
+
+    def module_versions(self, kit: str) -> Dict[str, str]:
+        """module -> version of every result cached for a kit"""
+        with self._lock:
+            return dict(self._db.execute(
+                'SELECT module, version FROM results WHERE kit = ?', (kit,)).fetchall())
+
+    # -------------------------------------------------------------------------
+    # SIZE LIMITS
+    # -------------------------------------------------------------------------
+
+    def _total_bytes(self) -> int:
+        return self._db.execute(
+            'SELECT (SELECT COALESCE(SUM(size), 0) FROM results)'
+            ' + (SELECT COALESCE(SUM(size), 0) FROM kits)').fetchone()[0]
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes()
+
+    def evict(self, max_bytes: int) -> int:
+        """
+        Drop least recently used entries until the total is within max_bytes.
+        A stored kit goes once none of its results are left.
+        """
+        removed = 0
+        with self._lock:
+            total = self._total_bytes()
+            if total <= max_bytes:
+                return 0
+            for kit, module, size in self._db.execute(
+                    'SELECT kit, module, size FROM results ORDER BY accessed').fetchall():
+                if total <= max_bytes:
+                    break
+                self._db.execute('DELETE FROM results WHERE kit = ? AND module = ?', (kit, module))
+                total -= size
+                removed += 1
+            self._db.execute('DELETE FROM kits WHERE kit NOT IN (SELECT DISTINCT kit FROM results)')
+            self._db.commit()
+        return removed
+
+    def prune_older_than(self, seconds: float) -> int:
+        with self._lock:
+            cursor = self._db.execute('DELETE FROM results WHERE accessed < ?',
+                                      (time.time() - seconds,))
+            self._db.execute('DELETE FROM kits WHERE kit NOT IN (SELECT DISTINCT kit FROM results)')
+            self._db.commit()
+            return cursor.rowcount
+
+    def prune_stale(self, versions: Dict[str, str]) -> int:
+        """Drop entries whose version differs from the current module versions"""
+        removed = 0
+        with self._lock:
+            for module, version in versions.items():
+                cursor = self._db.execute(
+                    'DELETE FROM results WHERE module = ? AND version != ?', (module, version))
+                removed += cursor.rowcount
+            self._db.commit()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM results')
+            self._db.execute('DELETE FROM kits')
+            self._db.commit()
+            self._db.execute('VACUUM')
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """module -> {'entries': n, 'bytes': size}"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT module, COUNT(*), SUM(size) FROM results GROUP BY module ORDER BY module'
+            ).fetchall()
+        return {module: {'entries': count, 'bytes': size} for module, count, size in rows}
+
+    def kits(self) -> List[Tuple[str, int, int, float]]:
+        """(kit fingerprint, modules cached, bytes, last access) per kit"""
+        with self._lock:
+            return self._db.execute(
+                'SELECT kit, COUNT(*), SUM(size), MAX(accessed) FROM results '
+                'GROUP BY kit ORDER BY MAX(accessed) DESC').fetchall()
+
+    def kit_entries(self, kit_prefix: str) -> List[Tuple[str, str, str, int, float]]:
+        """(kit, module, version, bytes, last access) for kits matching a prefix"""
+        with self._lock:
+            return self._db.execute(
+                'SELECT kit, module, version, size, accessed FROM results '
+                'WHERE kit LIKE ? ORDER BY kit, module', (kit_prefix + '%',)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_results_cache(path: str = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                       store_kits: bool = False) -> Optional[ResultsCache]:
+    """Open the cache, or return None (caching disabled) if it can't be opened"""
+    try:
+        return ResultsCache(path, max_bytes=max_bytes, store_kits=store_kits)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: results cache disabled: {e}")
+        return None
+
+
+# =============================================================================
+# REANALYSIS
+# =============================================================================
+
+_REANALYSIS_ENGINE = None
+
+
+def _init_reanalysis_worker(path: str):
+    global _REANALYSIS_ENGINE
+    from comprehensive_analysis import ComprehensiveDNAAnalysisEngine
+    _REANALYSIS_ENGINE = ComprehensiveDNAAnalysisEngine(results_cache=ResultsCache(path))
+
+
+def _reanalyze_kit(kit: str, modules: List[str]) -> Dict[str, Any]:
+    """Recompute modules of one stored kit (runs in a worker process)"""
+    start = time.perf_counter()
+    engine = _REANALYSIS_ENGINE
+    snp_dict = engine.results_cache.get_kit(kit)
+    if snp_dict is None:
+        return {'kit': kit, 'recomputed': 0, 'errors': {'kit': 'not stored'}, 'seconds': 0.0}
+
+    engine.load_snp_dict(snp_dict, fingerprint=kit)
+    results = engine.analyze_loaded_kit(backend='serial', modules=modules)
+    return {'kit': kit,
+            'recomputed': len(results.module_timings) - len(results.cached_modules),
+            'errors': results.module_errors,
+            'seconds': round(time.perf_counter() - start, 4)}
+
+
+def stale_modules(cache: ResultsCache, versions: Dict[str, str]) -> Dict[str, List[str]]:
+    """Stored kit -> its cached modules whose version is no longer current"""
+    stale = {}
+    for kit in cache.stored_kits():
+        modules = [module for module, version in cache.module_versions(kit).items()
+                   if module in versions and version != versions[module]]
+        if modules:
+            stale[kit] = sorted(modules)
+    return stale
+
+
+def reanalyze(cache: ResultsCache, workers: int = None, dry_run: bool = False) -> List[Dict]:
+    """
+    Recompute, for every stored kit, the cached modules whose tables (or
+    inputs) changed since they were computed. Modules still current are
+    reused, so only the delta is computed. Kits run in parallel.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from comprehensive_analysis import ANALYSIS_MODULES, module_version
+
+    versions = {name: module_version(name) for name in ANALYSIS_MODULES}
+    todo = stale_modules(cache, versions)
+
+    counts = {}
+    for modules in todo.values():
+        for module in modules:
+            counts[module] = counts.get(module, 0) + 1
+    print(f"{len(todo)} of {len(cache.stored_kits())} stored kits have stale modules")
+    for module, count in sorted(counts.items(), key=lambda x: -x[1]):
+        print(f"  {module:<28} {count:>6} kits")
+    if dry_run or not todo:
+        return []
+
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    records = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_reanalysis_worker,
+                             initargs=(cache.path,)) as pool:
+        futures = [pool.submit(_reanalyze_kit, kit, modules) for kit, modules in todo.items()]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            errors = f"  errors: {record['errors']}" if record['errors'] else ""
+            print(f"  [{len(records)}/{len(todo)}] {record['kit'][:12]}: "
+                  f"{record['recomputed']} modules in {record['seconds']:.2f}s{errors}")
+    print(f"Reanalyzed {len(records)} kits in {time.perf_counter() - start:.1f}s "
+          f"on {workers} workers")
+    return records
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _format_bytes(size: Optional[int]) -> str:
+    size = size or 0
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _format_time(timestamp: float) -> str:
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Inspect and prune the analysis results cache')
+    parser.add_argument('--path', help='cache file (default: %(default)s)',
+                        default=os.path.join(DEFAULT_CACHE_DIR, DEFAULT_CACHE_FILE))
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help='entries and size per module')
+    list_parser = commands.add_parser('list', help='cached kits, or one kit\'s modules')
+    list_parser.add_argument('--kit', help='kit fingerprint (or prefix)')
+    prune_parser = commands.add_parser('prune', help='evict entries')
+    prune_parser.add_argument('--max-mb', type=float, help='evict LRU entries down to this size')
+    prune_parser.add_argument('--older-than', type=float, metavar='DAYS',
+                              help='drop entries not used for this many days')
+    prune_parser.add_argument('--stale', action='store_true',
+                              help='drop entries computed from tables that have since changed')
+    reanalyze_parser = commands.add_parser(
+        'reanalyze', help='recompute stale modules of the stored kits')
+    reanalyze_parser.add_argument('-j', '--workers', type=int,
+                                  help='worker processes (default: CPU count)')
+    reanalyze_parser.add_argument('--dry-run', action='store_true',
+                                  help='only report what would be recomputed')
+    commands.add_parser('clear', help='delete every entry')
+    args = parser.parse_args(argv)
+
+    cache = ResultsCache(args.path)
+
+    if args.command == 'stats':
+        stats = cache.stats()
+        for module, entry in stats.items():
+            print(f"  {module:<28} {entry['entries']:>6} kits  {_format_bytes(entry['bytes']):>10}")
+        print(f"{sum(e['entries'] for e in stats.values())} entries, "
+              f"{len(cache.stored_kits())} stored kits, "
+              f"{_format_bytes(cache.total_bytes())} in {cache.path}")
+
+    elif args.command == 'list':
+        if args.kit:
+            for kit, module, version, size, accessed in cache.kit_entries(args.kit):
+                print(f"  {kit[:12]}  {module:<28} {version:<22} "
+                      f"{_format_bytes(size):>10}  {_format_time(accessed)}")
+        else:
+            for kit, modules, size, accessed in cache.kits():
+                print(f"  {kit[:12]}  {modules:>3} modules  {_format_bytes(size):>10}  "
+                      f"last used {_format_time(accessed)}")
+
+    elif args.command == 'prune':
+        removed = 0
+        if args.stale:
+            from comprehensive_analysis import ANALYSIS_MODULES, module_version
+            removed += cache.prune_stale({name: module_version(name) for name in ANALYSIS_MODULES})
+        if args.older_than is not None:
+            removed += cache.prune_older_than(args.older_than * 86400)
+        if args.max_mb is not None:
+            removed += cache.evict(int(args.max_mb * 1024 * 1024))
+        print(f"Removed {removed} entries; {_format_bytes(cache.total_bytes())} remaining")
+
+    elif args.command == 'reanalyze':
+        reanalyze(cache, workers=args.workers, dry_run=args.dry_run)
+
+    elif args.command == 'clear':
+        cache.clear()
+        print(f"Cleared {cache.path}")
+
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Score Rule Tables
+Table-driven kernel for the score-averaging category analyzers (sleep,
+behavioral, reproduction, nutrition, immune).
+
+Each of those analyzers looked a kit up against a marker table, resolved
+the genotype orientation, averaged (or summed, or took the max of) a
+per-genotype score and binned it into levels, copying effect fields and
+findings into the result on the way. A category is now a rule: a plain dict
+naming its marker table(s) and how to read and bin them. A module's rules
+are compiled once: every marker entry gets a genotype -> code lookup with
+orientation already resolved (by the module's own resolver), and every code
+its score, markers_found fields and flags prepared ahead. A kit is then one
+pass over the rsids it actually has, one dict lookup per matching entry; no
+resolver, table walk or per-genotype dict building at run time.
+
+Rule keys:
+    markers     marker table {rsid: marker}, or
+    sources     [{'markers': table, 'rsids': [...]}, ...] read in order
+    genotypes   key of a marker's genotype dict (default 'genotypes')
+    score       score key in a genotype entry; 'default' when it may be missing
+    aggregate   'mean' (default), 'max' or 'sum' (0 when nothing scored)
+    score_field result field that receives the aggregate (default 'score',
+                None for none)
+    result      result before any marker is found
+    found_field result list of the markers found (default 'markers_found')
+    list_present also list rule markers in the kit whose genotype matches no
+                entry (they add nothing else)
+    marker_fields fields after rsid, gene and genotype taken from the marker:
+                {field: [key, default]}
+    found       fields after those taken from the genotype entry:
+                {field: key} (required) or {field: [key, default]}
+    collect     {result list: genotype list key} extended per marker found
+    flags       [{'key': k, 'set': {...}}]             set when entry[k] is truthy
+                [{'key': k, 'in': [...], 'set': {...}}] set when entry[k] is listed
+                [{'key': k, 'copy_to': field}]         copy entry[k] when present
+    checks      tests on effect fields of the matching entry, in order:
+                {'key': k, 'copy_to': field, 'cases': [...]}, skipped when the
+                entry has no k; copy_to copies entry[k]; the first case whose
+                test passes ({'contains': x}: x in value, {'equals': x},
+                {'in': [...]}, or no test) applies its 'score' (added to the
+                marker's score), 'copy_to' field, 'set' {field: value},
+                'append' {list field: text} and 'add' {field: n}; texts are
+                formatted with rsid, the marker's fields and the entry's value
+    count_field result field set to the number of markers listed
+    levels      first match wins: {'min': x, 'set': {...}} (score >= x),
+                {'max': x, 'set': ...} (score <= x), {'if': field, 'set': ...}
+                (result field truthy), {'set': ...} (otherwise)
+    levels_when when levels apply: 'found' (default, a marker matched),
+                'present' (a rule marker is in the kit) or 'scored'
+
+A new category of this kind is a table and a rule, no code.
+"""
+
+import importlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+COMPLEMENT = str.maketrans('ACGT', 'TGCA')
+
+
+def _candidates(keys) -> List[str]:
+    """Upper-case genotypes that can resolve to one of keys in any orientation"""
+    found = []
+    for key in keys:
+        upper = str(key).upper()
+        for genotype in (upper, upper[::-1], upper.translate(COMPLEMENT),
+                         upper.translate(COMPLEMENT)[::-1]):
+            if genotype not in found:
+                found.append(genotype)
+    return found
+
+
+# =============================================================================
+# COMPILED RULES
+# =============================================================================
+
+@dataclass
+class CompiledScoreRules:
+    """A module's category rules, resolved to per-entry genotype lookups"""
+    name: str
+    rules: List[Dict[str, Any]]
+    rsids: List[str]                    # unique rsids read by any category
+    by_rsid: List[List[tuple]]          # per rsid: (category, position, gene, genotype -> code, unmatched code)
+    plans: List[tuple]                  # per category, see _plan()
+    codes: List[tuple]                  # per code: (score, found, collect, flags, adds, matched)
+
+    def evaluate(self, snp_dict: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Result dict of every category"""
+        # Only rsids present in the kit are visited; each fans out to its entries
+        hits = [[] for _ in self.plans]
+        for rsid, entries in zip(self.rsids, self.by_rsid):
+            genotype = snp_dict.get(rsid)
+            if genotype is None:
+                continue
+            upper = genotype.upper()
+            for c, position, gene, lookup, unmatched in entries:
+                code = lookup.get(upper, unmatched)
+                if code is not None:
+                    hits[c].append((position, rsid, gene, genotype, code))
+
+        codes = self.codes
+        results = {}
+        for (category, template, list_fields, ordered, count_field, score_field,
+             aggregate, levels, found_field, levels_when), category_hits in zip(self.plans, hits):
+            result = template.copy()
+            for field in list_fields:
+                result[field] = list(result[field])
+            if count_field:
+                result[count_field] = len(category_hits)
+            results[category] = result
+            if not category_hits:
+                continue
+
+            if not ordered:
+                category_hits.sort()
+            markers_found = result[found_field]
+            scores = []
+            any_matched = False
+            for _, rsid, gene, genotype, code in category_hits:
+                score, found, collect, flags, adds, matched = codes[code]
+                any_matched = any_matched or matched
+                if score is not None:
+                    scores.append(score)
+                markers_found.append({'rsid': rsid, 'gene': gene, 'genotype': genotype, **found})
+                if collect:
+                    for field, values in collect:
+                        result[field].extend(values)
+                if flags:
+                    result.update(flags)
+                if adds:
+                    for field, n in adds:
+                        result[field] += n
+
+            if scores:
+                score = (max(scores) if aggregate == 'max' else sum(scores) if aggregate == 'sum'
+                         else sum(scores) / len(scores))
+            else:
+                score = 0 if aggregate == 'sum' else None
+            if score is not None and score_field:
+                result[score_field] = score
+
+            if (levels_when == 'found' and not any_matched
+                    or levels_when == 'scored' and not scores):
+                continue
+            for kind, value, updates in levels:
+                if (kind is None or kind == 'if' and result.get(value)
+                        or score is not None and (kind == 'min' and score >= value
+                                                  or kind == 'max' and score <= value)):
+                    result.update(updates)
+                    break
+
+        return results
+
+
+def _sources(rule: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if 'sources' in rule:
+        return rule['sources']
+    return [{'markers': rule['markers']}]
+
+
+def _plan(category: str, rule: Dict[str, Any], ordered: bool) -> tuple:
+    """Per-category settings read on every kit, flattened once"""
+    levels = []
+    for level in rule.get('levels', []):
+        kind = next((key for key in ('min', 'max', 'if') if key in level), None)
+        levels.append((kind, level.get(kind), level['set']))
+    template = rule['result']
+    return (category, template, [field for field, value in template.items() if isinstance(value, list)],
+            ordered, rule.get('count_field'), rule.get('score_field', 'score'),
+            rule.get('aggregate', 'mean'), levels, rule.get('found_field', 'markers_found'),
+            rule.get('levels_when', 'found'))
+
+
+def _marker_fields(rule: Dict[str, Any], marker: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: marker.get(key, default)
+            for field, (key, default) in rule.get('marker_fields', {}).items()}
+
+
+def _case_applies(case: Dict[str, Any], value: Any) -> bool:
+    if 'contains' in case:
+        return case['contains'] in value
+    if 'equals' in case:
+        return value == case['equals']
+    if 'in' in case:
+        return value in case['in']
+    return True
+
+
+def _compile_code(rule: Dict[str, Any], entry: Dict[str, Any], rsid: str,
+                  marker: Dict[str, Any]) -> tuple:
+    """Score, markers_found fields, collected lists, flags and counters of one genotype entry"""
+    score = None
+    if 'score' in rule:
+        score_key = rule['score']
+        score = entry[score_key] if 'default' not in rule else entry.get(score_key, rule['default'])
+
+    found = _marker_fields(rule, marker)
+    for field, key in rule.get('found', {}).items():
+        found[field] = entry[key] if isinstance(key, str) else entry.get(key[0], key[1])
+
+    collect = [(field, list(entry.get(key, []))) for field, key in rule.get('collect', {}).items()]
+
+    flags = {}
+    for flag in rule.get('flags', []):
+        key = flag['key']
+        if 'copy_to' in flag:
+            if key in entry:
+                flags[flag['copy_to']] = entry[key]
+        elif 'in' in flag:
+            if entry.get(key) in flag['in']:
+                flags.update(flag['set'])
+        elif entry.get(key):
+            flags.update(flag['set'])
+
+    adds = []
+    for check in rule.get('checks', []):
+        key = check['key']
+        if key not in entry:
+            continue
+        value = entry[key]
+        if 'copy_to' in check:
+            flags[check['copy_to']] = value
+        for case in check.get('cases', []):
+            if not _case_applies(case, value):
+                continue
+            if 'score' in case:
+                score = case['score'] if score is None else score + case['score']
+            if 'copy_to' in case:
+                flags[case['copy_to']] = value
+            flags.update(case.get('set', {}))
+            for field, text in case.get('append', {}).items():
+                collect.append((field, [text.format(**{**marker, 'rsid': rsid, 'value': value})]))
+            adds.extend(case.get('add', {}).items())
+            break
+    return score, found, collect, flags, adds, True
+
+
+def compile_score_rules(rules: Dict[str, Dict[str, Any]],
+                        resolve: Callable[[str, Dict], Optional[str]],
+                        name: str = '') -> CompiledScoreRules:
+    """
+    Compile category rules.
+
+    resolve(genotype, genotypes) is the module's orientation resolver; it is
+    run once per candidate genotype here, never per kit.
+    """
+    rsid_index: Dict[str, int] = {}
+    by_rsid: List[List[tuple]] = []
+    plans, codes = [], []
+
+    for c, (category, rule) in enumerate(rules.items()):
+        genotypes_key = rule.get('genotypes', 'genotypes')
+        indices = []
+        for source in _sources(rule):
+            table = source['markers']
+            for rsid in source.get('rsids', table):
+                marker = table[rsid]
+                genotypes = marker.get(genotypes_key, {})
+                key_codes = {}
+                for key in genotypes:
+                    key_codes[key] = len(codes)
+                    codes.append(_compile_code(rule, genotypes[key], rsid, marker))
+                unmatched = None
+                if rule.get('list_present'):
+                    unmatched = len(codes)
+                    codes.append((None, _marker_fields(rule, marker), [], {}, [], False))
+                lookup = {}
+                for genotype in _candidates(genotypes):
+                    key = resolve(genotype, genotypes)
+                    if isinstance(key, tuple):
+                        key = key[0]
+                    if key is not None:
+                        lookup[genotype] = key_codes[key]
+                if rsid not in rsid_index:
+                    rsid_index[rsid] = len(by_rsid)
+                    by_rsid.append([])
+                index = rsid_index[rsid]
+                by_rsid[index].append((c, len(indices), marker['gene'], lookup, unmatched))
+                indices.append(index)
+        plans.append(_plan(category, rule, indices == sorted(indices)))
+
+    return CompiledScoreRules(
+        name=name,
+        rules=list(rules.values()),
+        rsids=list(rsid_index),
+        by_rsid=by_rsid,
+        plans=plans,
+        codes=codes,
+    )
+
+
+_COMPILED_RULES: Dict[str, CompiledScoreRules] = {}
+
+
+def get_compiled_score_rules(module_name: str, table: str,
+                             resolver: str = 'get_genotype_key') -> CompiledScoreRules:
+    """Compiled rules of module_name.table, resolved with the module's resolver (cached)"""
+    ref = f"{module_name}.{table}"
+    if ref not in _COMPILED_RULES:
+        module = importlib.import_module(module_name)
+        _COMPILED_RULES[ref] = compile_score_rules(getattr(module, table),
+                                                   getattr(module, resolver), ref)
+    return _COMPILED_RULES[ref]
+
+
+def evaluate_score_rules(module_name: str, table: str, snp_dict: Dict[str, str],
+                         resolver: str = 'get_genotype_key') -> Dict[str, Dict[str, Any]]:
+    """Result dict of every category in module_name.table for a kit"""
+    return get_compiled_score_rules(module_name, table, resolver).evaluate(snp_dict)
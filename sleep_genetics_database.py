@@ -2136,6 +2136,260 @@ SLEEP_GENETICS_DATABASE = {
 }
 
 
+# =============================================================================
+# SCORE RULES (compiled by score_rules)
+# =============================================================================
+
+SLEEP_SCORE_RULES = {
+    'chronotype': {
+        'markers': CHRONOTYPE_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'phenotype': 'Intermediate',
+            'score': 0.5,
+            'markers_found': [],
+            'optimal_bedtime': '10:30-11:30 PM',
+            'optimal_wake': '6:30-7:30 AM',
+            'description': 'Balanced chronotype'
+        },
+        'found': {'phenotype': 'phenotype', 'description': ['description', '']},
+        'levels': [
+            {'min': 0.7, 'set': {
+                'phenotype': 'Strong morning person (lark)',
+                'optimal_bedtime': '9:00-10:00 PM',
+                'optimal_wake': '5:00-6:00 AM',
+                'description': 'You are genetically predisposed to be a morning person. Peak alertness is likely in the early morning hours.'}},
+            {'min': 0.55, 'set': {
+                'phenotype': 'Moderate morning preference',
+                'optimal_bedtime': '10:00-11:00 PM',
+                'optimal_wake': '6:00-7:00 AM',
+                'description': 'You have a mild morning preference. You likely feel best with a somewhat earlier schedule.'}},
+            {'min': 0.45, 'set': {
+                'phenotype': 'Intermediate chronotype',
+                'optimal_bedtime': '10:30-11:30 PM',
+                'optimal_wake': '6:30-7:30 AM',
+                'description': 'You have a balanced chronotype with flexibility in your schedule.'}},
+            {'min': 0.35, 'set': {
+                'phenotype': 'Moderate evening preference',
+                'optimal_bedtime': '11:30 PM-12:30 AM',
+                'optimal_wake': '7:30-8:30 AM',
+                'description': 'You have a mild evening preference. Peak performance may be later in the day.'}},
+            {'set': {
+                'phenotype': 'Strong evening person (owl)',
+                'optimal_bedtime': '12:00-1:00 AM',
+                'optimal_wake': '8:00-9:00 AM',
+                'description': 'You are genetically predisposed to be a night owl. Peak alertness is likely in the evening.'}},
+        ]
+    },
+    'sleep_duration': {
+        'markers': SLEEP_DURATION_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'hours_needed': '7-8 hours',
+            'phenotype': 'Normal sleep need',
+            'short_sleeper_variant': False,
+            'markers_found': [],
+            'score': 0.5
+        },
+        'found': {'phenotype': 'phenotype', 'hours_needed': ['hours_needed', 'Unknown']},
+        'flags': [{'key': 'short_sleeper', 'set': {'short_sleeper_variant': True}}],
+        'levels': [
+            {'if': 'short_sleeper_variant', 'set': {
+                'phenotype': 'Natural short sleeper',
+                'hours_needed': '5-6 hours',
+                'description': 'You carry a rare variant associated with needing less sleep.'}},
+            {'max': 0.35, 'set': {
+                'phenotype': 'Lower sleep need',
+                'hours_needed': '6-7 hours',
+                'description': 'You may function well on slightly less sleep than average.'}},
+            {'min': 0.65, 'set': {
+                'phenotype': 'Higher sleep need',
+                'hours_needed': '8-9 hours',
+                'description': 'You may need more sleep than average to feel fully rested.'}},
+            {'set': {
+                'phenotype': 'Normal sleep need',
+                'hours_needed': '7-8 hours',
+                'description': 'You likely need a typical amount of sleep (7-8 hours).'}},
+        ]
+    },
+    'sleep_quality': {
+        'markers': SLEEP_QUALITY_GENETICS['markers'],
+        'score': 'quality_score', 'default': 0.5,
+        'score_field': 'quality_score',
+        'result': {
+            'quality_score': 0.5,
+            'phenotype': 'Normal sleep quality',
+            'stress_impact': 'Moderate',
+            'markers_found': []
+        },
+        'found': {'phenotype': 'phenotype', 'stress_impact': ['stress_impact', 'Unknown']},
+        'levels': [
+            {'min': 0.65, 'set': {
+                'phenotype': 'Good genetic sleep quality',
+                'description': 'Your genetics support good sleep quality and resilience to disruption.'}},
+            {'min': 0.45, 'set': {
+                'phenotype': 'Normal sleep quality',
+                'description': 'Your sleep quality genetics are average.'}},
+            {'set': {
+                'phenotype': 'Variable sleep quality',
+                'description': 'Your genetics may make sleep quality more susceptible to external factors.'}},
+        ]
+    },
+    'insomnia_risk': {
+        'markers': INSOMNIA_GENETICS['markers'],
+        'score': 'risk_score', 'default': 0.5,
+        'score_field': 'risk_score',
+        'result': {
+            'risk_score': 0.5,
+            'risk_level': 'Average',
+            'markers_found': [],
+            'rls_plm_risk': 'Normal'
+        },
+        'found': {'phenotype': 'phenotype', 'description': ['description', '']},
+        'flags': [{'key': 'plm_risk', 'copy_to': 'rls_plm_risk'}],
+        'levels': [
+            {'min': 0.6, 'set': {
+                'risk_level': 'Elevated',
+                'description': 'You may be more susceptible to insomnia. Good sleep hygiene is especially important.'}},
+            {'max': 0.4, 'set': {
+                'risk_level': 'Lower',
+                'description': 'Your genetics suggest lower susceptibility to insomnia.'}},
+            {'set': {
+                'risk_level': 'Average',
+                'description': 'Your insomnia risk is about average.'}},
+        ]
+    },
+    'deep_sleep': {
+        'markers': DEEP_SLEEP_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'score': 0.5,
+            'percentage': 'Average (20-25%)',
+            'phenotype': 'Normal deep sleep',
+            'markers_found': []
+        },
+        'found': {'phenotype': 'phenotype', 'sws_percentage': ['sws_percentage', 'Unknown']},
+        'levels': [
+            {'min': 0.65, 'set': {
+                'phenotype': 'Enhanced deep sleep',
+                'percentage': 'Above average (25-30%)',
+                'description': 'Your genetics support good amounts of restorative deep sleep.'}},
+            {'max': 0.4, 'set': {
+                'phenotype': 'Reduced deep sleep tendency',
+                'percentage': 'Below average (15-20%)',
+                'description': 'You may get less deep sleep. Optimize sleep environment and avoid alcohol before bed.'}},
+            {'set': {
+                'phenotype': 'Normal deep sleep',
+                'percentage': 'Average (20-25%)',
+                'description': 'Your deep sleep genetics are typical.'}},
+        ]
+    },
+    'rem_sleep': {
+        'markers': REM_SLEEP_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'score': 0.5,
+            'percentage': 'Average (20-25%)',
+            'phenotype': 'Normal REM sleep',
+            'dreaming': 'Normal',
+            'markers_found': []
+        },
+        'found': {'phenotype': 'phenotype', 'dreaming': ['dreaming', 'Unknown']},
+        'levels': [
+            {'min': 0.6, 'set': {
+                'phenotype': 'Enhanced REM sleep',
+                'percentage': 'Above average (25-30%)',
+                'dreaming': 'Vivid dreams likely',
+                'description': 'You may have more REM sleep and vivid dreams.'}},
+            {'max': 0.4, 'set': {
+                'phenotype': 'Variable REM sleep',
+                'percentage': 'May vary',
+                'dreaming': 'Variable dream recall',
+                'description': 'Your REM sleep may be more variable.'}},
+            {'set': {
+                'phenotype': 'Normal REM sleep',
+                'percentage': 'Average (20-25%)',
+                'description': 'Your REM sleep genetics are typical.'}},
+        ]
+    },
+    'sleep_latency': {
+        'markers': SLEEP_LATENCY_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'score': 0.5,
+            'latency_minutes': '10-20 minutes',
+            'phenotype': 'Normal sleep onset',
+            'markers_found': []
+        },
+        'found': {'phenotype': 'phenotype', 'latency': ['latency_minutes', 'Unknown']},
+        'levels': [
+            {'min': 0.65, 'set': {
+                'phenotype': 'Fast sleep onset',
+                'latency_minutes': '5-10 minutes',
+                'description': 'You likely fall asleep quickly once in bed.'}},
+            {'max': 0.4, 'set': {
+                'phenotype': 'Slower sleep onset',
+                'latency_minutes': '20-30+ minutes',
+                'description': 'You may take longer to fall asleep. Consider relaxation techniques.'}},
+            {'set': {
+                'phenotype': 'Normal sleep onset',
+                'latency_minutes': '10-20 minutes',
+                'description': 'Your time to fall asleep is typical.'}},
+        ]
+    },
+    'shift_work_tolerance': {
+        'markers': SHIFT_WORK_GENETICS['markers'],
+        'score': 'score', 'default': 0.5,
+        'result': {
+            'score': 0.5,
+            'tolerance': 'Moderate',
+            'jet_lag_recovery': 'Average',
+            'markers_found': []
+        },
+        'found': {'phenotype': 'phenotype', 'adaptation': ['adaptation', 'Unknown']},
+        'levels': [
+            {'min': 0.6, 'set': {
+                'tolerance': 'Good',
+                'jet_lag_recovery': 'Faster',
+                'description': 'Your circadian system is relatively flexible. You may adapt to schedule changes more easily.'}},
+            {'max': 0.4, 'set': {
+                'tolerance': 'Poor',
+                'jet_lag_recovery': 'Slower',
+                'description': 'Your circadian rhythm may be more rigid. Avoid shift work if possible; allow extra recovery time after time zone changes.'}},
+            {'set': {
+                'tolerance': 'Moderate',
+                'jet_lag_recovery': 'Average',
+                'description': 'You have average tolerance for schedule changes.'}},
+        ]
+    },
+    'dsps_risk': {
+        'markers': DSPS_GENETICS['markers'],
+        'score': 'score', 'default': 0.2,
+        'aggregate': 'max',         # DSPS is often dominant
+        'score_field': 'risk_score',
+        'result': {
+            'risk_score': 0.2,
+            'risk_level': 'Low',
+            'dsps_mutation': False,
+            'markers_found': []
+        },
+        'found': {'phenotype': 'phenotype', 'dsps_risk': ['dsps_risk', 'Unknown']},
+        'flags': [{'key': 'dsps_risk', 'in': ['High', 'Very high'], 'set': {'dsps_mutation': True}}],
+        'levels': [
+            {'min': 0.7, 'set': {
+                'risk_level': 'High',
+                'description': 'You carry variants associated with Delayed Sleep Phase Syndrome. Consider light therapy and melatonin timing.'}},
+            {'min': 0.5, 'set': {
+                'risk_level': 'Moderate',
+                'description': 'You have some genetic tendency toward delayed sleep timing.'}},
+            {'set': {
+                'risk_level': 'Low',
+                'description': 'You have low genetic risk for DSPS.'}},
+        ]
+    },
+}
+
+
 # =============================================================================
 # ANALYSIS FUNCTIONS
 # =============================================================================
@@ -2150,18 +2404,10 @@ def analyze_sleep_genetics(dna_data: dict) -> dict:
     Returns:
         Dictionary with all sleep-related trait analysis
     """
-    results = {
-        'chronotype': analyze_chronotype(dna_data),
-        'sleep_duration': analyze_sleep_duration(dna_data),
-        'sleep_quality': analyze_sleep_quality(dna_data),
-        'insomnia_risk': analyze_insomnia_risk(dna_data),
-        'deep_sleep': analyze_deep_sleep(dna_data),
-        'rem_sleep': analyze_rem_sleep(dna_data),
-        'sleep_latency': analyze_sleep_latency(dna_data),
-        'shift_work_tolerance': analyze_shift_work(dna_data),
-        'dsps_risk': analyze_dsps(dna_data),
-        'caffeine_sleep': analyze_caffeine_sleep(dna_data)
-    }
+    # Score categories are evaluated together from SLEEP_SCORE_RULES
+    from score_rules import evaluate_score_rules
+    results = evaluate_score_rules('sleep_genetics_database', 'SLEEP_SCORE_RULES', dna_data)
+    results['caffeine_sleep'] = analyze_caffeine_sleep(dna_data)
 
     # Calculate overall sleep profile
     results['overall_profile'] = calculate_sleep_profile(results)
@@ -2170,474 +2416,6 @@ def analyze_sleep_genetics(dna_data: dict) -> dict:
     return results
 
 
-def analyze_chronotype(dna_data: dict) -> dict:
-    """Analyze chronotype (morning lark vs night owl)"""
-    result = {
-        'phenotype': 'Intermediate',
-        'score': 0.5,
-        'markers_found': [],
-        'optimal_bedtime': '10:30-11:30 PM',
-        'optimal_wake': '6:30-7:30 AM',
-        'description': 'Balanced chronotype'
-    }
-
-    scores = []
-
-    for rsid, marker_data in CHRONOTYPE_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'description': data.get('description', '')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['score'] = avg_score
-
-        if avg_score >= 0.7:
-            result['phenotype'] = 'Strong morning person (lark)'
-            result['optimal_bedtime'] = '9:00-10:00 PM'
-            result['optimal_wake'] = '5:00-6:00 AM'
-            result['description'] = 'You are genetically predisposed to be a morning person. Peak alertness is likely in the early morning hours.'
-        elif avg_score >= 0.55:
-            result['phenotype'] = 'Moderate morning preference'
-            result['optimal_bedtime'] = '10:00-11:00 PM'
-            result['optimal_wake'] = '6:00-7:00 AM'
-            result['description'] = 'You have a mild morning preference. You likely feel best with a somewhat earlier schedule.'
-        elif avg_score >= 0.45:
-            result['phenotype'] = 'Intermediate chronotype'
-            result['optimal_bedtime'] = '10:30-11:30 PM'
-            result['optimal_wake'] = '6:30-7:30 AM'
-            result['description'] = 'You have a balanced chronotype with flexibility in your schedule.'
-        elif avg_score >= 0.35:
-            result['phenotype'] = 'Moderate evening preference'
-            result['optimal_bedtime'] = '11:30 PM-12:30 AM'
-            result['optimal_wake'] = '7:30-8:30 AM'
-            result['description'] = 'You have a mild evening preference. Peak performance may be later in the day.'
-        else:
-            result['phenotype'] = 'Strong evening person (owl)'
-            result['optimal_bedtime'] = '12:00-1:00 AM'
-            result['optimal_wake'] = '8:00-9:00 AM'
-            result['description'] = 'You are genetically predisposed to be a night owl. Peak alertness is likely in the evening.'
-
-    return result
-
-
-def analyze_sleep_duration(dna_data: dict) -> dict:
-    """Analyze sleep duration needs"""
-    result = {
-        'hours_needed': '7-8 hours',
-        'phenotype': 'Normal sleep need',
-        'short_sleeper_variant': False,
-        'markers_found': [],
-        'score': 0.5
-    }
-
-    scores = []
-
-    for rsid, marker_data in SLEEP_DURATION_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('score', 0.5))
-
-                if data.get('short_sleeper', False):
-                    result['short_sleeper_variant'] = True
-
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'hours_needed': data.get('hours_needed', 'Unknown')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['score'] = avg_score
-
-        if result['short_sleeper_variant']:
-            result['phenotype'] = 'Natural short sleeper'
-            result['hours_needed'] = '5-6 hours'
-            result['description'] = 'You carry a rare variant associated with needing less sleep.'
-        elif avg_score <= 0.35:
-            result['phenotype'] = 'Lower sleep need'
-            result['hours_needed'] = '6-7 hours'
-            result['description'] = 'You may function well on slightly less sleep than average.'
-        elif avg_score >= 0.65:
-            result['phenotype'] = 'Higher sleep need'
-            result['hours_needed'] = '8-9 hours'
-            result['description'] = 'You may need more sleep than average to feel fully rested.'
-        else:
-            result['phenotype'] = 'Normal sleep need'
-            result['hours_needed'] = '7-8 hours'
-            result['description'] = 'You likely need a typical amount of sleep (7-8 hours).'
-
-    return result
-
-
-def analyze_sleep_quality(dna_data: dict) -> dict:
-    """Analyze sleep quality genetics"""
-    result = {
-        'quality_score': 0.5,
-        'phenotype': 'Normal sleep quality',
-        'stress_impact': 'Moderate',
-        'markers_found': []
-    }
-
-    scores = []
-
-    for rsid, marker_data in SLEEP_QUALITY_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                score = data.get('quality_score', 0.5)
-                scores.append(score)
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'stress_impact': data.get('stress_impact', 'Unknown')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['quality_score'] = avg_score
-
-        if avg_score >= 0.65:
-            result['phenotype'] = 'Good genetic sleep quality'
-            result['description'] = 'Your genetics support good sleep quality and resilience to disruption.'
-        elif avg_score >= 0.45:
-            result['phenotype'] = 'Normal sleep quality'
-            result['description'] = 'Your sleep quality genetics are average.'
-        else:
-            result['phenotype'] = 'Variable sleep quality'
-            result['description'] = 'Your genetics may make sleep quality more susceptible to external factors.'
-
-    return result
-
-
-def analyze_insomnia_risk(dna_data: dict) -> dict:
-    """Analyze insomnia susceptibility"""
-    result = {
-        'risk_score': 0.5,
-        'risk_level': 'Average',
-        'markers_found': [],
-        'rls_plm_risk': 'Normal'
-    }
-
-    scores = []
-
-    for rsid, marker_data in INSOMNIA_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('risk_score', 0.5))
-
-                if 'plm_risk' in data:
-                    result['rls_plm_risk'] = data['plm_risk']
-
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'description': data.get('description', '')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['risk_score'] = avg_score
-
-        if avg_score >= 0.6:
-            result['risk_level'] = 'Elevated'
-            result['description'] = 'You may be more susceptible to insomnia. Good sleep hygiene is especially important.'
-        elif avg_score <= 0.4:
-            result['risk_level'] = 'Lower'
-            result['description'] = 'Your genetics suggest lower susceptibility to insomnia.'
-        else:
-            result['risk_level'] = 'Average'
-            result['description'] = 'Your insomnia risk is about average.'
-
-    return result
-
-
-def analyze_deep_sleep(dna_data: dict) -> dict:
-    """Analyze deep sleep (slow-wave sleep) genetics"""
-    result = {
-        'score': 0.5,
-        'percentage': 'Average (20-25%)',
-        'phenotype': 'Normal deep sleep',
-        'markers_found': []
-    }
-
-    scores = []
-
-    for rsid, marker_data in DEEP_SLEEP_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'sws_percentage': data.get('sws_percentage', 'Unknown')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['score'] = avg_score
-
-        if avg_score >= 0.65:
-            result['phenotype'] = 'Enhanced deep sleep'
-            result['percentage'] = 'Above average (25-30%)'
-            result['description'] = 'Your genetics support good amounts of restorative deep sleep.'
-        elif avg_score <= 0.4:
-            result['phenotype'] = 'Reduced deep sleep tendency'
-            result['percentage'] = 'Below average (15-20%)'
-            result['description'] = 'You may get less deep sleep. Optimize sleep environment and avoid alcohol before bed.'
-        else:
-            result['phenotype'] = 'Normal deep sleep'
-            result['percentage'] = 'Average (20-25%)'
-            result['description'] = 'Your deep sleep genetics are typical.'
-
-    return result
-
-
-def analyze_rem_sleep(dna_data: dict) -> dict:
-    """Analyze REM sleep genetics"""
-    result = {
-        'score': 0.5,
-        'percentage': 'Average (20-25%)',
-        'phenotype': 'Normal REM sleep',
-        'dreaming': 'Normal',
-        'markers_found': []
-    }
-
-    scores = []
-
-    for rsid, marker_data in REM_SLEEP_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'dreaming': data.get('dreaming', 'Unknown')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['score'] = avg_score
-
-        if avg_score >= 0.6:
-            result['phenotype'] = 'Enhanced REM sleep'
-            result['percentage'] = 'Above average (25-30%)'
-            result['dreaming'] = 'Vivid dreams likely'
-            result['description'] = 'You may have more REM sleep and vivid dreams.'
-        elif avg_score <= 0.4:
-            result['phenotype'] = 'Variable REM sleep'
-            result['percentage'] = 'May vary'
-            result['dreaming'] = 'Variable dream recall'
-            result['description'] = 'Your REM sleep may be more variable.'
-        else:
-            result['phenotype'] = 'Normal REM sleep'
-            result['percentage'] = 'Average (20-25%)'
-            result['description'] = 'Your REM sleep genetics are typical.'
-
-    return result
-
-
-def analyze_sleep_latency(dna_data: dict) -> dict:
-    """Analyze sleep latency (time to fall asleep)"""
-    result = {
-        'score': 0.5,
-        'latency_minutes': '10-20 minutes',
-        'phenotype': 'Normal sleep onset',
-        'markers_found': []
-    }
-
-    scores = []
-
-    for rsid, marker_data in SLEEP_LATENCY_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'latency': data.get('latency_minutes', 'Unknown')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['score'] = avg_score
-
-        if avg_score >= 0.65:
-            result['phenotype'] = 'Fast sleep onset'
-            result['latency_minutes'] = '5-10 minutes'
-            result['description'] = 'You likely fall asleep quickly once in bed.'
-        elif avg_score <= 0.4:
-            result['phenotype'] = 'Slower sleep onset'
-            result['latency_minutes'] = '20-30+ minutes'
-            result['description'] = 'You may take longer to fall asleep. Consider relaxation techniques.'
-        else:
-            result['phenotype'] = 'Normal sleep onset'
-            result['latency_minutes'] = '10-20 minutes'
-            result['description'] = 'Your time to fall asleep is typical.'
-
-    return result
-
-
-def analyze_shift_work(dna_data: dict) -> dict:
-    """Analyze shift work tolerance"""
-    result = {
-        'score': 0.5,
-        'tolerance': 'Moderate',
-        'jet_lag_recovery': 'Average',
-        'markers_found': []
-    }
-
-    scores = []
-
-    for rsid, marker_data in SHIFT_WORK_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('score', 0.5))
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'adaptation': data.get('adaptation', 'Unknown')
-                })
-
-    if scores:
-        avg_score = sum(scores) / len(scores)
-        result['score'] = avg_score
-
-        if avg_score >= 0.6:
-            result['tolerance'] = 'Good'
-            result['jet_lag_recovery'] = 'Faster'
-            result['description'] = 'Your circadian system is relatively flexible. You may adapt to schedule changes more easily.'
-        elif avg_score <= 0.4:
-            result['tolerance'] = 'Poor'
-            result['jet_lag_recovery'] = 'Slower'
-            result['description'] = 'Your circadian rhythm may be more rigid. Avoid shift work if possible; allow extra recovery time after time zone changes.'
-        else:
-            result['tolerance'] = 'Moderate'
-            result['jet_lag_recovery'] = 'Average'
-            result['description'] = 'You have average tolerance for schedule changes.'
-
-    return result
-
-
-def analyze_dsps(dna_data: dict) -> dict:
-    """Analyze Delayed Sleep Phase Syndrome risk"""
-    result = {
-        'risk_score': 0.2,
-        'risk_level': 'Low',
-        'dsps_mutation': False,
-        'markers_found': []
-    }
-
-    scores = []
-
-    for rsid, marker_data in DSPS_GENETICS['markers'].items():
-        if rsid in dna_data:
-            genotype = dna_data[rsid]
-            genotypes = marker_data['genotypes']
-
-            _key = get_genotype_key(genotype, genotypes)
-            if _key:
-
-                data = genotypes[_key]
-                scores.append(data.get('score', 0.2))
-
-                if data.get('dsps_risk') in ['High', 'Very high']:
-                    result['dsps_mutation'] = True
-
-                result['markers_found'].append({
-                    'rsid': rsid,
-                    'gene': marker_data['gene'],
-                    'genotype': genotype,
-                    'phenotype': data['phenotype'],
-                    'dsps_risk': data.get('dsps_risk', 'Unknown')
-                })
-
-    if scores:
-        max_score = max(scores)  # DSPS is often dominant
-        result['risk_score'] = max_score
-
-        if max_score >= 0.7:
-            result['risk_level'] = 'High'
-            result['description'] = 'You carry variants associated with Delayed Sleep Phase Syndrome. Consider light therapy and melatonin timing.'
-        elif max_score >= 0.5:
-            result['risk_level'] = 'Moderate'
-            result['description'] = 'You have some genetic tendency toward delayed sleep timing.'
-        else:
-            result['risk_level'] = 'Low'
-            result['description'] = 'You have low genetic risk for DSPS.'
-
-    return result
-
-
 def analyze_caffeine_sleep(dna_data: dict) -> dict:
     """Analyze caffeine's effect on sleep"""
     result = {
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Star Allele Diplotype Caller
+Calls pharmacogene diplotypes (e.g. CYP2D6 *1/*4) from unphased array
+genotypes and assigns CPIC activity scores and phenotypes.
+
+Each gene's STAR_ALLELE_DEFINITIONS are compiled into one bitmask per allele
+over the gene's defining sites, and every unordered allele pair is
+precomputed. A kit's genotypes become three masks - sites called,
+heterozygous, homozygous variant - and a pair (a, b) explains them exactly
+when, on the called sites, a & b equals the homozygous mask and a ^ b equals
+the heterozygous mask (phase does not matter). That test is a few integer
+operations per pair, so whole cohorts are called as one (kits x pairs) array
+operation.
+
+Consistent diplotypes that need variants at uncalled sites are dropped when
+one that does not exists; the rest are ranked by non-reference alleles (so
+*1/*3A before *3B/*3C) and reported as candidates. When none is consistent
+(an allele the table does not know), the closest pair is reported with
+exact=False.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Candidate diplotypes listed per gene call
+MAX_CANDIDATES = 5
+
+_COMPLEMENT = {'A': 'T', 'T': 'A', 'C': 'G', 'G': 'C'}
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    """Set bits per element of a uint64 array"""
+    x = x.astype(np.uint64)
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+def _variant_counts(ref: str, alt: str) -> Dict[str, int]:
+    """Genotype -> variant allele count, in either orientation and on either strand"""
+    counts = {}
+    strands = [(ref, alt)]
+    if _COMPLEMENT.get(ref) != alt:     # palindromic sites are only read as given
+        strands.append((_COMPLEMENT.get(ref, ref), _COMPLEMENT.get(alt, alt)))
+    for r, a in reversed(strands):
+        for first in (r, a):
+            for second in (r, a):
+                counts[first + second] = (first == a) + (second == a)
+    return counts
+
+
+def _phenotype(phenotypes: List[Tuple[float, str]], activity_score: float) -> str:
+    """First phenotype whose threshold the activity score reaches (thresholds descending)"""
+    for threshold, phenotype in phenotypes:
+        if activity_score >= threshold:
+            return phenotype
+    return phenotypes[-1][1]
+
+
+# =============================================================================
+# COMPILED DEFINITIONS
+# =============================================================================
+
+@dataclass
+class CompiledGene:
+    """One gene's allele definitions as bitmasks, with every allele pair"""
+    gene: str
+    sites: List[str]                # defining rsids, bit i = sites[i]
+    genotype_counts: List[Dict[str, int]]   # per site: genotype -> variant count
+    alleles: List[str]              # reference allele first
+    masks: np.ndarray               # (alleles,) uint64
+    activity: np.ndarray            # (alleles,)
+    function: List[str]
+    phenotypes: List[Tuple[float, str]]
+    pair_a: np.ndarray              # (pairs,) allele indices, a <= b
+    pair_b: np.ndarray
+    pair_and: np.ndarray            # (pairs,) uint64 masks[a] & masks[b]
+    pair_xor: np.ndarray
+    pair_union: np.ndarray
+    pair_nonref: np.ndarray         # (pairs,) non-reference alleles in the pair
+    pair_activity: np.ndarray       # (pairs,) activity score
+    pair_phenotype: List[str]
+
+    def encode(self, snp_dicts: List[Dict[str, str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(called, heterozygous, homozygous variant) uint64 masks per kit"""
+        counts = np.full((len(snp_dicts), len(self.sites)), -1, dtype=np.int8)
+        for k, snp_dict in enumerate(snp_dicts):
+            for i, (rsid, lookup) in enumerate(zip(self.sites, self.genotype_counts)):
+                genotype = snp_dict.get(rsid)
+                if genotype:
+                    counts[k, i] = lookup.get(genotype.upper(), -1)
+        bits = np.uint64(1) << np.arange(len(self.sites), dtype=np.uint64)
+        called = np.bitwise_or.reduce(np.where(counts >= 0, bits, np.uint64(0)), axis=1)
+        het = np.bitwise_or.reduce(np.where(counts == 1, bits, np.uint64(0)), axis=1)
+        hom = np.bitwise_or.reduce(np.where(counts == 2, bits, np.uint64(0)), axis=1)
+        return called, het, hom
+
+    def diplotype(self, pair: int) -> str:
+        return f"{self.alleles[self.pair_a[pair]]}/{self.alleles[self.pair_b[pair]]}"
+
+
+def compile_gene(gene: str, definition: Dict, snp_table: Dict) -> CompiledGene:
+    """Compile one STAR_ALLELE_DEFINITIONS entry against its SNP table"""
+    definitions = definition['alleles']
+    sites = list(dict.fromkeys(rsid for allele in definitions.values()
+                               for rsid in allele['sites']))
+    if len(sites) > 64:
+        raise ValueError(f"{gene}: more than 64 defining sites")
+
+    genotype_counts = []
+    for rsid in sites:
+        if rsid not in snp_table:
+            raise ValueError(f"{gene}: defining site {rsid} is not in the SNP table")
+        genotypes = list(snp_table[rsid]['effect'])
+        genotype_counts.append(_variant_counts(genotypes[0][0], genotypes[-1][0]))
+
+    alleles = [definition.get('reference', '*1')] + list(definitions)
+    masks = np.zeros(len(alleles), dtype=np.uint64)
+    for i, name in enumerate(alleles[1:], start=1):
+        for rsid in definitions[name]['sites']:
+            masks[i] |= np.uint64(1) << np.uint64(sites.index(rsid))
+    activity = np.array([1.0] + [definitions[a]['activity'] for a in alleles[1:]])
+    function = ['normal'] + [definitions[a]['function'] for a in alleles[1:]]
+
+    pair_a, pair_b = np.triu_indices(len(alleles))
+    pair_activity = activity[pair_a] + activity[pair_b]
+    phenotypes = sorted(definition['phenotypes'], reverse=True)
+    return CompiledGene(
+        gene=gene,
+        sites=sites,
+        genotype_counts=genotype_counts,
+        alleles=alleles,
+        masks=masks,
+        activity=activity,
+        function=function,
+        phenotypes=phenotypes,
+        pair_a=pair_a,
+        pair_b=pair_b,
+        pair_and=masks[pair_a] & masks[pair_b],
+        pair_xor=masks[pair_a] ^ masks[pair_b],
+        pair_union=masks[pair_a] | masks[pair_b],
+        pair_nonref=(pair_a > 0).astype(np.int64) + (pair_b > 0),
+        pair_activity=pair_activity,
+        pair_phenotype=[_phenotype(phenotypes, score) for score in pair_activity],
+    )
+
+
+def compile_star_alleles(definitions: Dict = None) -> Dict[str, CompiledGene]:
+    """Compile STAR_ALLELE_DEFINITIONS (gene -> definition) for every gene"""
+    import pharmacogenomics_database
+    if definitions is None:
+        definitions = pharmacogenomics_database.STAR_ALLELE_DEFINITIONS
+    return {gene: compile_gene(gene, definition,
+                               getattr(pharmacogenomics_database, definition['table']))
+            for gene, definition in definitions.items()}
+
+
+_COMPILED_STAR_ALLELES = None
+
+
+def get_compiled_star_alleles() -> Dict[str, CompiledGene]:
+    """Compiled STAR_ALLELE_DEFINITIONS (cached)"""
+    global _COMPILED_STAR_ALLELES
+    if _COMPILED_STAR_ALLELES is None:
+        _COMPILED_STAR_ALLELES = compile_star_alleles()
+    return _COMPILED_STAR_ALLELES
+
+
+# =============================================================================
+# CALLING
+# =============================================================================
+
+def _call_gene(compiled: CompiledGene, snp_dicts: List[Dict[str, str]]) -> List[Optional[Dict]]:
+    called, het, hom = compiled.encode(snp_dicts)
+    c = called[:, None]
+
+    # (kits, pairs): sites where the pair disagrees with the genotypes
+    mismatch = (((compiled.pair_and[None, :] ^ hom[:, None]) |
+                 (compiled.pair_xor[None, :] ^ het[:, None])) & c)
+    consistent = mismatch == 0
+    uncalled = _popcount(compiled.pair_union[None, :] & ~c)
+    penalty = uncalled * 4 + compiled.pair_nonref[None, :]
+
+    exact = consistent.any(axis=1)
+    best_exact = np.where(consistent, penalty, np.iinfo(np.int64).max).argmin(axis=1)
+    # No exact match: fewest disagreeing sites, then fewest observed variants
+    # left unexplained
+    distance = _popcount(mismatch)
+    unexplained = _popcount((((het | hom)[:, None] & ~compiled.pair_union[None, :]) |
+                             (hom[:, None] & ~compiled.pair_and[None, :])))
+    best_closest = ((distance * 64 + unexplained) * 1024 + penalty).argmin(axis=1)
+    best = np.where(exact, best_exact, best_closest)
+    # Pairs needing variants at more uncalled sites are less supported
+    fewest_uncalled = np.where(consistent, uncalled, 64).min(axis=1)
+    supported = consistent & (uncalled == fewest_uncalled[:, None])
+    sites_called = _popcount(called)
+
+    calls = []
+    for k in range(len(snp_dicts)):
+        if called[k] == 0:
+            calls.append(None)
+            continue
+        if exact[k]:
+            candidates = np.flatnonzero(supported[k])
+            candidates = candidates[np.argsort(penalty[k, candidates], kind='stable')]
+        else:
+            candidates = best[k:k + 1]
+        pair = best[k]
+        calls.append({
+            'gene': compiled.gene,
+            'diplotype': compiled.diplotype(pair),
+            'activity_score': float(compiled.pair_activity[pair]),
+            'phenotype': compiled.pair_phenotype[pair],
+            'allele_functions': [compiled.function[compiled.pair_a[pair]],
+                                 compiled.function[compiled.pair_b[pair]]],
+            'exact': bool(exact[k]),
+            'candidates': [compiled.diplotype(p) for p in candidates[:MAX_CANDIDATES]],
+            'phenotype_ambiguous': len({compiled.pair_phenotype[p] for p in candidates}) > 1,
+            'sites_called': int(sites_called[k]),
+            'sites_total': len(compiled.sites),
+        })
+    return calls
+
+
+def call_cohort(snp_dicts: List[Dict[str, str]],
+                compiled: Dict[str, CompiledGene] = None) -> List[Dict[str, Dict]]:
+    """
+    Diplotype calls for many kits at once.
+
+    Returns one dict per kit: gene -> call (genes with no defining site
+    called are left out).
+    """
+    if compiled is None:
+        compiled = get_compiled_star_alleles()
+    results = [{} for _ in snp_dicts]
+    for gene, gene_compiled in compiled.items():
+        for result, call in zip(results, _call_gene(gene_compiled, snp_dicts)):
+            if call is not None:
+                result[gene] = call
+    return results
+
+
+def call_diplotypes(snp_dict: Dict[str, str],
+                    compiled: Dict[str, CompiledGene] = None) -> Dict[str, Dict[str, Any]]:
+    """Diplotype, activity score and phenotype per gene for one kit"""
+    return call_cohort([snp_dict], compiled)[0]